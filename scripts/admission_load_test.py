@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.client import HTTPConnection
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+ARTIFACT = ROOT / "artifacts" / "admission_load_test.json"
+
+sys.path.insert(0, str(ROOT))
+
+from scripts.keep_alive_benchmark import TRACE_ID, percentile, seed_store  # noqa: E402
+
+THRESHOLDS = {
+    # Anything but 200 or a 503 shed means overload leaked through as errors or timeouts.
+    "unexpected_responses_max": 0,
+    # A shed request waits at most the queue timeout; this is the allowance on top of it.
+    "shed_p99_ms_over_queue_timeout_max": 1500.0,
+    "health_p99_ms_max": 250.0,
+}
+QUEUE_DEPTH_METRIC = 'agent_director_admission_queue_depth{route="/api/traces/{trace_id}/replay"}'
+# The server runs in its own process so client threads do not compete with it for the GIL. The
+# default listen backlog of 5 would turn the burst into client-side SYN retries.
+SERVER_CODE = """
+from http.server import ThreadingHTTPServer
+from server.main import ApiHandler, configure_api_handler
+
+class BacklogHTTPServer(ThreadingHTTPServer):
+    request_queue_size = 1024
+
+configure_api_handler()
+ApiHandler.rate_limit_max_requests = 1_000_000
+server = BacklogHTTPServer(("127.0.0.1", 0), ApiHandler)
+print(server.server_address[1], flush=True)
+server.serve_forever()
+"""
+
+
+def start_server(data_dir: Path, args: argparse.Namespace) -> tuple[subprocess.Popen, int]:
+    env = {
+        **os.environ,
+        "AGENT_DIRECTOR_DATA_DIR": str(data_dir),
+        "AGENT_DIRECTOR_HEAVY_WORKERS": str(args.limit),
+        "AGENT_DIRECTOR_HEAVY_QUEUE_DEPTH": str(args.queue_depth),
+        "AGENT_DIRECTOR_HEAVY_QUEUE_TIMEOUT_S": str(args.queue_timeout_s),
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-c", SERVER_CODE], cwd=ROOT, env=env, stdout=subprocess.PIPE, text=True
+    )
+    line = process.stdout.readline() if process.stdout else ""
+    if not line.strip().isdigit():
+        process.kill()
+        raise RuntimeError(f"Server did not start: {line!r}")
+    return process, int(line)
+
+
+def replay_request(port: int, index: int, start: threading.Event) -> tuple[int, float]:
+    body = json.dumps({"step_id": "s1", "strategy": "hybrid", "modifications": {"attempt": index}})
+    start.wait()
+    started = time.perf_counter()
+    conn = HTTPConnection("127.0.0.1", port, timeout=60)
+    try:
+        conn.request(
+            "POST",
+            f"/api/traces/{TRACE_ID}/replay",
+            body=body,
+            headers={"Content-Type": "application/json"},
+        )
+        resp = conn.getresponse()
+        resp.read()
+        status = resp.status
+    except OSError:
+        status = 0
+    finally:
+        conn.close()
+    return status, (time.perf_counter() - started) * 1000
+
+
+def poll_health(
+    port: int, stop: threading.Event, samples: list[float], max_queue: list[float]
+) -> None:
+    """Time cheap requests during the burst and track the replay route's admission queue depth."""
+    conn = HTTPConnection("127.0.0.1", port, timeout=10)
+    while not stop.is_set():
+        started = time.perf_counter()
+        conn.request("GET", "/api/health")
+        conn.getresponse().read()
+        samples.append((time.perf_counter() - started) * 1000)
+        conn.request("GET", "/api/metrics")
+        for line in conn.getresponse().read().decode("utf-8").splitlines():
+            if line.startswith(QUEUE_DEPTH_METRIC + " "):
+                max_queue[0] = max(max_queue[0], float(line.rsplit(" ", 1)[1]))
+        time.sleep(0.01)
+    conn.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Replay burst against admission control on the stdlib server"
+    )
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--steps", type=int, default=300)
+    parser.add_argument("--limit", type=int, default=4)
+    parser.add_argument("--queue-depth", type=int, default=16)
+    parser.add_argument("--queue-timeout-s", type=float, default=5.0)
+    args = parser.parse_args()
+
+    errors: list[str] = []
+    metrics: dict[str, float] = {}
+    results: list[tuple[int, float]] = []
+    health: list[float] = []
+    max_queue = [0.0]
+    elapsed_s = 0.0
+    with tempfile.TemporaryDirectory() as tmp:
+        seed_store(Path(tmp), args.steps)
+        start, stop = threading.Event(), threading.Event()
+        process = None
+        started = time.perf_counter()
+        try:
+            process, port = start_server(Path(tmp), args)
+            poller = threading.Thread(
+                target=poll_health, args=(port, stop, health, max_queue), daemon=True
+            )
+            poller.start()
+            started = time.perf_counter()
+            with ThreadPoolExecutor(args.requests) as pool:
+                futures = [
+                    pool.submit(replay_request, port, index, start)
+                    for index in range(args.requests)
+                ]
+                start.set()
+                results = [future.result() for future in futures]
+            elapsed_s = time.perf_counter() - started
+            stop.set()
+            poller.join(timeout=10)
+        except (OSError, RuntimeError) as exc:
+            errors.append(f"Load test failed: {exc}")
+        finally:
+            stop.set()
+            if process is not None:
+                process.send_signal(signal.SIGTERM)
+                process.wait(timeout=10)
+                if process.stdout:
+                    process.stdout.close()
+
+    if results:
+        statuses = Counter(status for status, _ in results)
+        served = [ms for status, ms in results if status == 200]
+        shed = [ms for status, ms in results if status == 503]
+        metrics["served"] = statuses[200]
+        metrics["shed"] = statuses[503]
+        metrics["unexpected_responses"] = len(results) - statuses[200] - statuses[503]
+        metrics["served_per_s"] = round(statuses[200] / elapsed_s, 1)
+        metrics["max_queue_depth"] = max_queue[0]
+        if served:
+            metrics["served_p50_ms"] = percentile(served, 50)
+            metrics["served_p99_ms"] = percentile(served, 99)
+        if shed:
+            metrics["shed_p50_ms"] = percentile(shed, 50)
+            metrics["shed_p99_ms"] = percentile(shed, 99)
+        if health:
+            metrics["health_p99_ms"] = percentile(health, 99)
+        if metrics["unexpected_responses"] > THRESHOLDS["unexpected_responses_max"]:
+            errors.append(f"Unexpected responses under load: {dict(statuses)}")
+        shed_budget_ms = (
+            args.queue_timeout_s * 1000 + THRESHOLDS["shed_p99_ms_over_queue_timeout_max"]
+        )
+        if metrics.get("shed_p99_ms", 0.0) > shed_budget_ms:
+            errors.append("Shed requests were not rejected promptly")
+        if metrics.get("health_p99_ms", 0.0) > THRESHOLDS["health_p99_ms_max"]:
+            errors.append("Cheap requests degraded under heavy load")
+        if metrics["max_queue_depth"] > args.queue_depth:
+            errors.append("Admission queue grew past its bound")
+    status = "fail" if errors else "pass"
+
+    artifact = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "workspace": str(ROOT),
+        "status": status,
+        "config": {
+            "requests": args.requests,
+            "steps": args.steps,
+            "limit": args.limit,
+            "queue_depth": args.queue_depth,
+            "queue_timeout_s": args.queue_timeout_s,
+        },
+        "thresholds": THRESHOLDS,
+        "metrics": metrics,
+        "errors": errors,
+    }
+    ARTIFACT.parent.mkdir(parents=True, exist_ok=True)
+    ARTIFACT.write_text(json.dumps(artifact, indent=2) + "\n", encoding="utf-8")
+
+    print(f"Wrote {ARTIFACT}")
+    print(json.dumps(metrics, indent=2))
+    print(f"Admission load test status: {status}")
+    return 0 if status == "pass" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from http.client import HTTPConnection
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+ARTIFACT = ROOT / "artifacts" / "keep_alive_benchmark.json"
+
+sys.path.insert(0, str(ROOT))
+
+from server.extensions.loader import ExtensionRegistry  # noqa: E402
+from server.main import ApiHandler  # noqa: E402
+from server.replay.jobs import ReplayJobStore  # noqa: E402
+from server.trace.live import LiveTraceBroker  # noqa: E402
+from server.trace.schema import StepDetails, StepSummary, TraceMetadata, TraceSummary  # noqa: E402
+from server.trace.store import TraceStore  # noqa: E402
+
+THRESHOLDS = {
+    "keep_alive_p50_speedup_min": 1.1,
+    "keep_alive_p99_ms_max": 50.0,
+}
+TRACE_ID = "keep-alive-bench"
+
+
+def seed_store(data_dir: Path, steps: int) -> TraceStore:
+    store = TraceStore(data_dir)
+    summary = TraceSummary(
+        id=TRACE_ID,
+        name="Keep-alive benchmark",
+        startedAt="2026-01-27T10:00:00.000Z",
+        endedAt="2026-01-27T10:10:00.000Z",
+        status="completed",
+        metadata=TraceMetadata(
+            source="manual", agentName="Bench", modelId="demo", wallTimeMs=600_000
+        ),
+        steps=[
+            StepSummary(
+                id=f"s{index}",
+                index=index,
+                type="llm_call",
+                name=f"step {index}",
+                startedAt="2026-01-27T10:00:00.000Z",
+                endedAt="2026-01-27T10:00:01.000Z",
+                durationMs=1000,
+                status="completed",
+                childStepIds=[],
+            )
+            for index in range(steps)
+        ],
+    )
+    store.ingest_trace(summary)
+    for step in summary.steps:
+        store.save_step_details(
+            TRACE_ID, StepDetails.from_summary(step, {"data": {"prompt": "scrub " * 40}})
+        )
+    return store
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return round(ordered[index], 3)
+
+
+def timed_requests(port: int, paths: list[str], keep_alive: bool) -> list[float]:
+    samples: list[float] = []
+    conn = HTTPConnection("127.0.0.1", port, timeout=10)
+    for path in paths:
+        if not keep_alive:
+            conn = HTTPConnection("127.0.0.1", port, timeout=10)
+        started = time.perf_counter()
+        conn.request("GET", path, headers={} if keep_alive else {"Connection": "close"})
+        resp = conn.getresponse()
+        resp.read()
+        samples.append((time.perf_counter() - started) * 1000)
+        if resp.status != 200:
+            raise RuntimeError(f"{path} returned {resp.status}")
+        if not keep_alive:
+            conn.close()
+    conn.close()
+    return samples
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Step-detail request latency with and without keep-alive"
+    )
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--steps", type=int, default=50)
+    args = parser.parse_args()
+
+    status = "pass"
+    errors: list[str] = []
+    metrics: dict[str, float] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        ApiHandler.store = seed_store(Path(tmp), args.steps)
+        ApiHandler.replay_jobs = ReplayJobStore()
+        ApiHandler.live_broker = LiveTraceBroker()
+        ApiHandler.extension_registry = ExtensionRegistry()
+        ApiHandler.rate_limit_max_requests = args.requests * 4
+        ApiHandler.max_requests_per_connection = args.requests * 4
+        server = ThreadingHTTPServer(("127.0.0.1", 0), ApiHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        port = server.server_address[1]
+        paths = [
+            f"/api/traces/{TRACE_ID}/steps/s{index % args.steps}" for index in range(args.requests)
+        ]
+        try:
+            timed_requests(port, paths[: min(20, len(paths))], keep_alive=True)
+            results = {
+                mode: timed_requests(port, paths, mode == "keep_alive")
+                for mode in ("close", "keep_alive")
+            }
+        except (OSError, RuntimeError) as exc:
+            results = {}
+            errors.append(f"Benchmark request failed: {exc}")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    for mode, samples in results.items():
+        metrics[f"{mode}_p50_ms"] = percentile(samples, 50)
+        metrics[f"{mode}_p99_ms"] = percentile(samples, 99)
+        metrics[f"{mode}_requests_per_s"] = round(len(samples) / (sum(samples) / 1000), 1)
+    if results:
+        metrics["keep_alive_p50_speedup"] = round(
+            statistics.median(results["close"]) / statistics.median(results["keep_alive"]), 2
+        )
+        if metrics["keep_alive_p50_speedup"] < THRESHOLDS["keep_alive_p50_speedup_min"]:
+            errors.append("Keep-alive p50 speedup below threshold")
+        if metrics["keep_alive_p99_ms"] > THRESHOLDS["keep_alive_p99_ms_max"]:
+            errors.append("Keep-alive p99 latency exceeds threshold")
+    if errors:
+        status = "fail"
+
+    artifact = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "workspace": str(ROOT),
+        "status": status,
+        "config": {"requests": args.requests, "steps": args.steps},
+        "thresholds": THRESHOLDS,
+        "metrics": metrics,
+        "errors": errors,
+    }
+    ARTIFACT.parent.mkdir(parents=True, exist_ok=True)
+    ARTIFACT.write_text(json.dumps(artifact, indent=2) + "\n", encoding="utf-8")
+
+    print(f"Wrote {ARTIFACT}")
+    print(json.dumps(metrics, indent=2))
+    print(f"Keep-alive benchmark status: {status}")
+    return 0 if status == "pass" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable
+
+ROOT = Path(__file__).resolve().parents[1]
+ARTIFACT = ROOT / "artifacts" / "mcp_transport_benchmark.json"
+
+sys.path.insert(0, str(ROOT))
+
+from scripts.keep_alive_benchmark import TRACE_ID, percentile, seed_store  # noqa: E402
+
+try:
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+    from mcp.client.streamable_http import streamablehttp_client
+except Exception as exc:  # pragma: no cover - runtime dependency
+    raise SystemExit("mcp package not installed. Install with: pip install \"mcp[cli]\"") from exc
+
+# Only correctness is gated; latency and throughput are reported until a recorded baseline
+# exists to set limits from.
+THRESHOLDS = {
+    "error_calls_max": 0,
+}
+TRANSPORTS = ("stdio", "streamable-http")
+SERVER_ARGS = ["-m", "server.mcp_server"]
+SHOW_PAGE_STEPS = 50
+
+
+def workload(steps: int) -> list[tuple[str, Callable[[int], dict[str, Any]]]]:
+    """The mixed call sequence; argument builders take the call number so requests vary."""
+    return [
+        ("list_traces", lambda call: {"summary_only": True}),
+        (
+            "show_trace",
+            lambda call: {
+                "trace_id": TRACE_ID,
+                "step_offset": call * SHOW_PAGE_STEPS % steps,
+                "step_limit": SHOW_PAGE_STEPS,
+            },
+        ),
+        ("get_step_details", lambda call: {"trace_id": TRACE_ID, "step_id": f"s{call % steps}"}),
+        (
+            "replay_from_step",
+            lambda call: {
+                "trace_id": TRACE_ID,
+                "step_id": f"s{call % steps}",
+                "strategy": "recorded",
+                "modifications": {"attempt": call},
+            },
+        ),
+        ("compare_traces", lambda call: {"left_trace_id": TRACE_ID, "right_trace_id": TRACE_ID}),
+    ]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_for_port(port: int, process: subprocess.Popen, timeout_s: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"MCP server exited with {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"MCP server did not listen on {port}")
+
+
+@asynccontextmanager
+async def open_session(transport: str, data_dir: Path) -> AsyncIterator[ClientSession]:
+    """Start `server.mcp_server` on `transport` against `data_dir` and connect one client to it."""
+    env = {
+        **os.environ,
+        "AGENT_DIRECTOR_DATA_DIR": str(data_dir),
+        "AGENT_DIRECTOR_MCP_TRANSPORT": transport,
+    }
+    if transport == "stdio":
+        params = StdioServerParameters(command=sys.executable, args=SERVER_ARGS, env=env, cwd=ROOT)
+        async with stdio_client(params) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                yield session
+        return
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, *SERVER_ARGS],
+        cwd=ROOT,
+        env={
+            **env,
+            "FASTMCP_HOST": "127.0.0.1",
+            "FASTMCP_PORT": str(port),
+            "FASTMCP_LOG_LEVEL": "WARNING",
+        },
+    )
+    try:
+        await wait_for_port(port, process)
+        async with streamablehttp_client(f"http://127.0.0.1:{port}/mcp") as (read, write, _):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                yield session
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+async def run_level(
+    session: ClientSession, calls: int, concurrency: int, steps: int, first_call: int
+) -> tuple[list[float], int, float]:
+    """Issue `calls` workload calls, `concurrency` at a time.
+
+    Returns (latencies in ms, failed calls, elapsed seconds).
+    """
+    mix = workload(steps)
+    next_call = iter(range(first_call, first_call + calls))
+    latencies: list[float] = []
+    errors = 0
+
+    async def worker() -> None:
+        nonlocal errors
+        for call in next_call:
+            tool, arguments = mix[call % len(mix)]
+            started = time.perf_counter()
+            try:
+                result = await session.call_tool(tool, arguments(call))
+                failed = bool(result.isError)
+            except Exception:
+                failed = True
+            latencies.append((time.perf_counter() - started) * 1000)
+            errors += failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+async def bench_transport(
+    transport: str, args: argparse.Namespace, metrics: dict[str, float], errors: list[str]
+) -> None:
+    key = transport.replace("-", "_")
+    with tempfile.TemporaryDirectory() as tmp:
+        seed_store(Path(tmp), args.steps)
+        async with open_session(transport, Path(tmp)) as session:
+            # One untimed pass so imports, caches and connection setup are not charged to level 1.
+            await run_level(session, len(workload(args.steps)), 1, args.steps, 0)
+            first_call = len(workload(args.steps))
+            throughput: dict[int, float] = {}
+            for concurrency in args.concurrency:
+                latencies, failed, elapsed_s = await run_level(
+                    session, args.calls, concurrency, args.steps, first_call
+                )
+                first_call += args.calls
+                prefix = f"{key}_c{concurrency}"
+                metrics[f"{prefix}_p50_ms"] = percentile(latencies, 50)
+                metrics[f"{prefix}_p99_ms"] = percentile(latencies, 99)
+                metrics[f"{prefix}_calls_per_s"] = throughput[concurrency] = round(
+                    len(latencies) / elapsed_s, 1
+                )
+                metrics[f"{prefix}_errors"] = failed
+                if failed > THRESHOLDS["error_calls_max"]:
+                    errors.append(
+                        f"{transport}: {failed} failed calls at concurrency {concurrency}"
+                    )
+
+    # Calls/s at the highest concurrency divided by the best level.
+    top = max(args.concurrency)
+    metrics[f"{key}_throughput_retention"] = round(throughput[top] / max(throughput.values()), 2)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Mixed MCP tool workload over each server transport"
+    )
+    parser.add_argument("--transport", choices=TRANSPORTS, action="append")
+    parser.add_argument("--steps", type=int, default=300)
+    parser.add_argument("--calls", type=int, default=200, help="calls per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+    transports = args.transport or list(TRANSPORTS)
+
+    errors: list[str] = []
+    metrics: dict[str, float] = {}
+    for transport in transports:
+        try:
+            asyncio.run(bench_transport(transport, args, metrics, errors))
+        except Exception as exc:  # the client wraps server failures in exception groups
+            errors.append(f"{transport}: benchmark failed: {exc!r}")
+    status = "fail" if errors else "pass"
+
+    artifact = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "workspace": str(ROOT),
+        "status": status,
+        "config": {
+            "transports": transports,
+            "steps": args.steps,
+            "calls": args.calls,
+            "concurrency": args.concurrency,
+            "workload": [tool for tool, _ in workload(args.steps)],
+        },
+        "thresholds": THRESHOLDS,
+        "metrics": metrics,
+        "errors": errors,
+    }
+    ARTIFACT.parent.mkdir(parents=True, exist_ok=True)
+    ARTIFACT.write_text(json.dumps(artifact, indent=2) + "\n", encoding="utf-8")
+
+    print(f"Wrote {ARTIFACT}")
+    print(json.dumps(metrics, indent=2))
+    print(f"MCP transport benchmark status: {status}")
+    return 0 if status == "pass" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+ROOT = Path(__file__).resolve().parents[1]
+ARTIFACT = ROOT / "artifacts" / "output_validation_benchmark.json"
+
+sys.path.insert(0, str(ROOT))
+
+from server.mcp.schema import configure_output_validation  # noqa: E402
+from server.mcp.tools.list_traces import build_payload as list_payload  # noqa: E402
+from server.mcp.tools.show_trace import build_payload as show_payload  # noqa: E402
+from server.trace.schema import (  # noqa: E402
+    StepMetrics,
+    StepPreview,
+    StepSummary,
+    TraceMetadata,
+    TraceSummary,
+)
+
+THRESHOLDS = {
+    # Payload build time in full mode divided by structural mode.
+    "list_traces_structural_speedup_min": 1.3,
+    "show_trace_structural_speedup_min": 1.1,
+}
+MODES = ("full", "structural", "sampled", "off")
+
+
+def build_trace(trace_index: int, steps: int) -> TraceSummary:
+    return TraceSummary(
+        id=f"bench-{trace_index}",
+        name=f"Validation benchmark {trace_index}",
+        startedAt="2026-01-27T10:00:00.000Z",
+        endedAt="2026-01-27T10:10:00.000Z",
+        status="completed",
+        metadata=TraceMetadata(
+            source="manual", agentName="Bench", modelId="demo", wallTimeMs=600_000
+        ),
+        steps=[
+            StepSummary(
+                id=f"s{index}",
+                index=index,
+                type="tool_call" if index % 2 else "llm_call",
+                name=f"step {index}",
+                startedAt="2026-01-27T10:00:00.000Z",
+                endedAt="2026-01-27T10:00:01.000Z",
+                durationMs=1000,
+                status="completed",
+                childStepIds=[],
+                metrics=StepMetrics(tokensTotal=120, costUsd=0.001),
+                preview=StepPreview(title=f"step {index}", outputPreview="ok"),
+            )
+            for index in range(steps)
+        ],
+    )
+
+
+def median_ms(fn: Callable[[], object], repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="list_traces / show_trace payload cost per output validation mode"
+    )
+    parser.add_argument("--traces", type=int, default=50)
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--show-steps", type=int, default=5000)
+    parser.add_argument("--repeats", type=int, default=15)
+    args = parser.parse_args()
+
+    summaries = [build_trace(index, args.steps) for index in range(args.traces)]
+    large = build_trace(args.traces, args.show_steps)
+    metrics: dict[str, float] = {}
+    try:
+        for mode in MODES:
+            configure_output_validation(mode)
+            metrics[f"list_traces_{mode}_ms"] = median_ms(
+                lambda: list_payload(summaries), args.repeats
+            )
+            metrics[f"show_trace_{mode}_ms"] = median_ms(lambda: show_payload(large), args.repeats)
+    finally:
+        configure_output_validation("full")
+    for tool in ("list_traces", "show_trace"):
+        metrics[f"{tool}_structural_speedup"] = round(
+            metrics[f"{tool}_full_ms"] / metrics[f"{tool}_structural_ms"], 2
+        )
+
+    errors: list[str] = []
+    for tool in ("list_traces", "show_trace"):
+        if metrics[f"{tool}_structural_speedup"] < THRESHOLDS[f"{tool}_structural_speedup_min"]:
+            errors.append(f"{tool} structural validation speedup below threshold")
+    status = "fail" if errors else "pass"
+
+    artifact = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "workspace": str(ROOT),
+        "status": status,
+        "config": {
+            "traces": args.traces,
+            "steps": args.steps,
+            "show_steps": args.show_steps,
+            "repeats": args.repeats,
+        },
+        "thresholds": THRESHOLDS,
+        "metrics": metrics,
+        "errors": errors,
+    }
+    ARTIFACT.parent.mkdir(parents=True, exist_ok=True)
+    ARTIFACT.write_text(json.dumps(artifact, indent=2) + "\n", encoding="utf-8")
+
+    print(f"Wrote {ARTIFACT}")
+    print(json.dumps(metrics, indent=2))
+    print(f"Output validation benchmark status: {status}")
+    return 0 if status == "pass" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from http.client import HTTPConnection
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+ARTIFACT = ROOT / "artifacts" / "prefork_benchmark.json"
+
+sys.path.insert(0, str(ROOT))
+
+from scripts.keep_alive_benchmark import TRACE_ID, seed_store  # noqa: E402
+
+THRESHOLDS = {
+    # Throughput with N workers divided by N times single-worker throughput.
+    "scaling_efficiency_min": 0.7,
+}
+
+
+def start_server(data_dir: Path, workers: int) -> tuple[subprocess.Popen, int]:
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            f"from server.prefork import serve_prefork; serve_prefork({workers}, '127.0.0.1', 0)",
+        ],
+        cwd=ROOT,
+        env={**os.environ, "AGENT_DIRECTOR_DATA_DIR": str(data_dir)},
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    line = process.stdout.readline() if process.stdout else ""
+    if "http://127.0.0.1:" not in line:
+        process.kill()
+        raise RuntimeError(f"Server did not start: {line!r}")
+    return process, int(line.split("http://127.0.0.1:", 1)[1].split()[0])
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    process.send_signal(signal.SIGTERM)
+    process.wait(timeout=10)
+    if process.stdout:
+        process.stdout.close()
+
+
+def hammer(port: int, seconds: float) -> int:
+    """One client process: sequential keep-alive GETs of the seeded trace until the deadline."""
+    conn = HTTPConnection("127.0.0.1", port, timeout=10)
+    completed = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        conn.request("GET", f"/api/traces/{TRACE_ID}")
+        resp = conn.getresponse()
+        resp.read()
+        if resp.status != 200:
+            raise RuntimeError(f"GET returned {resp.status}")
+        if resp.getheader("Connection") == "close":
+            conn.close()
+            conn = HTTPConnection("127.0.0.1", port, timeout=10)
+        completed += 1
+    conn.close()
+    return completed
+
+
+def measure(data_dir: Path, workers: int, clients: int, seconds: float) -> float:
+    process, port = start_server(data_dir, workers)
+    try:
+        hammer(port, 0.5)
+        with ProcessPoolExecutor(clients) as pool:
+            counts = list(pool.map(hammer, [port] * clients, [seconds] * clients))
+    finally:
+        stop_server(process)
+    return round(sum(counts) / seconds, 1)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Read throughput of one worker process vs pre-fork workers"
+    )
+    parser.add_argument("--workers", type=int, default=max(2, min(4, os.cpu_count() or 1)))
+    parser.add_argument(
+        "--clients", type=int, default=0, help="client processes (default: 2 per worker)"
+    )
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--steps", type=int, default=300)
+    args = parser.parse_args()
+    clients = args.clients or 2 * args.workers
+
+    errors: list[str] = []
+    metrics: dict[str, float] = {}
+    cpus = os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as tmp:
+        seed_store(Path(tmp), args.steps)
+        try:
+            metrics["single_worker_requests_per_s"] = measure(Path(tmp), 1, clients, args.seconds)
+            metrics["prefork_requests_per_s"] = measure(
+                Path(tmp), args.workers, clients, args.seconds
+            )
+        except (OSError, RuntimeError) as exc:
+            errors.append(f"Benchmark request failed: {exc}")
+
+    if not errors and metrics["single_worker_requests_per_s"] > 0:
+        metrics["speedup"] = round(
+            metrics["prefork_requests_per_s"] / metrics["single_worker_requests_per_s"], 2
+        )
+        metrics["scaling_efficiency"] = round(metrics["speedup"] / args.workers, 2)
+    # Client processes compete for the same cores, so the threshold only applies with room for both.
+    enforced = cpus >= args.workers * 2
+    if enforced and metrics.get("scaling_efficiency", 0.0) < THRESHOLDS["scaling_efficiency_min"]:
+        errors.append("Pre-fork scaling efficiency below threshold")
+    status = "fail" if errors else ("pass" if enforced else "skipped")
+
+    artifact = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "workspace": str(ROOT),
+        "status": status,
+        "config": {
+            "workers": args.workers,
+            "clients": clients,
+            "seconds": args.seconds,
+            "steps": args.steps,
+            "cpus": cpus,
+        },
+        "thresholds": THRESHOLDS,
+        "metrics": metrics,
+        "errors": errors,
+    }
+    ARTIFACT.parent.mkdir(parents=True, exist_ok=True)
+    ARTIFACT.write_text(json.dumps(artifact, indent=2) + "\n", encoding="utf-8")
+
+    print(f"Wrote {ARTIFACT}")
+    print(json.dumps(metrics, indent=2))
+    print(f"Pre-fork benchmark status: {status}")
+    return 0 if status != "fail" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
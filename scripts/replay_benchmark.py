@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from copy import deepcopy
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable
+
+ROOT = Path(__file__).resolve().parents[1]
+ARTIFACT = ROOT / "artifacts" / "replay_benchmark.json"
+
+sys.path.insert(0, str(ROOT))
+
+from server.replay.engine import replay_from_step  # noqa: E402
+from server.trace.schema import (  # noqa: E402
+    StepMetrics,
+    StepPreview,
+    StepSummary,
+    TraceMetadata,
+    TraceSummary,
+)
+
+THRESHOLDS = {
+    # Replay construction time divided by a bare deepcopy of the source trace, which used to be
+    # only the first step of building a replay.
+    "replay_vs_deepcopy_ratio_max": 1.0,
+}
+STRATEGIES = ("recorded", "hybrid", "live")
+
+
+def build_trace(steps: int) -> TraceSummary:
+    started = datetime(2026, 1, 27, 10, tzinfo=timezone.utc)
+
+    def stamp(offset_ms: int) -> str:
+        return (started + timedelta(milliseconds=offset_ms)).strftime("%Y-%m-%dT%H:%M:%S.%f")[
+            :-3
+        ] + "Z"
+
+    return TraceSummary(
+        id="replay-bench",
+        name="Replay benchmark",
+        startedAt=stamp(0),
+        endedAt=stamp(steps * 10),
+        status="completed",
+        metadata=TraceMetadata(
+            source="manual", agentName="Bench", modelId="demo", wallTimeMs=steps * 10
+        ),
+        steps=[
+            StepSummary(
+                id=f"s{index}",
+                index=index,
+                type="tool_call" if index % 2 else "llm_call",
+                name=f"step {index}",
+                startedAt=stamp(index * 10),
+                endedAt=stamp(index * 10 + 10),
+                durationMs=10,
+                status="completed",
+                childStepIds=[f"s{index + 1}"] if index + 1 < steps else [],
+                parentStepId=f"s{index - 1}" if index else None,
+                toolCallId=f"tc{index}" if index % 2 else None,
+                metrics=StepMetrics(tokensTotal=120, costUsd=0.001),
+                preview=StepPreview(title=f"step {index}", outputPreview="ok"),
+            )
+            for index in range(steps)
+        ],
+    )
+
+
+def median_ms(fn: Callable[[], object], repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 1)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Replay construction cost on a large trace")
+    parser.add_argument("--steps", type=int, default=50_000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    trace = build_trace(args.steps)
+    step_id = f"s{args.steps // 2}"
+    modifications = {"prompt": "benchmark"}
+    source = json.dumps(trace.to_dict())
+    metrics: dict[str, float] = {"deepcopy_ms": median_ms(lambda: deepcopy(trace), args.repeats)}
+    errors: list[str] = []
+    for strategy in STRATEGIES:
+        metrics[f"replay_{strategy}_ms"] = median_ms(
+            lambda: replay_from_step(trace, step_id, strategy, modifications), args.repeats
+        )
+        first = replay_from_step(trace, step_id, strategy, modifications).to_dict()
+        if replay_from_step(trace, step_id, strategy, modifications).to_dict() != first:
+            errors.append(f"{strategy} replay is not deterministic")
+    if json.dumps(trace.to_dict()) != source:
+        errors.append("Replay construction modified the source trace")
+
+    slowest = max(metrics[f"replay_{strategy}_ms"] for strategy in STRATEGIES)
+    metrics["replay_vs_deepcopy_ratio"] = round(slowest / metrics["deepcopy_ms"], 2)
+    if metrics["replay_vs_deepcopy_ratio"] > THRESHOLDS["replay_vs_deepcopy_ratio_max"]:
+        errors.append("Replay construction is slower than copying the source trace")
+    status = "fail" if errors else "pass"
+
+    artifact = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "workspace": str(ROOT),
+        "status": status,
+        "config": {"steps": args.steps, "repeats": args.repeats, "step_id": step_id},
+        "thresholds": THRESHOLDS,
+        "metrics": metrics,
+        "errors": errors,
+    }
+    ARTIFACT.parent.mkdir(parents=True, exist_ok=True)
+    ARTIFACT.write_text(json.dumps(artifact, indent=2) + "\n", encoding="utf-8")
+
+    print(f"Wrote {ARTIFACT}")
+    print(json.dumps(metrics, indent=2))
+    print(f"Replay benchmark status: {status}")
+    return 0 if status == "pass" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
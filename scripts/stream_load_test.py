@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+ARTIFACT = ROOT / "artifacts" / "stream_load_test.json"
+
+THRESHOLDS = {
+    "rss_per_subscriber_kb_max": 64.0,
+    "rss_growth_during_hold_mb_max": 16.0,
+    "cpu_percent_during_hold_max": 15.0,
+    "connect_failures_max": 0,
+}
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def raise_fd_limit(required: int) -> int:
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    target = hard if hard != resource.RLIM_INFINITY else max(soft, required)
+    if soft < target:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+    return resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+
+
+def process_sample(pid: int) -> dict[str, float]:
+    """RSS (MB) and cumulative CPU seconds for pid, read from /proc."""
+    rss_kb = 0.0
+    for line in Path(f"/proc/{pid}/status").read_text(encoding="utf-8").splitlines():
+        if line.startswith("VmRSS:"):
+            rss_kb = float(line.split()[1])
+            break
+    stat = Path(f"/proc/{pid}/stat").read_text(encoding="utf-8")
+    fields = stat[stat.rindex(")") + 2 :].split()
+    ticks = os.sysconf("SC_CLK_TCK")
+    cpu_s = (int(fields[11]) + int(fields[12])) / ticks
+    return {"rss_mb": round(rss_kb / 1024, 2), "cpu_s": round(cpu_s, 3), "at": time.monotonic()}
+
+
+def start_server(port: int, data: Path) -> subprocess.Popen[str]:
+    env = os.environ.copy()
+    env["AGENT_DIRECTOR_DATA_DIR"] = str(data)
+    env["AGENT_DIRECTOR_STREAM_PORT"] = str(port)
+    # The full server, so the stream port shares the API's broker as in production; -u because
+    # its startup lines are read from a pipe.
+    proc = subprocess.Popen(
+        [sys.executable, "-u", "-m", "server.main"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    assert proc.stdout is not None
+    line = proc.stdout.readline()
+    while line and "stream server running" not in line:
+        line = proc.stdout.readline()
+    if not line:
+        proc.kill()
+        detail = proc.stderr.read() if proc.stderr else ""
+        raise RuntimeError(f"stream server failed to start: {detail}")
+    return proc
+
+
+async def hold_subscriber(port: int, path: str, ready: asyncio.Event, stop: asyncio.Event) -> bool:
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        request = f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nAccept: text/event-stream\r\n\r\n"
+        writer.write(request.encode("ascii"))
+        await writer.drain()
+        await reader.readuntil(b"\r\n\r\n")
+        await reader.readuntil(b"\n\n")
+    except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+        return False
+    ready.set()
+    try:
+        while not stop.is_set():
+            try:
+                chunk = await asyncio.wait_for(reader.read(4096), timeout=1.0)
+            except asyncio.TimeoutError:
+                continue
+            if not chunk:
+                return False
+    finally:
+        writer.close()
+    return True
+
+
+async def run_load(
+    port: int, pid: int, subscribers: int, batch: int, hold_s: float, path: str
+) -> dict:
+    samples: dict[str, dict[str, float]] = {"baseline": process_sample(pid)}
+    stop = asyncio.Event()
+    tasks: list[asyncio.Task[bool]] = []
+    ramp_started = time.monotonic()
+    for start in range(0, subscribers, batch):
+        events = []
+        for _ in range(min(batch, subscribers - start)):
+            ready = asyncio.Event()
+            events.append(ready)
+            tasks.append(asyncio.create_task(hold_subscriber(port, path, ready, stop)))
+        await asyncio.wait([asyncio.create_task(event.wait()) for event in events], timeout=10.0)
+    ramp_s = time.monotonic() - ramp_started
+    connected = sum(1 for task in tasks if not task.done())
+    samples["after_ramp"] = process_sample(pid)
+    await asyncio.sleep(hold_s)
+    samples["after_hold"] = process_sample(pid)
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return {"samples": samples, "connected": connected, "ramp_seconds": round(ramp_s, 2)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Idle-subscriber load test for the stream server")
+    parser.add_argument("--subscribers", type=int, default=10_000)
+    parser.add_argument("--batch", type=int, default=500, help="Connections opened per ramp step")
+    parser.add_argument("--hold-seconds", type=float, default=30.0)
+    parser.add_argument("--path", default="/api/stream/traces/latest")
+    args = parser.parse_args()
+
+    fd_limit = raise_fd_limit(args.subscribers + 256)
+    status = "pass"
+    errors: list[str] = []
+    metrics: dict[str, float] = {}
+    result: dict = {}
+    if fd_limit < args.subscribers + 256:
+        errors.append(f"RLIMIT_NOFILE {fd_limit} is too low for {args.subscribers} subscribers")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        proc = start_server(port, Path(tmp))
+        try:
+            time.sleep(0.5)
+            result = asyncio.run(
+                run_load(port, proc.pid, args.subscribers, args.batch, args.hold_seconds, args.path)
+            )
+        finally:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    samples = result.get("samples", {})
+    if samples:
+        baseline, ramp, hold = samples["baseline"], samples["after_ramp"], samples["after_hold"]
+        connected = max(1, result["connected"])
+        hold_wall = max(1e-6, hold["at"] - ramp["at"])
+        metrics = {
+            "subscribers_connected": result["connected"],
+            "connect_failures": args.subscribers - result["connected"],
+            "ramp_seconds": result["ramp_seconds"],
+            "rss_baseline_mb": baseline["rss_mb"],
+            "rss_after_ramp_mb": ramp["rss_mb"],
+            "rss_after_hold_mb": hold["rss_mb"],
+            "rss_per_subscriber_kb": round(
+                (ramp["rss_mb"] - baseline["rss_mb"]) * 1024 / connected, 2
+            ),
+            "rss_growth_during_hold_mb": round(hold["rss_mb"] - ramp["rss_mb"], 2),
+            "cpu_percent_during_hold": round((hold["cpu_s"] - ramp["cpu_s"]) * 100 / hold_wall, 2),
+        }
+        if metrics["connect_failures"] > THRESHOLDS["connect_failures_max"]:
+            errors.append("Some subscribers failed to connect")
+        if metrics["rss_per_subscriber_kb"] > THRESHOLDS["rss_per_subscriber_kb_max"]:
+            errors.append("Per-subscriber memory exceeds threshold")
+        if metrics["rss_growth_during_hold_mb"] > THRESHOLDS["rss_growth_during_hold_mb_max"]:
+            errors.append("Memory grew while subscribers were idle")
+        if metrics["cpu_percent_during_hold"] > THRESHOLDS["cpu_percent_during_hold_max"]:
+            errors.append("Idle CPU exceeds threshold")
+    if errors:
+        status = "fail"
+
+    artifact = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "workspace": str(ROOT),
+        "status": status,
+        "config": {
+            "subscribers": args.subscribers,
+            "batch": args.batch,
+            "hold_seconds": args.hold_seconds,
+            "path": args.path,
+            "fd_limit": fd_limit,
+        },
+        "thresholds": THRESHOLDS,
+        "metrics": metrics,
+        "errors": errors,
+    }
+    ARTIFACT.parent.mkdir(parents=True, exist_ok=True)
+    ARTIFACT.write_text(json.dumps(artifact, indent=2) + "\n", encoding="utf-8")
+
+    print(f"Wrote {ARTIFACT}")
+    print(json.dumps(metrics, indent=2))
+    print(f"Stream load test status: {status}")
+    return 0 if status == "pass" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
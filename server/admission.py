@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict
+
+from .metrics import ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTED
+
+
+class AdmissionGate:
+    """Caps how many requests for one route run at once, with a bounded wait queue.
+
+    Up to `limit` requests hold a slot; up to `queue_depth` more wait, in arrival order, at most
+    `queue_timeout_s` for one. Anything beyond that is turned away immediately, so an overloaded
+    route answers quickly instead of piling up handler threads.
+    """
+
+    def __init__(self, route: str, limit: int, queue_depth: int, queue_timeout_s: float) -> None:
+        self.route = route
+        self.limit = max(1, limit)
+        self.queue_depth = max(0, queue_depth)
+        self.queue_timeout_s = queue_timeout_s
+        self.active = 0
+        self._waiters: Deque[object] = deque()
+        self._cond = threading.Condition()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def acquire(self) -> bool:
+        """Take a slot, waiting in the queue if needed; False means the request should be shed."""
+        with self._cond:
+            # A free slot goes to the head of the queue first, never to a newcomer.
+            if self.active < self.limit and not self._waiters:
+                self.active += 1
+                return True
+            if len(self._waiters) >= self.queue_depth:
+                ADMISSION_REJECTED.inc((self.route, "queue_full"))
+                return False
+            ticket = object()
+            self._waiters.append(ticket)
+            ADMISSION_QUEUE_DEPTH.set((self.route,), len(self._waiters))
+            give_up_at = time.monotonic() + self.queue_timeout_s
+            try:
+                while self._waiters[0] is not ticket or self.active >= self.limit:
+                    remaining = give_up_at - time.monotonic()
+                    if remaining <= 0:
+                        ADMISSION_REJECTED.inc((self.route, "queue_timeout"))
+                        return False
+                    self._cond.wait(remaining)
+                self.active += 1
+                return True
+            finally:
+                self._waiters.remove(ticket)
+                ADMISSION_QUEUE_DEPTH.set((self.route,), len(self._waiters))
+                # The head of the queue changed; let the next waiter re-check.
+                self._cond.notify_all()
+
+    def release(self) -> None:
+        with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+
+
+class AdmissionControl:
+    """One AdmissionGate per route template, created on first use with shared settings."""
+
+    def __init__(self, limit: int, queue_depth: int, queue_timeout_s: float) -> None:
+        self.limit = limit
+        self.queue_depth = queue_depth
+        self.queue_timeout_s = queue_timeout_s
+        self._gates: Dict[str, AdmissionGate] = {}
+        self._lock = threading.Lock()
+
+    def gate(self, route: str) -> AdmissionGate:
+        gate = self._gates.get(route)
+        if gate is None:
+            with self._lock:
+                gate = self._gates.setdefault(
+                    route, AdmissionGate(route, self.limit, self.queue_depth, self.queue_timeout_s)
+                )
+        return gate
@@ -0,0 +1,372 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http.client import HTTPMessage
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
+from typing import Any, Awaitable, BinaryIO, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from .config import (
+    DEFAULT_ASGI_WORKERS,
+    DEFAULT_HEAVY_QUEUE_DEPTH,
+    DEFAULT_HEAVY_WORKERS,
+    DEFAULT_HOST,
+    DEFAULT_PORT,
+    asgi_workers,
+    heavy_queue_depth,
+    heavy_workers,
+)
+from .main import MAX_REQUEST_BYTES, ROUTES, ApiHandler
+from .routing import Route, split_path
+from .streaming import (
+    HEARTBEAT_INTERVAL_S,
+    STREAM_HEADERS,
+    LoopQueue,
+    open_gameplay_stream,
+    open_trace_stream,
+    parse_last_event_id,
+    parse_stream_target,
+)
+from .trace.live import encode_sse_event
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+HOP_BY_HOP_HEADERS = {"connection", "keep-alive", "transfer-encoding"}
+# Streamed request bodies (trace ingest) spill from memory to a temporary file beyond this size.
+SPOOL_MEMORY_BYTES = 1024 * 1024
+# Routes that touch no store or disk and are answered on the event loop itself.
+INLINE_ROUTES = frozenset({"/api/health", "/api/metrics"})
+
+
+class _CapturedHandler(ApiHandler):
+    """ApiHandler run against an ASGI request; the response goes to ASGI messages, not a socket."""
+
+    def __init__(self, scope: Scope, body: bytes | BinaryIO) -> None:
+        # BaseHTTPRequestHandler.__init__ expects a socket and handles the request immediately.
+        query = scope.get("query_string", b"").decode("latin-1")
+        self.command = scope["method"]
+        self.path = scope["path"] + (f"?{query}" if query else "")
+        self.request_version = "HTTP/1.1"
+        self.client_address = tuple(scope.get("client") or ("unknown", 0))
+        self.headers = HTTPMessage()
+        for name, value in scope.get("headers", []):
+            if name.lower() not in {b"content-length", b"transfer-encoding"}:
+                self.headers[name.decode("latin-1")] = value.decode("latin-1")
+        if isinstance(body, bytes):
+            length = len(body)
+            self.rfile: BinaryIO = BytesIO(body)
+        else:
+            length = body.seek(0, 2)
+            body.seek(0)
+            self.rfile = body
+        if length:
+            # The ASGI server has already de-chunked the body, so hand the handler a plain length.
+            self.headers["Content-Length"] = str(length)
+        self.wfile = BytesIO()
+        self.close_connection = False
+        self.status = 500
+        self.response_headers: List[Tuple[bytes, bytes]] = []
+        # Set by stream_to; without them a streamed body is buffered like any other.
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._send: Optional[Send] = None
+        self.response_started = False
+
+    def stream_to(self, send: Send, loop: asyncio.AbstractEventLoop) -> None:
+        """Forward streamed bodies chunk by chunk through `send`; run the handler off `loop`."""
+        self._send = send
+        self._loop = loop
+
+    def send_response(self, code: int, message: Optional[str] = None) -> None:
+        self.status = self._status = code
+
+    def send_header(self, keyword: str, value: str) -> None:
+        if keyword.lower() not in HOP_BY_HOP_HEADERS:
+            self.response_headers.append(
+                (keyword.lower().encode("latin-1"), str(value).encode("latin-1"))
+            )
+
+    def end_headers(self) -> None:
+        return
+
+    def _write_body_chunk(self, data: bytes) -> None:
+        # The ASGI server applies its own framing to bodies sent without Content-Length.
+        if self._send is None:
+            self.wfile.write(data)
+        elif data:
+            self._send_message({"type": "http.response.body", "body": data, "more_body": True})
+
+    def _finish_body_chunks(self) -> None:
+        if self._send is not None:
+            self._send_message({"type": "http.response.body", "body": b""})
+
+    def _send_message(self, message: Dict[str, Any]) -> None:
+        assert self._send is not None and self._loop is not None
+        if not self.response_started:
+            self.response_started = True
+            start = {"type": "http.response.start", "status": self.status}
+            self._send_message({**start, "headers": self.response_headers})
+        # Waiting for each send keeps at most one chunk in flight, so a slow client pushes back.
+        asyncio.run_coroutine_threadsafe(self._send(message), self._loop).result()
+
+    def run(self) -> None:
+        method = getattr(self, f"do_{self.command}", None)
+        if method is None:
+            self._send_json(405, {"error": "Method not allowed"})
+            return
+        method()
+
+
+class AsgiApp:
+    """ASGI front end for the ApiHandler routes.
+
+    Only INLINE_ROUTES run on the event loop; other routes run on a pool of `workers` threads so
+    store and disk access never blocks it, and chunked JSON responses are forwarded from there as
+    they are encoded. Routes whose rate-limit class is `heavy` get a separate bounded pool; once
+    `heavy_workers + heavy_queue_depth` are in flight further heavy requests get 503 with
+    Retry-After instead of queueing without bound. Stream routes are pumped from the live broker
+    through an event-loop queue.
+    """
+
+    def __init__(
+        self,
+        heavy_workers: int = DEFAULT_HEAVY_WORKERS,
+        heavy_queue_depth: int = DEFAULT_HEAVY_QUEUE_DEPTH,
+        heartbeat_interval_s: float = HEARTBEAT_INTERVAL_S,
+        workers: int = DEFAULT_ASGI_WORKERS,
+    ) -> None:
+        self.heavy_workers = max(1, heavy_workers)
+        self.heavy_queue_depth = max(0, heavy_queue_depth)
+        self.heartbeat_interval_s = heartbeat_interval_s
+        self._pool = ThreadPoolExecutor(max(1, workers), thread_name_prefix="agent-director-worker")
+        self._heavy_pool = ThreadPoolExecutor(
+            self.heavy_workers, thread_name_prefix="agent-director-heavy"
+        )
+        # Only touched from the event loop, so no lock is needed.
+        self.heavy_in_flight = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        matched = ROUTES.match(scope["method"], scope["path"])
+        route = matched[0] if matched else None
+        if route is not None and route.rate_limit == "stream":
+            await self._stream(scope, receive, send)
+            return
+        body: bytes | BinaryIO | None
+        if route is not None and route.stream_body:
+            body = await _spool_body(receive, ApiHandler.max_ingest_bytes)
+        else:
+            body = await _read_body(
+                receive, (route.max_body_bytes if route else None) or MAX_REQUEST_BYTES
+            )
+        if body is None:
+            await _send_json(send, 413, {"error": "Payload too large"})
+            return
+        try:
+            await self._respond(send, route, _CapturedHandler(scope, body))
+        finally:
+            if not isinstance(body, bytes):
+                body.close()
+
+    async def _respond(self, send: Send, route: Optional[Route], handler: _CapturedHandler) -> None:
+        loop = asyncio.get_running_loop()
+        if route is not None and route.template in INLINE_ROUTES:
+            handler.run()
+        elif route is not None and route.rate_limit == "heavy":
+            handler.stream_to(send, loop)
+            if self.heavy_in_flight >= self.heavy_workers + self.heavy_queue_depth:
+                await _send_json(send, 503, {"error": "Server busy"}, {"Retry-After": "1"})
+                return
+            self.heavy_in_flight += 1
+            try:
+                await loop.run_in_executor(self._heavy_pool, handler.run)
+            finally:
+                self.heavy_in_flight -= 1
+        else:
+            handler.stream_to(send, loop)
+            await loop.run_in_executor(self._pool, handler.run)
+        if handler.response_started:
+            # Streamed; a body left without its final message makes the server drop the connection.
+            return
+        await send(
+            {
+                "type": "http.response.start",
+                "status": handler.status,
+                "headers": handler.response_headers,
+            }
+        )
+        await send({"type": "http.response.body", "body": handler.wfile.getvalue()})
+
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _stream(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limiter_probe = _CapturedHandler(scope, b"")
+        allowed, retry_after = limiter_probe._check_rate_limit("stream")
+        if not allowed:
+            await _send_json(
+                send, 429, {"error": "Too many requests"}, {"Retry-After": str(retry_after)}
+            )
+            return
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        try:
+            target = parse_stream_target(split_path(scope["path"]), query)
+        except ValueError as exc:
+            await _send_json(send, 400, {"error": str(exc)})
+            return
+        if target is None:
+            await _send_json(send, 404, {"error": "Not found"})
+            return
+
+        loop = asyncio.get_running_loop()
+        sink = LoopQueue(loop)
+        last_event_id = parse_last_event_id(limiter_probe.headers.get("Last-Event-ID"))
+        if target.kind == "gameplay":
+            opener = partial(
+                open_gameplay_stream, target.key, last_event_id, ApiHandler.gameplay_store, sink
+            )
+        else:
+            opener = partial(
+                open_trace_stream,
+                target,
+                last_event_id,
+                ApiHandler.store,
+                ApiHandler.live_broker,
+                sink,
+            )
+        stream = await loop.run_in_executor(None, opener)
+        disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+        try:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": _encode_headers(STREAM_HEADERS),
+                }
+            )
+            await send(
+                {"type": "http.response.body", "body": b"".join(stream.initial), "more_body": True}
+            )
+            while not disconnected.done():
+                next_frame = asyncio.ensure_future(sink.queue.get())
+                done, _ = await asyncio.wait(
+                    {next_frame, disconnected},
+                    timeout=self.heartbeat_interval_s,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if next_frame in done:
+                    frame = next_frame.result()
+                else:
+                    next_frame.cancel()
+                    if disconnected in done:
+                        break
+                    frame = encode_sse_event("heartbeat", {"ts": int(time.time())})
+                await send({"type": "http.response.body", "body": frame, "more_body": True})
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            disconnected.cancel()
+            stream.close()
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._heavy_pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def _read_body(receive: Receive, max_bytes: int) -> Optional[bytes]:
+    """Collect the request body, or None once it exceeds max_bytes."""
+    chunks: List[bytes] = []
+    size = 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > max_bytes:
+            return None
+        chunks.append(chunk)
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+async def _spool_body(receive: Receive, max_bytes: int) -> Optional[BinaryIO]:
+    """Like _read_body, but keeps at most SPOOL_MEMORY_BYTES in memory and the rest on disk."""
+    spool = SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+    size = 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > max_bytes:
+            spool.close()
+            return None
+        spool.write(chunk)
+        if not message.get("more_body", False):
+            break
+    return spool  # type: ignore[return-value]
+
+
+async def _wait_for_disconnect(receive: Receive) -> None:
+    while (await receive())["type"] != "http.disconnect":
+        continue
+
+
+def _encode_headers(headers: Dict[str, str]) -> List[Tuple[bytes, bytes]]:
+    return [
+        (name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()
+    ]
+
+
+async def _send_json(
+    send: Send, status: int, payload: Dict[str, Any], extra_headers: Dict[str, str] | None = None
+) -> None:
+    body = json.dumps(payload).encode("utf-8")
+    headers = {
+        "Content-Type": "application/json",
+        "Content-Length": str(len(body)),
+        "Cache-Control": "no-store",
+        "Access-Control-Allow-Origin": "*",
+        **(extra_headers or {}),
+    }
+    await send(
+        {"type": "http.response.start", "status": status, "headers": _encode_headers(headers)}
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+def create_app() -> AsgiApp:
+    return AsgiApp(
+        heavy_workers=heavy_workers(), heavy_queue_depth=heavy_queue_depth(), workers=asgi_workers()
+    )
+
+
+def serve_asgi() -> bool:
+    """Serve ApiHandler's routes with uvicorn; False when uvicorn is not installed."""
+    try:
+        import uvicorn  # type: ignore[import-not-found]
+    except ImportError:
+        return False
+    print(f"Agent Director ASGI server running on http://{DEFAULT_HOST}:{DEFAULT_PORT}")
+    uvicorn.run(create_app(), host=DEFAULT_HOST, port=DEFAULT_PORT, log_level="warning")
+    return True
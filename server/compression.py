@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import gzip
+import zlib
+from typing import Callable, Dict, Optional
+
+from .config import DEFAULT_BROTLI_QUALITY, DEFAULT_GZIP_LEVEL
+
+try:  # pragma: no cover - optional dependency
+    import brotli  # type: ignore[import-not-found]
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+
+def supported_encodings() -> list[str]:
+    """Encodings this process can produce, in server preference order."""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def _parse_accept_encoding(header: str) -> Dict[str, float]:
+    weights: Dict[str, float] = {}
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name] = weight
+    return weights
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the best supported content coding the client accepts, or None for identity."""
+    if not accept_encoding:
+        return None
+    weights = _parse_accept_encoding(accept_encoding)
+    best: Optional[str] = None
+    best_weight = 0.0
+    for encoding in supported_encodings():
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def accepts_encoding(accept_encoding: Optional[str], encoding: str) -> bool:
+    if not accept_encoding:
+        return False
+    weights = _parse_accept_encoding(accept_encoding)
+    return weights.get(encoding, weights.get("*", 0.0)) > 0
+
+
+def compress(
+    body: bytes,
+    encoding: str,
+    gzip_level: int = DEFAULT_GZIP_LEVEL,
+    brotli_quality: int = DEFAULT_BROTLI_QUALITY,
+) -> bytes:
+    if encoding == "gzip":
+        # mtime=0 keeps the output deterministic for identical bodies.
+        return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+    if encoding == "br" and brotli is not None:
+        return brotli.compress(body, quality=brotli_quality)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+class StreamCompressor:
+    """Incremental counterpart of compress() for chunked responses."""
+
+    def __init__(
+        self,
+        encoding: str,
+        gzip_level: int = DEFAULT_GZIP_LEVEL,
+        brotli_quality: int = DEFAULT_BROTLI_QUALITY,
+    ) -> None:
+        self._process: Callable[[bytes], bytes]
+        self._finish: Callable[[], bytes]
+        if encoding == "gzip":
+            # wbits=31 writes a gzip container; zlib leaves the header mtime at 0.
+            compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+            self._process, self._finish = compressor.compress, compressor.flush
+        elif encoding == "br" and brotli is not None:
+            compressor = brotli.Compressor(quality=brotli_quality)
+            self._process, self._finish = compressor.process, compressor.finish
+        else:
+            raise ValueError(f"Unsupported content encoding: {encoding}")
+
+    def compress(self, data: bytes) -> bytes:
+        return self._process(data)
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+def decompress(body: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    if encoding == "br" and brotli is not None:
+        return brotli.decompress(body)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
@@ -22,5 +22,172 @@ def demo_dir() -> Path:
     return repo_root() / "demo" / "traces"
 
 
+def stream_port() -> int | None:
+    """Port for the asyncio SSE front end; unset keeps streams on the threaded server only."""
+    raw = os.environ.get("AGENT_DIRECTOR_STREAM_PORT")
+    return int(raw) if raw else None
+
+
+def server_mode() -> str:
+    """`stdlib` (ThreadingHTTPServer, the default) or `asgi` (uvicorn, when installed)."""
+    return os.environ.get("AGENT_DIRECTOR_SERVER", "stdlib").strip().lower() or "stdlib"
+
+
+def server_workers() -> int:
+    """Worker processes for the stdlib server; above 1 selects pre-fork mode (server/prefork.py)."""
+    return max(1, int(os.environ.get("AGENT_DIRECTOR_WORKERS", "1")))
+
+
+def profiling_token() -> str | None:
+    """Bearer token for the /api/debug profiling endpoints; unset keeps them disabled (404)."""
+    return os.environ.get("AGENT_DIRECTOR_PROFILING_TOKEN") or None
+
+
 def safe_export_enabled() -> bool:
     return os.environ.get("AGENT_DIRECTOR_SAFE_EXPORT", "0") == "1"
+
+
+DEFAULT_SSE_REPLAY_DEPTH = 256
+DEFAULT_SSE_REPLAY_BYTES = 8 * 1024 * 1024
+
+
+def sse_replay_depth() -> int:
+    return int(os.environ.get("AGENT_DIRECTOR_SSE_REPLAY_DEPTH", DEFAULT_SSE_REPLAY_DEPTH))
+
+
+def sse_replay_bytes() -> int:
+    return int(os.environ.get("AGENT_DIRECTOR_SSE_REPLAY_BYTES", DEFAULT_SSE_REPLAY_BYTES))
+
+
+DEFAULT_COMPRESSION_MIN_BYTES = 1024
+DEFAULT_GZIP_LEVEL = 6
+DEFAULT_BROTLI_QUALITY = 5
+
+
+def compression_min_bytes() -> int:
+    return int(
+        os.environ.get("AGENT_DIRECTOR_COMPRESSION_MIN_BYTES", DEFAULT_COMPRESSION_MIN_BYTES)
+    )
+
+
+def gzip_level() -> int:
+    return int(os.environ.get("AGENT_DIRECTOR_GZIP_LEVEL", DEFAULT_GZIP_LEVEL))
+
+
+def brotli_quality() -> int:
+    return int(os.environ.get("AGENT_DIRECTOR_BROTLI_QUALITY", DEFAULT_BROTLI_QUALITY))
+
+
+DEFAULT_KEEP_ALIVE_TIMEOUT_S = 15.0
+DEFAULT_MAX_KEEP_ALIVE_REQUESTS = 100
+
+
+def keep_alive_timeout_s() -> float:
+    return float(
+        os.environ.get("AGENT_DIRECTOR_KEEP_ALIVE_TIMEOUT_S", DEFAULT_KEEP_ALIVE_TIMEOUT_S)
+    )
+
+
+def max_keep_alive_requests() -> int:
+    return int(
+        os.environ.get("AGENT_DIRECTOR_MAX_KEEP_ALIVE_REQUESTS", DEFAULT_MAX_KEEP_ALIVE_REQUESTS)
+    )
+
+
+DEFAULT_MAX_INGEST_BYTES = 512 * 1024 * 1024
+DEFAULT_MAX_INGEST_LINE_BYTES = 32 * 1024 * 1024
+
+
+def max_ingest_bytes() -> int:
+    """Cap on one POST /api/traces body, counted both on the wire and after gzip decoding."""
+    return int(os.environ.get("AGENT_DIRECTOR_MAX_INGEST_BYTES", DEFAULT_MAX_INGEST_BYTES))
+
+
+def max_ingest_line_bytes() -> int:
+    return int(
+        os.environ.get("AGENT_DIRECTOR_MAX_INGEST_LINE_BYTES", DEFAULT_MAX_INGEST_LINE_BYTES)
+    )
+
+
+DEFAULT_STREAM_JSON_MIN_STEPS = 5000
+
+
+def stream_json_min_steps() -> int:
+    """Trace and listing responses with at least this many steps are streamed as chunked JSON."""
+    return int(
+        os.environ.get("AGENT_DIRECTOR_STREAM_JSON_MIN_STEPS", DEFAULT_STREAM_JSON_MIN_STEPS)
+    )
+
+
+DEFAULT_SLOW_REQUEST_MS = 0.0
+
+
+def slow_request_ms() -> float:
+    """Requests slower than this log their phase breakdown; 0 disables the slow-request log."""
+    return float(os.environ.get("AGENT_DIRECTOR_SLOW_REQUEST_MS", DEFAULT_SLOW_REQUEST_MS))
+
+
+DEFAULT_HEAVY_WORKERS = 4
+DEFAULT_HEAVY_QUEUE_DEPTH = 16
+DEFAULT_ASGI_WORKERS = 8
+
+
+def heavy_workers() -> int:
+    return int(os.environ.get("AGENT_DIRECTOR_HEAVY_WORKERS", DEFAULT_HEAVY_WORKERS))
+
+
+def heavy_queue_depth() -> int:
+    return int(os.environ.get("AGENT_DIRECTOR_HEAVY_QUEUE_DEPTH", DEFAULT_HEAVY_QUEUE_DEPTH))
+
+
+def asgi_workers() -> int:
+    """Threads the ASGI server runs non-heavy routes on, apart from the ones answered inline."""
+    return int(os.environ.get("AGENT_DIRECTOR_ASGI_WORKERS", DEFAULT_ASGI_WORKERS))
+
+
+DEFAULT_HEAVY_QUEUE_TIMEOUT_S = 5.0
+DEFAULT_HEAVY_DEADLINE_S = 30.0
+
+
+def heavy_queue_timeout_s() -> float:
+    """How long a queued heavy request waits for a slot before it is answered 503."""
+    return float(
+        os.environ.get("AGENT_DIRECTOR_HEAVY_QUEUE_TIMEOUT_S", DEFAULT_HEAVY_QUEUE_TIMEOUT_S)
+    )
+
+
+def heavy_deadline_s() -> float:
+    """Heavy requests still computing this long after arrival are abandoned with 503; 0 disables."""
+    return float(os.environ.get("AGENT_DIRECTOR_HEAVY_DEADLINE_S", DEFAULT_HEAVY_DEADLINE_S))
+
+
+DEFAULT_OUTPUT_VALIDATION = "structural"
+DEFAULT_OUTPUT_VALIDATION_SAMPLE_EVERY = 100
+
+
+def output_validation() -> str:
+    """How the API and MCP servers check tool output: `full`, `structural`, `sampled` or `off`."""
+    return (
+        os.environ.get("AGENT_DIRECTOR_OUTPUT_VALIDATION", DEFAULT_OUTPUT_VALIDATION)
+        .strip()
+        .lower()
+    )
+
+
+def output_validation_sample_every() -> int:
+    """In `sampled` mode, one tool call in this many gets full output validation."""
+    return int(
+        os.environ.get(
+            "AGENT_DIRECTOR_OUTPUT_VALIDATION_SAMPLE_EVERY", DEFAULT_OUTPUT_VALIDATION_SAMPLE_EVERY
+        )
+    )
+
+
+DEFAULT_MCP_RESULT_CACHE_BYTES = 64 * 1024 * 1024
+
+
+def mcp_result_cache_bytes() -> int:
+    """Size bound of the MCP server's tool result cache (JSON-encoded bytes); 0 disables it."""
+    return int(
+        os.environ.get("AGENT_DIRECTOR_MCP_RESULT_CACHE_BYTES", DEFAULT_MCP_RESULT_CACHE_BYTES)
+    )
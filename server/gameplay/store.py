@@ -3,6 +3,7 @@ from __future__ import annotations
 import json
 import math
 import random
+from collections import OrderedDict
 from copy import deepcopy
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
@@ -12,6 +13,10 @@ from threading import Lock
 from typing import Any, Dict, Tuple
 from uuid import uuid4
 
+from ..config import DEFAULT_SSE_REPLAY_BYTES, DEFAULT_SSE_REPLAY_DEPTH
+from ..metrics import GAMEPLAY_LOCK_WAIT_SECONDS, TimedLock
+from ..trace.live import EventRing, FrameSink, encode_sse_event, queued_frames
+
 
 def _utc_now() -> str:
     return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
@@ -360,6 +365,7 @@ NARRATIVE_NODES = {
 
 STATE_SCHEMA_VERSION = 2
 PROFILE_SCHEMA_VERSION = 2
+MAX_REPLAY_SESSIONS = 256
 
 
 class ConflictError(ValueError):
@@ -369,14 +375,25 @@ class ConflictError(ValueError):
 @dataclass
 class Subscription:
     token: str
-    queue: Queue[dict]
+    queue: FrameSink
 
 
 class GameplayStore:
-    def __init__(self, data_dir: Path) -> None:
+    def __init__(
+        self,
+        data_dir: Path,
+        replay_depth: int = DEFAULT_SSE_REPLAY_DEPTH,
+        replay_bytes: int = DEFAULT_SSE_REPLAY_BYTES,
+    ) -> None:
         self._path = data_dir / "gameplay_state.json"
-        self._lock = Lock()
-        self._subscribers: Dict[str, Dict[str, Queue[dict]]] = {}
+        self._lock = TimedLock(GAMEPLAY_LOCK_WAIT_SECONDS)
+        # Guards subscribers, replay rings and event ids; may be taken while holding _lock.
+        self._stream_lock = Lock()
+        self._subscribers: Dict[str, Dict[str, FrameSink]] = {}
+        self._replay_rings: OrderedDict[str, EventRing] = OrderedDict()
+        self._replay_depth = replay_depth
+        self._replay_bytes = replay_bytes
+        self._last_event_id = 0
         self._state = self._load()
 
     def _default_state(self) -> Dict[str, Any]:
@@ -1111,25 +1128,74 @@ class GameplayStore:
         return awarded
 
     def _publish(self, session_id: str, event_type: str, payload: Dict[str, Any]) -> None:
-        event = {"type": event_type, "publishedAt": _utc_now(), **payload}
-        subscribers = self._subscribers.get(session_id, {})
-        for queue in subscribers.values():
-            queue.put_nowait(event)
+        with self._stream_lock:
+            subscribers = self._subscribers.get(session_id)
+            ring = self._replay_rings.get(session_id)
+            if not subscribers and ring is None:
+                return
+            self._last_event_id += 1
+            event = {"type": event_type, "publishedAt": _utc_now(), **payload}
+            frame = encode_sse_event(event_type, event, self._last_event_id)
+            if ring is not None:
+                ring.append(self._last_event_id, frame)
+            for queue in (subscribers or {}).values():
+                queue.put_nowait(frame)
+
+    @property
+    def last_event_id(self) -> int:
+        return self._last_event_id
+
+    def subscribe(self, session_id: str, queue: FrameSink | None = None) -> Subscription:
+        token = uuid4().hex
+        if queue is None:
+            queue = Queue()
+        with self._stream_lock:
+            self._subscribe_locked(session_id, token, queue)
+        return Subscription(token=token, queue=queue)
 
-    def subscribe(self, session_id: str) -> Subscription:
+    def resume(
+        self, session_id: str, last_event_id: int, queue: FrameSink | None = None
+    ) -> Subscription | None:
+        """Subscribe with every frame after last_event_id pre-queued, or None if they are gone."""
         token = uuid4().hex
-        queue: Queue[dict] = Queue()
-        with self._lock:
-            self._subscribers.setdefault(session_id, {})[token] = queue
+        if queue is None:
+            queue = Queue()
+        with self._stream_lock:
+            ring = self._replay_rings.get(session_id)
+            if ring is None or last_event_id > self._last_event_id:
+                return None
+            backlog = ring.since(last_event_id)
+            if backlog is None:
+                return None
+            for frame in backlog:
+                queue.put_nowait(frame)
+            self._subscribe_locked(session_id, token, queue)
         return Subscription(token=token, queue=queue)
 
+    def _subscribe_locked(self, session_id: str, token: str, queue: FrameSink) -> None:
+        self._subscribers.setdefault(session_id, {})[token] = queue
+        if session_id in self._replay_rings:
+            self._replay_rings.move_to_end(session_id)
+            return
+        self._replay_rings[session_id] = EventRing(
+            self._last_event_id, self._replay_depth, self._replay_bytes
+        )
+        while len(self._replay_rings) > MAX_REPLAY_SESSIONS:
+            self._replay_rings.popitem(last=False)
+
     def unsubscribe(self, session_id: str, token: str) -> None:
-        with self._lock:
+        with self._stream_lock:
             session_subscribers = self._subscribers.get(session_id, {})
             session_subscribers.pop(token, None)
             if not session_subscribers and session_id in self._subscribers:
                 self._subscribers.pop(session_id, None)
 
+    def stream_stats(self) -> tuple[int, int]:
+        """(subscriber count, frames queued across all subscribers) for metrics scrapes."""
+        with self._stream_lock:
+            sinks = [sink for session in self._subscribers.values() for sink in session.values()]
+        return len(sinks), sum(queued_frames(sink) for sink in sinks)
+
     def list_sessions(self) -> list[Dict[str, Any]]:
         with self._lock:
             sessions = list(self._state["sessions"].values())
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import json
+from dataclasses import replace
+from typing import Any, Callable, Dict, Iterable, Iterator
+
+from .trace.schema import StepSummary, TraceSummary
+
+DEFAULT_CHUNK_BYTES = 64 * 1024
+
+
+class LazyArray:
+    """A JSON array whose items are produced and encoded one at a time while streaming."""
+
+    __slots__ = ("items", "encode")
+
+    def __init__(
+        self, items: Iterable[Any], encode: Callable[[Any], Any] = lambda item: item
+    ) -> None:
+        self.items = items
+        self.encode = encode
+
+
+def _has_lazy(value: Any) -> bool:
+    if isinstance(value, LazyArray):
+        return True
+    return isinstance(value, dict) and any(_has_lazy(item) for item in value.values())
+
+
+def iter_json(value: Any) -> Iterator[str]:
+    """Encode value piecewise; the concatenation equals json.dumps(value) with lazies expanded.
+
+    Subtrees without a LazyArray go through json.dumps in one call, so the per-piece overhead
+    is paid per step or trace rather than per key.
+    """
+    if isinstance(value, LazyArray):
+        yield "["
+        first = True
+        for item in value.items:
+            if not first:
+                yield ", "
+            first = False
+            yield from iter_json(value.encode(item))
+        yield "]"
+    elif isinstance(value, dict) and _has_lazy(value):
+        yield "{"
+        for index, (key, item) in enumerate(value.items()):
+            yield f"{', ' if index else ''}{json.dumps(str(key))}: "
+            yield from iter_json(item)
+        yield "}"
+    else:
+        yield json.dumps(value)
+
+
+def iter_json_chunks(value: Any, chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> Iterator[bytes]:
+    """UTF-8 chunks of roughly chunk_bytes, so socket writes are not one per step."""
+    buffer: list[str] = []
+    size = 0
+    for piece in iter_json(value):
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_bytes:
+            yield "".join(buffer).encode("utf-8")
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def lazy_trace(trace: TraceSummary) -> Dict[str, Any]:
+    """trace.to_dict() with the steps left as a LazyArray; keys keep to_dict's order."""
+    fields = replace(trace, steps=[]).to_dict()
+    fields["steps"] = LazyArray(trace.steps, StepSummary.to_dict)
+    return fields
@@ -1,34 +1,151 @@
 from __future__ import annotations
 
+import hashlib
+import hmac
 import json
-import math
+import logging
 import time
-from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from json import JSONDecodeError
 from queue import Empty
 from threading import Lock
-from json import JSONDecodeError
-from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from typing import Any, Dict
-from urllib.parse import parse_qs, urlparse
+from urllib.parse import ParseResult, parse_qs, urlparse
 
-from .config import DEFAULT_HOST, DEFAULT_PORT, data_dir, demo_dir, safe_export_enabled
+from .admission import AdmissionControl, AdmissionGate
+from .compression import (
+    StreamCompressor,
+    accepts_encoding,
+    compress,
+    decompress,
+    negotiate_encoding,
+)
+from .config import (
+    DEFAULT_BROTLI_QUALITY,
+    DEFAULT_COMPRESSION_MIN_BYTES,
+    DEFAULT_GZIP_LEVEL,
+    DEFAULT_HEAVY_DEADLINE_S,
+    DEFAULT_HEAVY_QUEUE_DEPTH,
+    DEFAULT_HEAVY_QUEUE_TIMEOUT_S,
+    DEFAULT_HEAVY_WORKERS,
+    DEFAULT_HOST,
+    DEFAULT_KEEP_ALIVE_TIMEOUT_S,
+    DEFAULT_MAX_INGEST_BYTES,
+    DEFAULT_MAX_INGEST_LINE_BYTES,
+    DEFAULT_MAX_KEEP_ALIVE_REQUESTS,
+    DEFAULT_PORT,
+    DEFAULT_SLOW_REQUEST_MS,
+    DEFAULT_STREAM_JSON_MIN_STEPS,
+    brotli_quality,
+    compression_min_bytes,
+    data_dir,
+    demo_dir,
+    gzip_level,
+    heavy_deadline_s,
+    heavy_queue_depth,
+    heavy_queue_timeout_s,
+    heavy_workers,
+    keep_alive_timeout_s,
+    max_ingest_bytes,
+    max_ingest_line_bytes,
+    max_keep_alive_requests,
+    output_validation,
+    output_validation_sample_every,
+    profiling_token,
+    safe_export_enabled,
+    server_mode,
+    server_workers,
+    slow_request_ms,
+    sse_replay_bytes,
+    sse_replay_depth,
+    stream_json_min_steps,
+    stream_port,
+)
 from .extensions.loader import ExtensionRegistry
 from .gameplay import ConflictError, GameplayStore
+from .json_stream import LazyArray, iter_json_chunks, lazy_trace
+from .mcp.schema import configure_output_validation, validate_input
 from .mcp.tools.compare_traces import execute as compare_execute
 from .mcp.tools.get_step_details import execute as step_execute
+from .mcp.tools.get_step_details_batch import execute as step_batch_execute
+from .mcp.tools.list_traces import build_payload as list_payload
 from .mcp.tools.list_traces import execute as list_execute
 from .mcp.tools.replay_from_step import execute as replay_execute
+from .mcp.tools.show_trace import build_payload as show_payload
 from .mcp.tools.show_trace import execute as show_execute
-from .mcp.schema import validate_input
-from .replay.jobs import ReplayJobStore
+from .metrics import (
+    ADMISSION_REJECTED,
+    HTTP_IN_FLIGHT,
+    HTTP_REQUEST_SECONDS,
+    PROMETHEUS_CONTENT_TYPE,
+    REGISTRY,
+)
+from .profiling import MIN_SAMPLE_INTERVAL_S, MemoryTracker, StackSampler, to_folded, to_speedscope
+from .rate_limit import RATE_LIMIT_COSTS, TokenBucketLimiter
+from .replay.jobs import ReplayJobLedger, ReplayJobStore, execute_replay_job
 from .replay.merge import merge_replays
+from .request_body import (
+    BodyTooLargeError,
+    UnsupportedContentEncodingError,
+    iter_decoded,
+    iter_lines,
+    iter_request_body,
+)
+from .routing import RequestContext, Route, RouteTable
+from .streaming import (
+    HEARTBEAT_INTERVAL_S,
+    STREAM_HEADERS,
+    StreamTarget,
+    open_gameplay_stream,
+    open_trace_stream,
+    parse_last_event_id,
+    parse_stream_target,
+    start_stream_server_thread,
+)
+from .timing import DeadlineExceededError, current_timer, end_request, phase, start_request
+from .trace.ingest import ingest_ndjson
+from .trace.insights import compute_insights
 from .trace.investigator import investigate_trace
-from .trace.live import LiveTraceBroker
+from .trace.live import LiveTraceBroker, encode_sse_event
 from .trace.query import run_trace_query
+from .trace.schema import StepSummary
 from .trace.store import TraceStore
 
 MAX_REQUEST_BYTES = 1_000_000
+# Oversized bodies up to this size are drained so the connection can be reused; larger ones close
+# it.
+MAX_DISCARD_BYTES = 8 * MAX_REQUEST_BYTES
 INTERNAL_ERROR_MESSAGE = "Internal server error"
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+# Per-connection headers a forwarding worker must not copy between client and owner.
+HOP_BY_HOP_HEADERS = {
+    "connection",
+    "content-length",
+    "keep-alive",
+    "proxy-connection",
+    "te",
+    "trailer",
+    "transfer-encoding",
+    "upgrade",
+}
+NDJSON_MEDIA_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+SLOW_REQUEST_LOG = logging.getLogger("agent_director.slow_requests")
+
+
+def strong_etag(*parts: Any) -> str:
+    digest = hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires; `*` matches any current representation."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
 
 
 class PayloadTooLargeError(Exception):
@@ -39,7 +156,21 @@ class InvalidContentTypeError(ValueError):
     pass
 
 
+class ServerBusyError(Exception):
+    pass
+
+
+ROUTES = RouteTable()
+
+
 class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; Nagle + delayed ACK would stall reused
+    # connections.
+    disable_nagle_algorithm = True
+    # Socket timeout; doubles as the idle limit between requests on a persistent connection.
+    timeout = DEFAULT_KEEP_ALIVE_TIMEOUT_S
+    max_requests_per_connection = DEFAULT_MAX_KEEP_ALIVE_REQUESTS
     store: TraceStore
     replay_jobs: ReplayJobStore
     live_broker: LiveTraceBroker
@@ -47,433 +178,169 @@ class ApiHandler(BaseHTTPRequestHandler):
     gameplay_store: GameplayStore
     rate_limit_window_s = 60
     rate_limit_max_requests = 240
-    _rate_limit_hits: Dict[str, deque[float]] = defaultdict(deque)
-    _rate_limit_lock = Lock()
+    compression_min_bytes = DEFAULT_COMPRESSION_MIN_BYTES
+    gzip_level = DEFAULT_GZIP_LEVEL
+    brotli_quality = DEFAULT_BROTLI_QUALITY
+    slow_request_ms = DEFAULT_SLOW_REQUEST_MS
+    stream_json_min_steps = DEFAULT_STREAM_JSON_MIN_STEPS
+    max_ingest_bytes = DEFAULT_MAX_INGEST_BYTES
+    max_ingest_line_bytes = DEFAULT_MAX_INGEST_LINE_BYTES
+    profiling_token: str | None = None
+    # Each heavy route gets heavy_workers slots and a bounded queue; see _admit.
+    admission = AdmissionControl(
+        DEFAULT_HEAVY_WORKERS, DEFAULT_HEAVY_QUEUE_DEPTH, DEFAULT_HEAVY_QUEUE_TIMEOUT_S
+    )
+    heavy_deadline_s = DEFAULT_HEAVY_DEADLINE_S
+    # Set in pre-fork workers: Unix socket of the process that owns `process_local` route state.
+    owner_socket: str | None = None
+    routes = ROUTES
+    profiler = StackSampler()
+    memory_tracker = MemoryTracker()
+    _route: Route | None = None
+    _requests_served = 0
+    _unread_body = False
+    _status = 500
+    _chunked = False
+    _rate_limiter: TokenBucketLimiter | None = None
+    _rate_limiter_lock = Lock()
 
     def log_message(self, format: str, *args: Any) -> None:
         return
 
     @classmethod
     def clear_rate_limit_state(cls) -> None:
-        with cls._rate_limit_lock:
-            cls._rate_limit_hits.clear()
+        with cls._rate_limiter_lock:
+            cls._rate_limiter = None
 
-    def _check_rate_limit(self) -> tuple[bool, int]:
+    @classmethod
+    def _limiter(cls) -> TokenBucketLimiter:
+        # Rebuilt whenever the window/limit attributes change, so tests and main() can tune them.
+        limiter = cls._rate_limiter
+        capacity = float(cls.rate_limit_max_requests)
+        refill = capacity / cls.rate_limit_window_s
+        if limiter is None or limiter.capacity != capacity or limiter.refill_per_s != refill:
+            with cls._rate_limiter_lock:
+                limiter = cls._rate_limiter
+                if (
+                    limiter is None
+                    or limiter.capacity != capacity
+                    or limiter.refill_per_s != refill
+                ):
+                    limiter = cls._rate_limiter = TokenBucketLimiter(capacity, refill)
+        return limiter
+
+    def _check_rate_limit(self, rate_class: str = "default") -> tuple[bool, int]:
         ip = self.client_address[0] if self.client_address else "unknown"
-        now = time.time()
-        with self._rate_limit_lock:
-            hits = self._rate_limit_hits[ip]
-            cutoff = now - self.rate_limit_window_s
-            while hits and hits[0] < cutoff:
-                hits.popleft()
-            if len(hits) >= self.rate_limit_max_requests:
-                retry_after = max(1, math.ceil(self.rate_limit_window_s - (now - hits[0])))
-                return False, retry_after
-            hits.append(now)
-        return True, 0
+        cost = RATE_LIMIT_COSTS.get(rate_class, RATE_LIMIT_COSTS["default"])
+        return self._limiter().acquire(ip, cost)
+
+    def _admit(self) -> AdmissionGate | None:
+        """Gate for the matched heavy route, already acquired; raises when the request is shed."""
+        if self._route is None or self._route.rate_limit != "heavy":
+            return None
+        gate = self.admission.gate(self._route.template)
+        if not gate.acquire():
+            raise ServerBusyError("Server busy")
+        timer = current_timer()
+        if timer is not None and self.heavy_deadline_s > 0:
+            # Time spent queued counts, so a request never outlives its deadline by waiting.
+            timer.deadline = timer.started + self.heavy_deadline_s
+        return gate
 
     def do_OPTIONS(self) -> None:
+        # Preflights skip _dispatch, so clear the previous request's route here and drain any body
+        # before the connection is reused; a chunked or oversized body closes it instead.
+        self._route = None
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = MAX_DISCARD_BYTES + 1
+        self._unread_body = "Transfer-Encoding" in self.headers or length > MAX_DISCARD_BYTES
+        if not self._unread_body:
+            self._discard_request_body(length)
         self._send_json(204, {})
 
     def do_GET(self) -> None:
-        allowed, retry_after = self._check_rate_limit()
-        if not allowed:
-            self._send_json(429, {"error": "Too many requests"}, {"Retry-After": str(retry_after)})
-            return
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:
+        self._dispatch("POST")
+
+    def send_response(self, code: int, message: str | None = None) -> None:
+        self._status = code
+        super().send_response(code, message)
+
+    def _dispatch(self, method: str) -> None:
+        # Until _read_json consumes it, a request body left on the socket makes reuse unsafe.
+        self._unread_body = self.headers.get("Content-Length", "0").strip() not in {"", "0"} or (
+            "Transfer-Encoding" in self.headers
+        )
         parsed = urlparse(self.path)
-        if parsed.path == "/api/stream/traces/latest":
-            self._stream_latest_trace()
+        matched = self.routes.match(method, parsed.path)
+        self._route = matched[0] if matched else None
+        if self._route is not None and self._route.rate_limit == "stream":
+            # Streams stay open for minutes and would swamp the latency histogram.
+            self._handle(method, parsed, matched)
             return
-        if parsed.path.startswith("/api/stream/gameplay/"):
-            path_parts = [p for p in parsed.path.split("/") if p]
-            if len(path_parts) == 4:
-                self._stream_gameplay_session(path_parts[3])
-                return
-        path_parts = [p for p in parsed.path.split("/") if p]
-        query = parse_qs(parsed.query)
-
+        self._status = 500
+        HTTP_IN_FLIGHT.inc()
+        timer = start_request()
         try:
-            if parsed.path == "/api/health":
-                self._send_json(200, {"status": "ok"})
-                return
-            if path_parts[:2] == ["api", "gameplay"]:
-                if path_parts == ["api", "gameplay", "sessions"]:
-                    self._send_json(200, {"sessions": self.gameplay_store.list_sessions()})
-                    return
-                if len(path_parts) == 4 and path_parts[2] == "sessions":
-                    session = self.gameplay_store.get_session(path_parts[3])
-                    if not session:
-                        self._send_json(404, {"error": f"Gameplay session not found: {path_parts[3]}"})
-                        return
-                    self._send_json(200, {"session": session})
-                    return
-                if len(path_parts) == 4 and path_parts[2] == "profiles":
-                    profile = self.gameplay_store.get_profile(path_parts[3])
-                    self._send_json(200, {"profile": profile})
-                    return
-                if len(path_parts) == 4 and path_parts[2] == "friends":
-                    social = self.gameplay_store.get_friend_graph(path_parts[3])
-                    self._send_json(200, {"social": social})
-                    return
-                if len(path_parts) == 4 and path_parts[2] == "guilds":
-                    guild = self.gameplay_store.get_guild(path_parts[3])
-                    if not guild:
-                        self._send_json(404, {"error": f"Guild not found: {path_parts[3]}"})
-                        return
-                    self._send_json(200, {"guild": guild})
-                    return
-                if path_parts == ["api", "gameplay", "liveops", "current"]:
-                    self._send_json(200, {"liveops": self.gameplay_store.current_liveops()})
-                    return
-                if path_parts == ["api", "gameplay", "observability", "summary"]:
-                    self._send_json(200, {"observability": self.gameplay_store.observability_snapshot()})
-                    return
-                if path_parts == ["api", "gameplay", "analytics", "funnels"]:
-                    self._send_json(200, {"analytics": self.gameplay_store.analytics_funnel_snapshot()})
-                    return
-            if parsed.path == "/api/extensions":
-                self._send_json(200, {"extensions": self.extension_registry.list_extensions()})
-                return
-            if path_parts[:2] == ["api", "replay-jobs"]:
-                if len(path_parts) == 3:
-                    job = self.replay_jobs.get(path_parts[2])
-                    if not job:
-                        self._send_json(404, {"error": f"Replay job not found: {path_parts[2]}"})
-                        return
-                    self._send_json(200, {"job": job.to_dict()})
-                    return
-                if len(path_parts) == 4 and path_parts[3] == "matrix":
-                    job = self.replay_jobs.get(path_parts[2])
-                    if not job:
-                        self._send_json(404, {"error": f"Replay job not found: {path_parts[2]}"})
-                        return
-                    matrix = self.replay_jobs.get_matrix(job.id, self.store)
-                    if matrix is None:
-                        self._send_json(404, {"error": f"Replay job not found: {job.id}"})
-                        return
-                    self._send_json(200, {"matrix": matrix})
-                    return
-            if path_parts[:2] == ["api", "traces"]:
-                if len(path_parts) == 2:
-                    payload = list_execute(self.store)
-                    if query.get("latest") == ["1"]:
-                        traces = payload["structuredContent"]["traces"]
-                        latest = traces[-1] if traces else None
-                        self._send_json(200, {"trace": latest})
-                    else:
-                        self._send_json(200, payload["structuredContent"])
-                    return
-                if len(path_parts) == 3:
-                    trace_id = path_parts[2]
-                    payload = show_execute(self.store, trace_id)
-                    self._send_json(200, payload["structuredContent"])
-                    return
-                if len(path_parts) == 4 and path_parts[3] == "investigate":
-                    trace_id = path_parts[2]
-                    validate_input("show_trace", {"trace_id": trace_id})
-                    trace = self.store.get_summary(trace_id)
-                    self._send_json(200, {"investigation": investigate_trace(trace)})
-                    return
-                if len(path_parts) == 4 and path_parts[3] == "comments":
-                    trace_id = path_parts[2]
-                    validate_input("show_trace", {"trace_id": trace_id})
-                    step_filter = query.get("step_id", [None])[0]
-                    if step_filter:
-                        validate_input(
-                            "get_step_details",
-                            {
-                                "trace_id": trace_id,
-                                "step_id": step_filter,
-                                "redaction_mode": "redacted",
-                                "reveal_paths": [],
-                                "safe_export": False,
-                            },
-                        )
-                    comments = self.store.list_comments(trace_id, step_filter)
-                    self._send_json(200, {"comments": comments})
-                    return
-                if len(path_parts) == 5 and path_parts[3] == "steps":
-                    trace_id = path_parts[2]
-                    step_id = path_parts[4]
-                    redaction_mode = query.get("redaction_mode", ["redacted"])[0]
-                    safe_export = query.get("safe_export", ["0"])[0] == "1" or safe_export_enabled()
-                    role = query.get("role", ["viewer"])[0]
-                    reveal_paths = query.get("reveal_path", [])
-                    if safe_export:
-                        redaction_mode = "redacted"
-                        reveal_paths = []
-                    payload = step_execute(
-                        self.store,
-                        trace_id,
-                        step_id,
-                        redaction_mode,
-                        reveal_paths,
-                        role,
-                        safe_export,
+            self._handle(method, parsed, matched)
+        finally:
+            end_request()
+            HTTP_IN_FLIGHT.dec()
+            template = self._route.template if self._route else "unmatched"
+            elapsed_ms = timer.elapsed_ms()
+            HTTP_REQUEST_SECONDS.observe((template, method, self._status), elapsed_ms / 1000)
+            if self.slow_request_ms > 0 and elapsed_ms >= self.slow_request_ms:
+                SLOW_REQUEST_LOG.warning(
+                    json.dumps(
+                        {
+                            "event": "slow_request",
+                            "method": method,
+                            "route": template,
+                            "path": parsed.path,
+                            "status": self._status,
+                            "durationMs": round(elapsed_ms, 3),
+                            "phasesMs": timer.phases_ms(),
+                        }
                     )
-                    audit = payload["structuredContent"].get("audit")
-                    if isinstance(audit, dict):
-                        self.store.log_redaction_event(
-                            trace_id=trace_id,
-                            step_id=step_id,
-                            role=str(audit.get("role", role)),
-                            action=str(audit.get("action", "view_step")),
-                            status=str(audit.get("status", "allowed")),
-                            requested_paths=[str(path) for path in audit.get("requestedPaths", [])],
-                            revealed_paths=[str(path) for path in audit.get("revealedPaths", [])],
-                            denied_paths=[str(path) for path in audit.get("deniedPaths", [])],
-                            safe_export=bool(audit.get("safeExport", safe_export)),
-                        )
-                    self._send_json(200, payload["structuredContent"])
-                    return
-            self._send_json(404, {"error": "Not found"})
-        except FileNotFoundError as exc:
-            self._send_json(404, {"error": str(exc)})
-        except ConflictError as exc:
-            self._send_json(409, {"error": str(exc)})
-        except ValueError as exc:
-            self._send_json(400, {"error": str(exc)})
-        except Exception:  # pragma: no cover - generic handler
-            self._send_json(500, {"error": INTERNAL_ERROR_MESSAGE})
+                )
 
-    def do_POST(self) -> None:
-        allowed, retry_after = self._check_rate_limit()
+    def _handle(
+        self, method: str, parsed: ParseResult, matched: tuple[Route, Dict[str, Any]] | None
+    ) -> None:
+        allowed, retry_after = self._check_rate_limit(
+            self._route.rate_limit if self._route else "default"
+        )
         if not allowed:
             self._send_json(429, {"error": "Too many requests"}, {"Retry-After": str(retry_after)})
             return
-        parsed = urlparse(self.path)
-        path_parts = [p for p in parsed.path.split("/") if p]
+        gate: AdmissionGate | None = None
         try:
-            body = self._read_json()
-            if path_parts[:2] == ["api", "gameplay"]:
-                if path_parts == ["api", "gameplay", "matchmaking"]:
-                    preferred_roles = body.get("preferred_roles")
-                    if preferred_roles is not None and not isinstance(preferred_roles, list):
-                        raise ValueError("preferred_roles must be a list when provided")
-                    session, match = self.gameplay_store.matchmake_session(
-                        trace_id=str(body.get("trace_id") or ""),
-                        player_id=str(body.get("player_id") or ""),
-                        preferred_roles=[
-                            str(role or "")
-                            for role in preferred_roles
-                        ] if isinstance(preferred_roles, list) else None,
-                    )
-                    self._send_json(200, {"session": session, "match": match})
-                    return
-                if path_parts == ["api", "gameplay", "sessions"]:
-                    session = self.gameplay_store.create_session(
-                        trace_id=str(body.get("trace_id") or ""),
-                        host_player_id=str(body.get("host_player_id") or ""),
-                        name=body.get("name"),
-                    )
-                    self._send_json(201, {"session": session})
-                    return
-                if len(path_parts) == 5 and path_parts[2] == "sessions" and path_parts[4] == "join":
-                    session = self.gameplay_store.join_session(
-                        session_id=path_parts[3],
-                        player_id=str(body.get("player_id") or ""),
-                        role=str(body.get("role") or ""),
-                    )
-                    self._send_json(200, {"session": session})
-                    return
-                if len(path_parts) == 5 and path_parts[2] == "sessions" and path_parts[4] == "leave":
-                    session = self.gameplay_store.leave_session(
-                        session_id=path_parts[3], player_id=str(body.get("player_id") or "")
-                    )
-                    self._send_json(200, {"session": session})
-                    return
-                if len(path_parts) == 5 and path_parts[2] == "sessions" and path_parts[4] == "reconnect":
-                    session = self.gameplay_store.reconnect_session(
-                        session_id=path_parts[3], player_id=str(body.get("player_id") or "")
-                    )
-                    self._send_json(200, {"session": session})
-                    return
-                if len(path_parts) == 5 and path_parts[2] == "sessions" and path_parts[4] == "action":
-                    expected_version = body.get("expected_version")
-                    if expected_version is not None and not isinstance(expected_version, int):
-                        raise ValueError("expected_version must be int")
-                    session = self.gameplay_store.apply_action(
-                        session_id=path_parts[3],
-                        player_id=str(body.get("player_id") or ""),
-                        action_type=str(body.get("type") or ""),
-                        payload=body.get("payload") if isinstance(body.get("payload"), dict) else {},
-                        expected_version=expected_version,
-                    )
-                    self._send_json(200, {"session": session})
-                    return
-                if len(path_parts) == 6 and path_parts[2] == "profiles" and path_parts[4] == "skills" and path_parts[5] == "unlock":
-                    profile = self.gameplay_store.unlock_profile_skill(
-                        player_id=path_parts[3], skill_id=str(body.get("skill_id") or "")
-                    )
-                    self._send_json(200, {"profile": profile})
-                    return
-                if len(path_parts) == 6 and path_parts[2] == "profiles" and path_parts[4] == "loadout" and path_parts[5] == "equip":
-                    profile = self.gameplay_store.equip_profile_skill(
-                        player_id=path_parts[3], skill_id=str(body.get("skill_id") or "")
-                    )
-                    self._send_json(200, {"profile": profile})
-                    return
-                if path_parts == ["api", "gameplay", "guilds"]:
-                    guild = self.gameplay_store.create_guild(
-                        guild_id=str(body.get("guild_id") or ""),
-                        name=str(body.get("name") or ""),
-                        owner_player_id=str(body.get("owner_player_id") or ""),
-                    )
-                    self._send_json(201, {"guild": guild})
-                    return
-                if len(path_parts) == 5 and path_parts[2] == "guilds" and path_parts[4] == "join":
-                    guild = self.gameplay_store.join_guild(path_parts[3], str(body.get("player_id") or ""))
-                    self._send_json(200, {"guild": guild})
-                    return
-                if path_parts == ["api", "gameplay", "friends", "invite"]:
-                    invite, social = self.gameplay_store.invite_friend(
-                        from_player_id=str(body.get("from_player_id") or ""),
-                        to_player_id=str(body.get("to_player_id") or ""),
-                    )
-                    self._send_json(201, {"invite": invite, "social": social})
-                    return
-                if path_parts == ["api", "gameplay", "friends", "accept"]:
-                    social = self.gameplay_store.accept_friend_invite(
-                        player_id=str(body.get("player_id") or ""),
-                        invite_id=str(body.get("invite_id") or ""),
-                    )
-                    self._send_json(200, {"social": social})
-                    return
-                if len(path_parts) == 5 and path_parts[2] == "guilds" and path_parts[4] == "events":
-                    guild, event = self.gameplay_store.schedule_guild_event(
-                        guild_id=path_parts[3],
-                        title=str(body.get("title") or ""),
-                        scheduled_at=str(body.get("scheduled_at") or ""),
-                    )
-                    self._send_json(201, {"guild": guild, "event": event})
-                    return
-                if (
-                    len(path_parts) == 7
-                    and path_parts[2] == "guilds"
-                    and path_parts[4] == "events"
-                    and path_parts[6] == "complete"
-                ):
-                    guild = self.gameplay_store.complete_guild_event(
-                        guild_id=path_parts[3],
-                        event_id=path_parts[5],
-                        impact=int(body.get("impact") or 0),
-                    )
-                    self._send_json(200, {"guild": guild})
-                    return
-                if path_parts == ["api", "gameplay", "liveops", "advance-week"]:
-                    liveops = self.gameplay_store.advance_liveops_week()
-                    self._send_json(200, {"liveops": liveops})
-                    return
-            if path_parts == ["api", "replay-jobs"]:
-                trace_id = str(body.get("trace_id") or "")
-                step_id = str(body.get("step_id") or "")
-                trace = self.store.get_summary(trace_id)
-                if not any(step.id == step_id for step in trace.steps):
-                    raise ValueError("step_id not found in trace")
-                job = self.replay_jobs.create_job(
-                    trace_id=trace_id,
-                    step_id=step_id,
-                    scenarios=body.get("scenarios") or [],
-                )
-                execute = body.get("execute", True)
-                if not isinstance(execute, bool):
-                    raise ValueError("execute must be bool")
-                if execute:
-                    self.replay_jobs.execute_job(job.id, self.store)
-                self._send_json(202, {"job": job.to_dict()})
-                return
-            if path_parts[:2] == ["api", "replay-jobs"] and len(path_parts) == 4 and path_parts[3] == "cancel":
-                job = self.replay_jobs.cancel_job(path_parts[2])
-                if not job:
-                    self._send_json(404, {"error": f"Replay job not found: {path_parts[2]}"})
-                    return
-                self._send_json(200, {"job": job.to_dict()})
-                return
-            if path_parts[:2] == ["api", "traces"] and len(path_parts) == 4:
-                trace_id = path_parts[2]
-                if path_parts[3] == "replay":
-                    payload = replay_execute(
-                        self.store,
-                        trace_id,
-                        body.get("step_id", ""),
-                        body.get("strategy", "hybrid"),
-                        body.get("modifications", {}),
-                    )
-                    replay_trace = payload["structuredContent"].get("trace")
-                    if replay_trace:
-                        self.live_broker.publish_trace(self.store.get_summary(replay_trace["id"]))
-                    self._send_json(200, payload["structuredContent"])
-                    return
-                if path_parts[3] == "query":
-                    validate_input("show_trace", {"trace_id": trace_id})
-                    query = body.get("query", "")
-                    trace = self.store.get_summary(trace_id)
-                    result = run_trace_query(trace, query)
-                    self._send_json(200, result)
-                    return
-                if path_parts[3] == "comments":
-                    step_id = body.get("step_id", "")
-                    author = body.get("author", "anonymous")
-                    text = body.get("body", "")
-                    pinned = body.get("pinned", False)
-                    validate_input(
-                        "get_step_details",
-                        {
-                            "trace_id": trace_id,
-                            "step_id": step_id,
-                            "redaction_mode": "redacted",
-                            "reveal_paths": [],
-                            "safe_export": False,
-                        },
-                    )
-                    if not isinstance(author, str):
-                        raise ValueError("author must be str")
-                    if not isinstance(text, str):
-                        raise ValueError("body must be str")
-                    if not isinstance(pinned, bool):
-                        raise ValueError("pinned must be bool")
-                    comment = self.store.add_comment(trace_id, step_id, author, text, pinned)
-                    self._send_json(201, {"comment": comment})
-                    return
-            if path_parts == ["api", "replays", "merge"]:
-                base_trace_id = body.get("base_trace_id", "")
-                left_trace_id = body.get("left_trace_id", "")
-                right_trace_id = body.get("right_trace_id", "")
-                strategy = body.get("strategy", "prefer_right")
-                validate_input(
-                    "compare_traces",
-                    {"left_trace_id": base_trace_id, "right_trace_id": left_trace_id},
-                )
-                validate_input(
-                    "compare_traces",
-                    {"left_trace_id": base_trace_id, "right_trace_id": right_trace_id},
-                )
-                if strategy not in {"prefer_left", "prefer_right"}:
-                    raise ValueError("strategy must be prefer_left or prefer_right")
-                base_trace = self.store.get_summary(base_trace_id)
-                left_trace = self.store.get_summary(left_trace_id)
-                right_trace = self.store.get_summary(right_trace_id)
-                merged = merge_replays(base_trace, left_trace, right_trace, strategy)
-                self.store.ingest_trace(merged)
-                self.live_broker.publish_trace(merged)
-                self._send_json(200, {"trace": merged.to_dict()})
+            gate = self._admit()
+            if self.owner_socket and matched and matched[0].process_local:
+                self._forward_to_owner(method)
                 return
-            if path_parts[:2] == ["api", "extensions"] and len(path_parts) == 4 and path_parts[3] == "run":
-                extension_id = path_parts[2]
-                validate_input("show_trace", {"trace_id": extension_id})
-                trace_id = body.get("trace_id", "")
-                validate_input("show_trace", {"trace_id": trace_id})
-                trace = self.store.get_summary(trace_id)
-                result = self.extension_registry.run_extension(extension_id, trace)
-                self._send_json(200, {"extensionId": extension_id, "traceId": trace_id, "result": result})
+            body: Dict[str, Any] = {}
+            if method == "POST" and not (matched and matched[0].stream_body):
+                limit = matched[0].max_body_bytes if matched else None
+                body = self._read_json(limit or MAX_REQUEST_BYTES)
+            if matched is None:
+                self._send_json(404, {"error": "Not found"})
                 return
-            if path_parts == ["api", "compare"]:
-                payload = compare_execute(
-                    self.store, body.get("left_trace_id", ""), body.get("right_trace_id", "")
-                )
-                self._send_json(200, payload["structuredContent"])
-                return
-            self._send_json(404, {"error": "Not found"})
+            route, params = matched
+            route.handler(
+                self, RequestContext(params=params, query=parse_qs(parsed.query), body=body)
+            )
+        except ServerBusyError as exc:
+            self._send_json(503, {"error": str(exc)}, {"Retry-After": "1"})
+        except DeadlineExceededError as exc:
+            ADMISSION_REJECTED.inc(
+                (self._route.template if self._route else "unmatched", "deadline")
+            )
+            self._send_json(503, {"error": str(exc)}, {"Retry-After": "1"})
         except PayloadTooLargeError:
             self._send_json(413, {"error": "Payload too large"})
         except InvalidContentTypeError as exc:
@@ -484,87 +351,762 @@ class ApiHandler(BaseHTTPRequestHandler):
             self._send_json(409, {"error": str(exc)})
         except ValueError as exc:
             self._send_json(400, {"error": str(exc)})
-        except Exception:  # pragma: no cover
+        except Exception:  # pragma: no cover - generic handler
             self._send_json(500, {"error": INTERNAL_ERROR_MESSAGE})
+        finally:
+            if gate is not None:
+                gate.release()
 
-    def _read_json(self) -> Dict[str, Any]:
-        raw_length = self.headers.get("Content-Length", "0")
+    @ROUTES.route("GET", "/api/stream/{kind}/{key}", rate_limit="stream")
+    def _get_stream(self, request: RequestContext) -> None:
+        path_parts = ["api", "stream", request.params["kind"], request.params["key"]]
+        target = parse_stream_target(path_parts, request.query)
+        if target is None:
+            self._send_json(404, {"error": "Not found"})
+            return
+        if target.kind == "gameplay" and self.owner_socket:
+            self._forward_to_owner("GET")
+            return
+        self._stream(target)
+
+    @ROUTES.route("GET", "/api/health")
+    def _get_health(self, request: RequestContext) -> None:
+        self._send_json(200, {"status": "ok"})
+
+    @ROUTES.route("GET", "/api/metrics")
+    def _get_metrics(self, request: RequestContext) -> None:
+        trace_subscribers, trace_queued = self.live_broker.stream_stats()
+        gameplay_subscribers, gameplay_queued = self.gameplay_store.stream_stats()
+        snapshot = [
+            (
+                "agent_director_sse_subscribers",
+                "Open SSE subscriptions by stream kind.",
+                [
+                    ({"stream": "trace"}, trace_subscribers),
+                    ({"stream": "gameplay"}, gameplay_subscribers),
+                ],
+            ),
+            (
+                "agent_director_sse_queued_frames",
+                "Frames waiting in SSE subscriber queues by stream kind.",
+                [({"stream": "trace"}, trace_queued), ({"stream": "gameplay"}, gameplay_queued)],
+            ),
+            (
+                "agent_director_replay_jobs",
+                "Replay jobs currently held in memory, by status.",
+                [
+                    ({"status": status}, count)
+                    for status, count in self.replay_jobs.status_counts().items()
+                ],
+            ),
+        ]
+        body = REGISTRY.render(snapshot).encode("utf-8")
+        self._send_body(200, body, PROMETHEUS_CONTENT_TYPE)
+
+    def _profiling_allowed(self) -> bool:
+        """Debug endpoints answer 404 unless a profiling token is configured, and 403 without it."""
+        if not self.profiling_token:
+            self._send_json(404, {"error": "Not found"})
+            return False
+        supplied = self.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(supplied.encode("utf-8"), self.profiling_token.encode("utf-8")):
+            self._send_json(403, {"error": "Forbidden"})
+            return False
+        return True
+
+    @ROUTES.route("GET", "/api/debug/profile", rate_limit="heavy")
+    def _debug_profile(self, request: RequestContext) -> None:
+        if not self._profiling_allowed():
+            return
+        seconds = float(request.query.get("seconds", ["5"])[0])
+        interval_s = max(
+            float(request.query.get("interval_ms", ["10"])[0]) / 1000, MIN_SAMPLE_INTERVAL_S
+        )
+        output = request.query.get("format", ["folded"])[0]
+        if output not in {"folded", "speedscope"}:
+            raise ValueError("format must be folded or speedscope")
         try:
-            length = int(raw_length)
-        except ValueError as exc:
-            raise ValueError("Invalid Content-Length") from exc
-        if length < 0:
-            raise ValueError("Invalid Content-Length")
-        if length > MAX_REQUEST_BYTES:
-            self._discard_request_body(length)
-            raise PayloadTooLargeError
+            stacks, _ = self.profiler.sample(seconds, interval_s)
+        except RuntimeError as exc:
+            self._send_json(409, {"error": str(exc)})
+            return
+        if output == "speedscope":
+            self._send_json(200, to_speedscope(stacks, interval_s))
+        else:
+            self._send_body(200, to_folded(stacks).encode("utf-8"), "text/plain; charset=utf-8")
+
+    @ROUTES.route("POST", "/api/debug/memory", rate_limit="heavy")
+    def _debug_memory(self, request: RequestContext) -> None:
+        if not self._profiling_allowed():
+            return
+        if request.body.get("stop"):
+            self.memory_tracker.stop()
+            self._send_json(200, {"tracing": False})
+            return
+        result = self.memory_tracker.snapshot_diff(
+            limit=int(request.body.get("limit", 25)),
+            group_by=str(request.body.get("group_by", "lineno")),
+            reset=bool(request.body.get("reset", False)),
+        )
+        self._send_json(200, {"tracing": True, **result})
+
+    @ROUTES.route("GET", "/api/gameplay/sessions", process_local=True)
+    def _list_gameplay_sessions(self, request: RequestContext) -> None:
+        self._send_json(200, {"sessions": self.gameplay_store.list_sessions()})
+
+    @ROUTES.route("GET", "/api/gameplay/sessions/{session_id}", cacheable=True, process_local=True)
+    def _get_gameplay_session(self, request: RequestContext) -> None:
+        session_id = request.params["session_id"]
+        session = self.gameplay_store.get_session(session_id)
+        if not session:
+            self._send_json(404, {"error": f"Gameplay session not found: {session_id}"})
+            return
+        etag = strong_etag("session", session_id, session.get("version"), session.get("updated_at"))
+        self._send_json(200, {"session": session}, etag=etag)
+
+    @ROUTES.route("GET", "/api/gameplay/profiles/{player_id}", process_local=True)
+    def _get_gameplay_profile(self, request: RequestContext) -> None:
+        self._send_json(
+            200, {"profile": self.gameplay_store.get_profile(request.params["player_id"])}
+        )
+
+    @ROUTES.route("GET", "/api/gameplay/friends/{player_id}", process_local=True)
+    def _get_gameplay_friends(self, request: RequestContext) -> None:
+        social = self.gameplay_store.get_friend_graph(request.params["player_id"])
+        self._send_json(200, {"social": social})
+
+    @ROUTES.route("GET", "/api/gameplay/guilds/{guild_id}", process_local=True)
+    def _get_gameplay_guild(self, request: RequestContext) -> None:
+        guild_id = request.params["guild_id"]
+        guild = self.gameplay_store.get_guild(guild_id)
+        if not guild:
+            self._send_json(404, {"error": f"Guild not found: {guild_id}"})
+            return
+        self._send_json(200, {"guild": guild})
+
+    @ROUTES.route("GET", "/api/gameplay/liveops/current", process_local=True)
+    def _get_gameplay_liveops(self, request: RequestContext) -> None:
+        self._send_json(200, {"liveops": self.gameplay_store.current_liveops()})
+
+    @ROUTES.route("GET", "/api/gameplay/observability/summary", process_local=True)
+    def _get_gameplay_observability(self, request: RequestContext) -> None:
+        self._send_json(200, {"observability": self.gameplay_store.observability_snapshot()})
+
+    @ROUTES.route("GET", "/api/gameplay/analytics/funnels", process_local=True)
+    def _get_gameplay_funnels(self, request: RequestContext) -> None:
+        self._send_json(200, {"analytics": self.gameplay_store.analytics_funnel_snapshot()})
+
+    @ROUTES.route("GET", "/api/extensions")
+    def _list_extensions(self, request: RequestContext) -> None:
+        self._send_json(200, {"extensions": self.extension_registry.list_extensions()})
+
+    @ROUTES.route("GET", "/api/replay-jobs/{job_id}", process_local=True)
+    def _get_replay_job(self, request: RequestContext) -> None:
+        job_id = request.params["job_id"]
+        job = self.replay_jobs.get(job_id)
+        if not job:
+            self._send_json(404, {"error": f"Replay job not found: {job_id}"})
+            return
+        self._send_json(200, {"job": job.to_dict()})
+
+    @ROUTES.route("GET", "/api/replay-jobs/{job_id}/matrix", cacheable=True, process_local=True)
+    def _get_replay_matrix(self, request: RequestContext) -> None:
+        job_id = request.params["job_id"]
+        job = self.replay_jobs.get(job_id)
+        if not job:
+            self._send_json(404, {"error": f"Replay job not found: {job_id}"})
+            return
+        matrix = self.replay_jobs.get_matrix(job.id, self.store)
+        if matrix is None:
+            self._send_json(404, {"error": f"Replay job not found: {job.id}"})
+            return
+        self._send_json(200, {"matrix": matrix})
+
+    @ROUTES.route("GET", "/api/traces")
+    def _list_traces(self, request: RequestContext) -> None:
+        projection = _projection_query(request.query, paged=False)
+        if projection and request.query.get("latest") != ["1"]:
+            self._send_json(200, list_execute(self.store, **projection)["structuredContent"])
+            return
+        if request.query.get("latest") == ["1"]:
+            traces = list_payload(self.store.list_traces()[-1:])["structuredContent"]["traces"]
+            self._send_json(200, {"trace": traces[0] if traces else None})
+        elif self.store.step_total() >= self.stream_json_min_steps:
+            # Each summary is loaded only when the encoder reaches it.
+            self._send_json_stream(200, {"traces": LazyArray(self.store.iter_traces(), lazy_trace)})
+        else:
+            self._send_json(200, list_payload(self.store.list_traces())["structuredContent"])
+
+    @ROUTES.route("POST", "/api/traces", rate_limit="heavy", stream_body=True)
+    def _ingest_trace(self, request: RequestContext) -> None:
+        media_type = self.headers.get("Content-Type", "").split(";", 1)[0].strip().lower()
+        if media_type not in NDJSON_MEDIA_TYPES:
+            raise InvalidContentTypeError("Content-Type must be application/x-ndjson")
+        chunks = iter_request_body(self.rfile, self.headers, self.max_ingest_bytes)
+        decoded = iter_decoded(chunks, self.headers.get("Content-Encoding"), self.max_ingest_bytes)
+        try:
+            summary, step_count, detail_count = ingest_ndjson(
+                self.store, iter_lines(decoded, self.max_ingest_line_bytes)
+            )
+        except BodyTooLargeError as exc:
+            raise PayloadTooLargeError from exc
+        except UnsupportedContentEncodingError as exc:
+            raise InvalidContentTypeError(str(exc)) from exc
+        self._unread_body = False
+        self.live_broker.publish_trace(self.store.get_trace_page(summary.id)[0])
+        self._send_json(
+            201,
+            {
+                "trace": {
+                    "id": summary.id,
+                    "stepCount": step_count,
+                    "detailCount": detail_count,
+                },
+                "warnings": list(self.store.last_ingest_warnings),
+            },
+        )
+
+    @ROUTES.route("POST", "/api/traces/{trace_id}/steps")
+    def _append_step(self, request: RequestContext) -> None:
+        trace_id = request.params["trace_id"]
+        step, data = _step_from_body(trace_id, request.body)
+        self.store.append_step(trace_id, step, data)
+        self.live_broker.publish_step(trace_id, step, lambda: self.store.get_summary(trace_id))
+        self._send_json(201, {"step": step.to_dict()})
+
+    @ROUTES.route("POST", "/api/traces/{trace_id}/steps/{step_id}/update")
+    def _update_step(self, request: RequestContext) -> None:
+        trace_id = request.params["trace_id"]
+        step, data = _step_from_body(trace_id, request.body, request.params["step_id"])
+        self.store.update_step(trace_id, step, data)
+        self.live_broker.publish_step(
+            trace_id, step, lambda: self.store.get_summary(trace_id), updated=True
+        )
+        self._send_json(200, {"step": step.to_dict()})
+
+    @ROUTES.route("POST", "/api/traces/{trace_id}/finalize")
+    def _finalize_trace(self, request: RequestContext) -> None:
+        trace_id = request.params["trace_id"]
+        validate_input("show_trace", {"trace_id": trace_id})
+        body = request.body
+        ended_at = body.get("endedAt")
+        metadata = body.get("metadata")
+        if ended_at is not None and not isinstance(ended_at, str):
+            raise ValueError("endedAt must be str")
+        if metadata is not None and not isinstance(metadata, dict):
+            raise ValueError("metadata must be an object")
+        summary = self.store.finalize_trace(
+            trace_id, str(body.get("status", "completed")), ended_at, metadata
+        )
+        self.live_broker.publish_trace(summary)
+        self._send_json(
+            200,
+            {
+                "trace": {
+                    "id": summary.id,
+                    "status": summary.status,
+                    "stepCount": len(summary.steps),
+                }
+            },
+        )
+
+    @ROUTES.route("GET", "/api/traces/{trace_id}", cacheable=True)
+    def _get_trace(self, request: RequestContext) -> None:
+        trace_id = request.params["trace_id"]
+        validate_input("show_trace", {"trace_id": trace_id})
+        projection = _projection_query(request.query, paged=True)
+        if projection:
+            payload = show_execute(self.store, trace_id, **projection)["structuredContent"]
+            self._send_json(200, payload)
+            return
+        # Large traces are streamed without a body digest, so they are tagged from the store's
+        # validator instead, checked before the summary is even read.
+        etag = self._stream_etag(strong_etag("trace", *self.store.trace_version(trace_id)))
+        if etag_matches(self.headers.get("If-None-Match"), etag):
+            self._send_not_modified({"Cache-Control": REVALIDATE_CACHE_CONTROL, "ETag": etag}, True)
+            return
+        trace = self.store.get_summary(trace_id)
+        if len(trace.steps) >= self.stream_json_min_steps:
+            with phase("insights"):
+                insights = compute_insights(trace)
+            self._send_json_stream(
+                200,
+                {"trace": lazy_trace(trace), "insights": insights},
+                cache_control=REVALIDATE_CACHE_CONTROL,
+                etag=etag,
+            )
+            return
+        self._send_json(200, show_payload(trace)["structuredContent"])
+
+    @ROUTES.route("GET", "/api/traces/{trace_id}/investigate", rate_limit="heavy", cacheable=True)
+    def _investigate_trace(self, request: RequestContext) -> None:
+        trace_id = request.params["trace_id"]
+        validate_input("show_trace", {"trace_id": trace_id})
+        trace = self.store.get_summary(trace_id)
+        self._send_json(200, {"investigation": investigate_trace(trace)})
+
+    @ROUTES.route("GET", "/api/traces/{trace_id}/comments")
+    def _list_comments(self, request: RequestContext) -> None:
+        trace_id = request.params["trace_id"]
+        validate_input("show_trace", {"trace_id": trace_id})
+        step_filter = request.query.get("step_id", [None])[0]
+        if step_filter:
+            validate_input(
+                "get_step_details",
+                {
+                    "trace_id": trace_id,
+                    "step_id": step_filter,
+                    "redaction_mode": "redacted",
+                    "reveal_paths": [],
+                    "safe_export": False,
+                },
+            )
+        comments = self.store.list_comments(trace_id, step_filter)
+        self._send_json(200, {"comments": comments})
+
+    @ROUTES.route("GET", "/api/traces/{trace_id}/steps/{step_id}", cacheable=True)
+    def _get_step_details(self, request: RequestContext) -> None:
+        trace_id = request.params["trace_id"]
+        step_id = request.params["step_id"]
+        query = request.query
+        redaction_mode = query.get("redaction_mode", ["redacted"])[0]
+        safe_export = query.get("safe_export", ["0"])[0] == "1" or safe_export_enabled()
+        role = query.get("role", ["viewer"])[0]
+        reveal_paths = query.get("reveal_path", [])
+        if safe_export:
+            redaction_mode = "redacted"
+            reveal_paths = []
+        payload = step_execute(
+            self.store,
+            trace_id,
+            step_id,
+            redaction_mode,
+            reveal_paths,
+            role,
+            safe_export,
+        )
+        audit = payload["structuredContent"].get("audit")
+        if isinstance(audit, dict):
+            self.store.log_redaction_events(
+                [_audit_event(trace_id, step_id, audit, role, safe_export)]
+            )
+        self._send_json(200, payload["structuredContent"])
+
+    @ROUTES.route("POST", "/api/traces/{trace_id}/steps/batch", rate_limit="heavy")
+    def _get_step_details_batch(self, request: RequestContext) -> None:
+        trace_id = request.params["trace_id"]
+        body = request.body
+        step_ids = body.get("step_ids")
+        redaction_mode = str(body.get("redaction_mode", "redacted"))
+        safe_export = body.get("safe_export", False) is True or safe_export_enabled()
+        role = str(body.get("role", "viewer"))
+        reveal_paths = body.get("reveal_paths") or []
+        if safe_export:
+            redaction_mode = "redacted"
+            reveal_paths = []
+        payload = step_batch_execute(
+            self.store,
+            trace_id,
+            step_ids,
+            redaction_mode,
+            reveal_paths,
+            role,
+            safe_export,
+        )
+        result = payload["structuredContent"]
+        events = [
+            _audit_event(trace_id, step_id, audit, role, safe_export)
+            for step_id, audit in result["audits"].items()
+        ]
+        if events:
+            self.store.log_redaction_events(events)
+        self._send_json(200, result)
+
+    @ROUTES.route("POST", "/api/gameplay/matchmaking", process_local=True)
+    def _matchmake(self, request: RequestContext) -> None:
+        body = request.body
+        preferred_roles = body.get("preferred_roles")
+        if preferred_roles is not None and not isinstance(preferred_roles, list):
+            raise ValueError("preferred_roles must be a list when provided")
+        session, match = self.gameplay_store.matchmake_session(
+            trace_id=str(body.get("trace_id") or ""),
+            player_id=str(body.get("player_id") or ""),
+            preferred_roles=[
+                str(role or "")
+                for role in preferred_roles
+            ] if isinstance(preferred_roles, list) else None,
+        )
+        self._send_json(200, {"session": session, "match": match})
+
+    @ROUTES.route("POST", "/api/gameplay/sessions", process_local=True)
+    def _create_gameplay_session(self, request: RequestContext) -> None:
+        body = request.body
+        session = self.gameplay_store.create_session(
+            trace_id=str(body.get("trace_id") or ""),
+            host_player_id=str(body.get("host_player_id") or ""),
+            name=body.get("name"),
+        )
+        self._send_json(201, {"session": session})
+
+    @ROUTES.route("POST", "/api/gameplay/sessions/{session_id}/join", process_local=True)
+    def _join_gameplay_session(self, request: RequestContext) -> None:
+        session = self.gameplay_store.join_session(
+            session_id=request.params["session_id"],
+            player_id=str(request.body.get("player_id") or ""),
+            role=str(request.body.get("role") or ""),
+        )
+        self._send_json(200, {"session": session})
+
+    @ROUTES.route("POST", "/api/gameplay/sessions/{session_id}/leave", process_local=True)
+    def _leave_gameplay_session(self, request: RequestContext) -> None:
+        session = self.gameplay_store.leave_session(
+            session_id=request.params["session_id"],
+            player_id=str(request.body.get("player_id") or ""),
+        )
+        self._send_json(200, {"session": session})
+
+    @ROUTES.route("POST", "/api/gameplay/sessions/{session_id}/reconnect", process_local=True)
+    def _reconnect_gameplay_session(self, request: RequestContext) -> None:
+        session = self.gameplay_store.reconnect_session(
+            session_id=request.params["session_id"],
+            player_id=str(request.body.get("player_id") or ""),
+        )
+        self._send_json(200, {"session": session})
+
+    @ROUTES.route("POST", "/api/gameplay/sessions/{session_id}/action", process_local=True)
+    def _apply_gameplay_action(self, request: RequestContext) -> None:
+        body = request.body
+        expected_version = body.get("expected_version")
+        if expected_version is not None and not isinstance(expected_version, int):
+            raise ValueError("expected_version must be int")
+        session = self.gameplay_store.apply_action(
+            session_id=request.params["session_id"],
+            player_id=str(body.get("player_id") or ""),
+            action_type=str(body.get("type") or ""),
+            payload=body.get("payload") if isinstance(body.get("payload"), dict) else {},
+            expected_version=expected_version,
+        )
+        self._send_json(200, {"session": session})
+
+    @ROUTES.route("POST", "/api/gameplay/profiles/{player_id}/skills/unlock", process_local=True)
+    def _unlock_profile_skill(self, request: RequestContext) -> None:
+        profile = self.gameplay_store.unlock_profile_skill(
+            player_id=request.params["player_id"], skill_id=str(request.body.get("skill_id") or "")
+        )
+        self._send_json(200, {"profile": profile})
+
+    @ROUTES.route("POST", "/api/gameplay/profiles/{player_id}/loadout/equip", process_local=True)
+    def _equip_profile_skill(self, request: RequestContext) -> None:
+        profile = self.gameplay_store.equip_profile_skill(
+            player_id=request.params["player_id"], skill_id=str(request.body.get("skill_id") or "")
+        )
+        self._send_json(200, {"profile": profile})
+
+    @ROUTES.route("POST", "/api/gameplay/guilds", process_local=True)
+    def _create_guild(self, request: RequestContext) -> None:
+        body = request.body
+        guild = self.gameplay_store.create_guild(
+            guild_id=str(body.get("guild_id") or ""),
+            name=str(body.get("name") or ""),
+            owner_player_id=str(body.get("owner_player_id") or ""),
+        )
+        self._send_json(201, {"guild": guild})
+
+    @ROUTES.route("POST", "/api/gameplay/guilds/{guild_id}/join", process_local=True)
+    def _join_guild(self, request: RequestContext) -> None:
+        guild = self.gameplay_store.join_guild(
+            request.params["guild_id"], str(request.body.get("player_id") or "")
+        )
+        self._send_json(200, {"guild": guild})
+
+    @ROUTES.route("POST", "/api/gameplay/friends/invite", process_local=True)
+    def _invite_friend(self, request: RequestContext) -> None:
+        invite, social = self.gameplay_store.invite_friend(
+            from_player_id=str(request.body.get("from_player_id") or ""),
+            to_player_id=str(request.body.get("to_player_id") or ""),
+        )
+        self._send_json(201, {"invite": invite, "social": social})
+
+    @ROUTES.route("POST", "/api/gameplay/friends/accept", process_local=True)
+    def _accept_friend_invite(self, request: RequestContext) -> None:
+        social = self.gameplay_store.accept_friend_invite(
+            player_id=str(request.body.get("player_id") or ""),
+            invite_id=str(request.body.get("invite_id") or ""),
+        )
+        self._send_json(200, {"social": social})
+
+    @ROUTES.route("POST", "/api/gameplay/guilds/{guild_id}/events", process_local=True)
+    def _schedule_guild_event(self, request: RequestContext) -> None:
+        guild, event = self.gameplay_store.schedule_guild_event(
+            guild_id=request.params["guild_id"],
+            title=str(request.body.get("title") or ""),
+            scheduled_at=str(request.body.get("scheduled_at") or ""),
+        )
+        self._send_json(201, {"guild": guild, "event": event})
+
+    @ROUTES.route(
+        "POST", "/api/gameplay/guilds/{guild_id}/events/{event_id}/complete", process_local=True
+    )
+    def _complete_guild_event(self, request: RequestContext) -> None:
+        guild = self.gameplay_store.complete_guild_event(
+            guild_id=request.params["guild_id"],
+            event_id=request.params["event_id"],
+            impact=int(request.body.get("impact") or 0),
+        )
+        self._send_json(200, {"guild": guild})
+
+    @ROUTES.route("POST", "/api/gameplay/liveops/advance-week", process_local=True)
+    def _advance_liveops_week(self, request: RequestContext) -> None:
+        self._send_json(200, {"liveops": self.gameplay_store.advance_liveops_week()})
+
+    # Not process_local: replays run here, under this process's admission gate and deadline,
+    # while only the job's bookkeeping lives with the owner.
+    @ROUTES.route("POST", "/api/replay-jobs", rate_limit="heavy")
+    def _create_replay_job(self, request: RequestContext) -> None:
+        body = request.body
+        trace_id = str(body.get("trace_id") or "")
+        step_id = str(body.get("step_id") or "")
+        trace = self.store.get_summary(trace_id)
+        if not any(step.id == step_id for step in trace.steps):
+            raise ValueError("step_id not found in trace")
+        execute = body.get("execute", True)
+        if not isinstance(execute, bool):
+            raise ValueError("execute must be bool")
+        jobs = self._replay_job_ledger()
+        job = jobs.create_job(
+            trace_id=trace_id,
+            step_id=step_id,
+            scenarios=body.get("scenarios") or [],
+        )
+        if execute:
+            job = execute_replay_job(jobs, job.id, self.store) or job
+            for scenario in job.scenarios:
+                if scenario.replay_trace_id:
+                    self.live_broker.publish_trace(self.store.get_summary(scenario.replay_trace_id))
+        self._send_json(202, {"job": job.to_dict()})
+
+    @ROUTES.route("POST", "/api/replay-jobs/{job_id}/cancel", process_local=True)
+    def _cancel_replay_job(self, request: RequestContext) -> None:
+        job_id = request.params["job_id"]
+        job = self.replay_jobs.cancel_job(job_id)
+        if not job:
+            self._send_json(404, {"error": f"Replay job not found: {job_id}"})
+            return
+        self._send_json(200, {"job": job.to_dict()})
+
+    @ROUTES.route("POST", "/api/traces/{trace_id}/replay", rate_limit="heavy")
+    def _replay_trace(self, request: RequestContext) -> None:
+        body = request.body
+        payload = replay_execute(
+            self.store,
+            request.params["trace_id"],
+            body.get("step_id", ""),
+            body.get("strategy", "hybrid"),
+            body.get("modifications", {}),
+        )
+        replay_trace = payload["structuredContent"].get("trace")
+        if replay_trace:
+            self.live_broker.publish_trace(self.store.get_summary(replay_trace["id"]))
+        self._send_json(200, payload["structuredContent"])
+
+    @ROUTES.route("POST", "/api/traces/{trace_id}/query")
+    def _query_trace(self, request: RequestContext) -> None:
+        trace_id = request.params["trace_id"]
+        validate_input("show_trace", {"trace_id": trace_id})
+        trace = self.store.get_summary(trace_id)
+        self._send_json(200, run_trace_query(trace, request.body.get("query", "")))
+
+    @ROUTES.route("POST", "/api/traces/{trace_id}/comments")
+    def _add_comment(self, request: RequestContext) -> None:
+        trace_id = request.params["trace_id"]
+        body = request.body
+        step_id = body.get("step_id", "")
+        author = body.get("author", "anonymous")
+        text = body.get("body", "")
+        pinned = body.get("pinned", False)
+        validate_input(
+            "get_step_details",
+            {
+                "trace_id": trace_id,
+                "step_id": step_id,
+                "redaction_mode": "redacted",
+                "reveal_paths": [],
+                "safe_export": False,
+            },
+        )
+        if not isinstance(author, str):
+            raise ValueError("author must be str")
+        if not isinstance(text, str):
+            raise ValueError("body must be str")
+        if not isinstance(pinned, bool):
+            raise ValueError("pinned must be bool")
+        comment = self.store.add_comment(trace_id, step_id, author, text, pinned)
+        self._send_json(201, {"comment": comment})
+
+    @ROUTES.route("POST", "/api/replays/merge", rate_limit="heavy")
+    def _merge_replays(self, request: RequestContext) -> None:
+        body = request.body
+        base_trace_id = body.get("base_trace_id", "")
+        left_trace_id = body.get("left_trace_id", "")
+        right_trace_id = body.get("right_trace_id", "")
+        strategy = body.get("strategy", "prefer_right")
+        validate_input(
+            "compare_traces",
+            {"left_trace_id": base_trace_id, "right_trace_id": left_trace_id},
+        )
+        validate_input(
+            "compare_traces",
+            {"left_trace_id": base_trace_id, "right_trace_id": right_trace_id},
+        )
+        if strategy not in {"prefer_left", "prefer_right"}:
+            raise ValueError("strategy must be prefer_left or prefer_right")
+        base_trace = self.store.get_summary(base_trace_id)
+        left_trace = self.store.get_summary(left_trace_id)
+        right_trace = self.store.get_summary(right_trace_id)
+        merged = merge_replays(base_trace, left_trace, right_trace, strategy)
+        self.store.ingest_trace(merged)
+        self.live_broker.publish_trace(merged)
+        self._send_json(200, {"trace": merged.to_dict()})
+
+    @ROUTES.route("POST", "/api/extensions/{extension_id}/run", rate_limit="heavy")
+    def _run_extension(self, request: RequestContext) -> None:
+        extension_id = request.params["extension_id"]
+        validate_input("show_trace", {"trace_id": extension_id})
+        trace_id = request.body.get("trace_id", "")
+        validate_input("show_trace", {"trace_id": trace_id})
+        trace = self.store.get_summary(trace_id)
+        result = self.extension_registry.run_extension(extension_id, trace)
+        self._send_json(200, {"extensionId": extension_id, "traceId": trace_id, "result": result})
+
+    @ROUTES.route("POST", "/api/compare", rate_limit="heavy")
+    def _compare_traces(self, request: RequestContext) -> None:
+        payload = compare_execute(
+            self.store,
+            request.body.get("left_trace_id", ""),
+            request.body.get("right_trace_id", ""),
+        )
+        self._send_json(200, payload["structuredContent"])
+
+    def _read_json(self, max_bytes: int = MAX_REQUEST_BYTES) -> Dict[str, Any]:
+        length = self._content_length(max_bytes)
         content_type = self.headers.get("Content-Type", "")
         media_type = content_type.split(";", 1)[0].strip().lower()
         if length > 0 and media_type != "application/json":
             raise InvalidContentTypeError("Content-Type must be application/json")
-        if length == 0:
+        body = self._read_body(length)
+        if not body:
             return {}
-        body = self.rfile.read(length)
         try:
             return json.loads(body.decode("utf-8"))
         except JSONDecodeError as exc:
             raise ValueError("Malformed JSON payload") from exc
 
-    def _stream_latest_trace(self) -> None:
-        self.send_response(200)
-        self.send_header("Content-Type", "text/event-stream")
-        self.send_header("Cache-Control", "no-store")
-        self.send_header("Connection", "keep-alive")
-        self.send_header("Access-Control-Allow-Origin", "*")
-        self.end_headers()
+    def _content_length(self, max_bytes: int) -> int:
+        raw_length = self.headers.get("Content-Length", "0")
+        try:
+            length = int(raw_length)
+        except ValueError as exc:
+            raise ValueError("Invalid Content-Length") from exc
+        if length < 0:
+            raise ValueError("Invalid Content-Length")
+        if length > max_bytes:
+            if length <= MAX_DISCARD_BYTES:
+                self._discard_request_body(length)
+            raise PayloadTooLargeError
+        return length
+
+    def _read_body(self, length: int) -> bytes:
+        if length == 0:
+            self._unread_body = "Transfer-Encoding" in self.headers
+            return b""
+        body = self.rfile.read(length)
+        self._unread_body = len(body) < length
+        return body
+
+    def _replay_job_ledger(self) -> ReplayJobLedger:
+        """Where replay jobs are recorded: this process, or the owner in pre-fork workers."""
+        if self.owner_socket:
+            from .prefork import OwnerReplayJobs
+
+            return OwnerReplayJobs(self.owner_socket)
+        return self.replay_jobs
 
-        token, queue = self.live_broker.subscribe()
+    def _forward_to_owner(self, method: str) -> None:
+        """Relay this request to the owner process and copy its response back (pre-fork mode)."""
+        from .prefork import UnixHTTPConnection
+
+        body = (
+            self._read_body(self._content_length(MAX_REQUEST_BYTES)) if method == "POST" else None
+        )
+        headers = {
+            name: value
+            for name, value in self.headers.items()
+            if name.lower() not in HOP_BY_HOP_HEADERS
+        }
+        conn = UnixHTTPConnection(str(self.owner_socket))
         try:
+            with phase("forward"):
+                conn.request(method, self.path, body=body, headers=headers)
+                resp = conn.getresponse()
+            self.send_response(resp.status)
+            for name, value in resp.getheaders():
+                if name.lower() not in HOP_BY_HOP_HEADERS:
+                    self.send_header(name, value)
+            if resp.getheader("Content-Length") is not None or resp.status in {204, 304}:
+                payload = resp.read()
+                if resp.getheader("Content-Length") is not None:
+                    self.send_header("Content-Length", str(len(payload)))
+                self._end_headers_for_reuse()
+                self.wfile.write(payload)
+                return
+            # Event streams and other unframed bodies are relayed as they arrive, until either side
+            # closes.
+            self.close_connection = True
+            self.send_header("Connection", "close")
+            self.end_headers()
             try:
-                latest = self.store.get_summary()
-                self._write_sse("trace", {"trace": latest.to_dict()})
-            except FileNotFoundError:
-                self._write_sse("heartbeat", {"status": "empty"})
-            while True:
-                try:
-                    event = queue.get(timeout=10.0)
-                    self._write_sse(event.get("type", "trace"), event)
-                except Empty:
-                    self._write_sse("heartbeat", {"ts": int(time.time())})
-        except (BrokenPipeError, ConnectionResetError):
-            return
+                while chunk := resp.read1():
+                    self.wfile.write(chunk)
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                return
         finally:
-            self.live_broker.unsubscribe(token)
+            conn.close()
 
-    def _stream_gameplay_session(self, session_id: str) -> None:
+    def _stream(self, target: StreamTarget) -> None:
         self.send_response(200)
-        self.send_header("Content-Type", "text/event-stream")
-        self.send_header("Cache-Control", "no-store")
-        self.send_header("Connection", "keep-alive")
-        self.send_header("Access-Control-Allow-Origin", "*")
+        for header, value in STREAM_HEADERS.items():
+            self.send_header(header, value)
+        # The event stream has no length; it ends when the connection does.
+        self.close_connection = True
+        self.send_header("Connection", "close")
         self.end_headers()
 
-        subscription = self.gameplay_store.subscribe(session_id)
+        last_event_id = parse_last_event_id(self.headers.get("Last-Event-ID"))
+        if target.kind == "gameplay":
+            stream = open_gameplay_stream(target.key, last_event_id, self.gameplay_store)
+        else:
+            stream = open_trace_stream(target, last_event_id, self.store, self.live_broker)
         try:
-            session = self.gameplay_store.get_session(session_id)
-            if session:
-                self._write_sse("gameplay", {"session": session, "event": {"type": "session.snapshot"}})
-            else:
-                self._write_sse("heartbeat", {"status": "missing"})
+            for frame in stream.initial:
+                self._write_frame(frame)
             while True:
                 try:
-                    event = subscription.queue.get(timeout=10.0)
-                    self._write_sse(event.get("type", "gameplay"), event)
+                    self._write_frame(stream.queue.get(timeout=HEARTBEAT_INTERVAL_S))
                 except Empty:
                     self._write_sse("heartbeat", {"ts": int(time.time())})
         except (BrokenPipeError, ConnectionResetError):
             return
         finally:
-            self.gameplay_store.unsubscribe(session_id, subscription.token)
+            stream.close()
+
+    def _write_sse(
+        self, event_name: str, payload: Dict[str, Any], event_id: int | None = None
+    ) -> None:
+        self._write_frame(encode_sse_event(event_name, payload, event_id))
 
-    def _write_sse(self, event_name: str, payload: Dict[str, Any]) -> None:
-        body = f"event: {event_name}\ndata: {json.dumps(payload)}\n\n".encode("utf-8")
-        self.wfile.write(body)
+    def _write_frame(self, frame: bytes) -> None:
+        self.wfile.write(frame)
         self.wfile.flush()
 
     def _discard_request_body(self, length: int) -> None:
@@ -575,38 +1117,306 @@ class ApiHandler(BaseHTTPRequestHandler):
             if not chunk:
                 break
             remaining -= len(chunk)
+        self._unread_body = remaining > 0
+
+    def _send_json(
+        self,
+        status: int,
+        payload: Dict[str, Any],
+        extra_headers: Dict[str, str] | None = None,
+        *,
+        etag: str | None = None,
+    ) -> None:
+        with phase("serialize"):
+            body = json.dumps(payload).encode("utf-8")
+        self._send_body(status, body, "application/json", extra_headers, etag=etag)
+
+    def _send_body(
+        self,
+        status: int,
+        body: bytes,
+        content_type: str,
+        extra_headers: Dict[str, str] | None = None,
+        content_encoding: str | None = None,
+        *,
+        etag: str | None = None,
+    ) -> None:
+        """Send body, compressed when worthwhile; content_encoding marks an already-encoded body.
+
+        Successful responses on cacheable routes get a strong ETag (the caller's, or a digest of the
+        body) and a 304 when it matches If-None-Match. Encoded representations get their own tag.
+        """
+        accept_encoding = self.headers.get("Accept-Encoding") if self.headers else None
+        varies = content_encoding is not None or (
+            status != 204 and len(body) >= self.compression_min_bytes
+        )
+        encode_to: str | None = None
+        if content_encoding is not None:
+            # Stored artifacts are passed through as-is unless the client cannot decode them.
+            if not accepts_encoding(accept_encoding, content_encoding):
+                body = decompress(body, content_encoding)
+                content_encoding = None
+        elif varies:
+            encode_to = negotiate_encoding(accept_encoding)
+        headers: Dict[str, str] = {"Cache-Control": "no-store"}
+        if status == 200 and self._route is not None and self._route.cacheable:
+            if etag is None:
+                with phase("etag"):
+                    etag = strong_etag(hashlib.sha256(body).hexdigest())
+            coding = encode_to or content_encoding
+            if coding:
+                etag = f'{etag[:-1]}-{coding}"'
+            headers = {"Cache-Control": REVALIDATE_CACHE_CONTROL, "ETag": etag}
+            if etag_matches(self.headers.get("If-None-Match"), etag):
+                self._send_not_modified(headers, varies)
+                return
+        if encode_to:
+            with phase("compress"):
+                body = compress(body, encode_to, self.gzip_level, self.brotli_quality)
+            content_encoding = encode_to
+        self._send_standard_headers(status, content_type, headers)
+        if varies:
+            self.send_header("Vary", "Accept-Encoding")
+        if content_encoding:
+            self.send_header("Content-Encoding", content_encoding)
+        if extra_headers:
+            for header, value in extra_headers.items():
+                self.send_header(header, value)
+        self._send_server_timing()
+        if status != 204:
+            self.send_header("Content-Length", str(len(body)))
+        self._end_headers_for_reuse()
+        if status != 204:
+            self.wfile.write(body)
 
-    def _send_json(self, status: int, payload: Dict[str, Any], extra_headers: Dict[str, str] | None = None) -> None:
-        body = json.dumps(payload).encode("utf-8")
+    def _send_standard_headers(
+        self, status: int, content_type: str, headers: Dict[str, str]
+    ) -> None:
         self.send_response(status)
-        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Type", content_type)
         self.send_header("X-Content-Type-Options", "nosniff")
         self.send_header("X-Frame-Options", "DENY")
         self.send_header("Referrer-Policy", "no-referrer")
-        self.send_header("Cache-Control", "no-store")
+        for header, value in headers.items():
+            self.send_header(header, value)
         self.send_header("Access-Control-Allow-Origin", "*")
         self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
         self.send_header("Access-Control-Allow-Headers", "Content-Type")
-        if extra_headers:
-            for header, value in extra_headers.items():
-                self.send_header(header, value)
-        self.send_header("Content-Length", str(len(body)))
+
+    def _send_json_stream(
+        self,
+        status: int,
+        payload: Dict[str, Any],
+        *,
+        cache_control: str | None = None,
+        etag: str | None = None,
+    ) -> None:
+        """Write payload (which may hold LazyArrays) incrementally with chunked transfer encoding.
+
+        Nothing is buffered beyond one chunk, so there is no Content-Length and no body-derived
+        ETag; callers may pass one from _stream_etag.
+        HTTP/1.0 clients get a close-delimited body instead of chunks.
+        """
+        encoding = negotiate_encoding(self.headers.get("Accept-Encoding"))
+        self._chunked = self.request_version != "HTTP/1.0"
+        headers = {"Cache-Control": cache_control or "no-store"}
+        if etag is not None:
+            headers["ETag"] = etag
+        self._send_standard_headers(status, "application/json", headers)
+        self.send_header("Vary", "Accept-Encoding")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self._send_server_timing()
+        if self._chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        else:
+            self.close_connection = True
+        self._end_headers_for_reuse()
+        compressor = (
+            StreamCompressor(encoding, self.gzip_level, self.brotli_quality) if encoding else None
+        )
+        try:
+            for chunk in iter_json_chunks(payload):
+                self._write_body_chunk(compressor.compress(chunk) if compressor else chunk)
+            if compressor:
+                self._write_body_chunk(compressor.finish())
+        except (ConnectionError, OSError):
+            self.close_connection = True
+            return
+        except Exception:  # pragma: no cover - defensive
+            # Headers are already out, so a 500 is impossible; a truncated body without the final
+            # chunk tells the client the response failed.
+            self.close_connection = True
+            return
+        self._finish_body_chunks()
+
+    def _stream_etag(self, etag: str) -> str:
+        """etag as sent by _send_json_stream, which tags each content coding separately."""
+        coding = negotiate_encoding(self.headers.get("Accept-Encoding"))
+        return f'{etag[:-1]}-{coding}"' if coding else etag
+
+    def _write_body_chunk(self, data: bytes) -> None:
+        if not data:
+            return  # An empty chunk would terminate the body early.
+        if self._chunked:
+            self.wfile.write(b"%X\r\n%s\r\n" % (len(data), data))
+        else:
+            self.wfile.write(data)
+
+    def _finish_body_chunks(self) -> None:
+        if self._chunked:
+            self.wfile.write(b"0\r\n\r\n")
+
+    def _send_not_modified(self, cache_headers: Dict[str, str], varies: bool) -> None:
+        self.send_response(304)
+        for header, value in cache_headers.items():
+            self.send_header(header, value)
+        self.send_header("Access-Control-Allow-Origin", "*")
+        if varies:
+            self.send_header("Vary", "Accept-Encoding")
+        self._send_server_timing()
+        self._end_headers_for_reuse()
+
+    def _send_server_timing(self) -> None:
+        timer = current_timer()
+        if timer is not None:
+            self.send_header("Server-Timing", timer.server_timing())
+            self.send_header("Timing-Allow-Origin", "*")
+
+    def _end_headers_for_reuse(self) -> None:
+        """Finish a length-delimited response, deciding whether the connection stays open."""
+        self._requests_served += 1
+        if self._unread_body or self._requests_served >= self.max_requests_per_connection:
+            self.close_connection = True
+        if self.close_connection:
+            self.send_header("Connection", "close")
         self.end_headers()
-        if status != 204:
-            self.wfile.write(body)
 
 
-def main() -> None:
-    store = TraceStore(data_dir(), demo_dir())
-    ApiHandler.store = store
+def _audit_event(
+    trace_id: str, step_id: str, audit: Dict[str, Any], role: str, safe_export: bool
+) -> Dict[str, object]:
+    """Redaction audit row for TraceStore.log_redaction_events from a tool's audit payload."""
+    return {
+        "traceId": trace_id,
+        "stepId": step_id,
+        "role": str(audit.get("role", role)),
+        "action": str(audit.get("action", "view_step")),
+        "status": str(audit.get("status", "allowed")),
+        "requestedPaths": [str(path) for path in audit.get("requestedPaths", [])],
+        "revealedPaths": [str(path) for path in audit.get("revealedPaths", [])],
+        "deniedPaths": [str(path) for path in audit.get("deniedPaths", [])],
+        "safeExport": bool(audit.get("safeExport", safe_export)),
+    }
+
+
+def _projection_query(query: Dict[str, list[str]], paged: bool) -> Dict[str, Any]:
+    """show_trace/list_traces projection arguments from `fields=a,b`, `summary_only=1` and, when
+    paged, `step_offset`/`step_limit` query parameters; empty when none are given."""
+    arguments: Dict[str, Any] = {}
+    if "fields" in query:
+        arguments["fields"] = [
+            field.strip()
+            for value in query["fields"]
+            for field in value.split(",")
+            if field.strip()
+        ]
+    if "summary_only" in query:
+        arguments["summary_only"] = query["summary_only"][0] == "1"
+    for name in ("step_offset", "step_limit") if paged else ():
+        if name in query:
+            try:
+                arguments[name] = int(query[name][0])
+            except ValueError as exc:
+                raise ValueError(f"{name} must be int") from exc
+    return arguments
+
+
+def _step_from_body(
+    trace_id: str, body: Dict[str, Any], step_id: str | None = None
+) -> tuple[StepSummary, Any]:
+    """(StepSummary, details data or None) from an append/update body.
+
+    The body is `{"step": {...}, "data"?: {...}}`.
+    """
+    record = body.get("step")
+    if not isinstance(record, dict):
+        raise ValueError("step must be an object")
+    if step_id is not None:
+        record = {**record, "id": step_id}
+    validate_input("get_step_details", {"trace_id": trace_id, "step_id": record.get("id")})
+    data = body.get("data")
+    if data is not None and not isinstance(data, dict):
+        raise ValueError("data must be an object")
+    try:
+        return StepSummary.from_dict(record), data
+    except (AttributeError, KeyError, TypeError, ValueError) as exc:
+        raise ValueError(f"Invalid step: {exc}") from exc
+
+
+def configure_api_handler() -> None:
+    """Wire stores and env-driven limits into ApiHandler; shared by the stdlib and ASGI servers."""
+    ApiHandler.store = TraceStore(data_dir(), demo_dir())
+    ApiHandler.compression_min_bytes = compression_min_bytes()
+    ApiHandler.gzip_level = gzip_level()
+    ApiHandler.brotli_quality = brotli_quality()
+    ApiHandler.timeout = keep_alive_timeout_s()
+    ApiHandler.max_requests_per_connection = max_keep_alive_requests()
+    ApiHandler.slow_request_ms = slow_request_ms()
+    ApiHandler.stream_json_min_steps = stream_json_min_steps()
+    ApiHandler.max_ingest_bytes = max_ingest_bytes()
+    ApiHandler.max_ingest_line_bytes = max_ingest_line_bytes()
+    ApiHandler.profiling_token = profiling_token()
+    ApiHandler.admission = AdmissionControl(
+        heavy_workers(), heavy_queue_depth(), heavy_queue_timeout_s()
+    )
+    ApiHandler.heavy_deadline_s = heavy_deadline_s()
+    configure_output_validation(output_validation(), output_validation_sample_every())
     ApiHandler.replay_jobs = ReplayJobStore()
-    ApiHandler.live_broker = LiveTraceBroker()
+    ApiHandler.live_broker = LiveTraceBroker(
+        replay_depth=sse_replay_depth(), replay_bytes=sse_replay_bytes()
+    )
     ApiHandler.extension_registry = ExtensionRegistry()
-    ApiHandler.gameplay_store = GameplayStore(data_dir())
+    ApiHandler.gameplay_store = GameplayStore(
+        data_dir(), replay_depth=sse_replay_depth(), replay_bytes=sse_replay_bytes()
+    )
+
+
+def serve_stdlib() -> None:
     server = ThreadingHTTPServer((DEFAULT_HOST, DEFAULT_PORT), ApiHandler)
     print(f"Agent Director server running on http://{DEFAULT_HOST}:{DEFAULT_PORT}")
+    if stream_port() is not None:
+        streams = start_stream_server_thread(
+            ApiHandler.store,
+            ApiHandler.live_broker,
+            ApiHandler.gameplay_store,
+            DEFAULT_HOST,
+            stream_port() or 0,
+        )
+        print(f"Agent Director stream server running on http://{DEFAULT_HOST}:{streams.port}")
     server.serve_forever()
 
 
+def main() -> None:
+    if server_mode() == "asgi" and server_workers() > 1:
+        # The ASGI server runs in one process; only the stdlib server forks workers.
+        raise SystemExit(
+            "AGENT_DIRECTOR_WORKERS > 1 is only supported with AGENT_DIRECTOR_SERVER=stdlib"
+        )
+    if server_workers() > 1:
+        from .prefork import serve_prefork
+
+        serve_prefork(server_workers(), DEFAULT_HOST, DEFAULT_PORT)
+        return
+    configure_api_handler()
+    if server_mode() == "asgi":
+        from .asgi import serve_asgi
+
+        if serve_asgi():
+            return
+        print("uvicorn is not installed; falling back to the threaded stdlib server")
+    serve_stdlib()
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+from ..trace.schema import TraceSummary
+from .schema import TRACE_FIELDS
+
+
+def is_projected(
+    fields: Optional[List[str]],
+    step_offset: Optional[int] = None,
+    step_limit: Optional[int] = None,
+    summary_only: bool = False,
+) -> bool:
+    return fields is not None or step_offset is not None or step_limit is not None or summary_only
+
+
+def resolve_fields(fields: Optional[List[str]], summary_only: bool) -> List[str]:
+    """Trace keys a projected result keeps, in TraceSummary.to_dict order; `id` is always kept."""
+    wanted = set(TRACE_FIELDS if fields is None else fields) | {"id"}
+    if summary_only:
+        wanted.discard("steps")
+    return [field for field in TRACE_FIELDS if field in wanted]
+
+
+def project_trace(trace: TraceSummary, fields: List[str], step_count: int) -> Dict[str, Any]:
+    """Selected keys of `trace.to_dict()` plus `stepCount`, the trace's total number of steps.
+
+    `trace.steps` holds only the window that was read, so the count tells a pager where to stop.
+    """
+    projected = {key: value for key, value in trace.to_dict().items() if key in fields}
+    projected["stepCount"] = step_count
+    return projected
+
+
+def projection_info(
+    fields: List[str], step_offset: Optional[int], step_limit: Optional[int], summary_only: bool
+) -> Dict[str, Any]:
+    info: Dict[str, Any] = {"fields": fields, "summaryOnly": summary_only}
+    if "steps" in fields:
+        info["stepOffset"] = step_offset or 0
+        if step_limit is not None:
+            info["stepLimit"] = step_limit
+    return info
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import json
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from ..metrics import CACHE_REQUESTS
+
+CacheKey = Tuple[str, str, int]
+
+
+def canonical_arguments(arguments: Dict[str, Any]) -> str:
+    return json.dumps(
+        arguments, sort_keys=True, separators=(",", ":"), ensure_ascii=True, default=str
+    )
+
+
+class ToolResultCache:
+    """Size-bounded LRU of tool results keyed by tool, canonical arguments and store generation.
+
+    Values are the structured content the tool returned, shared between callers, so they must be
+    treated as read-only. Each entry is weighed by its JSON encoding; results larger than the
+    whole budget are not kept. A new store generation makes every older entry unreachable, so they
+    are dropped as soon as one is seen.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max(0, max_bytes)
+        self.size_bytes = 0
+        self._entries: OrderedDict[CacheKey, Tuple[Dict[str, Any], int]] = OrderedDict()
+        self._generation: Optional[int] = None
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_compute(
+        self,
+        tool: str,
+        arguments: Dict[str, Any],
+        generation: int,
+        compute: Callable[[], Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        if not self.max_bytes:
+            return compute()
+        key = (tool, canonical_arguments(arguments), generation)
+        with self._lock:
+            if generation != self._generation:
+                self._entries.clear()
+                self.size_bytes = 0
+                self._generation = generation
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is not None:
+            CACHE_REQUESTS.inc(("mcp_tool", "hit"))
+            return entry[0]
+        CACHE_REQUESTS.inc(("mcp_tool", "miss"))
+        # Computed outside the lock; concurrent misses for one key both compute and the last wins.
+        value = compute()
+        size = len(json.dumps(value, separators=(",", ":"), default=str))
+        if size > self.max_bytes:
+            return value
+        with self._lock:
+            if generation != self._generation:
+                return value
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size_bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self.size_bytes += size
+            while self.size_bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size_bytes -= evicted
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 import re
-from typing import Any, Dict, List, Optional
+from itertools import count
+from typing import Any, Callable, Dict, Iterator, List, Tuple
 
 from ..trace.schema import StepDetails, TraceSummary
 
@@ -9,6 +10,27 @@ VALID_REDACTION_MODES = {"redacted", "raw"}
 VALID_REPLAY_STRATEGIES = {"recorded", "live", "hybrid"}
 VALID_REDACTION_ROLES = {"viewer", "analyst", "admin"}
 VALID_IDENTIFIER_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._:-]{0,127}$")
+MAX_BATCH_STEP_IDS = 200
+OUTPUT_VALIDATION_MODES = ("full", "structural", "sampled", "off")
+# Top-level keys of TraceSummary.to_dict that `fields` can select; show_trace also accepts
+# "insights".
+TRACE_FIELDS = (
+    "id",
+    "name",
+    "startedAt",
+    "endedAt",
+    "status",
+    "metadata",
+    "steps",
+    "parentTraceId",
+    "branchPointStepId",
+    "replay",
+)
+
+# Library callers and tests get full validation; servers switch to their configured mode at startup.
+_output_mode = "full"
+_sample_every = 100
+_sample_counters: Dict[str, Iterator[int]] = {}
 
 
 def _ensure(condition: bool, message: str, errors: List[str]) -> None:
@@ -32,14 +54,60 @@ def _ensure_safe_identifier(value: Any, field: str, errors: List[str]) -> None:
     _ensure(bool(VALID_IDENTIFIER_RE.fullmatch(value)), f"{field} has invalid characters", errors)
 
 
+def _ensure_non_negative_int(value: Any, field: str, errors: List[str], minimum: int = 0) -> None:
+    valid = isinstance(value, int) and not isinstance(value, bool)
+    _ensure(valid, f"{field} must be int", errors)
+    if valid:
+        _ensure(value >= minimum, f"{field} must be at least {minimum}", errors)
+
+
+def _ensure_projection(
+    payload: Dict[str, Any], allowed_fields: Tuple[str, ...], errors: List[str]
+) -> None:
+    fields = payload.get("fields")
+    if fields is not None:
+        _ensure(
+            isinstance(fields, list) and bool(fields), "fields must be a non-empty list", errors
+        )
+        if isinstance(fields, list):
+            for field in fields:
+                _ensure(field in allowed_fields, f"fields item invalid: {field!r}", errors)
+    _ensure(
+        isinstance(payload.get("summary_only", False), bool), "summary_only must be bool", errors
+    )
+
+
 def validate_input(tool: str, payload: Dict[str, Any]) -> None:
     errors: List[str] = []
     if tool == "show_trace":
         if "trace_id" in payload:
             _ensure_safe_identifier(payload["trace_id"], "trace_id", errors)
-    elif tool == "get_step_details":
+        _ensure_projection(payload, TRACE_FIELDS + ("insights",), errors)
+        if payload.get("step_offset") is not None:
+            _ensure_non_negative_int(payload["step_offset"], "step_offset", errors)
+        if payload.get("step_limit") is not None:
+            _ensure_non_negative_int(payload["step_limit"], "step_limit", errors, minimum=1)
+    elif tool == "list_traces":
+        _ensure_projection(payload, TRACE_FIELDS, errors)
+    elif tool in {"get_step_details", "get_step_details_batch"}:
         _ensure_safe_identifier(payload.get("trace_id"), "trace_id", errors)
-        _ensure_safe_identifier(payload.get("step_id"), "step_id", errors)
+        if tool == "get_step_details":
+            _ensure_safe_identifier(payload.get("step_id"), "step_id", errors)
+        else:
+            step_ids = payload.get("step_ids")
+            _ensure(
+                isinstance(step_ids, list) and bool(step_ids),
+                "step_ids must be a non-empty list",
+                errors,
+            )
+            if isinstance(step_ids, list):
+                _ensure(
+                    len(step_ids) <= MAX_BATCH_STEP_IDS,
+                    f"step_ids must have at most {MAX_BATCH_STEP_IDS} items",
+                    errors,
+                )
+                for step_id in step_ids[:MAX_BATCH_STEP_IDS]:
+                    _ensure_safe_identifier(step_id, "step_ids item", errors)
         redaction = payload.get("redaction_mode", "redacted")
         _ensure(redaction in VALID_REDACTION_MODES, "redaction_mode invalid", errors)
         reveal_paths = payload.get("reveal_paths", [])
@@ -67,7 +135,148 @@ def validate_input(tool: str, payload: Dict[str, Any]) -> None:
         raise ValueError(f"Invalid {tool} input: {', '.join(errors)}")
 
 
+def configure_output_validation(mode: str, sample_every: int = 100) -> None:
+    """Select how validate_output checks tool results for this process.
+
+    `full` rebuilds the trace dataclasses from the payload, `structural` checks only the keys and
+    container types those dataclasses rely on, `sampled` runs the full check on one call in
+    `sample_every` per tool and nothing on the rest, and `off` skips output validation.
+    """
+    global _output_mode, _sample_every
+    if mode not in OUTPUT_VALIDATION_MODES:
+        raise ValueError(f"Unknown output validation mode: {mode}")
+    _output_mode = mode
+    _sample_every = max(1, sample_every)
+    _sample_counters.clear()
+
+
+def output_validation_mode() -> str:
+    return _output_mode
+
+
+class _Shape:
+    """Keys one JSON object must have and the container types its other keys need when set.
+
+    Only what the dataclass `from_dict` constructors rely on is checked: they read `id` without a
+    default and iterate nested lists and objects, but copy scalar fields through unchecked, so a
+    stored step named `5` passes full validation and must pass this check too.
+    """
+
+    __slots__ = ("name", "_required", "_containers")
+
+    def __init__(
+        self, name: str, required: Tuple[str, ...], containers: Dict[str, type]
+    ) -> None:
+        self.name = name
+        self._required = frozenset(required)
+        self._containers: Tuple[Tuple[str, type], ...] = tuple(containers.items())
+
+    def check(self, value: Any, errors: List[str]) -> bool:
+        if not isinstance(value, dict):
+            errors.append(f"{self.name} must be object")
+            return False
+        if not value.keys() >= self._required:
+            missing = ", ".join(sorted(self._required - value.keys()))
+            errors.append(f"{self.name} missing {missing}")
+            return False
+        valid = True
+        for key, container in self._containers:
+            item = value.get(key)
+            if item and not isinstance(item, container):
+                errors.append(f"{self.name} {key} has invalid type")
+                valid = False
+        return valid
+
+
+_TRACE_SHAPE = _Shape("trace", ("id",), {"metadata": dict, "steps": list})
+_STEP_SHAPE = _Shape("trace step", ("id",), {"metrics": dict, "preview": dict, "io": dict})
+_STEP_DETAILS_SHAPE = _Shape(
+    "step", ("id",), {"metrics": dict, "preview": dict, "io": dict, "redaction": dict}
+)
+
+
+def _check_trace(trace: Any, errors: List[str]) -> None:
+    if _TRACE_SHAPE.check(trace, errors):
+        check_step = _STEP_SHAPE.check
+        for step in trace.get("steps") or ():
+            check_step(step, errors)
+
+
+def _check_list_traces(payload: Dict[str, Any], errors: List[str]) -> None:
+    traces = payload.get("traces")
+    _ensure(isinstance(traces, list), "traces must be list", errors)
+    if isinstance(traces, list):
+        for trace in traces:
+            _check_trace(trace, errors)
+
+
+def _check_show_trace(payload: Dict[str, Any], errors: List[str]) -> None:
+    _check_trace(payload.get("trace"), errors)
+    if "projection" not in payload or "insights" in payload:
+        _ensure(isinstance(payload.get("insights"), dict), "insights must be object", errors)
+
+
+def _check_step_details(payload: Dict[str, Any], errors: List[str]) -> None:
+    _STEP_DETAILS_SHAPE.check(payload.get("step"), errors)
+
+
+def _check_step_details_batch(payload: Dict[str, Any], errors: List[str]) -> None:
+    steps = payload.get("steps")
+    _ensure(isinstance(steps, dict), "steps must be object", errors)
+    _ensure(isinstance(payload.get("errors"), dict), "errors must be object", errors)
+    if isinstance(steps, dict):
+        for step in steps.values():
+            _STEP_DETAILS_SHAPE.check(step, errors)
+
+
+def _check_replay(payload: Dict[str, Any], errors: List[str]) -> None:
+    _check_trace(payload.get("trace"), errors)
+
+
+def _check_diff(payload: Dict[str, Any], errors: List[str]) -> None:
+    diff = payload.get("diff")
+    _ensure(isinstance(diff, dict), "diff must be object", errors)
+    if isinstance(diff, dict):
+        for field in [
+            "addedSteps",
+            "removedSteps",
+            "changedSteps",
+            "costDeltaUsd",
+            "wallTimeDeltaMs",
+        ]:
+            _ensure(field in diff, f"diff missing {field}", errors)
+
+
+_STRUCTURAL_CHECKS: Dict[str, Callable[[Dict[str, Any], List[str]], None]] = {
+    "list_traces": _check_list_traces,
+    "show_trace": _check_show_trace,
+    "get_step_details": _check_step_details,
+    "get_step_details_batch": _check_step_details_batch,
+    "replay_from_step": _check_replay,
+    "compare_traces": _check_diff,
+}
+
+
 def validate_output(tool: str, payload: Dict[str, Any]) -> None:
+    mode = _output_mode
+    if mode == "off":
+        return
+    if mode == "sampled":
+        counter = _sample_counters.setdefault(tool, count())
+        if next(counter) % _sample_every:
+            return
+    elif mode == "structural":
+        errors: List[str] = []
+        check = _STRUCTURAL_CHECKS.get(tool)
+        if check is not None:
+            check(payload, errors)
+        if errors:
+            raise ValueError(f"Invalid {tool} output: {', '.join(errors)}")
+        return
+    _validate_output_full(tool, payload)
+
+
+def _validate_output_full(tool: str, payload: Dict[str, Any]) -> None:
     errors: List[str] = []
     if tool in {"list_traces"}:
         traces = payload.get("traces")
@@ -86,8 +295,9 @@ def validate_output(tool: str, payload: Dict[str, Any]) -> None:
                 TraceSummary.from_dict(trace)
             except Exception as exc:
                 errors.append(f"trace invalid: {exc}")
-        insights = payload.get("insights")
-        _ensure(isinstance(insights, dict), "insights must be object", errors)
+        if "projection" not in payload or "insights" in payload:
+            insights = payload.get("insights")
+            _ensure(isinstance(insights, dict), "insights must be object", errors)
     elif tool in {"get_step_details"}:
         step = payload.get("step")
         _ensure(isinstance(step, dict), "step must be object", errors)
@@ -96,6 +306,16 @@ def validate_output(tool: str, payload: Dict[str, Any]) -> None:
                 StepDetails.from_dict(step)
             except Exception as exc:
                 errors.append(f"step invalid: {exc}")
+    elif tool in {"get_step_details_batch"}:
+        steps = payload.get("steps")
+        _ensure(isinstance(steps, dict), "steps must be object", errors)
+        _ensure(isinstance(payload.get("errors"), dict), "errors must be object", errors)
+        if isinstance(steps, dict):
+            for step_id, step in steps.items():
+                try:
+                    StepDetails.from_dict(step)
+                except Exception as exc:
+                    errors.append(f"step {step_id} invalid: {exc}")
     elif tool in {"replay_from_step"}:
         trace = payload.get("trace")
         _ensure(isinstance(trace, dict), "trace must be object", errors)
@@ -105,11 +325,6 @@ def validate_output(tool: str, payload: Dict[str, Any]) -> None:
             except Exception as exc:
                 errors.append(f"trace invalid: {exc}")
     elif tool in {"compare_traces"}:
-        diff = payload.get("diff")
-        _ensure(isinstance(diff, dict), "diff must be object", errors)
-        if isinstance(diff, dict):
-            # Validate the structure by doing a dry call to compare_traces signature
-            for field in ["addedSteps", "removedSteps", "changedSteps", "costDeltaUsd", "wallTimeDeltaMs"]:
-                _ensure(field in diff, f"diff missing {field}", errors)
+        _check_diff(payload, errors)
     if errors:
         raise ValueError(f"Invalid {tool} output: {', '.join(errors)}")
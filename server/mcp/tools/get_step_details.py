@@ -1,8 +1,10 @@
 from __future__ import annotations
 
-from typing import Any, Dict
+from typing import Any, Dict, Tuple
 
+from ...timing import phase
 from ...trace.redaction import apply_reveal_paths_with_policy, redact_step
+from ...trace.schema import StepDetails
 from ...trace.store import TraceStore
 from ..schema import validate_input, validate_output
 
@@ -28,6 +30,25 @@ def execute(
         },
     )
     step = store.get_step_details(trace_id, step_id)
+    with phase("redact"):
+        step_out, audit = render_step(step, redaction_mode, reveal_paths, role, safe_export)
+    payload = {
+        "content": [{"type": "text", "text": f"Loaded step details: {step_id}"}],
+        "structuredContent": {"step": step_out.to_dict(), "audit": audit},
+    }
+    with phase("validate"):
+        validate_output("get_step_details", payload["structuredContent"])
+    return payload
+
+
+def render_step(
+    step: StepDetails,
+    redaction_mode: str = "redacted",
+    reveal_paths: list[str] | None = None,
+    role: str = "viewer",
+    safe_export: bool = False,
+) -> Tuple[StepDetails, Dict[str, Any]]:
+    """Apply the redaction mode and reveal policy to loaded details; returns (step, audit event)."""
     audit: Dict[str, Any] = {
         "role": role,
         "action": "view_step",
@@ -62,9 +83,4 @@ def execute(
             "deniedPaths": [],
             "safeExport": safe_export,
         }
-    payload = {
-        "content": [{"type": "text", "text": f"Loaded step details: {step_id}"}],
-        "structuredContent": {"step": step_out.to_dict(), "audit": audit},
-    }
-    validate_output("get_step_details", payload["structuredContent"])
-    return payload
+    return step_out, audit
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+from ...timing import phase
+from ...trace.store import TraceStore
+from ..schema import validate_input, validate_output
+from .get_step_details import render_step
+
+
+def execute(
+    store: TraceStore,
+    trace_id: str,
+    step_ids: List[str],
+    redaction_mode: str = "redacted",
+    reveal_paths: list[str] | None = None,
+    role: str = "viewer",
+    safe_export: bool = False,
+) -> Dict[str, Any]:
+    """get_step_details for many steps of one trace; missing steps land in `errors`, not a raise."""
+    validate_input(
+        "get_step_details_batch",
+        {
+            "trace_id": trace_id,
+            "step_ids": step_ids,
+            "redaction_mode": redaction_mode,
+            "reveal_paths": reveal_paths or [],
+            "role": role,
+            "safe_export": safe_export,
+        },
+    )
+    if redaction_mode == "raw" and (safe_export or role != "admin"):
+        # Checked up front so a policy failure rejects the batch before any file is read.
+        raise ValueError("raw mode requires admin role with safe_export disabled")
+    with phase("read"):
+        details, errors = store.get_step_details_many(trace_id, step_ids)
+    steps: Dict[str, Any] = {}
+    audits: Dict[str, Dict[str, Any]] = {}
+    with phase("redact"):
+        for step_id, step in details.items():
+            step_out, audits[step_id] = render_step(
+                step, redaction_mode, reveal_paths, role, safe_export
+            )
+            steps[step_id] = step_out.to_dict()
+    payload = {
+        "content": [
+            {"type": "text", "text": f"Loaded {len(steps)} step details ({len(errors)} errors)"}
+        ],
+        "structuredContent": {"steps": steps, "audits": audits, "errors": errors},
+    }
+    with phase("validate"):
+        validate_output("get_step_details_batch", payload["structuredContent"])
+    return payload
@@ -1,16 +1,54 @@
 from __future__ import annotations
 
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 
+from ...timing import phase
+from ...trace.schema import TraceSummary
 from ...trace.store import TraceStore
-from ..schema import validate_output
+from ..projection import is_projected, project_trace, projection_info, resolve_fields
+from ..schema import validate_input, validate_output
 
 
-def execute(store: TraceStore) -> Dict[str, Any]:
-    traces = [trace.to_dict() for trace in store.list_traces()]
+def execute(
+    store: TraceStore, fields: Optional[List[str]] = None, summary_only: bool = False
+) -> Dict[str, Any]:
+    if not is_projected(fields, summary_only=summary_only):
+        return build_payload(store.list_traces())
+    validate_input("list_traces", {"fields": fields, "summary_only": summary_only})
+    return build_projected_payload(store, fields, summary_only)
+
+
+def build_payload(summaries: List[TraceSummary]) -> Dict[str, Any]:
+    with phase("to_dict"):
+        traces = [trace.to_dict() for trace in summaries]
     payload = {
         "content": [{"type": "text", "text": f"Found {len(traces)} traces"}],
         "structuredContent": {"traces": traces},
     }
-    validate_output("list_traces", payload["structuredContent"])
+    with phase("validate"):
+        validate_output("list_traces", payload["structuredContent"])
+    return payload
+
+
+def build_projected_payload(
+    store: TraceStore, fields: Optional[List[str]], summary_only: bool
+) -> Dict[str, Any]:
+    """Without `steps` among the fields, headers come from the index and no summary file is read."""
+    trace_fields = resolve_fields(fields, summary_only)
+    if "steps" in trace_fields:
+        entries = [(trace, len(trace.steps)) for trace in store.list_traces()]
+    else:
+        entries = store.list_trace_headers()
+    with phase("to_dict"):
+        traces = [project_trace(trace, trace_fields, step_count) for trace, step_count in entries]
+    structured = {
+        "traces": traces,
+        "projection": projection_info(trace_fields, None, None, summary_only),
+    }
+    payload = {
+        "content": [{"type": "text", "text": f"Found {len(traces)} traces"}],
+        "structuredContent": structured,
+    }
+    with phase("validate"):
+        validate_output("list_traces", structured)
     return payload
@@ -3,6 +3,7 @@ from __future__ import annotations
 from typing import Any, Dict
 
 from ...replay.engine import replay_from_step
+from ...timing import check_deadline, phase
 from ...trace.store import TraceStore
 from ..schema import validate_input, validate_output
 
@@ -19,8 +20,12 @@ def execute(
         {"trace_id": trace_id, "step_id": step_id, "strategy": strategy, "modifications": modifications},
     )
     trace = store.get_summary(trace_id)
-    new_trace = replay_from_step(trace, step_id, strategy, modifications)
-    store.ingest_trace(new_trace)
+    with phase("replay"):
+        new_trace = replay_from_step(trace, step_id, strategy, modifications)
+    # Last point to give up cheaply; past here the replay trace is written in full.
+    check_deadline()
+    with phase("write"):
+        store.ingest_trace(new_trace)
     invalidated = set(
         (new_trace.replay.modifications.get("__system__", {}) if new_trace.replay else {}).get(
             "invalidatedStepIds", []
@@ -42,5 +47,6 @@ def execute(
         ],
         "structuredContent": {"trace": new_trace.to_dict()},
     }
-    validate_output("replay_from_step", payload["structuredContent"])
+    with phase("validate"):
+        validate_output("replay_from_step", payload["structuredContent"])
     return payload
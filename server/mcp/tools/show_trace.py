@@ -1,19 +1,82 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
+from ...timing import phase
 from ...trace.insights import compute_insights
+from ...trace.schema import TraceSummary
 from ...trace.store import TraceStore
+from ..projection import is_projected, project_trace, projection_info, resolve_fields
 from ..schema import validate_input, validate_output
 
 
-def execute(store: TraceStore, trace_id: Optional[str] = None) -> Dict[str, Any]:
-    validate_input("show_trace", {"trace_id": trace_id} if trace_id is not None else {})
-    trace = store.get_summary(trace_id)
-    insights = compute_insights(trace)
+def execute(
+    store: TraceStore,
+    trace_id: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    step_offset: Optional[int] = None,
+    step_limit: Optional[int] = None,
+    summary_only: bool = False,
+) -> Dict[str, Any]:
+    arguments: Dict[str, Any] = {"trace_id": trace_id} if trace_id is not None else {}
+    if not is_projected(fields, step_offset, step_limit, summary_only):
+        validate_input("show_trace", arguments)
+        return build_payload(store.get_summary(trace_id))
+    arguments.update(
+        fields=fields, step_offset=step_offset, step_limit=step_limit, summary_only=summary_only
+    )
+    validate_input("show_trace", arguments)
+    return build_projected_payload(store, trace_id, fields, step_offset, step_limit, summary_only)
+
+
+def build_payload(trace: TraceSummary) -> Dict[str, Any]:
+    with phase("insights"):
+        insights = compute_insights(trace)
+    with phase("to_dict"):
+        trace_dict = trace.to_dict()
+    payload = {
+        "content": [{"type": "text", "text": f"Showing trace: {trace.name}"}],
+        "structuredContent": {"trace": trace_dict, "insights": insights},
+    }
+    with phase("validate"):
+        validate_output("show_trace", payload["structuredContent"])
+    return payload
+
+
+def build_projected_payload(
+    store: TraceStore,
+    trace_id: Optional[str],
+    fields: Optional[List[str]],
+    step_offset: Optional[int],
+    step_limit: Optional[int],
+    summary_only: bool,
+) -> Dict[str, Any]:
+    """Serve the requested fields and step window; only insights need the whole trace loaded."""
+    trace_fields = resolve_fields(fields, summary_only)
+    offset = step_offset or 0
+    insights = None
+    if fields is not None and "insights" in fields:
+        trace = store.get_summary(trace_id)
+        with phase("insights"):
+            insights = compute_insights(trace)
+        step_count = len(trace.steps)
+        end = None if step_limit is None else offset + step_limit
+        trace.steps = trace.steps[offset:end] if "steps" in trace_fields else []
+    else:
+        trace, step_count = store.get_trace_page(
+            trace_id, offset, step_limit, include_steps="steps" in trace_fields
+        )
+    with phase("to_dict"):
+        structured: Dict[str, Any] = {
+            "trace": project_trace(trace, trace_fields, step_count),
+            "projection": projection_info(trace_fields, step_offset, step_limit, summary_only),
+        }
+    if insights is not None:
+        structured["insights"] = insights
     payload = {
         "content": [{"type": "text", "text": f"Showing trace: {trace.name}"}],
-        "structuredContent": {"trace": trace.to_dict(), "insights": insights},
+        "structuredContent": structured,
     }
-    validate_output("show_trace", payload["structuredContent"])
+    with phase("validate"):
+        validate_output("show_trace", structured)
     return payload
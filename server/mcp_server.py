@@ -1,12 +1,22 @@
 from __future__ import annotations
 
 import os
-from typing import Any, Dict, List, Optional
-
-from server.config import data_dir, demo_dir, safe_export_enabled
+from typing import Any, Callable, Dict, List, Optional
+
+from server.config import (
+    data_dir,
+    demo_dir,
+    mcp_result_cache_bytes,
+    output_validation,
+    output_validation_sample_every,
+    safe_export_enabled,
+)
 from server.mcp.resources.ui_resource import build_ui_manifest
+from server.mcp.result_cache import ToolResultCache
+from server.mcp.schema import configure_output_validation
 from server.mcp.tools.compare_traces import execute as compare_execute
 from server.mcp.tools.get_step_details import execute as step_execute
+from server.mcp.tools.get_step_details_batch import execute as step_batch_execute
 from server.mcp.tools.list_traces import execute as list_execute
 from server.mcp.tools.replay_from_step import execute as replay_execute
 from server.mcp.tools.show_trace import execute as show_execute
@@ -20,18 +30,51 @@ except Exception as exc:  # pragma: no cover - runtime dependency
     ) from exc
 
 STORE = TraceStore(data_dir(), demo_dir())
+configure_output_validation(output_validation(), output_validation_sample_every())
+# Read-only tools are served from here until the store generation moves on.
+RESULT_CACHE = ToolResultCache(mcp_result_cache_bytes())
 
 mcp = FastMCP("Agent Director", json_response=True)
 
 
+def _cached(
+    tool: str, arguments: Dict[str, Any], compute: Callable[[], Dict[str, Any]]
+) -> Dict[str, Any]:
+    return RESULT_CACHE.get_or_compute(tool, arguments, STORE.generation(), compute)
+
+
 @mcp.tool()
-def list_traces() -> Dict[str, Any]:
-    return list_execute(STORE)["structuredContent"]
+def list_traces(fields: Optional[List[str]] = None, summary_only: bool = False) -> Dict[str, Any]:
+    return _cached(
+        "list_traces",
+        {"fields": fields, "summary_only": summary_only},
+        lambda: list_execute(STORE, fields, summary_only)["structuredContent"],
+    )
 
 
 @mcp.tool()
-def show_trace(trace_id: Optional[str] = None) -> Dict[str, Any]:
-    return show_execute(STORE, trace_id)["structuredContent"]
+def show_trace(
+    trace_id: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    step_offset: Optional[int] = None,
+    step_limit: Optional[int] = None,
+    summary_only: bool = False,
+) -> Dict[str, Any]:
+    """Show a trace; `fields`, `summary_only` and `step_offset`/`step_limit` page a large one."""
+    arguments = {
+        "trace_id": trace_id,
+        "fields": fields,
+        "step_offset": step_offset,
+        "step_limit": step_limit,
+        "summary_only": summary_only,
+    }
+    return _cached(
+        "show_trace",
+        arguments,
+        lambda: show_execute(STORE, trace_id, fields, step_offset, step_limit, summary_only)[
+            "structuredContent"
+        ],
+    )
 
 
 @mcp.tool()
@@ -48,6 +91,22 @@ def get_step_details(
     return step_execute(STORE, trace_id, step_id, redaction_mode, reveal_paths or [])["structuredContent"]
 
 
+@mcp.tool()
+def get_step_details_batch(
+    trace_id: str,
+    step_ids: List[str],
+    redaction_mode: str = "redacted",
+    reveal_paths: Optional[List[str]] = None,
+    safe_export: bool = False,
+) -> Dict[str, Any]:
+    if safe_export or safe_export_enabled():
+        redaction_mode = "redacted"
+        reveal_paths = []
+    return step_batch_execute(STORE, trace_id, step_ids, redaction_mode, reveal_paths or [])[
+        "structuredContent"
+    ]
+
+
 @mcp.tool()
 def replay_from_step(
     trace_id: str,
@@ -60,7 +119,11 @@ def replay_from_step(
 
 @mcp.tool()
 def compare_traces(left_trace_id: str, right_trace_id: str) -> Dict[str, Any]:
-    return compare_execute(STORE, left_trace_id, right_trace_id)["structuredContent"]
+    return _cached(
+        "compare_traces",
+        {"left_trace_id": left_trace_id, "right_trace_id": right_trace_id},
+        lambda: compare_execute(STORE, left_trace_id, right_trace_id)["structuredContent"],
+    )
 
 
 @mcp.tool()
@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS_S = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[object, ...]
+# (metric name, help text, [(labels, value), ...]) for gauges computed at scrape time.
+GaugeSnapshot = Tuple[str, str, List[Tuple[Dict[str, object], float]]]
+
+
+def _escape(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Iterable[object]) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._lock = Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:  # pragma: no cover - overridden
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic counter; label values are stored as given and only stringified at scrape time."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, labels: LabelValues = (), amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, labels: LabelValues = ()) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: LabelValues = (), amount: float = 1.0) -> None:
+        self.inc(labels, -amount)
+
+    def set(self, labels: LabelValues, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class _HistogramChild:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self, size: int) -> None:
+        self.counts = [0] * size
+        self.total = 0.0
+        self.count = 0
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS_S,
+    ) -> None:
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._children: Dict[LabelValues, _HistogramChild] = {}
+
+    def observe(self, labels: LabelValues, value: float) -> None:
+        # Per-bucket counts are cumulated at render time, so an observation touches one slot.
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            child = self._children.get(labels)
+            if child is None:
+                child = self._children[labels] = _HistogramChild(len(self.buckets) + 1)
+            child.counts[index] += 1
+            child.total += value
+            child.count += 1
+
+    def time(self, labels: LabelValues = ()) -> "_Timer":
+        return _Timer(self, labels)
+
+    def count(self, labels: LabelValues = ()) -> int:
+        child = self._children.get(labels)
+        return child.count if child else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            children = [
+                (key, list(child.counts), child.total, child.count)
+                for key, child in self._children.items()
+            ]
+        lines = self.header()
+        bucket_labels = self.labels + ("le",)
+        for key, counts, total, count in children:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                bucket = _format_labels(bucket_labels, key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{bucket} {cumulative}")
+            lines.append(
+                f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}"
+            )
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_labels", "_started")
+
+    def __init__(self, histogram: Histogram, labels: LabelValues) -> None:
+        self._histogram = histogram
+        self._labels = labels
+        self._started = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self._histogram.observe(self._labels, time.perf_counter() - self._started)
+
+
+class TimedLock:
+    """threading.Lock that records how long each acquisition waited."""
+
+    def __init__(self, histogram: Histogram, labels: LabelValues = ()) -> None:
+        self._lock = Lock()
+        self._histogram = histogram
+        self._labels = labels
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        started = time.perf_counter()
+        acquired = self._lock.acquire(blocking, timeout)
+        if acquired:
+            self._histogram.observe(self._labels, time.perf_counter() - started)
+        return acquired
+
+    def release(self) -> None:
+        self._lock.release()
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    def __enter__(self) -> bool:
+        return self.acquire()
+
+    def __exit__(self, *_exc: object) -> None:
+        self._lock.release()
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help_text, labels))  # type: ignore[return-value]
+
+    def gauge(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help_text, labels))  # type: ignore[return-value]
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS_S,
+    ) -> Histogram:
+        histogram = Histogram(name, help_text, labels, buckets)
+        return self.register(histogram)  # type: ignore[return-value]
+
+    def render(self, snapshot: Optional[List[GaugeSnapshot]] = None) -> str:
+        """Prometheus text exposition; `snapshot` adds point-in-time gauges computed at scrape."""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        for name, help_text, samples in snapshot or []:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in samples:
+                lines.append(
+                    f"{name}{_format_labels(list(labels), labels.values())} {_format_value(value)}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "agent_director_http_request_duration_seconds",
+    "API request latency by route template, method and status; _count is the request count.",
+    ("route", "method", "status"),
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    "agent_director_http_requests_in_flight",
+    "API requests currently being handled (streams excluded).",
+)
+STORE_SUMMARY_LOAD_SECONDS = REGISTRY.histogram(
+    "agent_director_store_summary_load_seconds", "Time to read and parse one trace summary file."
+)
+SQLITE_QUERY_SECONDS = REGISTRY.histogram(
+    "agent_director_sqlite_query_seconds",
+    "TraceStore SQLite connection lifetime per operation.",
+    ("operation",),
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "agent_director_cache_requests_total",
+    "Cache lookups by cache and result (hit/miss).",
+    ("cache", "result"),
+)
+REPLAY_JOB_SECONDS = REGISTRY.histogram(
+    "agent_director_replay_job_duration_seconds",
+    "Wall time to execute all scenarios of a replay job.",
+)
+REPLAY_SCENARIOS = REGISTRY.counter(
+    "agent_director_replay_scenarios_total", "Replay scenarios finished, by outcome.", ("status",)
+)
+GAMEPLAY_LOCK_WAIT_SECONDS = REGISTRY.histogram(
+    "agent_director_gameplay_lock_wait_seconds",
+    "Time spent waiting to acquire the gameplay state lock.",
+    buckets=(0.00001, 0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0),
+)
+ADMISSION_QUEUE_DEPTH = REGISTRY.gauge(
+    "agent_director_admission_queue_depth",
+    "Heavy requests waiting for a concurrency slot, by route template.",
+    ("route",),
+)
+ADMISSION_REJECTED = REGISTRY.counter(
+    "agent_director_admission_rejected_total",
+    "Heavy requests answered 503, by route template and reason "
+    "(queue_full/queue_timeout/deadline).",
+    ("route", "reason"),
+)
@@ -0,0 +1,452 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from http.client import HTTPConnection
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from socketserver import ThreadingUnixStreamServer
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .admission import AdmissionGate
+from .config import data_dir, demo_dir, sse_replay_bytes, sse_replay_depth, stream_port
+from .main import ROUTES, ApiHandler, configure_api_handler
+from .replay.jobs import ReplayJob, ReplayScenario
+from .routing import RequestContext
+from .streaming import start_stream_server_thread
+from .trace.live import LiveTraceBroker
+from .trace.schema import StepSummary, TraceSummary
+from .trace.store import TraceStore
+
+LOG = logging.getLogger("agent_director.prefork")
+# A worker that dies sooner than this after starting is restarted only after the same delay.
+MIN_WORKER_LIFETIME_S = 1.0
+OWNER_REQUEST_TIMEOUT_S = 30.0
+
+
+class UnixHTTPConnection(HTTPConnection):
+    """http.client connection to an HTTP server listening on a Unix domain socket."""
+
+    def __init__(self, path: str, timeout: float = OWNER_REQUEST_TIMEOUT_S) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self._path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self._path)
+
+
+# Every public route plus the internal ones workers use to report replay-job progress.
+OWNER_ROUTES = ROUTES.copy()
+
+
+class OwnerApiHandler(ApiHandler):
+    """ApiHandler for the owner's Unix socket; workers have already rate-limited and admitted it."""
+
+    disable_nagle_algorithm = False
+    routes = OWNER_ROUTES
+
+    def _check_rate_limit(self, rate_class: str = "default") -> tuple[bool, int]:
+        return True, 0
+
+    def _admit(self) -> AdmissionGate | None:
+        return None
+
+    @OWNER_ROUTES.route("POST", "/internal/replay-jobs")
+    def _create_job(self, request: RequestContext) -> None:
+        body = request.body
+        job = self.replay_jobs.create_job(
+            str(body.get("trace_id") or ""),
+            str(body.get("step_id") or ""),
+            body.get("scenarios") or [],
+        )
+        self._send_json(201, {"job": job.to_dict()})
+
+    @OWNER_ROUTES.route("POST", "/internal/replay-jobs/{job_id}/next")
+    def _start_next_scenario(self, request: RequestContext) -> None:
+        scenario = self.replay_jobs.start_next_scenario(request.params["job_id"])
+        self._send_json(200, {"scenario": scenario.to_dict() if scenario else None})
+
+    @OWNER_ROUTES.route("POST", "/internal/replay-jobs/{job_id}/fail")
+    def _fail_job(self, request: RequestContext) -> None:
+        job = self.replay_jobs.fail_job(request.params["job_id"], str(request.body.get("error")))
+        self._send_json(200, {"job": job.to_dict() if job else None})
+
+    @OWNER_ROUTES.route("POST", "/internal/replay-jobs/{job_id}/scenarios/{scenario_id}/complete")
+    def _complete_scenario(self, request: RequestContext) -> None:
+        scenario = self.replay_jobs.complete_scenario(
+            request.params["job_id"],
+            request.params["scenario_id"],
+            str(request.body.get("replay_trace_id")),
+        )
+        self._send_json(200, {"scenario": scenario.to_dict() if scenario else None})
+
+    @OWNER_ROUTES.route("POST", "/internal/replay-jobs/{job_id}/scenarios/{scenario_id}/fail")
+    def _fail_scenario(self, request: RequestContext) -> None:
+        scenario = self.replay_jobs.fail_scenario(
+            request.params["job_id"], request.params["scenario_id"], str(request.body.get("error"))
+        )
+        self._send_json(200, {"scenario": scenario.to_dict() if scenario else None})
+
+
+class OwnerReplayJobs:
+    """A worker's view of the owner's ReplayJobStore: the same calls, made over its socket.
+
+    Workers run the replays themselves, under their own admission gate and deadline, and only
+    record progress here.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+
+    def create_job(
+        self, trace_id: str, step_id: str, scenarios: List[Dict[str, Any]]
+    ) -> ReplayJob:
+        body = {"trace_id": trace_id, "step_id": step_id, "scenarios": scenarios}
+        return ReplayJob.from_dict(self._call("POST", "/internal/replay-jobs", body)["job"])
+
+    def get(self, job_id: str) -> Optional[ReplayJob]:
+        try:
+            return ReplayJob.from_dict(self._call("GET", f"/api/replay-jobs/{job_id}")["job"])
+        except FileNotFoundError:
+            return None
+
+    def start_next_scenario(self, job_id: str) -> Optional[ReplayScenario]:
+        return self._scenario(self._call("POST", f"/internal/replay-jobs/{job_id}/next", {}))
+
+    def complete_scenario(
+        self, job_id: str, scenario_id: str, replay_trace_id: str
+    ) -> Optional[ReplayScenario]:
+        path = f"/internal/replay-jobs/{job_id}/scenarios/{scenario_id}/complete"
+        return self._scenario(self._call("POST", path, {"replay_trace_id": replay_trace_id}))
+
+    def fail_scenario(
+        self, job_id: str, scenario_id: str, error: str
+    ) -> Optional[ReplayScenario]:
+        path = f"/internal/replay-jobs/{job_id}/scenarios/{scenario_id}/fail"
+        return self._scenario(self._call("POST", path, {"error": error}))
+
+    def fail_job(self, job_id: str, error: str) -> Optional[ReplayJob]:
+        job = self._call("POST", f"/internal/replay-jobs/{job_id}/fail", {"error": error})["job"]
+        return ReplayJob.from_dict(job) if job else None
+
+    def cancel_job(self, job_id: str) -> Optional[ReplayJob]:
+        try:
+            job = self._call("POST", f"/api/replay-jobs/{job_id}/cancel", {})["job"]
+        except FileNotFoundError:
+            return None
+        return ReplayJob.from_dict(job)
+
+    @staticmethod
+    def _scenario(payload: Dict[str, Any]) -> Optional[ReplayScenario]:
+        scenario = payload["scenario"]
+        return ReplayScenario.from_dict(scenario) if scenario else None
+
+    def _call(
+        self, method: str, path: str, body: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        conn = UnixHTTPConnection(self._path)
+        try:
+            conn.request(
+                method,
+                path,
+                body=json.dumps(body) if body is not None else None,
+                headers={"Content-Type": "application/json"},
+            )
+            resp = conn.getresponse()
+            payload = json.loads(resp.read() or b"{}")
+        finally:
+            conn.close()
+        # The owner maps errors to statuses as any handler does; map them back for the caller.
+        if resp.status == 404:
+            raise FileNotFoundError(payload.get("error", path))
+        if resp.status == 400:
+            raise ValueError(payload.get("error", path))
+        if resp.status >= 300:
+            raise RuntimeError(f"Owner answered {resp.status} for {method} {path}")
+        return payload
+
+
+class OwnerHTTPServer(ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class PublishHub:
+    """Fans live-trace publishes out between processes over newline-delimited JSON.
+
+    Runs in the owner process; each worker keeps one Unix socket connection to it. A line from
+    one peer is applied locally and forwarded to every other peer.
+    """
+
+    def __init__(self, listener: socket.socket) -> None:
+        self._listener = listener
+        self._peers: List[socket.socket] = []
+        self._lock = threading.Lock()
+        # One writer at a time, so lines forwarded from different peers never interleave.
+        self._send_lock = threading.Lock()
+
+    def start(self, on_message: Callable[[bytes], None]) -> None:
+        threading.Thread(
+            target=self._accept_loop, args=(on_message,), name="agent-director-hub", daemon=True
+        ).start()
+
+    def broadcast(self, line: bytes, sender: Optional[socket.socket] = None) -> None:
+        with self._lock:
+            peers = [peer for peer in self._peers if peer is not sender]
+        with self._send_lock:
+            for peer in peers:
+                try:
+                    peer.sendall(line)
+                except OSError:
+                    self._drop(peer)
+
+    def _accept_loop(self, on_message: Callable[[bytes], None]) -> None:
+        while True:
+            try:
+                peer, _ = self._listener.accept()
+            except OSError:
+                return
+            with self._lock:
+                self._peers.append(peer)
+            threading.Thread(
+                target=self._read_loop,
+                args=(peer, on_message),
+                name="agent-director-hub-peer",
+                daemon=True,
+            ).start()
+
+    def _read_loop(self, peer: socket.socket, on_message: Callable[[bytes], None]) -> None:
+        try:
+            with peer.makefile("rb") as reader:
+                for line in reader:
+                    on_message(line)
+                    self.broadcast(line, peer)
+        except OSError:
+            pass
+        finally:
+            self._drop(peer)
+
+    def _drop(self, peer: socket.socket) -> None:
+        with self._lock:
+            if peer in self._peers:
+                self._peers.remove(peer)
+        peer.close()
+
+
+class HubClient:
+    """A worker's connection to the PublishHub."""
+
+    def __init__(self, path: str) -> None:
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.connect(path)
+        self._lock = threading.Lock()
+
+    def send(self, line: bytes) -> None:
+        with self._lock:
+            try:
+                self._sock.sendall(line)
+            except OSError as exc:
+                LOG.warning("Dropped live publish for sibling workers: %s", exc)
+
+    def listen(self, on_message: Callable[[bytes], None]) -> None:
+        def read() -> None:
+            with self._sock.makefile("rb") as reader:
+                for line in reader:
+                    on_message(line)
+            LOG.warning("Publish hub connection closed; live updates from other workers stop")
+
+        threading.Thread(target=read, name="agent-director-hub-client", daemon=True).start()
+
+
+class RelayedTraceBroker(LiveTraceBroker):
+    """LiveTraceBroker that also sends its publishes to sibling processes and applies theirs.
+
+    Event ids stay per process, so a Last-Event-ID from another worker usually misses the replay
+    ring and the client is resynced with a snapshot, as after any other gap.
+    """
+
+    def __init__(self, store: TraceStore, send: Callable[[bytes], None], **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._store = store
+        self._send = send
+        self._local = threading.local()
+
+    def publish_trace(self, trace: TraceSummary) -> None:
+        super().publish_trace(trace)
+        self._relay({"type": "trace", "trace": trace.to_dict()})
+
+    def publish_step(
+        self,
+        trace_id: str,
+        step: StepSummary,
+        load_trace: Callable[[], TraceSummary],
+        updated: bool = False,
+    ) -> None:
+        # A fallback full publish inside stays local; siblings load the trace themselves if needed.
+        with self._local_only():
+            super().publish_step(trace_id, step, load_trace, updated)
+        self._relay(
+            {"type": "step", "traceId": trace_id, "step": step.to_dict(), "updated": updated}
+        )
+
+    def apply(self, line: bytes) -> None:
+        """Publish a sibling's message to this process's subscribers without relaying it back."""
+        try:
+            message = json.loads(line)
+            with self._local_only():
+                if message["type"] == "trace":
+                    self.publish_trace(TraceSummary.from_dict(message["trace"]))
+                elif message["type"] == "step":
+                    trace_id = message["traceId"]
+                    self.publish_step(
+                        trace_id,
+                        StepSummary.from_dict(message["step"]),
+                        lambda: self._store.get_summary(trace_id),
+                        bool(message.get("updated")),
+                    )
+        except (KeyError, TypeError, ValueError, FileNotFoundError) as exc:
+            LOG.warning("Ignored malformed live publish from a sibling worker: %s", exc)
+
+    @contextmanager
+    def _local_only(self) -> Iterator[None]:
+        outer = getattr(self._local, "active", False)
+        self._local.active = True
+        try:
+            yield
+        finally:
+            self._local.active = outer
+
+    def _relay(self, message: Dict[str, Any]) -> None:
+        if getattr(self._local, "active", False):
+            return
+        self._send(json.dumps(message).encode("utf-8") + b"\n")
+
+
+def _spawn(target: Callable[[], None]) -> int:
+    pid = os.fork()
+    if pid:
+        return pid
+    code = 0
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    try:
+        target()
+    except BaseException:  # pragma: no cover - child process
+        traceback.print_exc()
+        code = 1
+    finally:
+        os._exit(code)
+    return 0  # pragma: no cover - unreachable
+
+
+def _raise_interrupt(signum: int, frame: Any) -> None:
+    raise KeyboardInterrupt
+
+
+def _run_owner(owner_server: OwnerHTTPServer, hub_listener: socket.socket, host: str) -> None:
+    configure_api_handler()
+    hub = PublishHub(hub_listener)
+    broker = RelayedTraceBroker(
+        ApiHandler.store,
+        hub.broadcast,
+        replay_depth=sse_replay_depth(),
+        replay_bytes=sse_replay_bytes(),
+    )
+    ApiHandler.live_broker = broker
+    hub.start(broker.apply)
+    if stream_port() is not None:
+        start_stream_server_thread(
+            ApiHandler.store, broker, ApiHandler.gameplay_store, host, stream_port() or 0
+        )
+    owner_server.serve_forever()
+
+
+def _run_worker(server: ThreadingHTTPServer, owner_path: str, hub_path: str) -> None:
+    configure_api_handler()
+    hub = HubClient(hub_path)
+    broker = RelayedTraceBroker(
+        ApiHandler.store, hub.send, replay_depth=sse_replay_depth(), replay_bytes=sse_replay_bytes()
+    )
+    ApiHandler.live_broker = broker
+    ApiHandler.owner_socket = owner_path
+    hub.listen(broker.apply)
+    server.serve_forever()
+
+
+def serve_prefork(workers: int, host: str, port: int) -> None:
+    """Serve the API from `workers` forked processes accepting on one shared listening socket.
+
+    Trace reads and writes go straight to the shared data directory (SQLite WAL for the index).
+    State that only lives in memory — gameplay sessions and replay jobs — has a single owner: a
+    separate process that workers forward those routes to over a Unix socket. Replays themselves
+    run in the worker that received the job, which reports progress to the owner. The owner also
+    relays live-trace publishes between workers. The parent only supervises, restarting workers
+    that exit; it starts no threads, so forking from it stays safe.
+    """
+    # Schema creation and demo bootstrap run once here rather than racing in every worker.
+    TraceStore(data_dir(), demo_dir())
+    runtime_dir = Path(tempfile.mkdtemp(prefix="agent-director-"))
+    owner_path = str(runtime_dir / "owner.sock")
+    hub_path = str(runtime_dir / "hub.sock")
+    server = ThreadingHTTPServer((host, port), ApiHandler)
+    # Every worker polls the same socket; a non-blocking accept lets the losers return to select().
+    server.socket.setblocking(False)
+    owner_server = OwnerHTTPServer(owner_path, OwnerApiHandler)
+    hub_listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    hub_listener.bind(hub_path)
+    hub_listener.listen()
+
+    previous_sigterm = signal.signal(signal.SIGTERM, _raise_interrupt)
+    owner_pid = _spawn(lambda: _run_owner(owner_server, hub_listener, host))
+    started: Dict[int, float] = {}
+    for _ in range(workers):
+        started[_spawn(lambda: _run_worker(server, owner_path, hub_path))] = time.monotonic()
+    bound_host, bound_port = server.server_address[:2]
+    print(
+        f"Agent Director server running on http://{bound_host}:{bound_port} "
+        f"({workers} worker processes)",
+        flush=True,
+    )
+    try:
+        while True:
+            pid, _ = os.wait()
+            if pid == owner_pid:
+                LOG.error("Owner process exited; stopping workers")
+                owner_pid = 0
+                break
+            began = started.pop(pid, None)
+            if began is None:
+                continue
+            if time.monotonic() - began < MIN_WORKER_LIFETIME_S:
+                time.sleep(MIN_WORKER_LIFETIME_S)
+            LOG.warning("Worker %s exited; starting a replacement", pid)
+            started[_spawn(lambda: _run_worker(server, owner_path, hub_path))] = time.monotonic()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        children = list(started) + ([owner_pid] if owner_pid else [])
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in children:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        signal.signal(signal.SIGTERM, previous_sigterm)
+        server.server_close()
+        owner_server.server_close()
+        hub_listener.close()
+        shutil.rmtree(runtime_dir, ignore_errors=True)
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+MAX_PROFILE_SECONDS = 60.0
+MIN_SAMPLE_INTERVAL_S = 0.001
+DEFAULT_SAMPLE_INTERVAL_S = 0.01
+MAX_STACK_DEPTH = 128
+SERVER_DIR = Path(__file__).resolve().parent
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+# (function name, file, first line); a function is one frame however many lines it spans.
+FrameKey = Tuple[str, str, int]
+Stack = Tuple[FrameKey, ...]
+
+
+class StackSampler:
+    """Samples every other thread's Python stack via sys._current_frames.
+
+    Sampling holds the GIL for one pass over the frames, so at the default 10 ms interval the
+    overhead is a few percent of one core regardless of how many handler threads are running.
+    Only one profile runs at a time.
+    """
+
+    def __init__(self) -> None:
+        self._running = threading.Lock()
+
+    def sample(
+        self, duration_s: float, interval_s: float = DEFAULT_SAMPLE_INTERVAL_S
+    ) -> Tuple[Counter[Tuple[str, Stack]], int]:
+        """Returns ({(thread name, root-first stack): samples}, passes taken)."""
+        duration_s = min(max(duration_s, interval_s), MAX_PROFILE_SECONDS)
+        interval_s = max(interval_s, MIN_SAMPLE_INTERVAL_S)
+        if not self._running.acquire(blocking=False):
+            raise RuntimeError("A profile is already running")
+        try:
+            own_id = threading.get_ident()
+            stacks: Counter[Tuple[str, Stack]] = Counter()
+            passes = 0
+            deadline = time.monotonic() + duration_s
+            while time.monotonic() < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_id:
+                        continue
+                    stacks[(names.get(thread_id, str(thread_id)), _stack(frame))] += 1
+                passes += 1
+                time.sleep(interval_s)
+            return stacks, passes
+        finally:
+            self._running.release()
+
+
+def _stack(frame: Any) -> Stack:
+    frames: List[FrameKey] = []
+    while frame is not None and len(frames) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        frames.append((code.co_name, code.co_filename, code.co_firstlineno))
+        frame = frame.f_back
+    frames.reverse()
+    return tuple(frames)
+
+
+def _frame_label(key: FrameKey) -> str:
+    name, filename, line = key
+    return f"{name} ({_short_path(filename)}:{line})"
+
+
+def _short_path(filename: str) -> str:
+    path = Path(filename)
+    try:
+        return str(path.relative_to(SERVER_DIR.parent))
+    except ValueError:
+        return path.name
+
+
+def to_folded(stacks: Counter[Tuple[str, Stack]]) -> str:
+    """Brendan Gregg's folded format (`thread;outer;inner count`), ready for flamegraph.pl."""
+    lines = []
+    for (thread_name, stack), count in stacks.most_common():
+        frames = [thread_name] + [_frame_label(key).replace(";", ":") for key in stack]
+        lines.append(f"{';'.join(frames)} {count}")
+    return "\n".join(lines) + ("\n" if lines else "")
+
+
+def to_speedscope(stacks: Counter[Tuple[str, Stack]], interval_s: float) -> Dict[str, Any]:
+    """speedscope "sampled" file, one profile per thread, weights in seconds."""
+    frame_index: Dict[FrameKey, int] = {}
+    frames: List[Dict[str, Any]] = []
+    profiles: Dict[str, Dict[str, Any]] = {}
+    for (thread_name, stack), count in stacks.items():
+        indices = []
+        for key in stack:
+            if key not in frame_index:
+                frame_index[key] = len(frames)
+                frames.append({"name": key[0], "file": _short_path(key[1]), "line": key[2]})
+            indices.append(frame_index[key])
+        profile = profiles.setdefault(
+            thread_name,
+            {
+                "type": "sampled",
+                "name": thread_name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": 0.0,
+                "samples": [],
+                "weights": [],
+            },
+        )
+        profile["samples"].append(indices)
+        profile["weights"].append(count * interval_s)
+        profile["endValue"] += count * interval_s
+    return {
+        "$schema": SPEEDSCOPE_SCHEMA,
+        "exporter": "agent-director",
+        "shared": {"frames": frames},
+        "profiles": list(profiles.values()),
+    }
+
+
+class MemoryTracker:
+    """tracemalloc baseline plus diffs against it, restricted to allocations made from server/."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._filters = [tracemalloc.Filter(True, str(SERVER_DIR / "*"))]
+
+    def snapshot_diff(
+        self, limit: int = 25, group_by: str = "lineno", reset: bool = False
+    ) -> Dict[str, Any]:
+        """The first call (or reset) starts tracing and records a baseline; later ones diff it."""
+        if group_by not in {"lineno", "filename", "traceback"}:
+            raise ValueError("group_by must be one of: lineno, filename, traceback")
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(25 if group_by == "traceback" else 1)
+                self._baseline = None
+            snapshot = tracemalloc.take_snapshot().filter_traces(self._filters)
+            if self._baseline is None or reset:
+                self._baseline = snapshot
+                return {
+                    "baseline": True,
+                    "tracedBytes": tracemalloc.get_traced_memory()[0],
+                    "top": [],
+                }
+            stats = snapshot.compare_to(self._baseline, group_by)
+        top = [
+            {
+                "location": [
+                    f"{_short_path(frame.filename)}:{frame.lineno}" for frame in stat.traceback
+                ],
+                "sizeBytes": stat.size,
+                "sizeDiffBytes": stat.size_diff,
+                "count": stat.count,
+                "countDiff": stat.count_diff,
+            }
+            for stat in stats[: max(1, limit)]
+        ]
+        return {"baseline": False, "tracedBytes": tracemalloc.get_traced_memory()[0], "top": top}
+
+    def stop(self) -> None:
+        with self._lock:
+            self._baseline = None
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
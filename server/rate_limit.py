@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import math
+import time
+import zlib
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+# Tokens charged per request by route rate-limit class; unknown classes cost the default.
+RATE_LIMIT_COSTS: Dict[str, float] = {
+    "default": 1.0,
+    "stream": 1.0,
+    "heavy": 5.0,
+}
+DEFAULT_SHARDS = 16
+SWEEP_INTERVAL_S = 30.0
+
+
+class _Shard:
+    __slots__ = ("lock", "buckets", "last_sweep")
+
+    def __init__(self) -> None:
+        self.lock = Lock()
+        # key -> [tokens, last refill time]; two floats per client regardless of request rate.
+        self.buckets: Dict[str, List[float]] = {}
+        self.last_sweep: Optional[float] = None
+
+
+class TokenBucketLimiter:
+    """Per-key token buckets spread over independently locked shards.
+
+    A bucket holds up to `capacity` tokens and refills at `refill_per_s`. Buckets that have been
+    idle long enough to refill completely carry no information, so each shard drops them when it
+    is next touched after SWEEP_INTERVAL_S.
+    """
+
+    def __init__(self, capacity: float, refill_per_s: float, shards: int = DEFAULT_SHARDS) -> None:
+        if capacity <= 0 or refill_per_s <= 0:
+            raise ValueError("capacity and refill_per_s must be positive")
+        self.capacity = float(capacity)
+        self.refill_per_s = float(refill_per_s)
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+
+    def _shard(self, key: str) -> _Shard:
+        return self._shards[zlib.crc32(key.encode("utf-8")) % len(self._shards)]
+
+    def acquire(self, key: str, cost: float = 1.0, now: Optional[float] = None) -> Tuple[bool, int]:
+        """Take `cost` tokens for key; returns (allowed, retry_after_seconds)."""
+        now = time.monotonic() if now is None else now
+        cost = min(float(cost), self.capacity)
+        shard = self._shard(key)
+        with shard.lock:
+            if shard.last_sweep is None:
+                shard.last_sweep = now
+            elif now - shard.last_sweep >= SWEEP_INTERVAL_S:
+                self._sweep(shard, now)
+            bucket = shard.buckets.get(key)
+            if bucket is None:
+                bucket = shard.buckets[key] = [self.capacity, now]
+            else:
+                elapsed = max(0.0, now - bucket[1])
+                bucket[0] = min(self.capacity, bucket[0] + elapsed * self.refill_per_s)
+                bucket[1] = now
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                return True, 0
+            return False, max(1, math.ceil((cost - bucket[0]) / self.refill_per_s))
+
+    def _sweep(self, shard: _Shard, now: float) -> None:
+        idle = [
+            key
+            for key, (tokens, updated) in shard.buckets.items()
+            if tokens + (now - updated) * self.refill_per_s >= self.capacity
+        ]
+        for key in idle:
+            del shard.buckets[key]
+        shard.last_sweep = now
+
+    def key_count(self) -> int:
+        total = 0
+        for shard in self._shards:
+            with shard.lock:
+                total += len(shard.buckets)
+        return total
+
+    def clear(self) -> None:
+        for shard in self._shards:
+            with shard.lock:
+                shard.buckets.clear()
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from typing import Any, Dict, List, Optional, Tuple
 
+from ..timing import check_deadline
 from ..trace.schema import StepSummary, TraceSummary
 
 
@@ -10,6 +11,7 @@ def compare_traces(left: TraceSummary, right: TraceSummary) -> Dict[str, Any]:
     right_steps = {step.id: step for step in right.steps}
 
     aligned_pairs = _align_steps(left, right)
+    check_deadline()
     aligned_left = {pair[0] for pair in aligned_pairs}
     aligned_right = {pair[1] for pair in aligned_pairs}
 
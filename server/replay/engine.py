@@ -2,12 +2,17 @@ from __future__ import annotations
 
 import hashlib
 import json
-from copy import deepcopy
+import re
+from copy import copy
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Set
+from typing import Any, Dict, List, Optional, Set
 
+from ..timing import check_deadline
 from ..trace.schema import ReplayInfo, StepSummary, TraceMetadata, TraceSummary
 
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+_TIMESTAMP_RE = re.compile(r"(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})\.(\d{1,6})Z")
+
 
 def _to_utc_z(dt: datetime) -> str:
     return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
@@ -19,28 +24,57 @@ def replay_from_step(
     strategy: str,
     modifications: Dict[str, Any],
 ) -> TraceSummary:
-    new_trace = deepcopy(trace)
+    """Build the replay branch of `trace` at `step_id` without copying the source trace.
+
+    Each step is cloned shallowly with its timestamps shifted; previews are cloned only for the
+    modified and invalidated steps. Metrics, io, child lists and untouched previews are shared
+    with `trace`, so neither trace may be mutated in place afterwards.
+    """
+    check_deadline()
     replay_digest = _replay_digest(trace.id, step_id, strategy, modifications)
+    replay_start = _deterministic_replay_start(trace.startedAt, replay_digest)
+    invalidated = _compute_invalidated_steps(trace.steps, step_id, strategy)
+    check_deadline()
+
+    new_trace = copy(trace)
     new_trace.id = f"replay-{replay_digest[:24]}"
     new_trace.parentTraceId = trace.id
     new_trace.branchPointStepId = step_id
-    replay_start = _deterministic_replay_start(trace.startedAt, replay_digest)
-    invalidated = _compute_invalidated_steps(new_trace.steps, step_id, strategy)
     system_meta = {"invalidatedStepIds": sorted(invalidated), "strategy": strategy}
     merged_modifications = {**modifications, "__system__": system_meta}
-    new_trace.replay = ReplayInfo(
+    replay_info = ReplayInfo(
         strategy=strategy,
         modifiedStepId=step_id,
         modifications=merged_modifications,
         createdAt=_to_utc_z(replay_start),
     )
+    new_trace.replay = replay_info
 
-    _shift_times(new_trace, replay_start)
-    _apply_modifications(new_trace.steps, step_id, modifications)
+    shift = _TimeShift.between(trace.startedAt, replay_start)
+    if shift is not None:
+        new_trace.startedAt = shift(trace.startedAt) or trace.startedAt
+        if trace.endedAt:
+            new_trace.endedAt = shift(trace.endedAt) or new_trace.startedAt
+    modified_suffix = (
+        f" (modified: {', '.join(modifications.keys())})" if modifications else " (modified)"
+    )
+    modified_index = next(
+        (index for index, step in enumerate(trace.steps) if step.id == step_id), -1
+    )
+    new_trace.steps = [
+        _replay_step(
+            step,
+            shift,
+            modified_suffix if index == modified_index else None,
+            step.id in invalidated,
+        )
+        for index, step in enumerate(trace.steps)
+    ]
     if invalidated:
-        _invalidate_steps(new_trace, invalidated)
-    if new_trace.replay:
-        new_trace.replay.checkpoints = _checkpoint_signatures(new_trace.steps)
+        new_trace.status = "running"
+        new_trace.endedAt = None
+    check_deadline()
+    replay_info.checkpoints = _checkpoint_signatures(new_trace.steps)
 
     new_trace.metadata = TraceMetadata(
         source=trace.metadata.source,
@@ -64,9 +98,8 @@ def _replay_digest(trace_id: str, step_id: str, strategy: str, modifications: Di
 
 
 def _deterministic_replay_start(source_started_at: str, replay_digest: str) -> datetime:
-    fmt = "%Y-%m-%dT%H:%M:%S.%fZ"
     try:
-        base_start = datetime.strptime(source_started_at, fmt)
+        base_start = datetime.strptime(source_started_at, TIMESTAMP_FORMAT)
         if base_start.tzinfo is None:
             base_start = base_start.replace(tzinfo=timezone.utc)
     except ValueError:
@@ -83,57 +116,100 @@ def _checkpoint_signatures(steps: List[StepSummary]) -> Dict[str, str]:
     return checkpoints
 
 
-def _shift_times(trace: TraceSummary, new_start: datetime) -> None:
-    fmt = "%Y-%m-%dT%H:%M:%S.%fZ"
-    try:
-        old_start = datetime.strptime(trace.startedAt, fmt)
-    except ValueError:
-        return
-    if old_start.tzinfo is None:
-        old_start = old_start.replace(tzinfo=timezone.utc)
-    delta = new_start - old_start
+class _TimeShift:
+    """Moves replay timestamps by one offset from the source trace's start.
+
+    Timestamps in the canonical `...:SS.fffZ` form are parsed without strptime, and each distinct
+    string is converted once (one step's end is often the next one's start). Results match
+    `_to_utc_z(strptime(value) + offset)`; None where strptime would reject the value.
+    """
+
+    __slots__ = ("offset", "_shifted")
+
+    def __init__(self, offset: timedelta) -> None:
+        self.offset = offset
+        self._shifted: Dict[str, Optional[str]] = {}
 
-    trace.startedAt = _to_utc_z(old_start + delta)
-    if trace.endedAt:
+    @classmethod
+    def between(cls, source_started_at: str, new_start: datetime) -> Optional["_TimeShift"]:
+        old_start = _parse_utc_z(source_started_at)
+        return None if old_start is None else cls(new_start - old_start)
+
+    def __call__(self, value: str) -> Optional[str]:
         try:
-            old_end = datetime.strptime(trace.endedAt, fmt)
-        except ValueError:
-            old_end = old_start
-        if old_end.tzinfo is None:
-            old_end = old_end.replace(tzinfo=timezone.utc)
-        trace.endedAt = _to_utc_z(old_end + delta)
+            return self._shifted[value]
+        except KeyError:
+            pass
+        parsed = _parse_utc_z(value)
+        shifted = None if parsed is None else _format_utc_z(parsed + self.offset)
+        self._shifted[value] = shifted
+        return shifted
+
 
-    for step in trace.steps:
+def _parse_utc_z(value: str) -> Optional[datetime]:
+    match = _TIMESTAMP_RE.fullmatch(value)
+    if match is None:
+        # Non-canonical but strptime-compatible forms (single-digit fields, lowercase t/z, ...).
         try:
-            step_start = datetime.strptime(step.startedAt, fmt)
+            parsed = datetime.strptime(value, TIMESTAMP_FORMAT)
         except ValueError:
-            continue
-        if step_start.tzinfo is None:
-            step_start = step_start.replace(tzinfo=timezone.utc)
-        step.startedAt = _to_utc_z(step_start + delta)
+            return None
+        return parsed.replace(tzinfo=timezone.utc)
+    year, month, day, hour, minute, second, fraction = match.groups()
+    try:
+        return datetime(
+            int(year),
+            int(month),
+            int(day),
+            int(hour),
+            int(minute),
+            int(second),
+            int(fraction.ljust(6, "0")),
+            tzinfo=timezone.utc,
+        )
+    except ValueError:
+        return None
+
+
+def _format_utc_z(dt: datetime) -> str:
+    if dt.year < 1000:
+        return _to_utc_z(dt)
+    return (
+        f"{dt.year:04d}-{dt.month:02d}-{dt.day:02d}T{dt.hour:02d}:{dt.minute:02d}:{dt.second:02d}"
+        f".{dt.microsecond // 1000:03d}Z"
+    )
+
+
+def _replay_step(
+    step: StepSummary,
+    shift: Optional[_TimeShift],
+    modified_suffix: Optional[str],
+    invalidated: bool,
+) -> StepSummary:
+    """The replay's version of `step`: the source object itself when nothing about it changes."""
+    started_at = shift(step.startedAt) if shift is not None else None
+    if started_at is None and modified_suffix is None and not invalidated:
+        return step
+    clone = copy(step)
+    if shift is not None and started_at is not None:
+        clone.startedAt = started_at
         if step.endedAt:
-            try:
-                step_end = datetime.strptime(step.endedAt, fmt)
-            except ValueError:
-                step_end = step_start
-            if step_end.tzinfo is None:
-                step_end = step_end.replace(tzinfo=timezone.utc)
-            step.endedAt = _to_utc_z(step_end + delta)
-
-
-def _apply_modifications(
-    steps: list[StepSummary], step_id: str, modifications: Dict[str, Any]
-) -> None:
-    for step in steps:
-        if step.id != step_id:
-            continue
-        if step.preview:
-            suffix = f" (modified: {', '.join(modifications.keys())})" if modifications else " (modified)"
-            if step.preview.outputPreview:
-                step.preview.outputPreview += suffix
-            else:
-                step.preview.outputPreview = suffix.strip()
-        break
+            clone.endedAt = shift(step.endedAt) or started_at
+    if step.preview and (modified_suffix is not None or invalidated):
+        clone.preview = copy(step.preview)
+    if modified_suffix is not None and clone.preview:
+        if clone.preview.outputPreview:
+            clone.preview.outputPreview += modified_suffix
+        else:
+            clone.preview.outputPreview = modified_suffix.strip()
+    if invalidated:
+        clone.status = "pending"
+        clone.endedAt = None
+        clone.durationMs = None
+        clone.metrics = None
+        if clone.preview:
+            clone.preview.outputPreview = "[invalidated for replay]"
+    return clone
 
 
 def _compute_invalidated_steps(
@@ -188,17 +264,3 @@ def _compute_invalidated_steps(
 
     invalidated.discard(step_id)
     return invalidated
-
-
-def _invalidate_steps(trace: TraceSummary, invalidated: Set[str]) -> None:
-    for step in trace.steps:
-        if step.id not in invalidated:
-            continue
-        step.status = "pending"
-        step.endedAt = None
-        step.durationMs = None
-        step.metrics = None
-        if step.preview:
-            step.preview.outputPreview = "[invalidated for replay]"
-    trace.status = "running"
-    trace.endedAt = None
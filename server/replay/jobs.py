@@ -2,10 +2,13 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Protocol
 from uuid import uuid4
 
 from .engine import replay_from_step
+from ..metrics import CACHE_REQUESTS, REPLAY_JOB_SECONDS, REPLAY_SCENARIOS
+from ..timing import DeadlineExceededError
 from ..trace.store import TraceStore
 
 
@@ -45,6 +48,20 @@ class ReplayScenario:
             "error": self.error,
         }
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ReplayScenario":
+        return cls(
+            id=data["id"],
+            name=data.get("name", ""),
+            strategy=data.get("strategy", "hybrid"),
+            modifications=data.get("modifications") or {},
+            status=data.get("status", "queued"),
+            started_at=data.get("startedAt"),
+            ended_at=data.get("endedAt"),
+            replay_trace_id=data.get("replayTraceId"),
+            error=data.get("error"),
+        )
+
 
 @dataclass
 class ReplayJob:
@@ -76,6 +93,106 @@ class ReplayJob:
             "scenarios": [scenario.to_dict() for scenario in self.scenarios],
         }
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ReplayJob":
+        return cls(
+            id=data["id"],
+            trace_id=data["traceId"],
+            step_id=data["stepId"],
+            scenarios=[ReplayScenario.from_dict(item) for item in data.get("scenarios", [])],
+            status=data.get("status", "queued"),
+            created_at=data.get("createdAt") or _now_iso(),
+            started_at=data.get("startedAt"),
+            ended_at=data.get("endedAt"),
+        )
+
+
+class ReplayJobLedger(Protocol):
+    """Job bookkeeping execute_replay_job reports to: a ReplayJobStore, or a proxy for one."""
+
+    def create_job(
+        self, trace_id: str, step_id: str, scenarios: List[Dict[str, Any]]
+    ) -> ReplayJob: ...
+
+    def get(self, job_id: str) -> Optional[ReplayJob]: ...
+
+    def start_next_scenario(self, job_id: str) -> Optional[ReplayScenario]: ...
+
+    def complete_scenario(
+        self, job_id: str, scenario_id: str, replay_trace_id: str
+    ) -> Optional[ReplayScenario]: ...
+
+    def fail_scenario(
+        self, job_id: str, scenario_id: str, error: str
+    ) -> Optional[ReplayScenario]: ...
+
+    def fail_job(self, job_id: str, error: str) -> Optional[ReplayJob]: ...
+
+    def cancel_job(self, job_id: str) -> Optional[ReplayJob]: ...
+
+
+def execute_replay_job(
+    jobs: ReplayJobLedger,
+    job_id: str,
+    store: TraceStore,
+    replay_fn=replay_from_step,
+) -> Optional[ReplayJob]:
+    """Run a job's queued scenarios in this thread, recording each outcome in `jobs`.
+
+    The replays run wherever this is called, under that request's deadline; `jobs` only keeps
+    the state, so it can live in another process.
+    """
+    job = jobs.get(job_id)
+    if not job or job.status in FINAL_JOB_STATES:
+        return job
+
+    try:
+        base_trace = store.get_summary(job.trace_id)
+    except FileNotFoundError as exc:
+        return jobs.fail_job(job_id, str(exc))
+
+    started = perf_counter()
+    while True:
+        # None once the job is finished or was canceled.
+        scenario = jobs.start_next_scenario(job_id)
+        if scenario is None:
+            break
+
+        outcome: Optional[ReplayScenario] = None
+        last_error = None
+        for _ in range(MAX_REPLAY_ATTEMPTS):
+            try:
+                replay_trace = replay_fn(
+                    base_trace,
+                    job.step_id,
+                    scenario.strategy,
+                    scenario.modifications,
+                )
+                replay_trace.name = f"{base_trace.name} ({scenario.name})"
+                if replay_trace.replay:
+                    system_meta = replay_trace.replay.modifications.get("__system__", {})
+                    system_meta["jobId"] = job.id
+                    system_meta["scenarioId"] = scenario.id
+                    replay_trace.replay.modifications["__system__"] = system_meta
+                store.ingest_trace(replay_trace)
+                # A job canceled meanwhile keeps the scenario canceled.
+                outcome = jobs.complete_scenario(job_id, scenario.id, replay_trace.id)
+                last_error = None
+                break
+            except DeadlineExceededError:
+                # Out of time: stop the whole job and let the request answer 503.
+                jobs.cancel_job(job_id)
+                REPLAY_SCENARIOS.inc(("canceled",))
+                REPLAY_JOB_SECONDS.observe((), perf_counter() - started)
+                raise
+            except Exception as exc:  # pragma: no cover - defensive fallback
+                last_error = exc
+        if last_error is not None:
+            outcome = jobs.fail_scenario(job_id, scenario.id, str(last_error))
+        REPLAY_SCENARIOS.inc(((outcome or scenario).status,))
+    REPLAY_JOB_SECONDS.observe((), perf_counter() - started)
+    return jobs.get(job_id)
+
 
 class ReplayJobStore:
     def __init__(self) -> None:
@@ -117,6 +234,12 @@ class ReplayJobStore:
     def list(self) -> List[ReplayJob]:
         return list(self._jobs.values())
 
+    def status_counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for job in self.list():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
     def start_next_scenario(self, job_id: str) -> Optional[ReplayScenario]:
         job = self._jobs.get(job_id)
         if not job or job.status in FINAL_JOB_STATES:
@@ -136,31 +259,50 @@ class ReplayJobStore:
         self._refresh_job_status(job)
         return None
 
-    def complete_scenario(self, job_id: str, scenario_id: str, replay_trace_id: str) -> None:
+    def complete_scenario(
+        self, job_id: str, scenario_id: str, replay_trace_id: str
+    ) -> Optional[ReplayScenario]:
+        """Record a finished replay; returns the scenario, unchanged if the job already ended."""
         job = self._jobs.get(job_id)
-        if not job or job.status in FINAL_JOB_STATES:
-            return
-        scenario = self._find_scenario(job, scenario_id)
-        if not scenario:
-            return
+        scenario = self._find_scenario(job, scenario_id) if job else None
+        if not job or not scenario or job.status in FINAL_JOB_STATES:
+            return scenario
         scenario.status = "completed"
         scenario.replay_trace_id = replay_trace_id
         scenario.ended_at = _now_iso()
         self._refresh_job_status(job)
         self._matrix_cache.pop(job_id, None)
+        return scenario
 
-    def fail_scenario(self, job_id: str, scenario_id: str, error: str) -> None:
+    def fail_scenario(
+        self, job_id: str, scenario_id: str, error: str
+    ) -> Optional[ReplayScenario]:
         job = self._jobs.get(job_id)
-        if not job or job.status in FINAL_JOB_STATES:
-            return
-        scenario = self._find_scenario(job, scenario_id)
-        if not scenario:
-            return
+        scenario = self._find_scenario(job, scenario_id) if job else None
+        if not job or not scenario or job.status in FINAL_JOB_STATES:
+            return scenario
         scenario.status = "failed"
         scenario.error = error
         scenario.ended_at = _now_iso()
         self._refresh_job_status(job)
         self._matrix_cache.pop(job_id, None)
+        return scenario
+
+    def fail_job(self, job_id: str, error: str) -> Optional[ReplayJob]:
+        """Fail a job that cannot run at all, with every queued scenario."""
+        job = self._jobs.get(job_id)
+        if not job or job.status in FINAL_JOB_STATES:
+            return job
+        now = _now_iso()
+        job.status = "failed"
+        job.ended_at = now
+        for scenario in job.scenarios:
+            if scenario.status == "queued":
+                scenario.status = "failed"
+                scenario.error = error
+                scenario.ended_at = now
+        self._matrix_cache.pop(job_id, None)
+        return job
 
     def cancel_job(self, job_id: str) -> Optional[ReplayJob]:
         job = self._jobs.get(job_id)
@@ -185,61 +327,13 @@ class ReplayJobStore:
         store: TraceStore,
         replay_fn=replay_from_step,
     ) -> Optional[ReplayJob]:
-        job = self._jobs.get(job_id)
-        if not job or job.status in FINAL_JOB_STATES:
-            return job
-
-        try:
-            base_trace = store.get_summary(job.trace_id)
-        except FileNotFoundError as exc:
-            job.status = "failed"
-            job.ended_at = _now_iso()
-            for scenario in job.scenarios:
-                if scenario.status == "queued":
-                    scenario.status = "failed"
-                    scenario.error = str(exc)
-                    scenario.ended_at = _now_iso()
-            return job
-
-        while True:
-            scenario = self.start_next_scenario(job_id)
-            if scenario is None:
-                break
-
-            # Job may have been canceled while queued.
-            if job.status == "canceled" or scenario.status == "canceled":
-                break
-
-            last_error = None
-            for _ in range(MAX_REPLAY_ATTEMPTS):
-                try:
-                    replay_trace = replay_fn(
-                        base_trace,
-                        job.step_id,
-                        scenario.strategy,
-                        scenario.modifications,
-                    )
-                    replay_trace.name = f"{base_trace.name} ({scenario.name})"
-                    if replay_trace.replay:
-                        system_meta = replay_trace.replay.modifications.get("__system__", {})
-                        system_meta["jobId"] = job.id
-                        system_meta["scenarioId"] = scenario.id
-                        replay_trace.replay.modifications["__system__"] = system_meta
-                    store.ingest_trace(replay_trace)
-                    if job.status == "canceled" or scenario.status == "canceled":
-                        break
-                    self.complete_scenario(job_id, scenario.id, replay_trace.id)
-                    last_error = None
-                    break
-                except Exception as exc:  # pragma: no cover - defensive fallback
-                    last_error = exc
-            if last_error is not None:
-                self.fail_scenario(job_id, scenario.id, str(last_error))
-        return job
+        return execute_replay_job(self, job_id, store, replay_fn)
 
     def get_matrix(self, job_id: str, store: TraceStore) -> Optional[Dict[str, Any]]:
         if job_id in self._matrix_cache:
+            CACHE_REQUESTS.inc(("replay_matrix", "hit"))
             return self._matrix_cache[job_id]
+        CACHE_REQUESTS.inc(("replay_matrix", "miss"))
         job = self._jobs.get(job_id)
         if not job:
             return None
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import zlib
+from typing import BinaryIO, Iterable, Iterator, Mapping, Optional
+
+READ_BLOCK_BYTES = 64 * 1024
+MAX_CHUNK_LINE_BYTES = 1024
+
+
+class BodyTooLargeError(Exception):
+    pass
+
+
+class UnsupportedContentEncodingError(ValueError):
+    pass
+
+
+def iter_request_body(
+    rfile: BinaryIO, headers: Mapping[str, str], max_bytes: int
+) -> Iterator[bytes]:
+    """Yield the raw request body in blocks, de-chunking Transfer-Encoding: chunked."""
+    if "chunked" in headers.get("Transfer-Encoding", "").lower():
+        yield from _iter_chunked(rfile, max_bytes)
+        return
+    try:
+        remaining = int(headers.get("Content-Length", "0") or "0")
+    except ValueError as exc:
+        raise ValueError("Invalid Content-Length") from exc
+    if remaining < 0:
+        raise ValueError("Invalid Content-Length")
+    if remaining > max_bytes:
+        raise BodyTooLargeError
+    while remaining:
+        block = rfile.read(min(READ_BLOCK_BYTES, remaining))
+        if not block:
+            raise ValueError("Request body ended early")
+        remaining -= len(block)
+        yield block
+
+
+def _iter_chunked(rfile: BinaryIO, max_bytes: int) -> Iterator[bytes]:
+    total = 0
+    while True:
+        line = rfile.readline(MAX_CHUNK_LINE_BYTES)
+        if not line.endswith(b"\n"):
+            raise ValueError("Malformed chunked body")
+        try:
+            size = int(line.split(b";", 1)[0].strip(), 16)
+        except ValueError as exc:
+            raise ValueError("Malformed chunked body") from exc
+        if size == 0:
+            # Skip trailer fields up to the blank line that ends the message.
+            while rfile.readline(MAX_CHUNK_LINE_BYTES) not in {b"\r\n", b"\n", b""}:
+                continue
+            return
+        total += size
+        if total > max_bytes:
+            raise BodyTooLargeError
+        while size:
+            block = rfile.read(min(READ_BLOCK_BYTES, size))
+            if not block:
+                raise ValueError("Request body ended early")
+            size -= len(block)
+            yield block
+        if rfile.readline(MAX_CHUNK_LINE_BYTES) not in {b"\r\n", b"\n"}:
+            raise ValueError("Malformed chunked body")
+
+
+def iter_decoded(
+    chunks: Iterable[bytes], encoding: Optional[str], max_bytes: int
+) -> Iterator[bytes]:
+    """Undo Content-Encoding incrementally; max_bytes caps the decoded size (so gzip bombs too)."""
+    encoding = (encoding or "identity").strip().lower()
+    if encoding == "identity":
+        total = 0
+        for chunk in chunks:
+            total += len(chunk)
+            if total > max_bytes:
+                raise BodyTooLargeError
+            yield chunk
+        return
+    if encoding not in {"gzip", "x-gzip"}:
+        raise UnsupportedContentEncodingError(f"Unsupported Content-Encoding: {encoding}")
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    in_member = False
+    total = 0
+    for chunk in chunks:
+        pending = chunk
+        while pending:
+            in_member = True
+            try:
+                # max_length bounds each inflate step, so a tiny chunk cannot expand without limit.
+                block = decompressor.decompress(pending, READ_BLOCK_BYTES)
+            except zlib.error as exc:
+                raise ValueError("Malformed gzip body") from exc
+            total += len(block)
+            if total > max_bytes:
+                raise BodyTooLargeError
+            if block:
+                yield block
+            if decompressor.eof:
+                # Concatenated gzip members are one stream (RFC 1952 section 2.2).
+                pending = decompressor.unused_data
+                decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+                in_member = False
+            else:
+                pending = decompressor.unconsumed_tail
+    if in_member:
+        tail = decompressor.flush()
+        total += len(tail)
+        if total > max_bytes:
+            raise BodyTooLargeError
+        if tail:
+            yield tail
+        if not decompressor.eof:
+            raise ValueError("Truncated gzip body")
+
+
+def iter_lines(chunks: Iterable[bytes], max_line_bytes: int) -> Iterator[bytes]:
+    """Split a byte stream into non-blank lines without holding more than one line at a time."""
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end == -1:
+                break
+            if end - start > max_line_bytes:
+                raise BodyTooLargeError
+            line = bytes(buffer[start:end])
+            start = end + 1
+            if line.strip():
+                yield line
+        del buffer[:start]
+        if len(buffer) > max_line_bytes:
+            raise BodyTooLargeError
+    if buffer.strip():
+        yield bytes(buffer)
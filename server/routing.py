@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+PARAM_CONVERTERS: Dict[str, Callable[[str], Any]] = {"str": str, "int": int}
+
+
+@dataclass(frozen=True)
+class Route:
+    method: str
+    template: str
+    handler: Callable[..., None]
+    rate_limit: str = "default"
+    max_body_bytes: Optional[int] = None
+    cacheable: bool = False
+    # The handler reads the request body itself instead of receiving a parsed JSON object.
+    stream_body: bool = False
+    # The handler uses in-memory state with a single owner; pre-fork workers forward it there.
+    process_local: bool = False
+
+
+@dataclass
+class RequestContext:
+    params: Dict[str, Any]
+    query: Dict[str, List[str]]
+    body: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class _Node:
+    literals: Dict[str, "_Node"] = field(default_factory=dict)
+    param: Optional[Tuple[str, Callable[[str], Any], "_Node"]] = None
+    route: Optional[Route] = None
+
+
+def split_path(path: str) -> List[str]:
+    return [part for part in path.split("/") if part]
+
+
+def _parse_segment(segment: str) -> Optional[Tuple[str, Callable[[str], Any]]]:
+    if not (segment.startswith("{") and segment.endswith("}")):
+        return None
+    name, _, kind = segment[1:-1].partition(":")
+    kind = kind or "str"
+    if not name or kind not in PARAM_CONVERTERS:
+        raise ValueError(f"Invalid path parameter: {segment}")
+    return name, PARAM_CONVERTERS[kind]
+
+
+class RouteTable:
+    """Method + path template -> Route, matched segment by segment through a trie.
+
+    Literal segments win over parameters at the same depth, so `/sessions/{id}` and
+    `/liveops/current` can share a prefix without ordering concerns.
+    """
+
+    def __init__(self) -> None:
+        self._roots: Dict[str, _Node] = {}
+        self._routes: List[Route] = []
+
+    def add(
+        self,
+        method: str,
+        template: str,
+        handler: Callable[..., None],
+        *,
+        rate_limit: str = "default",
+        max_body_bytes: Optional[int] = None,
+        cacheable: bool = False,
+        stream_body: bool = False,
+        process_local: bool = False,
+    ) -> Route:
+        route = Route(
+            method.upper(),
+            template,
+            handler,
+            rate_limit,
+            max_body_bytes,
+            cacheable,
+            stream_body,
+            process_local,
+        )
+        node = self._roots.setdefault(route.method, _Node())
+        for segment in split_path(template):
+            param = _parse_segment(segment)
+            if param is None:
+                node = node.literals.setdefault(segment, _Node())
+                continue
+            name, converter = param
+            if node.param is None:
+                node.param = (name, converter, _Node())
+            elif node.param[:2] != (name, converter):
+                raise ValueError(f"Conflicting path parameter at {template}")
+            node = node.param[2]
+        if node.route is not None:
+            raise ValueError(f"Duplicate route: {route.method} {template}")
+        node.route = route
+        self._routes.append(route)
+        return route
+
+    def route(
+        self, method: str, template: str, **meta: Any
+    ) -> Callable[[Callable[..., None]], Callable[..., None]]:
+        """Decorator form of add(); returns the handler unchanged."""
+
+        def register(handler: Callable[..., None]) -> Callable[..., None]:
+            self.add(method, template, handler, **meta)
+            return handler
+
+        return register
+
+    def routes(self) -> List[Route]:
+        return list(self._routes)
+
+    def copy(self) -> "RouteTable":
+        """A new table with the same routes, to which another handler can add its own."""
+        table = RouteTable()
+        for route in self._routes:
+            table.add(
+                route.method,
+                route.template,
+                route.handler,
+                rate_limit=route.rate_limit,
+                max_body_bytes=route.max_body_bytes,
+                cacheable=route.cacheable,
+                stream_body=route.stream_body,
+                process_local=route.process_local,
+            )
+        return table
+
+    def match(self, method: str, path: str) -> Optional[Tuple[Route, Dict[str, Any]]]:
+        root = self._roots.get(method.upper())
+        if root is None:
+            return None
+        params: Dict[str, Any] = {}
+        route = _match(root, split_path(path), 0, params)
+        if route is None:
+            return None
+        return route, params
+
+
+def _match(node: _Node, parts: List[str], index: int, params: Dict[str, Any]) -> Optional[Route]:
+    if index == len(parts):
+        return node.route
+    segment = parts[index]
+    child = node.literals.get(segment)
+    if child is not None:
+        route = _match(child, parts, index + 1, params)
+        if route is not None:
+            return route
+    if node.param is None:
+        return None
+    name, converter, child = node.param
+    try:
+        params[name] = converter(segment)
+    except ValueError:
+        return None
+    route = _match(child, parts, index + 1, params)
+    if route is None:
+        params.pop(name, None)
+    return route
@@ -0,0 +1,407 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Set
+from urllib.parse import parse_qs, urlparse
+
+from .config import DEFAULT_HOST
+from .gameplay import GameplayStore
+from .mcp.schema import validate_input
+from .trace.live import (
+    ALL_TOPIC,
+    STREAM_MODES,
+    FrameSink,
+    LiveTraceBroker,
+    encode_sse_event,
+    topic_for,
+)
+from .trace.store import TraceStore
+
+HEARTBEAT_INTERVAL_S = 10.0
+MAX_STREAM_REQUEST_BYTES = 16 * 1024
+STREAM_HEADERS = {
+    "Content-Type": "text/event-stream",
+    "Cache-Control": "no-store",
+    "Access-Control-Allow-Origin": "*",
+}
+
+
+@dataclass
+class StreamTarget:
+    kind: str
+    key: str
+    mode: str = "full"
+    trace_id: Optional[str] = None
+    client_seq: Optional[str] = None
+
+
+@dataclass
+class OpenStream:
+    initial: List[bytes]
+    queue: Any
+    close: Callable[[], None]
+
+
+def parse_stream_target(
+    path_parts: List[str], query: Dict[str, List[str]]
+) -> Optional[StreamTarget]:
+    """Map /api/stream/<kind>/<key> onto a gameplay session or a broker topic."""
+    if path_parts[:2] != ["api", "stream"] or len(path_parts) != 4:
+        return None
+    kind, key = path_parts[2], path_parts[3]
+    if kind == "gameplay":
+        return StreamTarget(kind="gameplay", key=key)
+    if kind not in {"traces", "replay-jobs"}:
+        return None
+    mode = query.get("mode", ["full"])[0]
+    if mode not in STREAM_MODES:
+        raise ValueError(f"mode must be one of {sorted(STREAM_MODES)}")
+    client_seq = query.get("seq", [None])[0]
+    if kind == "replay-jobs":
+        validate_input("show_trace", {"trace_id": key})
+        return StreamTarget(
+            kind="traces", key=topic_for("job", key), mode=mode, client_seq=client_seq
+        )
+    if key == "latest":
+        trace_id = query.get("trace_id", [None])[0]
+        return StreamTarget(
+            kind="traces", key=ALL_TOPIC, mode=mode, trace_id=trace_id, client_seq=client_seq
+        )
+    validate_input("show_trace", {"trace_id": key})
+    scope = query.get("scope", ["trace"])[0]
+    if scope not in {"trace", "lineage"}:
+        raise ValueError("scope must be trace or lineage")
+    return StreamTarget(
+        kind="traces", key=topic_for(scope, key), mode=mode, trace_id=key, client_seq=client_seq
+    )
+
+
+def open_trace_stream(
+    target: StreamTarget,
+    last_event_id: Optional[int],
+    store: TraceStore,
+    live_broker: LiveTraceBroker,
+    queue: Optional[FrameSink] = None,
+) -> OpenStream:
+    """Subscribe (or resume from last_event_id) and build the frames to send before live events."""
+    resumed = (
+        live_broker.resume(target.mode, last_event_id, target.key, queue)
+        if last_event_id is not None
+        else None
+    )
+    if resumed:
+        token, subscribed = resumed
+        return OpenStream(
+            initial=[], queue=subscribed, close=lambda: live_broker.unsubscribe(token)
+        )
+    # Read the id before subscribing so the snapshot never claims events it may not include.
+    snapshot_event_id = live_broker.last_event_id
+    token, subscribed = live_broker.subscribe(target.mode, target.key, queue)
+    try:
+        if target.key == ALL_TOPIC or target.trace_id:
+            initial = [_trace_snapshot_frame(target, store, live_broker, snapshot_event_id)]
+        else:
+            initial = [
+                encode_sse_event("heartbeat", {"status": "subscribed", "topic": target.key})
+            ]
+    except BaseException:
+        live_broker.unsubscribe(token)
+        raise
+    return OpenStream(
+        initial=initial, queue=subscribed, close=lambda: live_broker.unsubscribe(token)
+    )
+
+
+def open_gameplay_stream(
+    session_id: str,
+    last_event_id: Optional[int],
+    gameplay_store: GameplayStore,
+    queue: Optional[FrameSink] = None,
+) -> OpenStream:
+    subscription = (
+        gameplay_store.resume(session_id, last_event_id, queue)
+        if last_event_id is not None
+        else None
+    )
+    initial: List[bytes] = []
+    if subscription is None:
+        snapshot_event_id = gameplay_store.last_event_id
+        subscription = gameplay_store.subscribe(session_id, queue)
+        session = gameplay_store.get_session(session_id)
+        if session:
+            initial.append(
+                encode_sse_event(
+                    "gameplay",
+                    {"session": session, "event": {"type": "session.snapshot"}},
+                    snapshot_event_id,
+                )
+            )
+        else:
+            initial.append(encode_sse_event("heartbeat", {"status": "missing"}))
+    token = subscription.token
+    return OpenStream(
+        initial=initial,
+        queue=subscription.queue,
+        close=lambda: gameplay_store.unsubscribe(session_id, token),
+    )
+
+
+def _trace_snapshot_frame(
+    target: StreamTarget, store: TraceStore, live_broker: LiveTraceBroker, event_id: int
+) -> bytes:
+    if target.mode == "delta":
+        return _delta_snapshot_frame(
+            target.trace_id, target.client_seq, store, live_broker, event_id
+        )
+    try:
+        latest = store.get_summary(target.trace_id)
+    except FileNotFoundError:
+        return encode_sse_event("heartbeat", {"status": "empty"})
+    return encode_sse_event("trace", {"trace": latest.to_dict()}, event_id)
+
+
+def _delta_snapshot_frame(
+    trace_id: Optional[str],
+    client_seq: Optional[str],
+    store: TraceStore,
+    live_broker: LiveTraceBroker,
+    event_id: int,
+) -> bytes:
+    # Reconnecting clients pass the trace id and last applied seq; a current client
+    # skips the snapshot and resumes on deltas, a stale one is resynced in full.
+    try:
+        if trace_id:
+            validate_input("show_trace", {"trace_id": trace_id})
+            known = live_broker.snapshot(trace_id)
+            trace_payload = known[1] if known else store.get_summary(trace_id).to_dict()
+        else:
+            trace_payload = store.get_summary().to_dict()
+            known = live_broker.snapshot(trace_payload["id"])
+            if known:
+                trace_payload = known[1]
+    except (FileNotFoundError, ValueError):
+        return encode_sse_event("heartbeat", {"status": "empty"})
+    seq = known[0] if known else 0
+    if client_seq is not None and client_seq == str(seq) and trace_id == trace_payload["id"]:
+        return encode_sse_event("heartbeat", {"status": "current", "traceId": trace_id, "seq": seq})
+    return encode_sse_event(
+        "trace.snapshot",
+        {
+            "type": "trace.snapshot",
+            "traceId": trace_payload["id"],
+            "seq": seq,
+            "trace": trace_payload,
+        },
+        event_id,
+    )
+
+
+def parse_last_event_id(raw: Optional[str]) -> Optional[int]:
+    value = (raw or "").strip()
+    if not value.isdigit():
+        return None
+    return int(value)
+
+
+class LoopQueue:
+    """FrameSink that hands frames published from any thread to an asyncio.Queue."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self.queue: asyncio.Queue[bytes] = asyncio.Queue()
+
+    def put_nowait(self, item: bytes) -> None:
+        self._loop.call_soon_threadsafe(self.queue.put_nowait, item)
+
+    def qsize(self) -> int:
+        return self.queue.qsize()
+
+
+class AsyncStreamServer:
+    """Serves /api/stream/... from one event loop; idle clients cost a coroutine, not a thread."""
+
+    def __init__(
+        self,
+        store: TraceStore,
+        live_broker: LiveTraceBroker,
+        gameplay_store: GameplayStore,
+        host: str = DEFAULT_HOST,
+        port: int = 0,
+        heartbeat_interval_s: float = HEARTBEAT_INTERVAL_S,
+    ) -> None:
+        self.store = store
+        self.live_broker = live_broker
+        self.gameplay_store = gameplay_store
+        self.host = host
+        self.port = port
+        self.heartbeat_interval_s = heartbeat_interval_s
+        self._connections: Set[LoopQueue] = set()
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def connection_count(self) -> int:
+        return len(self._connections)
+
+    async def start(self) -> int:
+        self._server = await asyncio.start_server(
+            self._handle, self.host, self.port, limit=MAX_STREAM_REQUEST_BYTES
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        assert self._server is not None
+        heartbeat = asyncio.create_task(self._heartbeat_loop())
+        try:
+            await self._server.serve_forever()
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat_loop(self) -> None:
+        # One timer for every connection; the frame is encoded once per tick and shared.
+        while True:
+            await asyncio.sleep(self.heartbeat_interval_s)
+            frame = encode_sse_event("heartbeat", {"ts": int(time.time())})
+            for sink in list(self._connections):
+                sink.queue.put_nowait(frame)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            head = await asyncio.wait_for(
+                reader.readuntil(b"\r\n\r\n"), timeout=self.heartbeat_interval_s
+            )
+        except asyncio.LimitOverrunError:
+            await self._respond_json(writer, 413, {"error": "Payload too large"})
+            return
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        request_line, *header_lines = head.decode("latin-1").split("\r\n")
+        parts = request_line.split(" ")
+        headers = {
+            name.strip().lower(): value.strip()
+            for name, _, value in (line.partition(":") for line in header_lines if line)
+        }
+        if len(parts) != 3 or parts[0] != "GET":
+            await self._respond_json(writer, 405, {"error": "Method not allowed"})
+            return
+        parsed = urlparse(parts[1])
+        try:
+            target = parse_stream_target(
+                [p for p in parsed.path.split("/") if p], parse_qs(parsed.query)
+            )
+        except ValueError as exc:
+            await self._respond_json(writer, 400, {"error": str(exc)})
+            return
+        if target is None:
+            await self._respond_json(writer, 404, {"error": "Not found"})
+            return
+
+        loop = asyncio.get_running_loop()
+        sink = LoopQueue(loop)
+        # Snapshots read the store, so build them off the loop.
+        last_event_id = parse_last_event_id(headers.get("last-event-id"))
+        if target.kind == "gameplay":
+            opener = partial(
+                open_gameplay_stream, target.key, last_event_id, self.gameplay_store, sink
+            )
+        else:
+            opener = partial(
+                open_trace_stream, target, last_event_id, self.store, self.live_broker, sink
+            )
+        try:
+            stream = await loop.run_in_executor(None, opener)
+        except Exception:
+            await self._respond_json(writer, 500, {"error": "Internal server error"})
+            return
+        self._connections.add(sink)
+        try:
+            writer.write(_status_head(200, STREAM_HEADERS))
+            for frame in stream.initial:
+                writer.write(frame)
+            await writer.drain()
+            while True:
+                writer.write(await sink.queue.get())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            # Also runs on cancellation (server shutdown), which then propagates to the caller.
+            self._connections.discard(sink)
+            stream.close()
+            writer.close()
+
+    async def _respond_json(
+        self, writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any]
+    ) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        writer.write(
+            _status_head(
+                status,
+                {
+                    "Content-Type": "application/json",
+                    "Content-Length": str(len(body)),
+                    "Access-Control-Allow-Origin": "*",
+                },
+            )
+            + body
+        )
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+def _status_head(status: int, headers: Dict[str, str]) -> bytes:
+    lines = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}", "Connection: close"]
+    lines.extend(f"{name}: {value}" for name, value in headers.items())
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+def start_stream_server_thread(
+    store: TraceStore,
+    live_broker: LiveTraceBroker,
+    gameplay_store: GameplayStore,
+    host: str,
+    port: int,
+    heartbeat_interval_s: float = HEARTBEAT_INTERVAL_S,
+) -> AsyncStreamServer:
+    """Run an AsyncStreamServer on its own event loop thread, sharing the threaded server's."""
+    server = AsyncStreamServer(
+        store,
+        live_broker,
+        gameplay_store,
+        host=host,
+        port=port,
+        heartbeat_interval_s=heartbeat_interval_s,
+    )
+    started = threading.Event()
+
+    async def run() -> None:
+        await server.start()
+        started.set()
+        await server.serve_forever()
+
+    threading.Thread(
+        target=lambda: asyncio.run(run()), name="agent-director-streams", daemon=True
+    ).start()
+    started.wait(timeout=10.0)
+    return server
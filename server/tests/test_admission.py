@@ -0,0 +1,72 @@
+import threading
+import time
+import unittest
+
+from server.admission import AdmissionControl, AdmissionGate
+from server.timing import DeadlineExceededError, check_deadline, end_request, start_request
+
+
+class TestAdmissionGate(unittest.TestCase):
+    def test_rejects_once_slots_and_queue_are_full(self) -> None:
+        gate = AdmissionGate("/api/compare", limit=1, queue_depth=0, queue_timeout_s=1.0)
+        self.assertTrue(gate.acquire())
+        started = time.monotonic()
+        self.assertFalse(gate.acquire())
+        self.assertLess(time.monotonic() - started, 0.5)
+        gate.release()
+        self.assertTrue(gate.acquire())
+
+    def test_queued_request_times_out(self) -> None:
+        gate = AdmissionGate("/api/compare", limit=1, queue_depth=1, queue_timeout_s=0.05)
+        self.assertTrue(gate.acquire())
+        self.assertFalse(gate.acquire())
+        self.assertEqual(gate.waiting, 0)
+
+    def test_waiters_are_admitted_in_arrival_order(self) -> None:
+        gate = AdmissionGate("/api/compare", limit=1, queue_depth=3, queue_timeout_s=5.0)
+        self.assertTrue(gate.acquire())
+        order = []
+
+        def worker(name: str) -> None:
+            if gate.acquire():
+                order.append(name)
+                gate.release()
+
+        threads = []
+        for name in ("a", "b", "c"):
+            thread = threading.Thread(target=worker, args=(name,))
+            thread.start()
+            threads.append(thread)
+            deadline = time.monotonic() + 2.0
+            while gate.waiting < len(threads) and time.monotonic() < deadline:
+                time.sleep(0.005)
+        self.assertEqual(gate.waiting, 3)
+        gate.release()
+        for thread in threads:
+            thread.join(timeout=2)
+        self.assertEqual(order, ["a", "b", "c"])
+        self.assertEqual(gate.active, 0)
+
+    def test_control_keeps_one_gate_per_route(self) -> None:
+        control = AdmissionControl(limit=2, queue_depth=4, queue_timeout_s=1.0)
+        self.assertIs(control.gate("/api/compare"), control.gate("/api/compare"))
+        self.assertIsNot(control.gate("/api/compare"), control.gate("/api/replays/merge"))
+        self.assertEqual(control.gate("/api/compare").limit, 2)
+
+
+class TestDeadline(unittest.TestCase):
+    def test_check_deadline_raises_only_inside_an_expired_request(self) -> None:
+        check_deadline()
+        timer = start_request()
+        try:
+            check_deadline()
+            timer.deadline = time.perf_counter() - 1
+            with self.assertRaises(DeadlineExceededError):
+                check_deadline()
+        finally:
+            end_request()
+        check_deadline()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,15 @@
+import gzip
 import json
+import os
 import socket
+import sqlite3
 import threading
 import time
 import unittest
 from http.client import HTTPConnection
 from pathlib import Path
 from tempfile import TemporaryDirectory
+from unittest import mock
 
 import server.main as server_main
 from server.main import ApiHandler
@@ -76,6 +80,24 @@ class TestApi(unittest.TestCase):
         self.assertEqual(status, 200)
         self.assertEqual(len(data["traces"]), 1)
 
+    def test_trace_and_listing_accept_projection_query_parameters(self) -> None:
+        status, data = self._request(
+            "GET", "/api/traces/trace-1?fields=name,steps&step_offset=0&step_limit=1"
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(set(data["trace"]), {"id", "name", "steps", "stepCount"})
+        self.assertEqual((len(data["trace"]["steps"]), data["projection"]["stepLimit"]), (1, 1))
+        status, data = self._request("GET", "/api/traces?summary_only=1")
+        self.assertEqual(status, 200)
+        self.assertEqual((data["traces"][0]["stepCount"], "steps" in data["traces"][0]), (1, False))
+        for path in (
+            "/api/traces/trace-1?step_limit=abc",
+            "/api/traces/trace-1?step_offset=-1",
+            "/api/traces/trace-1?fields=secret",
+            "/api/traces?fields=insights",
+        ):
+            self.assertEqual(self._request("GET", path)[0], 400, path)
+
     def test_create_replay_job_and_get_status(self) -> None:
         status, data = self._request(
             "POST",
@@ -193,6 +215,65 @@ class TestApi(unittest.TestCase):
         conn.close()
         return status, data
 
+    def test_saturated_heavy_route_sheds_with_503(self) -> None:
+        admission = server_main.AdmissionControl(limit=1, queue_depth=0, queue_timeout_s=0.0)
+        self.addCleanup(setattr, ApiHandler, "admission", ApiHandler.admission)
+        ApiHandler.admission = admission
+        gate = admission.gate("/api/compare")
+        self.assertTrue(gate.acquire())
+        payload = {"left_trace_id": "trace-1", "right_trace_id": "trace-1"}
+
+        conn = HTTPConnection("127.0.0.1", self.port)
+        conn.request(
+            "POST",
+            "/api/compare",
+            body=json.dumps(payload),
+            headers={"Content-Type": "application/json"},
+        )
+        resp = conn.getresponse()
+        data = json.loads(resp.read().decode("utf-8"))
+        conn.close()
+        self.assertEqual(resp.status, 503)
+        self.assertEqual(data["error"], "Server busy")
+        self.assertEqual(resp.getheader("Retry-After"), "1")
+        # Other heavy routes have their own slots.
+        self.assertEqual(self._request("GET", "/api/traces/trace-1/investigate")[0], 200)
+
+        gate.release()
+        self.assertEqual(self._request("POST", "/api/compare", payload)[0], 200)
+        # The slot is released after the response is written.
+        deadline = time.monotonic() + 2.0
+        while gate.active and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(gate.active, 0)
+
+    def test_heavy_request_past_deadline_returns_503(self) -> None:
+        self.addCleanup(setattr, ApiHandler, "heavy_deadline_s", ApiHandler.heavy_deadline_s)
+        ApiHandler.heavy_deadline_s = 1e-9
+        status, data = self._request(
+            "POST",
+            "/api/traces/trace-1/replay",
+            {"step_id": "s1", "strategy": "hybrid", "modifications": {}},
+        )
+        self.assertEqual(status, 503)
+        self.assertEqual(data["error"], "Request deadline exceeded")
+        # The replay was abandoned before anything was written.
+        self.assertEqual([item.id for item in self.store.list_traces()], ["trace-1"])
+
+    def test_replay_job_past_deadline_returns_503(self) -> None:
+        self.addCleanup(setattr, ApiHandler, "heavy_deadline_s", ApiHandler.heavy_deadline_s)
+        ApiHandler.heavy_deadline_s = 1e-9
+        status, data = self._request(
+            "POST",
+            "/api/replay-jobs",
+            {"trace_id": "trace-1", "step_id": "s1", "scenarios": [{"strategy": "recorded"}] * 2},
+        )
+        self.assertEqual(status, 503)
+        self.assertEqual(data["error"], "Request deadline exceeded")
+        self.assertEqual([item.id for item in self.store.list_traces()], ["trace-1"])
+        (job,) = ApiHandler.replay_jobs.list()
+        self.assertEqual(job.status, "canceled")
+
     def test_replay_invalid_strategy_returns_400(self) -> None:
         conn = HTTPConnection("127.0.0.1", self.port)
         body = json.dumps({"step_id": "s1", "strategy": "invalid", "modifications": {}})
@@ -277,6 +358,93 @@ class TestApi(unittest.TestCase):
         self.assertEqual(payload.get("error"), "Payload too large")
         conn.close()
 
+    def test_connection_is_reused_across_requests(self) -> None:
+        conn = HTTPConnection("127.0.0.1", self.port)
+        conn.request("GET", "/api/health")
+        resp = conn.getresponse()
+        resp.read()
+        self.assertEqual(resp.version, 11)
+        self.assertIsNone(resp.getheader("Connection"))
+        sock = conn.sock
+
+        conn.request("OPTIONS", "/api/traces")
+        resp = conn.getresponse()
+        self.assertEqual(resp.status, 204)
+        self.assertIsNone(resp.getheader("Content-Length"))
+        resp.read()
+
+        oversized = json.dumps({"note": "x" * 1_100_000})
+        conn.request(
+            "POST", "/api/compare", body=oversized, headers={"Content-Type": "application/json"}
+        )
+        resp = conn.getresponse()
+        resp.read()
+        self.assertEqual(resp.status, 413)
+
+        conn.request("GET", "/api/traces/trace-1/steps/s1")
+        resp = conn.getresponse()
+        resp.read()
+        self.assertEqual(resp.status, 200)
+        self.assertIs(conn.sock, sock)
+        conn.close()
+
+    def test_options_with_body_keeps_connection_in_sync(self) -> None:
+        conn = HTTPConnection("127.0.0.1", self.port)
+        conn.request("GET", "/api/traces/trace-1")
+        resp = conn.getresponse()
+        resp.read()
+        self.assertIsNotNone(resp.getheader("ETag"))
+        sock = conn.sock
+
+        conn.request("OPTIONS", "/api/traces/trace-1", body='{"probe": true}')
+        resp = conn.getresponse()
+        resp.read()
+        self.assertEqual(resp.status, 204)
+        self.assertEqual(resp.getheader("Cache-Control"), "no-store")
+        self.assertIsNone(resp.getheader("Connection"))
+
+        conn.request("GET", "/api/health")
+        resp = conn.getresponse()
+        self.assertEqual(json.loads(resp.read()), {"status": "ok"})
+        self.assertIs(conn.sock, sock)
+        conn.close()
+
+    def test_unread_body_and_request_cap_close_the_connection(self) -> None:
+        conn = HTTPConnection("127.0.0.1", self.port)
+        conn.request("POST", "/api/compare", body="{}", headers={"Content-Type": "text/plain"})
+        resp = conn.getresponse()
+        resp.read()
+        self.assertEqual(resp.status, 415)
+        self.assertEqual(resp.getheader("Connection"), "close")
+        conn.close()
+
+        server_main.ApiHandler.max_requests_per_connection = 2
+        try:
+            conn = HTTPConnection("127.0.0.1", self.port)
+            for expected in (None, "close"):
+                conn.request("GET", "/api/health")
+                resp = conn.getresponse()
+                resp.read()
+                self.assertEqual(resp.getheader("Connection"), expected)
+            conn.close()
+        finally:
+            server_main.ApiHandler.max_requests_per_connection = (
+                server_main.DEFAULT_MAX_KEEP_ALIVE_REQUESTS
+            )
+
+    def test_idle_keep_alive_connection_times_out(self) -> None:
+        server_main.ApiHandler.timeout = 0.3
+        try:
+            with socket.create_connection(("127.0.0.1", self.port), timeout=2) as sock:
+                sock.sendall(b"GET /api/health HTTP/1.1\r\nHost: localhost\r\n\r\n")
+                response = b""
+                while b'"ok"' not in response:
+                    response += sock.recv(4096)
+                time.sleep(0.6)
+                self.assertEqual(sock.recv(4096), b"")
+        finally:
+            server_main.ApiHandler.timeout = server_main.DEFAULT_KEEP_ALIVE_TIMEOUT_S
+
     def test_internal_error_is_sanitized(self) -> None:
         original_compare_execute = server_main.compare_execute
 
@@ -297,6 +465,101 @@ class TestApi(unittest.TestCase):
         finally:
             server_main.compare_execute = original_compare_execute
 
+    def test_large_responses_are_gzip_encoded_when_accepted(self) -> None:
+        server_main.ApiHandler.compression_min_bytes = 64
+        try:
+            conn = HTTPConnection("127.0.0.1", self.port)
+            conn.request("GET", "/api/traces/trace-1", headers={"Accept-Encoding": "gzip"})
+            resp = conn.getresponse()
+            raw = resp.read()
+            self.assertEqual(resp.status, 200)
+            self.assertEqual(resp.getheader("Content-Encoding"), "gzip")
+            self.assertEqual(resp.getheader("Vary"), "Accept-Encoding")
+            self.assertEqual(int(resp.getheader("Content-Length")), len(raw))
+            self.assertEqual(json.loads(gzip.decompress(raw))["trace"]["id"], "trace-1")
+
+            conn.request("GET", "/api/traces/trace-1", headers={"Accept-Encoding": "gzip;q=0"})
+            resp = conn.getresponse()
+            self.assertIsNone(resp.getheader("Content-Encoding"))
+            self.assertEqual(json.loads(resp.read())["trace"]["id"], "trace-1")
+
+            conn.request("GET", "/api/health", headers={"Accept-Encoding": "gzip"})
+            resp = conn.getresponse()
+            self.assertIsNone(resp.getheader("Content-Encoding"))
+            self.assertEqual(json.loads(resp.read()), {"status": "ok"})
+            conn.close()
+        finally:
+            server_main.ApiHandler.compression_min_bytes = server_main.DEFAULT_COMPRESSION_MIN_BYTES
+
+    def test_trace_and_step_responses_revalidate_with_etag(self) -> None:
+        conn = HTTPConnection("127.0.0.1", self.port)
+        for path in ("/api/traces/trace-1", "/api/traces/trace-1/steps/s1"):
+            conn.request("GET", path)
+            resp = conn.getresponse()
+            resp.read()
+            etag = resp.getheader("ETag")
+            self.assertEqual(resp.status, 200)
+            self.assertTrue(etag and etag.startswith('"'))
+            self.assertEqual(resp.getheader("Cache-Control"), "private, no-cache")
+
+            conn.request("GET", path, headers={"If-None-Match": f'W/"other", {etag}'})
+            resp = conn.getresponse()
+            self.assertEqual(resp.status, 304)
+            self.assertEqual(resp.read(), b"")
+            self.assertEqual(resp.getheader("ETag"), etag)
+
+            conn.request("GET", path, headers={"If-None-Match": '"stale"'})
+            resp = conn.getresponse()
+            resp.read()
+            self.assertEqual(resp.status, 200)
+        conn.close()
+
+    def test_replay_traces_are_revalidated(self) -> None:
+        status, data = self._request(
+            "POST",
+            "/api/traces/trace-1/replay",
+            {"step_id": "s1", "strategy": "recorded", "modifications": {}},
+        )
+        self.assertEqual(status, 200)
+        conn = HTTPConnection("127.0.0.1", self.port)
+        conn.request("GET", f"/api/traces/{data['trace']['id']}")
+        resp = conn.getresponse()
+        resp.read()
+        # Replay jobs can re-ingest a trace under the same replay id, so it is never immutable.
+        self.assertEqual(resp.getheader("Cache-Control"), "private, no-cache")
+        self.assertIsNotNone(resp.getheader("ETag"))
+        conn.request("GET", "/api/traces")
+        resp = conn.getresponse()
+        resp.read()
+        self.assertEqual(resp.getheader("Cache-Control"), "no-store")
+        self.assertIsNone(resp.getheader("ETag"))
+        conn.close()
+
+    def test_encoded_responses_get_distinct_etags(self) -> None:
+        server_main.ApiHandler.compression_min_bytes = 64
+        try:
+            conn = HTTPConnection("127.0.0.1", self.port)
+            conn.request("GET", "/api/traces/trace-1")
+            resp = conn.getresponse()
+            resp.read()
+            identity_etag = resp.getheader("ETag")
+            conn.request("GET", "/api/traces/trace-1", headers={"Accept-Encoding": "gzip"})
+            resp = conn.getresponse()
+            resp.read()
+            gzip_etag = resp.getheader("ETag")
+            self.assertEqual(gzip_etag, identity_etag[:-1] + '-gzip"')
+            conn.request(
+                "GET",
+                "/api/traces/trace-1",
+                headers={"Accept-Encoding": "gzip", "If-None-Match": identity_etag},
+            )
+            resp = conn.getresponse()
+            resp.read()
+            self.assertEqual(resp.status, 200)
+            conn.close()
+        finally:
+            server_main.ApiHandler.compression_min_bytes = server_main.DEFAULT_COMPRESSION_MIN_BYTES
+
     def test_health_response_includes_security_headers(self) -> None:
         conn = HTTPConnection("127.0.0.1", self.port)
         conn.request("GET", "/api/health")
@@ -309,6 +572,277 @@ class TestApi(unittest.TestCase):
         self.assertEqual(resp.getheader("Cache-Control"), "no-store")
         conn.close()
 
+    def test_metrics_endpoint_reports_request_latency_and_stream_gauges(self) -> None:
+        ApiHandler.gameplay_store = server_main.GameplayStore(Path(self.temp_dir.name) / "gameplay")
+        self.assertEqual(self._request("GET", "/api/traces/trace-1")[0], 200)
+
+        conn = HTTPConnection("127.0.0.1", self.port)
+        conn.request("GET", "/api/metrics")
+        resp = conn.getresponse()
+        text = resp.read().decode("utf-8")
+        conn.close()
+        self.assertEqual(resp.status, 200)
+        self.assertTrue(resp.getheader("Content-Type").startswith("text/plain; version=0.0.4"))
+        self.assertIn("# TYPE agent_director_http_request_duration_seconds histogram", text)
+        self.assertIn(
+            "agent_director_http_request_duration_seconds_count"
+            '{route="/api/traces/{trace_id}",method="GET",status="200"}',
+            text,
+        )
+        self.assertIn('agent_director_sse_subscribers{stream="trace"} 0', text)
+        self.assertIn("agent_director_store_summary_load_seconds_count", text)
+
+    def test_server_timing_header_breaks_down_trace_phases(self) -> None:
+        conn = HTTPConnection("127.0.0.1", self.port)
+        conn.request("GET", "/api/traces/trace-1")
+        resp = conn.getresponse()
+        resp.read()
+        conn.close()
+        self.assertEqual(resp.status, 200)
+        timing = resp.getheader("Server-Timing")
+        phases = {entry.split(";")[0].strip() for entry in timing.split(",")}
+        self.assertTrue(
+            {"read", "parse", "insights", "validate", "serialize", "total"} <= phases, timing
+        )
+        self.assertEqual(resp.getheader("Timing-Allow-Origin"), "*")
+
+    def test_slow_request_log_reports_phases(self) -> None:
+        ApiHandler.slow_request_ms = 0.001
+        try:
+            with self.assertLogs("agent_director.slow_requests", level="WARNING") as logs:
+                self.assertEqual(self._request("GET", "/api/traces/trace-1/steps/s1")[0], 200)
+                # The log line is written after the response is flushed, so give the handler a
+                # moment.
+                deadline = time.monotonic() + 2.0
+                while not logs.records and time.monotonic() < deadline:
+                    time.sleep(0.01)
+        finally:
+            ApiHandler.slow_request_ms = server_main.DEFAULT_SLOW_REQUEST_MS
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record["route"], "/api/traces/{trace_id}/steps/{step_id}")
+        self.assertEqual(record["status"], 200)
+        self.assertIn("redact", record["phasesMs"])
+
+    def test_debug_profile_is_disabled_without_token_and_requires_it_when_set(self) -> None:
+        self.assertEqual(self._request("GET", "/api/debug/profile?seconds=0.01")[0], 404)
+        ApiHandler.profiling_token = "s3cret"
+        try:
+            self.assertEqual(self._request("GET", "/api/debug/profile?seconds=0.01")[0], 403)
+            conn = HTTPConnection("127.0.0.1", self.port)
+            conn.request(
+                "GET",
+                "/api/debug/profile?seconds=0.05&interval_ms=5&format=speedscope",
+                headers={"Authorization": "Bearer s3cret"},
+            )
+            resp = conn.getresponse()
+            payload = json.loads(resp.read().decode("utf-8"))
+            conn.close()
+            self.assertEqual(resp.status, 200)
+            self.assertIn("profiles", payload)
+
+            conn = HTTPConnection("127.0.0.1", self.port)
+            conn.request(
+                "POST",
+                "/api/debug/memory",
+                body=json.dumps({"stop": True}),
+                headers={"Authorization": "Bearer s3cret", "Content-Type": "application/json"},
+            )
+            resp = conn.getresponse()
+            self.assertEqual(json.loads(resp.read().decode("utf-8")), {"tracing": False})
+            conn.close()
+        finally:
+            ApiHandler.profiling_token = None
+
+    def test_large_trace_and_listing_stream_as_chunked_json(self) -> None:
+        expected_trace = self._request("GET", "/api/traces/trace-1")[1]
+        expected_listing = self._request("GET", "/api/traces")[1]
+        ApiHandler.stream_json_min_steps = 1
+        try:
+            conn = HTTPConnection("127.0.0.1", self.port)
+            conn.request("GET", "/api/traces/trace-1")
+            resp = conn.getresponse()
+            body = resp.read()
+            self.assertEqual(resp.status, 200)
+            self.assertEqual(resp.getheader("Transfer-Encoding"), "chunked")
+            self.assertIsNone(resp.getheader("Content-Length"))
+            etag = resp.getheader("ETag")
+            self.assertIsNotNone(etag)
+            self.assertEqual(json.loads(body), expected_trace)
+
+            conn.request("GET", "/api/traces/trace-1", headers={"If-None-Match": etag})
+            resp = conn.getresponse()
+            self.assertEqual((resp.status, resp.read()), (304, b""))
+            self.assertEqual(resp.getheader("ETag"), etag)
+            conn.request(
+                "GET",
+                "/api/traces/trace-1",
+                headers={"If-None-Match": etag, "Accept-Encoding": "gzip"},
+            )
+            resp = conn.getresponse()
+            resp.read()
+            self.assertEqual(resp.status, 200)
+            self.assertEqual(resp.getheader("ETag"), f'{etag[:-1]}-gzip"')
+            ApiHandler.store.ingest_trace(ApiHandler.store.get_summary("trace-1"))
+            conn.request("GET", "/api/traces/trace-1", headers={"If-None-Match": etag})
+            resp = conn.getresponse()
+            self.assertEqual(json.loads(resp.read()), expected_trace)
+            self.assertNotEqual(resp.getheader("ETag"), etag)
+
+            conn.request("GET", "/api/traces", headers={"Accept-Encoding": "gzip"})
+            resp = conn.getresponse()
+            body = resp.read()
+            self.assertEqual(resp.getheader("Content-Encoding"), "gzip")
+            self.assertEqual(json.loads(gzip.decompress(body)), expected_listing)
+            conn.close()
+        finally:
+            ApiHandler.stream_json_min_steps = server_main.DEFAULT_STREAM_JSON_MIN_STEPS
+
+    def test_step_details_batch_returns_map_and_audits_in_one_transaction(self) -> None:
+        status, data = self._request(
+            "POST",
+            "/api/traces/trace-1/steps/batch",
+            {"step_ids": ["s1", "nope"], "role": "viewer"},
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(set(data["steps"]), {"s1"})
+        self.assertNotIn("sk-abc1234567890", json.dumps(data["steps"]["s1"]))
+        self.assertIn("nope", data["errors"])
+        with sqlite3.connect(self.store.db_path) as conn:
+            rows = conn.execute(
+                "SELECT stepId, action FROM redaction_events WHERE traceId = ?", ("trace-1",)
+            ).fetchall()
+        self.assertEqual(rows, [("s1", "view_step")])
+
+        status, data = self._request("POST", "/api/traces/trace-1/steps/batch", {"step_ids": "s1"})
+        self.assertEqual(status, 400)
+
+    def test_ingest_accepts_chunked_gzip_ndjson(self) -> None:
+        lines = [
+            {
+                "id": "ingest-1",
+                "name": "Ingest",
+                "startedAt": "2026-01-27T10:00:00.000Z",
+                "status": "completed",
+                "metadata": {
+                    "source": "manual",
+                    "agentName": "A",
+                    "modelId": "demo",
+                    "wallTimeMs": 1,
+                },
+            },
+            {
+                "record": "step",
+                "id": "a",
+                "index": 0,
+                "type": "llm_call",
+                "name": "a",
+                "startedAt": "2026-01-27T10:00:00.000Z",
+                "data": {"prompt": "hi"},
+            },
+        ]
+        compressed = gzip.compress(b"".join(json.dumps(line).encode() + b"\n" for line in lines))
+        conn = HTTPConnection("127.0.0.1", self.port)
+        conn.request(
+            "POST",
+            "/api/traces",
+            body=iter([compressed[:20], compressed[20:]]),
+            headers={"Content-Type": "application/x-ndjson", "Content-Encoding": "gzip"},
+            encode_chunked=True,
+        )
+        resp = conn.getresponse()
+        data = json.loads(resp.read())
+        self.assertEqual(resp.status, 201, data)
+        self.assertEqual(data["trace"], {"id": "ingest-1", "stepCount": 1, "detailCount": 1})
+        self.assertEqual(self._request("GET", "/api/traces/ingest-1/steps/a")[0], 200)
+
+        conn.request(
+            "POST", "/api/traces", body=b"{}", headers={"Content-Type": "application/json"}
+        )
+        resp = conn.getresponse()
+        resp.read()
+        self.assertEqual(resp.status, 415)
+        conn.close()
+
+        ApiHandler.max_ingest_bytes = 10
+        try:
+            conn = HTTPConnection("127.0.0.1", self.port)
+            conn.request(
+                "POST",
+                "/api/traces",
+                body=b"x" * 100,
+                headers={"Content-Type": "application/x-ndjson"},
+            )
+            resp = conn.getresponse()
+            resp.read()
+            self.assertEqual(resp.status, 413)
+            conn.close()
+        finally:
+            ApiHandler.max_ingest_bytes = server_main.DEFAULT_MAX_INGEST_BYTES
+
+    def test_running_trace_append_update_and_finalize(self) -> None:
+        header = {
+            "id": "live-1",
+            "name": "Live",
+            "startedAt": "2026-01-27T10:00:00.000Z",
+            "status": "running",
+            "metadata": {"source": "manual", "agentName": "A", "modelId": "demo", "wallTimeMs": 0},
+        }
+        conn = HTTPConnection("127.0.0.1", self.port)
+        conn.request(
+            "POST",
+            "/api/traces",
+            body=json.dumps(header),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        resp = conn.getresponse()
+        resp.read()
+        conn.close()
+        self.assertEqual(resp.status, 201)
+        token, queue = ApiHandler.live_broker.subscribe("delta", "trace:live-1")
+        try:
+            step = {
+                "id": "a",
+                "index": 0,
+                "type": "llm_call",
+                "name": "a",
+                "startedAt": "2026-01-27T10:00:00.000Z",
+            }
+            status, data = self._request(
+                "POST", "/api/traces/live-1/steps", {"step": step, "data": {"prompt": "hi"}}
+            )
+            self.assertEqual(status, 201, data)
+            self.assertEqual(
+                self._request("POST", "/api/traces/live-1/steps", {"step": step})[0], 400
+            )
+            status, _ = self._request(
+                "POST",
+                "/api/traces/live-1/steps/a/update",
+                {"step": {**step, "status": "completed"}},
+            )
+            self.assertEqual(status, 200)
+            self.assertEqual(
+                self._request("GET", "/api/traces/live-1")[1]["trace"]["steps"][0]["status"],
+                "completed",
+            )
+            self.assertEqual(
+                self._request("GET", "/api/traces/live-1/steps/a")[1]["step"]["data"],
+                {"prompt": "hi"},
+            )
+            status, data = self._request(
+                "POST", "/api/traces/live-1/finalize", {"status": "completed"}
+            )
+            self.assertEqual((status, data["trace"]["stepCount"]), (200, 1))
+            self.assertEqual(
+                self._request("POST", "/api/traces/live-1/steps", {"step": {**step, "id": "b"}})[0],
+                400,
+            )
+            # The ingest published the base payload, so the append, update and finalize arrive as
+            # deltas.
+            events = [queue.get(timeout=1).split(b"\n", 1)[0] for _ in range(3)]
+            self.assertEqual(events, [b"event: trace.delta"] * 3)
+        finally:
+            ApiHandler.live_broker.unsubscribe(token)
+
     def test_post_requires_json_content_type(self) -> None:
         conn = HTTPConnection("127.0.0.1", self.port)
         body = json.dumps({"left_trace_id": "trace-1", "right_trace_id": "trace-1"})
@@ -440,6 +974,63 @@ class TestApi(unittest.TestCase):
         self.assertEqual(payload["trace"]["id"], "trace-1")
         conn.close()
 
+    def test_stream_latest_trace_delta_mode_starts_with_snapshot(self) -> None:
+        conn = HTTPConnection("127.0.0.1", self.port, timeout=2)
+        conn.request("GET", "/api/stream/traces/latest?mode=delta")
+        resp = conn.getresponse()
+        self.assertEqual(resp.status, 200)
+
+        event_line = resp.fp.readline().decode("utf-8").strip()
+        data_line = resp.fp.readline().decode("utf-8").strip()
+
+        self.assertEqual(event_line, "event: trace.snapshot")
+        payload = json.loads(data_line[len("data: ") :])
+        self.assertEqual(payload["traceId"], "trace-1")
+        self.assertEqual(payload["seq"], 0)
+        self.assertEqual(payload["trace"]["id"], "trace-1")
+        conn.close()
+
+    def test_stream_latest_trace_resumes_from_last_event_id(self) -> None:
+        ApiHandler.live_broker.subscribe()
+        ApiHandler.live_broker.publish_trace(self.store.get_summary("trace-1"))
+
+        conn = HTTPConnection("127.0.0.1", self.port, timeout=2)
+        conn.request("GET", "/api/stream/traces/latest", headers={"Last-Event-ID": "0"})
+        resp = conn.getresponse()
+        self.assertEqual(resp.status, 200)
+
+        event_line = resp.fp.readline().decode("utf-8").strip()
+        data_line = resp.fp.readline().decode("utf-8").strip()
+        id_line = resp.fp.readline().decode("utf-8").strip()
+
+        self.assertEqual(event_line, "event: trace")
+        self.assertEqual(id_line, "id: 1")
+        self.assertIn("publishedAt", json.loads(data_line[len("data: ") :]))
+        conn.close()
+
+    def test_stream_trace_topic_emits_that_trace(self) -> None:
+        conn = HTTPConnection("127.0.0.1", self.port, timeout=2)
+        conn.request("GET", "/api/stream/traces/trace-1")
+        resp = conn.getresponse()
+        self.assertEqual(resp.status, 200)
+
+        event_line = resp.fp.readline().decode("utf-8").strip()
+        data_line = resp.fp.readline().decode("utf-8").strip()
+
+        self.assertEqual(event_line, "event: trace")
+        self.assertEqual(json.loads(data_line[len("data: ") :])["trace"]["id"], "trace-1")
+        conn.close()
+
+    def test_stream_trace_topic_rejects_unknown_scope(self) -> None:
+        status, data = self._request("GET", "/api/stream/traces/trace-1?scope=team")
+        self.assertEqual(status, 400)
+        self.assertIn("scope", data["error"])
+
+    def test_stream_latest_trace_rejects_unknown_mode(self) -> None:
+        status, data = self._request("GET", "/api/stream/traces/latest?mode=binary")
+        self.assertEqual(status, 400)
+        self.assertIn("mode", data["error"])
+
     def test_trace_query_returns_matched_step_ids(self) -> None:
         conn = HTTPConnection("127.0.0.1", self.port)
         body = json.dumps({"query": "type=llm_call and duration_ms>=1000"})
@@ -567,5 +1158,16 @@ class TestApi(unittest.TestCase):
         conn.close()
 
 
+
+class TestMain(unittest.TestCase):
+    def test_asgi_mode_refuses_multiple_workers(self) -> None:
+        env = {"AGENT_DIRECTOR_SERVER": "asgi", "AGENT_DIRECTOR_WORKERS": "2"}
+        with mock.patch.dict(os.environ, env):
+            with mock.patch.object(server_main, "serve_stdlib") as serve:
+                with self.assertRaisesRegex(SystemExit, "AGENT_DIRECTOR_WORKERS"):
+                    server_main.main()
+        serve.assert_not_called()
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,201 @@
+import asyncio
+import json
+import threading
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import server.main as server_main
+from server.asgi import AsgiApp
+from server.main import ApiHandler
+from server.replay.jobs import ReplayJobStore
+from server.trace.schema import StepSummary, TraceMetadata, TraceSummary
+from server.trace.store import TraceStore
+
+
+def _trace(trace_id: str) -> TraceSummary:
+    return TraceSummary(
+        id=trace_id,
+        name="ASGI test",
+        startedAt="2026-01-27T10:00:00.000Z",
+        endedAt="2026-01-27T10:00:01.000Z",
+        status="completed",
+        metadata=TraceMetadata(
+            source="manual", agentName="TestAgent", modelId="demo", wallTimeMs=1000
+        ),
+        steps=[
+            StepSummary(
+                id="s1",
+                index=0,
+                type="llm_call",
+                name="plan",
+                startedAt="2026-01-27T10:00:00.000Z",
+                endedAt="2026-01-27T10:00:01.000Z",
+                durationMs=1000,
+            )
+        ],
+    )
+
+
+def _scope(method: str, path: str, query: str = "", headers: list | None = None) -> dict:
+    return {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": query.encode("latin-1"),
+        "headers": headers or [],
+        "client": ("127.0.0.1", 50000),
+    }
+
+
+async def _call(app: AsgiApp, scope: dict, body: bytes = b"") -> tuple[int, dict, bytes]:
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+    async def receive() -> dict:
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    sent: list[dict] = []
+
+    async def send(message: dict) -> None:
+        sent.append(message)
+
+    await app(scope, receive, send)
+    headers = {name.decode(): value.decode() for name, value in sent[0]["headers"]}
+    return sent[0]["status"], headers, b"".join(message.get("body", b"") for message in sent[1:])
+
+
+class TestAsgiApp(unittest.TestCase):
+    def setUp(self) -> None:
+        ApiHandler.rate_limit_max_requests = 500
+        ApiHandler.clear_rate_limit_state()
+        self.temp_dir = TemporaryDirectory()
+        ApiHandler.store = TraceStore(Path(self.temp_dir.name))
+        ApiHandler.store.ingest_trace(_trace("trace-1"))
+        ApiHandler.replay_jobs = ReplayJobStore()
+        ApiHandler.live_broker = server_main.LiveTraceBroker()
+        ApiHandler.extension_registry = server_main.ExtensionRegistry()
+        self.app = AsgiApp(heavy_workers=1, heavy_queue_depth=0, heartbeat_interval_s=0.1)
+
+    def tearDown(self) -> None:
+        self.app.close()
+        self.temp_dir.cleanup()
+
+    def test_cheap_routes_share_handler_logic(self) -> None:
+        status, headers, body = asyncio.run(_call(self.app, _scope("GET", "/api/traces/trace-1")))
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)["trace"]["id"], "trace-1")
+        self.assertIn("etag", headers)
+        self.assertNotIn("connection", headers)
+
+        status, _, body = asyncio.run(_call(self.app, _scope("GET", "/api/missing")))
+        self.assertEqual(status, 404)
+
+    def test_store_routes_run_off_the_event_loop(self) -> None:
+        threads: set[str] = set()
+        original = server_main.show_payload
+
+        def recording_payload(*args: object) -> dict:
+            threads.add(threading.current_thread().name)
+            return original(*args)
+
+        server_main.show_payload = recording_payload
+        try:
+            status, _, _ = asyncio.run(_call(self.app, _scope("GET", "/api/traces/trace-1")))
+        finally:
+            server_main.show_payload = original
+        self.assertEqual(status, 200)
+        self.assertTrue(threads)
+        self.assertTrue(all(name.startswith("agent-director-worker") for name in threads))
+
+        status, _, body = asyncio.run(_call(self.app, _scope("GET", "/api/health")))
+        self.assertEqual((status, json.loads(body)), (200, {"status": "ok"}))
+
+    def test_chunked_json_is_forwarded_chunk_by_chunk(self) -> None:
+        _, _, expected = asyncio.run(_call(self.app, _scope("GET", "/api/traces")))
+        self.addCleanup(
+            setattr, ApiHandler, "stream_json_min_steps", ApiHandler.stream_json_min_steps
+        )
+        ApiHandler.stream_json_min_steps = 1
+        sent: list[dict] = []
+
+        async def run() -> None:
+            async def receive() -> dict:
+                return {"type": "http.request", "body": b"", "more_body": False}
+
+            async def send(message: dict) -> None:
+                sent.append(message)
+
+            await self.app(_scope("GET", "/api/traces"), receive, send)
+
+        asyncio.run(run())
+        self.assertEqual(sent[0]["type"], "http.response.start")
+        self.assertNotIn(b"content-length", dict(sent[0]["headers"]))
+        self.assertTrue(all(message.get("more_body") for message in sent[1:-1]))
+        self.assertFalse(sent[-1].get("more_body", False))
+        self.assertGreater(len(sent), 2)
+        body = b"".join(message.get("body", b"") for message in sent[1:])
+        self.assertEqual(json.loads(body), json.loads(expected))
+
+    def test_heavy_routes_run_on_pool_and_shed_load_when_full(self) -> None:
+        request = json.dumps({"left_trace_id": "trace-1", "right_trace_id": "trace-1"}).encode()
+        headers = [(b"content-type", b"application/json")]
+        threads: set[str] = set()
+        original = server_main.compare_execute
+
+        def recording_compare(*args: object) -> dict:
+            threads.add(threading.current_thread().name)
+            return original(*args)
+
+        server_main.compare_execute = recording_compare
+        try:
+            status, _, body = asyncio.run(
+                _call(self.app, _scope("POST", "/api/compare", headers=headers), request)
+            )
+        finally:
+            server_main.compare_execute = original
+        self.assertEqual(status, 200, body)
+        self.assertTrue(all(name.startswith("agent-director-heavy") for name in threads))
+
+        self.app.heavy_in_flight = 1
+        status, headers_out, body = asyncio.run(
+            _call(self.app, _scope("POST", "/api/compare", headers=headers), request)
+        )
+        self.assertEqual(status, 503)
+        self.assertEqual(headers_out["retry-after"], "1")
+
+    def test_oversized_body_is_rejected_while_reading(self) -> None:
+        status, _, body = asyncio.run(
+            _call(
+                self.app, _scope("POST", "/api/compare"), b"x" * (server_main.MAX_REQUEST_BYTES + 1)
+            )
+        )
+        self.assertEqual(status, 413)
+
+    def test_stream_route_sends_snapshot_then_heartbeat(self) -> None:
+        async def run() -> list[dict]:
+            sent: list[dict] = []
+            disconnect = asyncio.Event()
+
+            async def receive() -> dict:
+                await disconnect.wait()
+                return {"type": "http.disconnect"}
+
+            async def send(message: dict) -> None:
+                sent.append(message)
+                if sum(1 for item in sent if item["type"] == "http.response.body") >= 2:
+                    disconnect.set()
+
+            await asyncio.wait_for(
+                self.app(_scope("GET", "/api/stream/traces/latest"), receive, send), 5
+            )
+            return sent
+
+        sent = asyncio.run(run())
+        self.assertEqual(sent[0]["status"], 200)
+        self.assertIn(b"event: trace", sent[1]["body"])
+        self.assertIn(b"event: heartbeat", sent[2]["body"])
+        self.assertEqual(ApiHandler.live_broker.subscriber_count(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
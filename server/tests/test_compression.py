@@ -0,0 +1,44 @@
+import gzip
+import unittest
+
+from server.compression import (
+    StreamCompressor,
+    accepts_encoding,
+    compress,
+    decompress,
+    negotiate_encoding,
+)
+
+
+class TestCompression(unittest.TestCase):
+    def test_negotiation_honors_q_values_and_wildcards(self) -> None:
+        self.assertIsNone(negotiate_encoding(None))
+        self.assertIsNone(negotiate_encoding("identity"))
+        self.assertIsNone(negotiate_encoding("gzip;q=0"))
+        self.assertEqual(negotiate_encoding("deflate, gzip;q=0.5"), "gzip")
+        self.assertEqual(negotiate_encoding("*"), negotiate_encoding("br, gzip"))
+        self.assertTrue(accepts_encoding("GZIP", "gzip"))
+        self.assertFalse(accepts_encoding("br", "gzip"))
+
+    def test_gzip_round_trip_is_deterministic(self) -> None:
+        body = b'{"steps": ' + b'{"type": "llm_call"},' * 200 + b"}"
+        first = compress(body, "gzip", gzip_level=9)
+        self.assertEqual(first, compress(body, "gzip", gzip_level=9))
+        self.assertLess(len(first), len(body) // 10)
+        self.assertEqual(gzip.decompress(first), body)
+        self.assertEqual(decompress(first, "gzip"), body)
+        with self.assertRaises(ValueError):
+            compress(body, "zstd")
+
+    def test_stream_compressor_produces_one_gzip_member(self) -> None:
+        compressor = StreamCompressor("gzip", gzip_level=6)
+        parts = [compressor.compress(b'{"index": %d}, ' % index) for index in range(500)]
+        parts.append(compressor.finish())
+        expected = b"".join(b'{"index": %d}, ' % index for index in range(500))
+        self.assertEqual(gzip.decompress(b"".join(parts)), expected)
+        with self.assertRaises(ValueError):
+            StreamCompressor("zstd")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -104,6 +104,39 @@ class TestGameplayApi(unittest.TestCase):
         self.assertEqual(len(data["session"]["players"]), 5)
         self.assertIn("obj-root-cause", [o["id"] for o in data["session"]["raid"]["objectives"]])
 
+    def test_session_etag_follows_version(self) -> None:
+        status, data = self._request(
+            "POST",
+            "/api/gameplay/sessions",
+            {"trace_id": "trace-1", "host_player_id": "host", "name": "Raid Cached"},
+        )
+        session_id = data["session"]["id"]
+        conn = HTTPConnection("127.0.0.1", self.port)
+        conn.request("GET", f"/api/gameplay/sessions/{session_id}")
+        resp = conn.getresponse()
+        resp.read()
+        etag = resp.getheader("ETag")
+        self.assertIsNotNone(etag)
+
+        conn.request("GET", f"/api/gameplay/sessions/{session_id}", headers={"If-None-Match": etag})
+        resp = conn.getresponse()
+        resp.read()
+        self.assertEqual(resp.status, 304)
+
+        status, _ = self._request(
+            "POST",
+            f"/api/gameplay/sessions/{session_id}/join",
+            {"player_id": "p2", "role": "analyst"},
+        )
+        self.assertEqual(status, 200)
+        conn.request("GET", f"/api/gameplay/sessions/{session_id}", headers={"If-None-Match": etag})
+        resp = conn.getresponse()
+        data = json.loads(resp.read())
+        self.assertEqual(resp.status, 200)
+        self.assertNotEqual(resp.getheader("ETag"), etag)
+        self.assertEqual(len(data["session"]["players"]), 2)
+        conn.close()
+
     def test_matchmaking_joins_existing_session_or_creates_one(self) -> None:
         status, data = self._request(
             "POST",
@@ -93,6 +93,26 @@ class TestGameplayStore(unittest.TestCase):
             self.assertGreaterEqual(int(mission["quality_score"]), 25)
             self.assertLessEqual(int(mission["repetition_penalty"]), 72)
 
+    def test_resume_replays_session_events_after_last_event_id(self) -> None:
+        with TemporaryDirectory() as tmp:
+            store = GameplayStore(Path(tmp))
+            session_id = store.create_session("trace-seed-1", "host", "Resume")["id"]
+            subscription = store.subscribe(session_id)
+            store.join_session(session_id, "guest", "analyst")
+            first = subscription.queue.get_nowait()
+            store.unsubscribe(session_id, subscription.token)
+
+            store.leave_session(session_id, "guest")
+            first_id = int(first.decode("utf-8").strip().split("\n")[-1][len("id: ") :])
+            resumed = store.resume(session_id, first_id)
+
+            self.assertIsNotNone(resumed)
+            missed = resumed.queue.get_nowait().decode("utf-8")
+            self.assertIn("session.leave", missed)
+            self.assertTrue(resumed.queue.empty())
+            self.assertIsNone(store.resume(session_id, store.last_event_id + 1))
+            self.assertIsNone(store.resume("missing-session", 0))
+
 
 if __name__ == "__main__":
     unittest.main()
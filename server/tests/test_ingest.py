@@ -0,0 +1,135 @@
+import gzip
+import json
+import unittest
+from io import BytesIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from server.request_body import BodyTooLargeError, iter_decoded, iter_lines, iter_request_body
+from server.trace.ingest import ingest_ndjson
+from server.trace.store import TraceStore
+
+
+def _ndjson(steps: int, trace_id: str = "ingested") -> list[bytes]:
+    lines = [
+        {
+            "id": trace_id,
+            "name": "Ingested",
+            "startedAt": "2026-01-27T10:00:00.000Z",
+            "endedAt": "2026-01-27T10:00:05.000Z",
+            "status": "completed",
+            "metadata": {
+                "source": "manual",
+                "agentName": "Agent",
+                "modelId": "demo",
+                "wallTimeMs": 5000,
+            },
+        }
+    ]
+    for index in range(steps):
+        lines.append(
+            {
+                "record": "step",
+                "id": f"s{index}",
+                "index": index,
+                "type": "tool_call",
+                "name": f"step {index}",
+                "startedAt": "2026-01-27T10:00:00.000Z",
+                "endedAt": "2026-01-27T10:00:01.000Z",
+                "data": {"output": "x" * 100},
+            }
+        )
+    lines.append({"record": "details", "id": "s0", "data": {"output": "replaced"}})
+    return [json.dumps(line).encode("utf-8") + b"\n" for line in lines]
+
+
+class TestRequestBody(unittest.TestCase):
+    def test_chunked_gzip_body_decodes_to_lines(self) -> None:
+        payload = b"".join(_ndjson(50))
+        compressed = gzip.compress(payload[:3000]) + gzip.compress(payload[3000:])
+        framed = b"".join(
+            b"%x\r\n%s\r\n"
+            % (len(compressed[offset : offset + 700]), compressed[offset : offset + 700])
+            for offset in range(0, len(compressed), 700)
+        )
+        rfile = BytesIO(framed + b"0\r\n\r\n")
+        chunks = iter_request_body(rfile, {"Transfer-Encoding": "chunked"}, 1 << 20)
+        lines = list(iter_lines(iter_decoded(chunks, "gzip", 1 << 20), 4096))
+        self.assertEqual(b"\n".join(lines) + b"\n", payload)
+
+    def test_limits_apply_to_wire_decoded_and_line_sizes(self) -> None:
+        with self.assertRaises(BodyTooLargeError):
+            list(iter_request_body(BytesIO(b"x" * 10), {"Content-Length": "10"}, 5))
+        bomb = gzip.compress(b"\0" * 1_000_000)
+        with self.assertRaises(BodyTooLargeError):
+            list(iter_decoded([bomb], "gzip", 100_000))
+        with self.assertRaises(BodyTooLargeError):
+            list(iter_lines([b"a" * 100, b"b" * 100], 150))
+        with self.assertRaises(ValueError):
+            list(iter_decoded([gzip.compress(b"abc")[:-4]], "gzip", 100))
+
+
+class TestIngestNdjson(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = TemporaryDirectory()
+        self.store = TraceStore(Path(self.temp_dir.name))
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_ingest_writes_summary_and_details(self) -> None:
+        summary, step_count, detail_count = ingest_ndjson(self.store, iter(_ndjson(20)))
+        self.assertEqual((summary.steps, step_count, detail_count), ([], 20, 20))
+        stored = self.store.get_summary("ingested")
+        self.assertEqual([step.id for step in stored.steps], [f"s{index}" for index in range(20)])
+        self.assertEqual(self.store.get_step_details("ingested", "s0").data, {"output": "replaced"})
+        self.assertEqual(self.store.get_step_details("ingested", "s7").type, "tool_call")
+
+    def test_failed_ingest_publishes_nothing(self) -> None:
+        lines = _ndjson(5)
+        lines.insert(3, b'{"record": "step", "id": "../escape"}\n')
+        with self.assertRaises(ValueError):
+            ingest_ndjson(self.store, iter(lines))
+        self.assertFalse((self.store.steps_dir / "ingested").exists())
+        with self.assertRaises(FileNotFoundError):
+            self.store.get_summary("ingested")
+        self.assertEqual(list(Path(self.temp_dir.name).glob(".staging-*")), [])
+
+    def test_mistyped_fields_are_rejected(self) -> None:
+        cases = [
+            (0, {"metadata": {"wallTimeMs": "5000"}}, "trace metadata wallTimeMs has invalid type"),
+            (0, {"name": ["Ingested"]}, "trace name has invalid type"),
+            (1, {"name": 5}, "step name has invalid type"),
+            (1, {"index": True}, "step index has invalid type"),
+            (1, {"childStepIds": [1]}, "step childStepIds items must be strings"),
+            (1, {"metrics": {"costUsd": "0.1"}}, "step metrics costUsd has invalid type"),
+        ]
+        for line, override, message in cases:
+            lines = _ndjson(2)
+            lines[line] = json.dumps({**json.loads(lines[line]), **override}).encode("utf-8")
+            with self.subTest(override=override):
+                with self.assertRaisesRegex(ValueError, message):
+                    ingest_ndjson(self.store, iter(lines))
+        self.assertEqual(self.store.list_traces(), [])
+        lines = _ndjson(1)
+        lines[1] = json.dumps({**json.loads(lines[1]), "name": None, "durationMs": 2.5}).encode()
+        ingest_ndjson(self.store, iter(lines))
+        self.assertEqual(self.store.get_summary("ingested").steps[0].durationMs, 2.5)
+
+    def test_failed_upload_leaves_a_concurrent_upload_of_the_same_trace(self) -> None:
+        def failing_upload():
+            lines = _ndjson(3)
+            yield from lines[:2]
+            # Another upload of the same trace completes while this one is still streaming.
+            ingest_ndjson(self.store, iter(_ndjson(4)))
+            yield b"not json\n"
+
+        with self.assertRaises(ValueError):
+            ingest_ndjson(self.store, failing_upload())
+        self.assertEqual(len(self.store.get_summary("ingested").steps), 4)
+        self.assertEqual(self.store.get_step_details("ingested", "s0").data, {"output": "replaced"})
+        self.assertEqual(self.store.get_step_details("ingested", "s3").data, {"output": "x" * 100})
+
+
+if __name__ == "__main__":
+    unittest.main()
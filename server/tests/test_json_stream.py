@@ -0,0 +1,64 @@
+import json
+import unittest
+
+from server.json_stream import LazyArray, iter_json_chunks, lazy_trace
+from server.trace.schema import StepSummary, TraceMetadata, TraceSummary
+
+
+def _trace(steps: int) -> TraceSummary:
+    return TraceSummary(
+        id="trace-stream",
+        name="Streaming ✓",
+        startedAt="2026-01-27T10:00:00.000Z",
+        endedAt="2026-01-27T10:00:02.000Z",
+        status="completed",
+        metadata=TraceMetadata(
+            source="manual", agentName="TestAgent", modelId="demo", wallTimeMs=2000
+        ),
+        steps=[
+            StepSummary(
+                id=f"s{index}",
+                index=index,
+                type="llm_call",
+                name=f"step {index}",
+                startedAt="2026-01-27T10:00:00.000Z",
+                endedAt="2026-01-27T10:00:01.000Z",
+                durationMs=1000,
+            )
+            for index in range(steps)
+        ],
+        parentTraceId="trace-parent",
+    )
+
+
+class TestJsonStream(unittest.TestCase):
+    def test_streamed_trace_matches_json_dumps_byte_for_byte(self) -> None:
+        trace = _trace(500)
+        streamed = b"".join(
+            iter_json_chunks({"trace": lazy_trace(trace), "insights": {"n": 1}}, chunk_bytes=4096)
+        )
+        expected = json.dumps({"trace": trace.to_dict(), "insights": {"n": 1}}).encode("utf-8")
+        self.assertEqual(streamed, expected)
+
+    def test_nested_and_empty_lazy_arrays(self) -> None:
+        traces = [_trace(0), _trace(3)]
+        streamed = b"".join(iter_json_chunks({"traces": LazyArray(traces, lazy_trace)}))
+        self.assertEqual(
+            streamed, json.dumps({"traces": [trace.to_dict() for trace in traces]}).encode("utf-8")
+        )
+        self.assertEqual(b"".join(iter_json_chunks({"traces": LazyArray([])})), b'{"traces": []}')
+
+    def test_items_are_encoded_lazily(self) -> None:
+        encoded: list[int] = []
+
+        def encode(item: int) -> dict:
+            encoded.append(item)
+            return {"value": item}
+
+        chunks = iter_json_chunks(LazyArray(range(10_000), encode), chunk_bytes=1024)
+        next(chunks)
+        self.assertLess(len(encoded), 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,319 @@
+import json
+import unittest
+
+from server.trace.live import (
+    EventRing,
+    LiveTraceBroker,
+    encode_sse_event,
+    topic_for,
+    trace_delta,
+    trace_topics,
+)
+from server.trace.schema import ReplayInfo, StepSummary, TraceMetadata, TraceSummary
+
+
+def _trace(trace_id: str = "trace-live") -> TraceSummary:
+    return TraceSummary(
+        id=trace_id,
+        name="Live test",
+        startedAt="2026-01-27T10:00:00.000Z",
+        endedAt="2026-01-27T10:00:01.000Z",
+        status="completed",
+        metadata=TraceMetadata(
+            source="manual", agentName="TestAgent", modelId="demo", wallTimeMs=1000
+        ),
+        steps=[
+            StepSummary(
+                id="s1",
+                index=0,
+                type="llm_call",
+                name="plan",
+                startedAt="2026-01-27T10:00:00.000Z",
+                endedAt="2026-01-27T10:00:01.000Z",
+                durationMs=1000,
+            )
+        ],
+    )
+
+
+def _fields(frame: bytes) -> dict[str, str]:
+    return dict(line.split(": ", 1) for line in frame.decode("utf-8").strip().split("\n"))
+
+
+def _decode(frame: bytes) -> tuple[str, dict]:
+    fields = _fields(frame)
+    return fields["event"], json.loads(fields["data"])
+
+
+class TestLiveTraceBroker(unittest.TestCase):
+    def test_encode_sse_event_frames_payload(self) -> None:
+        frame = encode_sse_event("heartbeat", {"ts": 1})
+        self.assertEqual(frame, b'event: heartbeat\ndata: {"ts": 1}\n\n')
+
+    def test_publish_shares_one_encoded_frame_across_subscribers(self) -> None:
+        broker = LiveTraceBroker()
+        _, first = broker.subscribe()
+        _, second = broker.subscribe()
+
+        broker.publish_trace(_trace())
+
+        first_frame = first.get_nowait()
+        second_frame = second.get_nowait()
+        self.assertIs(first_frame, second_frame)
+        event_name, payload = _decode(first_frame)
+        self.assertEqual(event_name, "trace")
+        self.assertEqual(payload["trace"]["id"], "trace-live")
+
+    def test_unsubscribed_queue_receives_nothing(self) -> None:
+        broker = LiveTraceBroker()
+        token, queue = broker.subscribe()
+        broker.unsubscribe(token)
+
+        broker.publish_trace(_trace())
+
+        self.assertTrue(queue.empty())
+
+    def test_delta_subscriber_gets_snapshot_then_step_deltas(self) -> None:
+        broker = LiveTraceBroker()
+        _, full_queue = broker.subscribe()
+        _, delta_queue = broker.subscribe("delta")
+        trace = _trace()
+        trace.status = "running"
+        broker.publish_trace(trace)
+
+        trace.steps.append(
+            StepSummary(
+                id="s2",
+                index=1,
+                type="tool_call",
+                name="search",
+                startedAt="2026-01-27T10:00:01.000Z",
+                endedAt=None,
+                status="running",
+            )
+        )
+        trace.name = "Live test (updated)"
+        broker.publish_trace(trace)
+
+        event_name, first = _decode(delta_queue.get_nowait())
+        self.assertEqual(event_name, "trace.snapshot")
+        self.assertEqual(first["seq"], 1)
+        event_name, second = _decode(delta_queue.get_nowait())
+        self.assertEqual(event_name, "trace.delta")
+        self.assertEqual((second["seq"], second["baseSeq"]), (2, 1))
+        self.assertEqual([step["id"] for step in second["addedSteps"]], ["s2"])
+        self.assertEqual(second["changedSteps"], [])
+        self.assertEqual(second["patch"], {"name": "Live test (updated)"})
+        self.assertNotIn("trace", second)
+
+        self.assertEqual(_decode(full_queue.get_nowait())[0], "trace")
+        self.assertEqual(len(_decode(full_queue.get_nowait())[1]["trace"]["steps"]), 2)
+        self.assertEqual(broker.snapshot("trace-live")[0], 2)
+
+    def test_publish_step_sends_single_step_deltas(self) -> None:
+        broker = LiveTraceBroker()
+        _, full_queue = broker.subscribe()
+        _, delta_queue = broker.subscribe("delta", topic_for("trace", "trace-live"))
+        trace = _trace()
+        trace.status = "running"
+        loads: list[str] = []
+
+        def load() -> TraceSummary:
+            loads.append(trace.id)
+            return trace
+
+        step = StepSummary(
+            id="s2",
+            index=1,
+            type="tool_call",
+            name="search",
+            startedAt="2026-01-27T10:00:01.000Z",
+            endedAt=None,
+            status="running",
+        )
+        broker.publish_step("trace-live", step, load)
+        self.assertEqual(loads, ["trace-live"])
+        self.assertEqual(_decode(delta_queue.get_nowait())[0], "trace.snapshot")
+
+        trace.steps.append(step)
+        broker.publish_step("trace-live", step, load)
+        step.status = "completed"
+        broker.publish_step("trace-live", step, load, updated=True)
+        self.assertEqual(loads, ["trace-live"])
+
+        event_name, appended = _decode(delta_queue.get_nowait())
+        self.assertEqual(event_name, "trace.delta")
+        self.assertEqual([item["id"] for item in appended["addedSteps"]], ["s2"])
+        _, updated = _decode(delta_queue.get_nowait())
+        self.assertEqual(updated["addedSteps"], [])
+        self.assertEqual(updated["changedSteps"][0]["position"], 1)
+        self.assertEqual(updated["changedSteps"][0]["step"]["status"], "completed")
+        self.assertEqual((updated["seq"], updated["baseSeq"]), (3, 2))
+
+        seq, payload = broker.snapshot("trace-live")
+        self.assertEqual(seq, 3)
+        self.assertEqual([item["id"] for item in payload["steps"]], ["s1", "s2"])
+        full_frames = [_decode(full_queue.get_nowait())[1] for _ in range(3)]
+        self.assertEqual(full_frames[-1]["trace"]["steps"][-1]["status"], "completed")
+
+    def test_publish_step_leaves_earlier_snapshots_untouched(self) -> None:
+        broker = LiveTraceBroker()
+        _, delta_queue = broker.subscribe("delta")
+        broker.publish_trace(_trace())
+        _, before = broker.snapshot("trace-live")
+        for index in range(2, 5):
+            step = StepSummary(
+                id=f"s{index}",
+                index=index - 1,
+                type="tool_call",
+                name="search",
+                startedAt="2026-01-27T10:00:01.000Z",
+                endedAt=None,
+            )
+            broker.publish_step("trace-live", step, _trace)
+
+        self.assertEqual([item["id"] for item in before["steps"]], ["s1"])
+        seq, after = broker.snapshot("trace-live")
+        self.assertEqual(seq, 4)
+        self.assertEqual([item["id"] for item in after["steps"]], ["s1", "s2", "s3", "s4"])
+        self.assertIs(broker.snapshot("trace-live")[1], after)
+        frames = [_decode(delta_queue.get_nowait()) for _ in range(4)]
+        self.assertEqual([name for name, _ in frames], ["trace.snapshot"] + ["trace.delta"] * 3)
+        self.assertEqual(
+            [frame["addedSteps"][0]["id"] for _, frame in frames[1:]], ["s2", "s3", "s4"]
+        )
+
+    def test_delta_stream_sends_periodic_snapshots(self) -> None:
+        broker = LiveTraceBroker(snapshot_interval=3)
+        _, queue = broker.subscribe("delta")
+        for _ in range(3):
+            broker.publish_trace(_trace())
+        names = [_decode(queue.get_nowait())[0] for _ in range(3)]
+        self.assertEqual(names, ["trace.snapshot", "trace.delta", "trace.snapshot"])
+
+    def test_trace_delta_reports_changed_removed_and_unset(self) -> None:
+        previous = {
+            "id": "t",
+            "endedAt": "x",
+            "steps": [{"id": "a", "status": "running"}, {"id": "b"}],
+        }
+        current = {"id": "t", "steps": [{"id": "a", "status": "completed"}]}
+        delta = trace_delta(previous, current)
+        self.assertEqual(
+            delta["changedSteps"], [{"position": 0, "step": {"id": "a", "status": "completed"}}]
+        )
+        self.assertEqual(delta["stepCount"], 1)
+        self.assertEqual(delta["unset"], ["endedAt"])
+        self.assertEqual(delta["patch"], {})
+
+    def test_trace_delta_keys_steps_by_position_when_ids_repeat(self) -> None:
+        previous = {"id": "t", "steps": [{"id": "a", "n": 1}, {"id": "a", "n": 2}, {"id": "b"}]}
+        current = {
+            "id": "t",
+            "steps": [{"id": "a", "n": 1}, {"id": "a", "n": 3}, {"id": "b"}, {"id": "a", "n": 4}],
+        }
+        delta = trace_delta(previous, current)
+        self.assertEqual(delta["addedSteps"], [{"id": "a", "n": 4}])
+        self.assertEqual(delta["changedSteps"], [{"position": 1, "step": {"id": "a", "n": 3}}])
+        self.assertEqual(delta["stepCount"], 4)
+
+        steps = previous["steps"][: delta["stepCount"] - len(delta["addedSteps"])]
+        for change in delta["changedSteps"]:
+            steps[change["position"]] = change["step"]
+        self.assertEqual(steps + delta["addedSteps"], current["steps"])
+
+        shrunk = trace_delta(current, {"id": "t", "steps": current["steps"][:1]})
+        self.assertEqual((shrunk["addedSteps"], shrunk["changedSteps"]), ([], []))
+        self.assertEqual(shrunk["stepCount"], 1)
+
+    def test_subscribe_rejects_unknown_mode(self) -> None:
+        with self.assertRaises(ValueError):
+            LiveTraceBroker().subscribe("binary")
+
+    def test_published_frames_carry_increasing_event_ids(self) -> None:
+        broker = LiveTraceBroker()
+        _, queue = broker.subscribe()
+        broker.publish_trace(_trace())
+        broker.publish_trace(_trace())
+        ids = [int(_fields(queue.get_nowait())["id"]) for _ in range(2)]
+        self.assertEqual(ids, [1, 2])
+        self.assertEqual(broker.last_event_id, 2)
+
+    def test_resume_requeues_missed_frames(self) -> None:
+        broker = LiveTraceBroker()
+        token, queue = broker.subscribe()
+        broker.publish_trace(_trace())
+        broker.unsubscribe(token)
+        broker.publish_trace(_trace("trace-missed"))
+
+        resumed = broker.resume("full", 1)
+
+        self.assertIsNotNone(resumed)
+        _, resumed_queue = resumed
+        event_name, payload = _decode(resumed_queue.get_nowait())
+        self.assertEqual(payload["trace"]["id"], "trace-missed")
+        self.assertTrue(resumed_queue.empty())
+        self.assertIsNone(broker.resume("full", 99))
+        self.assertIsNone(broker.resume("delta", 0))
+
+    def test_event_ring_respects_depth_and_byte_budget(self) -> None:
+        ring = EventRing(floor=0, max_events=2, max_bytes=1024)
+        for event_id in range(1, 4):
+            ring.append(event_id, b"x")
+        self.assertIsNone(ring.since(0))
+        self.assertEqual(ring.since(1), [b"x", b"x"])
+        self.assertEqual(ring.since(3), [])
+
+        small = EventRing(floor=0, max_events=10, max_bytes=3)
+        small.append(1, b"aa")
+        small.append(2, b"bb")
+        self.assertIsNone(small.since(0))
+        self.assertEqual(small.since(1), [b"bb"])
+
+    def test_topic_subscribers_only_receive_matching_traces(self) -> None:
+        broker = LiveTraceBroker()
+        _, all_queue = broker.subscribe()
+        _, trace_queue = broker.subscribe(topic=topic_for("trace", "trace-a"))
+        _, lineage_queue = broker.subscribe(topic=topic_for("lineage", "trace-a"))
+        _, job_queue = broker.subscribe(topic=topic_for("job", "job-1"))
+
+        replay = _trace("replay-a")
+        replay.parentTraceId = "trace-a"
+        replay.replay = ReplayInfo(
+            strategy="hybrid",
+            modifiedStepId="s1",
+            modifications={"__system__": {"jobId": "job-1"}},
+            createdAt="2026-01-27T10:00:00.000Z",
+        )
+        broker.publish_trace(_trace("trace-a"))
+        broker.publish_trace(_trace("trace-b"))
+        broker.publish_trace(replay)
+
+        def trace_ids(queue) -> list[str]:
+            ids = []
+            while not queue.empty():
+                ids.append(_decode(queue.get_nowait())[1]["trace"]["id"])
+            return ids
+
+        self.assertEqual(trace_ids(all_queue), ["trace-a", "trace-b", "replay-a"])
+        self.assertEqual(trace_ids(trace_queue), ["trace-a"])
+        self.assertEqual(trace_ids(lineage_queue), ["trace-a", "replay-a"])
+        self.assertEqual(trace_ids(job_queue), ["replay-a"])
+        self.assertEqual(
+            trace_topics(replay),
+            ["all", "trace:replay-a", "lineage:replay-a", "lineage:trace-a", "job:job-1"],
+        )
+
+    def test_unsubscribe_drops_empty_topic(self) -> None:
+        broker = LiveTraceBroker()
+        topic = topic_for("trace", "trace-a")
+        token, _ = broker.subscribe(topic=topic)
+        self.assertEqual(broker.subscriber_count(topic), 1)
+        broker.unsubscribe(token)
+        self.assertEqual(broker.subscriber_count(), 0)
+        with self.assertRaises(ValueError):
+            topic_for("team", "x")
+
+
+if __name__ == "__main__":
+    unittest.main()
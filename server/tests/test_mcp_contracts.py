@@ -2,8 +2,10 @@ import tempfile
 import unittest
 from pathlib import Path
 
+from server.mcp.schema import configure_output_validation, validate_output
 from server.mcp.tools.compare_traces import execute as compare_execute
 from server.mcp.tools.get_step_details import execute as details_execute
+from server.mcp.tools.get_step_details_batch import execute as details_batch_execute
 from server.mcp.tools.list_traces import execute as list_execute
 from server.mcp.tools.replay_from_step import execute as replay_execute
 from server.mcp.tools.show_trace import execute as show_execute
@@ -88,10 +90,77 @@ class TestMcpContracts(unittest.TestCase):
         self.assertIn("trace", payload["structuredContent"])
         self.assertIn("insights", payload["structuredContent"])
 
+    def test_show_trace_projection_and_step_window(self) -> None:
+        payload = show_execute(
+            self.store, "trace-1", fields=["name", "steps"], step_offset=0, step_limit=1
+        )
+        content = payload["structuredContent"]
+        self.assertEqual(set(content["trace"]), {"id", "name", "steps", "stepCount"})
+        self.assertEqual([step["id"] for step in content["trace"]["steps"]], ["s1"])
+        self.assertEqual(content["projection"]["stepLimit"], 1)
+        self.assertNotIn("insights", content)
+
+        past_end = show_execute(self.store, "trace-1", step_offset=5)["structuredContent"]["trace"]
+        self.assertEqual((past_end["steps"], past_end["stepCount"]), ([], 1))
+        header = show_execute(self.store, "trace-1", summary_only=True)["structuredContent"]
+        self.assertNotIn("steps", header["trace"])
+        self.assertEqual(
+            (header["trace"]["metadata"]["wallTimeMs"], header["trace"]["stepCount"]), (2000, 1)
+        )
+        with_insights = show_execute(self.store, "trace-1", fields=["insights"])[
+            "structuredContent"
+        ]
+        self.assertEqual(set(with_insights["trace"]), {"id", "stepCount"})
+        self.assertIn("insights", with_insights)
+
+        for arguments in (
+            {"fields": []},
+            {"fields": ["secrets"]},
+            {"step_offset": -1},
+            {"step_limit": 0},
+            {"step_limit": True},
+            {"summary_only": "yes"},
+        ):
+            with self.assertRaises(ValueError, msg=arguments):
+                show_execute(self.store, "trace-1", **arguments)
+
+    def test_list_traces_projection(self) -> None:
+        content = list_execute(self.store, fields=["name"])["structuredContent"]
+        self.assertEqual(
+            content["traces"],
+            [
+                {"id": "trace-1", "name": "Base", "stepCount": 1},
+                {"id": "trace-2", "name": "Replay", "stepCount": 1},
+            ],
+        )
+        summaries = list_execute(self.store, summary_only=True)["structuredContent"]["traces"]
+        self.assertTrue(all("steps" not in trace and "metadata" in trace for trace in summaries))
+        with_steps = list_execute(self.store, fields=["steps"])["structuredContent"]["traces"]
+        self.assertEqual([len(trace["steps"]) for trace in with_steps], [1, 1])
+        with self.assertRaises(ValueError):
+            list_execute(self.store, fields=["insights"])
+
     def test_get_step_details_contract(self) -> None:
         payload = details_execute(self.store, "trace-1", "s1", "redacted", [])
         self.assertIn("step", payload["structuredContent"])
 
+    def test_get_step_details_batch_contract(self) -> None:
+        payload = details_batch_execute(self.store, "trace-1", ["s1", "missing", "s1"])
+        content = payload["structuredContent"]
+        self.assertEqual(list(content["steps"]), ["s1"])
+        self.assertEqual(
+            content["steps"]["s1"],
+            details_execute(self.store, "trace-1", "s1")["structuredContent"]["step"],
+        )
+        self.assertEqual(content["audits"]["s1"]["action"], "view_step")
+        self.assertIn("missing", content["errors"])
+        with self.assertRaises(ValueError):
+            details_batch_execute(self.store, "trace-1", [])
+        with self.assertRaises(ValueError):
+            details_batch_execute(self.store, "trace-1", [f"s{index}" for index in range(201)])
+        with self.assertRaises(ValueError):
+            details_batch_execute(self.store, "trace-1", ["s1"], "raw", role="viewer")
+
     def test_compare_contract(self) -> None:
         payload = compare_execute(self.store, "trace-1", "trace-2")
         self.assertIn("diff", payload["structuredContent"])
@@ -100,6 +169,115 @@ class TestMcpContracts(unittest.TestCase):
         payload = replay_execute(self.store, "trace-1", "s1", "recorded", {"note": "test"})
         self.assertIn("trace", payload["structuredContent"])
 
+    def test_structural_validation_accepts_every_tool_output(self) -> None:
+        self.addCleanup(configure_output_validation, "full")
+        configure_output_validation("structural")
+        list_execute(self.store)
+        list_execute(self.store, fields=["name", "status"])
+        show_execute(self.store, "trace-1")
+        show_execute(self.store, "trace-1", fields=["steps"], step_limit=1)
+        show_execute(self.store, summary_only=True)
+        details_execute(self.store, "trace-1", "s1", "redacted", [])
+        details_batch_execute(self.store, "trace-1", ["s1", "missing"])
+        compare_execute(self.store, "trace-1", "trace-2")
+        replay_execute(self.store, "trace-1", "s1", "recorded", {"note": "test"})
+
+    def test_structural_validation_accepts_loosely_typed_stored_traces(self) -> None:
+        self.addCleanup(configure_output_validation, "full")
+        configure_output_validation("structural")
+        loose = TraceSummary.from_dict(
+            {"id": "trace-3", "name": 5, "steps": [{"id": "s1", "name": None, "type": 7}]}
+        )
+        self.store.ingest_trace(loose, {"s1": StepDetails.from_summary(loose.steps[0], {})})
+        list_execute(self.store)
+        show_execute(self.store, "trace-3")
+        details_execute(self.store, "trace-3", "s1", "redacted", [])
+
+
+class TestOutputValidationModes(unittest.TestCase):
+    def setUp(self) -> None:
+        self.addCleanup(configure_output_validation, "full")
+        step = {
+            "id": "s1",
+            "index": 0,
+            "type": "llm_call",
+            "name": "plan",
+            "startedAt": "2026-01-27T10:00:00.000Z",
+            "status": "completed",
+            "childStepIds": [],
+        }
+        self.trace = {
+            "id": "trace-1",
+            "name": "Base",
+            "startedAt": "2026-01-27T10:00:00.000Z",
+            "status": "completed",
+            "metadata": {
+                "source": "manual",
+                "agentName": "TestAgent",
+                "modelId": "demo",
+                "wallTimeMs": 1,
+            },
+            "steps": [step],
+        }
+
+    def test_structural_rejects_missing_ids_and_wrong_containers(self) -> None:
+        configure_output_validation("structural")
+        validate_output("list_traces", {"traces": [self.trace]})
+        broken_step = {**self.trace["steps"][0], "metrics": [1]}
+        with self.assertRaisesRegex(ValueError, "trace step metrics has invalid type"):
+            validate_output(
+                "show_trace", {"trace": {**self.trace, "steps": [broken_step]}, "insights": {}}
+            )
+        without_id = {key: value for key, value in self.trace.items() if key != "id"}
+        with self.assertRaisesRegex(ValueError, "trace missing id"):
+            validate_output("list_traces", {"traces": [without_id]})
+        with self.assertRaisesRegex(ValueError, "trace steps has invalid type"):
+            validate_output("list_traces", {"traces": [{**self.trace, "steps": {"s1": {}}}]})
+        with self.assertRaisesRegex(ValueError, "step must be object"):
+            validate_output("get_step_details", {"step": None})
+        with self.assertRaisesRegex(ValueError, "insights must be object"):
+            validate_output("show_trace", {"trace": self.trace})
+
+    def test_structural_accepts_everything_full_accepts(self) -> None:
+        step = self.trace["steps"][0]
+        variants = [
+            {**self.trace, "name": 5},
+            {key: value for key, value in self.trace.items() if key != "name"},
+            {key: value for key, value in self.trace.items() if key not in {"metadata", "steps"}},
+            {**self.trace, "status": None, "startedAt": 0},
+            {**self.trace, "metadata": {"agentName": 7, "wallTimeMs": "12"}},
+            {**self.trace, "steps": [{**step, "name": 5, "index": "3", "type": None}]},
+            {**self.trace, "steps": [{"id": "s1"}]},
+            {**self.trace, "steps": [{**step, "childStepIds": None, "metrics": {}}]},
+        ]
+        projection = {"fields": ["id", "status"], "summaryOnly": True}
+        for trace in variants:
+            for tool, payload in [
+                ("list_traces", {"traces": [trace]}),
+                ("show_trace", {"trace": trace, "insights": {}}),
+                ("show_trace", {"trace": trace, "projection": projection}),
+                ("get_step_details", {"step": {**(trace.get("steps") or [step])[0], "data": 1}}),
+            ]:
+                with self.subTest(tool=tool, trace=trace):
+                    configure_output_validation("full")
+                    validate_output(tool, payload)
+                    configure_output_validation("structural")
+                    validate_output(tool, payload)
+
+    def test_off_and_sampled_modes(self) -> None:
+        invalid = {"traces": [{"name": "no id"}]}
+        configure_output_validation("off")
+        validate_output("list_traces", invalid)
+        configure_output_validation("sampled", sample_every=3)
+        with self.assertRaises(ValueError):
+            validate_output("list_traces", invalid)
+        validate_output("list_traces", invalid)
+        validate_output("list_traces", invalid)
+        with self.assertRaises(ValueError):
+            validate_output("list_traces", invalid)
+        with self.assertRaises(ValueError):
+            configure_output_validation("lenient")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,82 @@
+import json
+import unittest
+
+from server.mcp.result_cache import ToolResultCache, canonical_arguments
+
+
+class TestToolResultCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.calls = 0
+
+    def _compute(self, value: dict):
+        def compute() -> dict:
+            self.calls += 1
+            return value
+
+        return compute
+
+    def test_hits_share_the_computed_result_until_generation_changes(self) -> None:
+        cache = ToolResultCache(max_bytes=10_000)
+        first = cache.get_or_compute(
+            "show_trace", {"trace_id": "t1"}, 1, self._compute({"trace": {"id": "t1"}})
+        )
+        again = cache.get_or_compute(
+            "show_trace", {"trace_id": "t1"}, 1, self._compute({"other": True})
+        )
+        self.assertIs(again, first)
+        self.assertEqual(self.calls, 1)
+
+        cache.get_or_compute(
+            "show_trace", {"trace_id": "t2"}, 1, self._compute({"trace": {"id": "t2"}})
+        )
+        self.assertEqual((self.calls, len(cache)), (2, 2))
+        fresh = cache.get_or_compute(
+            "show_trace", {"trace_id": "t1"}, 2, self._compute({"trace": {"id": "new"}})
+        )
+        self.assertEqual(fresh, {"trace": {"id": "new"}})
+        # Entries from the old generation are dropped rather than left to age out.
+        self.assertEqual((self.calls, len(cache)), (3, 1))
+
+    def test_arguments_are_canonicalized(self) -> None:
+        self.assertEqual(
+            canonical_arguments({"right_trace_id": "b", "left_trace_id": "a"}),
+            canonical_arguments({"left_trace_id": "a", "right_trace_id": "b"}),
+        )
+        cache = ToolResultCache(max_bytes=10_000)
+        cache.get_or_compute(
+            "compare_traces", {"left_trace_id": "a", "right_trace_id": "b"}, 1, self._compute({})
+        )
+        cache.get_or_compute(
+            "compare_traces", {"right_trace_id": "b", "left_trace_id": "a"}, 1, self._compute({})
+        )
+        cache.get_or_compute(
+            "list_traces", {"left_trace_id": "a", "right_trace_id": "b"}, 1, self._compute({})
+        )
+        self.assertEqual(self.calls, 2)
+
+    def test_evicts_least_recently_used_entries_by_encoded_size(self) -> None:
+        value = {"blob": "x" * 80}
+        size = len(json.dumps(value, separators=(",", ":")))
+        cache = ToolResultCache(max_bytes=size * 2)
+        for trace_id in ("a", "b"):
+            cache.get_or_compute("show_trace", {"trace_id": trace_id}, 1, self._compute(value))
+        cache.get_or_compute("show_trace", {"trace_id": "a"}, 1, self._compute(value))
+        cache.get_or_compute("show_trace", {"trace_id": "c"}, 1, self._compute(value))
+        self.assertEqual((len(cache), cache.size_bytes, self.calls), (2, size * 2, 3))
+        cache.get_or_compute("show_trace", {"trace_id": "a"}, 1, self._compute(value))
+        self.assertEqual(self.calls, 3)
+        cache.get_or_compute("show_trace", {"trace_id": "b"}, 1, self._compute(value))
+        self.assertEqual(self.calls, 4)
+
+        cache.get_or_compute(
+            "show_trace", {"trace_id": "huge"}, 1, self._compute({"blob": "x" * size * 3})
+        )
+        self.assertEqual(len(cache), 2)
+        disabled = ToolResultCache(max_bytes=0)
+        disabled.get_or_compute("list_traces", {}, 1, self._compute(value))
+        disabled.get_or_compute("list_traces", {}, 1, self._compute(value))
+        self.assertEqual((self.calls, len(disabled)), (7, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,12 @@
 import importlib
 import os
 import sys
+import tempfile
 import types
 import unittest
+from unittest import mock
+
+from server.mcp.schema import configure_output_validation
 
 
 class DummyFastMCP:
@@ -34,6 +38,8 @@ def install_stub() -> None:
 class TestMcpTransport(unittest.TestCase):
     def setUp(self) -> None:
         install_stub()
+        # Importing the server selects its configured validation mode; the suite runs with full.
+        self.addCleanup(configure_output_validation, "full")
         if "server.mcp_server" in sys.modules:
             del sys.modules["server.mcp_server"]
 
@@ -51,5 +57,29 @@ class TestMcpTransport(unittest.TestCase):
         self.assertEqual(mcp_server.mcp.last_transport, "stdio")
 
 
+    def test_read_only_tools_are_cached_until_the_store_changes(self) -> None:
+        with tempfile.TemporaryDirectory() as data_dir:
+            with mock.patch.dict(os.environ, {"AGENT_DIRECTOR_DATA_DIR": data_dir}):
+                mcp_server = importlib.import_module("server.mcp_server")
+            listing = mcp_server.list_traces()
+            self.assertIs(mcp_server.list_traces(), listing)
+            trace_id = listing["traces"][0]["id"]
+            shown = mcp_server.show_trace(trace_id)
+            self.assertIs(mcp_server.show_trace(trace_id), shown)
+            page = mcp_server.show_trace(trace_id, step_offset=1, step_limit=2)
+            self.assertEqual(page["trace"]["steps"], shown["trace"]["steps"][1:3])
+            self.assertIs(mcp_server.show_trace(trace_id, step_offset=1, step_limit=2), page)
+            self.assertIs(
+                mcp_server.compare_traces(trace_id, trace_id),
+                mcp_server.compare_traces(trace_id, trace_id),
+            )
+
+            summary = mcp_server.STORE.get_summary(trace_id)
+            summary.id = "trace-copy"
+            mcp_server.STORE.ingest_trace(summary)
+            self.assertEqual(len(mcp_server.list_traces()["traces"]), len(listing["traces"]) + 1)
+            self.assertIsNot(mcp_server.show_trace(trace_id), shown)
+
+
 if __name__ == "__main__":
     unittest.main()
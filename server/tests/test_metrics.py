@@ -0,0 +1,64 @@
+import threading
+import unittest
+
+from server.metrics import MetricsRegistry, TimedLock
+
+
+class TestMetrics(unittest.TestCase):
+    def test_histogram_renders_cumulative_buckets(self) -> None:
+        registry = MetricsRegistry()
+        histogram = registry.histogram(
+            "latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0)
+        )
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(("/a",), value)
+
+        text = registry.render()
+        self.assertIn('latency_seconds_bucket{route="/a",le="0.1"} 2', text)
+        self.assertIn('latency_seconds_bucket{route="/a",le="1"} 3', text)
+        self.assertIn('latency_seconds_bucket{route="/a",le="+Inf"} 4', text)
+        self.assertIn('latency_seconds_count{route="/a"} 4', text)
+        self.assertIn('latency_seconds_sum{route="/a"} 3.65', text)
+
+    def test_counter_gauge_and_snapshot_rendering(self) -> None:
+        registry = MetricsRegistry()
+        counter = registry.counter("hits_total", "Hits.", ("cache", "result"))
+        gauge = registry.gauge("in_flight", "In flight.")
+        counter.inc(("matrix", "hit"))
+        counter.inc(("matrix", "hit"))
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+
+        text = registry.render([("queued", "Queued frames.", [({"stream": 'tr"ace'}, 3)])])
+        self.assertIn("# TYPE hits_total counter", text)
+        self.assertIn('hits_total{cache="matrix",result="hit"} 2', text)
+        self.assertIn("in_flight 1", text)
+        self.assertIn("# TYPE queued gauge", text)
+        self.assertIn('queued{stream="tr\\"ace"} 3', text)
+        with self.assertRaises(ValueError):
+            registry.counter("hits_total", "Again.")
+
+    def test_timed_lock_records_each_acquisition(self) -> None:
+        registry = MetricsRegistry()
+        waits = registry.histogram("lock_wait_seconds", "Lock wait.")
+        lock = TimedLock(waits)
+        counter = {"value": 0}
+
+        def work() -> None:
+            for _ in range(50):
+                with lock:
+                    counter["value"] += 1
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(counter["value"], 200)
+        self.assertEqual(waits.count(), 200)
+        self.assertFalse(lock.locked())
+
+
+if __name__ == "__main__":
+    unittest.main()
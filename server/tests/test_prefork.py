@@ -0,0 +1,231 @@
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import unittest
+from http.client import HTTPConnection
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from server.prefork import (
+    HubClient,
+    OwnerApiHandler,
+    OwnerHTTPServer,
+    OwnerReplayJobs,
+    PublishHub,
+    RelayedTraceBroker,
+)
+from server.replay.jobs import MAX_SCENARIOS, ReplayJobStore, execute_replay_job
+from server.timing import DeadlineExceededError
+from server.trace.live import topic_for
+from server.trace.schema import StepSummary, TraceMetadata, TraceSummary
+from server.trace.store import TraceStore
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def _trace() -> TraceSummary:
+    return TraceSummary(
+        id="trace-relay",
+        name="Relay",
+        startedAt="2026-01-27T10:00:00.000Z",
+        endedAt=None,
+        status="running",
+        metadata=TraceMetadata(
+            source="manual", agentName="TestAgent", modelId="demo", wallTimeMs=0
+        ),
+        steps=[],
+    )
+
+
+class TestPublishRelay(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = TemporaryDirectory()
+        self.store = TraceStore(Path(self.temp_dir.name))
+        hub_path = str(Path(self.temp_dir.name) / "hub.sock")
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(hub_path)
+        self.listener.listen()
+        hub = PublishHub(self.listener)
+        self.owner = RelayedTraceBroker(self.store, hub.broadcast)
+        hub.start(self.owner.apply)
+        self.workers = []
+        for _ in range(2):
+            client = HubClient(hub_path)
+            broker = RelayedTraceBroker(self.store, client.send)
+            client.listen(broker.apply)
+            self.workers.append(broker)
+        deadline = time.monotonic() + 2.0
+        while len(hub._peers) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def tearDown(self) -> None:
+        self.listener.close()
+        self.temp_dir.cleanup()
+
+    def test_publishes_reach_every_other_process_once(self) -> None:
+        first, second = self.workers
+        queues = []
+        for broker in (self.owner, first, second):
+            _, queue = broker.subscribe("delta", topic_for("trace", "trace-relay"))
+            queues.append(queue)
+        trace = _trace()
+        # Messages from different workers may reach the owner in either order; a step that arrives
+        # first falls back to loading the trace from the shared store.
+        self.store.ingest_trace(trace)
+        first.publish_trace(trace)
+        step = StepSummary(
+            id="s1",
+            index=0,
+            type="llm_call",
+            name="plan",
+            startedAt="2026-01-27T10:00:00.000Z",
+            endedAt=None,
+        )
+        second.publish_step(trace.id, step, lambda: trace)
+
+        for queue in queues:
+            names = [queue.get(timeout=2).split(b"\n", 1)[0] for _ in range(2)]
+            self.assertEqual(sorted(names), [b"event: trace.delta", b"event: trace.snapshot"])
+        time.sleep(0.1)
+        self.assertTrue(all(queue.empty() for queue in queues))
+        self.assertEqual([item["id"] for item in first.snapshot("trace-relay")[1]["steps"]], ["s1"])
+
+
+class TestOwnerReplayJobs(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = TemporaryDirectory()
+        self.store = TraceStore(Path(self.temp_dir.name))
+        trace = _trace()
+        trace.steps = [
+            StepSummary(
+                id="s1",
+                index=0,
+                type="llm_call",
+                name="plan",
+                startedAt="2026-01-27T10:00:00.000Z",
+                endedAt="2026-01-27T10:00:01.000Z",
+            )
+        ]
+        self.store.ingest_trace(trace)
+        OwnerApiHandler.replay_jobs = ReplayJobStore()
+        self.addCleanup(delattr, OwnerApiHandler, "replay_jobs")
+        path = str(Path(self.temp_dir.name) / "owner.sock")
+        self.server = OwnerHTTPServer(path, OwnerApiHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.jobs = OwnerReplayJobs(path)
+        self.scenarios = [
+            {"name": "Shorter", "strategy": "recorded", "modifications": {"prompt": "short"}},
+            {"name": "Longer", "strategy": "recorded", "modifications": {"prompt": "long"}},
+        ]
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        self.temp_dir.cleanup()
+
+    def test_replays_run_in_the_caller_and_are_recorded_by_the_owner(self) -> None:
+        threads = set()
+
+        def replay(*args: object) -> TraceSummary:
+            from server.replay.engine import replay_from_step
+
+            threads.add(threading.current_thread().name)
+            return replay_from_step(*args)
+
+        job = self.jobs.create_job("trace-relay", "s1", self.scenarios)
+        finished = execute_replay_job(self.jobs, job.id, self.store, replay_fn=replay)
+
+        self.assertEqual(threads, {threading.current_thread().name})
+        owned = OwnerApiHandler.replay_jobs.get(job.id)
+        self.assertEqual(owned.status, "completed")
+        self.assertEqual(finished.to_dict(), owned.to_dict())
+        for scenario in owned.scenarios:
+            replay = self.store.get_summary(scenario.replay_trace_id)
+            self.assertEqual(replay.replay.modifications["__system__"]["jobId"], job.id)
+        self.assertIsNone(self.jobs.get("job-missing"))
+        with self.assertRaises(ValueError):
+            self.jobs.create_job("trace-relay", "s1", self.scenarios * MAX_SCENARIOS)
+
+    def test_deadline_in_the_caller_cancels_the_owned_job(self) -> None:
+        def expiring_replay(*args: object) -> None:
+            raise DeadlineExceededError("Request deadline exceeded")
+
+        job = self.jobs.create_job("trace-relay", "s1", self.scenarios)
+        with self.assertRaises(DeadlineExceededError):
+            execute_replay_job(self.jobs, job.id, self.store, replay_fn=expiring_replay)
+        owned = OwnerApiHandler.replay_jobs.get(job.id)
+        self.assertEqual(owned.status, "canceled")
+        self.assertEqual([scenario.status for scenario in owned.scenarios], ["canceled"] * 2)
+
+
+@unittest.skipUnless(hasattr(os, "fork"), "pre-fork mode needs os.fork")
+class TestPreforkServer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = TemporaryDirectory()
+        env = {**os.environ, "AGENT_DIRECTOR_DATA_DIR": self.temp_dir.name}
+        self.process = subprocess.Popen(
+            [
+                sys.executable,
+                "-c",
+                "from server.prefork import serve_prefork; serve_prefork(2, '127.0.0.1', 0)",
+            ],
+            cwd=ROOT,
+            env=env,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        line = self.process.stdout.readline()
+        self.port = int(line.split("http://127.0.0.1:", 1)[1].split()[0])
+
+    def tearDown(self) -> None:
+        self.process.send_signal(signal.SIGTERM)
+        self.process.wait(timeout=10)
+        self.process.stdout.close()
+        self.temp_dir.cleanup()
+
+    def _request(self, method: str, path: str, payload: dict | None = None) -> tuple[int, dict]:
+        conn = HTTPConnection("127.0.0.1", self.port, timeout=10)
+        body = json.dumps(payload) if payload is not None else None
+        conn.request(
+            method, path, body=body, headers={"Content-Type": "application/json"} if body else {}
+        )
+        resp = conn.getresponse()
+        data = json.loads(resp.read() or b"{}")
+        conn.close()
+        return resp.status, data
+
+    def test_workers_share_traces_and_forward_gameplay_to_one_owner(self) -> None:
+        status, listing = self._request("GET", "/api/traces")
+        self.assertEqual(status, 200)
+        trace_id = listing["traces"][0]["id"]
+        status, data = self._request(
+            "POST",
+            "/api/gameplay/sessions",
+            {"trace_id": trace_id, "host_player_id": "host", "name": "Forked"},
+        )
+        self.assertEqual(status, 201, data)
+        session_id = data["session"]["id"]
+        for _ in range(8):
+            self.assertEqual(self._request("GET", f"/api/gameplay/sessions/{session_id}")[0], 200)
+            self.assertEqual(self._request("GET", f"/api/traces/{trace_id}")[0], 200)
+
+        step_id = self._request("GET", f"/api/traces/{trace_id}")[1]["trace"]["steps"][0]["id"]
+        status, data = self._request(
+            "POST",
+            "/api/replay-jobs",
+            {"trace_id": trace_id, "step_id": step_id, "scenarios": [{"strategy": "recorded"}]},
+        )
+        self.assertEqual((status, data["job"]["status"]), (202, "completed"), data)
+        for _ in range(4):
+            status, owned = self._request("GET", f"/api/replay-jobs/{data['job']['id']}")
+            self.assertEqual((status, owned), (200, data))
+        self.assertEqual(self.process.poll(), None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import threading
+import time
+import unittest
+
+from server.profiling import MemoryTracker, StackSampler, to_folded, to_speedscope
+
+
+def _spin_until(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+class TestProfiling(unittest.TestCase):
+    def test_sampler_sees_other_threads_in_folded_and_speedscope_output(self) -> None:
+        stop = threading.Event()
+        worker = threading.Thread(target=_spin_until, args=(stop,), name="busy-worker")
+        worker.start()
+        try:
+            stacks, passes = StackSampler().sample(0.1, 0.005)
+        finally:
+            stop.set()
+            worker.join()
+        self.assertGreater(passes, 1)
+
+        folded = to_folded(stacks)
+        busy = [line for line in folded.splitlines() if line.startswith("busy-worker;")]
+        self.assertTrue(
+            any("_spin_until (server/tests/test_profiling.py:" in line for line in busy), folded
+        )
+
+        speedscope = to_speedscope(stacks, 0.005)
+        profile = next(item for item in speedscope["profiles"] if item["name"] == "busy-worker")
+        self.assertEqual(len(profile["samples"]), len(profile["weights"]))
+        names = {frame["name"] for frame in speedscope["shared"]["frames"]}
+        self.assertIn("_spin_until", names)
+
+    def test_only_one_profile_runs_at_a_time(self) -> None:
+        sampler = StackSampler()
+        thread = threading.Thread(target=sampler.sample, args=(0.3, 0.01))
+        thread.start()
+        try:
+            while not sampler._running.locked():
+                time.sleep(0.001)
+            with self.assertRaises(RuntimeError):
+                sampler.sample(0.01, 0.01)
+        finally:
+            thread.join()
+
+    def test_memory_tracker_reports_growth_against_baseline(self) -> None:
+        tracker = MemoryTracker()
+        try:
+            self.assertTrue(tracker.snapshot_diff()["baseline"])
+            retained = [bytearray(1024) for _ in range(200)]
+            result = tracker.snapshot_diff(limit=50)
+            self.assertFalse(result["baseline"])
+            self.assertTrue(
+                any(
+                    "server/tests/test_profiling.py" in entry["location"][0]
+                    and entry["sizeDiffBytes"] > 0
+                    for entry in result["top"]
+                ),
+                result["top"],
+            )
+            self.assertEqual(len(retained), 200)
+            with self.assertRaises(ValueError):
+                tracker.snapshot_diff(group_by="module")
+        finally:
+            tracker.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+
+from server.rate_limit import SWEEP_INTERVAL_S, TokenBucketLimiter
+
+
+class TestTokenBucketLimiter(unittest.TestCase):
+    def test_bucket_drains_and_refills(self) -> None:
+        limiter = TokenBucketLimiter(capacity=3, refill_per_s=1.0)
+        for _ in range(3):
+            self.assertEqual(limiter.acquire("ip", now=0.0), (True, 0))
+        self.assertEqual(limiter.acquire("ip", now=0.0), (False, 1))
+        self.assertTrue(limiter.acquire("ip", now=1.0)[0])
+        self.assertTrue(limiter.acquire("other", now=1.0)[0])
+
+    def test_costs_scale_consumption_and_retry_after(self) -> None:
+        limiter = TokenBucketLimiter(capacity=10, refill_per_s=2.0)
+        self.assertTrue(limiter.acquire("ip", cost=5, now=0.0)[0])
+        self.assertTrue(limiter.acquire("ip", cost=5, now=0.0)[0])
+        self.assertEqual(limiter.acquire("ip", cost=5, now=0.0), (False, 3))
+        self.assertTrue(limiter.acquire("ip", cost=1, now=0.5)[0])
+        # A cost above capacity is clamped so the request is eventually admissible.
+        self.assertTrue(limiter.acquire("fresh", cost=50, now=0.0)[0])
+
+    def test_idle_full_buckets_are_evicted(self) -> None:
+        limiter = TokenBucketLimiter(capacity=2, refill_per_s=1.0, shards=1)
+        for index in range(100):
+            limiter.acquire(f"ip-{index}", now=0.0)
+        limiter.acquire("busy", cost=2, now=SWEEP_INTERVAL_S - 1)
+        self.assertEqual(limiter.key_count(), 101)
+        limiter.acquire("busy", cost=0, now=SWEEP_INTERVAL_S)
+        self.assertEqual(limiter.key_count(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
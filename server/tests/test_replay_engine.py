@@ -1,8 +1,9 @@
+import json
 import re
 import unittest
 
 from server.replay.engine import replay_from_step
-from server.trace.schema import StepSummary, TraceMetadata, TraceSummary
+from server.trace.schema import StepMetrics, StepPreview, StepSummary, TraceMetadata, TraceSummary
 
 
 ISO_Z_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d{3}Z$")
@@ -123,6 +124,60 @@ class TestReplayEngine(unittest.TestCase):
         self.assertEqual(set(replay_a.replay.checkpoints.keys()), {"s1", "s2", "s3"})  # type: ignore[union-attr]
         self.assertEqual(replay_a.replay.checkpoints, replay_b.replay.checkpoints)  # type: ignore[union-attr]
 
+    def test_replay_shares_unchanged_parts_and_leaves_source_intact(self) -> None:
+        trace = TraceSummary(
+            id="trace-1",
+            name="Replay source",
+            startedAt="2026-01-27T10:00:00.000Z",
+            endedAt="2026-01-27T10:00:03.000Z",
+            status="completed",
+            metadata=TraceMetadata(
+                source="manual", agentName="TestAgent", modelId="demo", wallTimeMs=3000
+            ),
+            steps=[
+                StepSummary(
+                    id=f"s{index}",
+                    index=index,
+                    type="llm_call",
+                    name=f"step {index}",
+                    # Non-canonical forms strptime accepts are shifted too; unparseable ones are
+                    # kept.
+                    startedAt=["2026-01-27T10:00:00.000Z", "2026-1-27T10:00:01.5Z", "not a time"][
+                        index
+                    ],
+                    endedAt=["2026-01-27T10:00:01.000Z", "garbage", None][index],
+                    durationMs=1000,
+                    status="completed",
+                    childStepIds=[],
+                    parentStepId=f"s{index - 1}" if index else None,
+                    metrics=StepMetrics(tokensTotal=10),
+                    preview=StepPreview(title=f"step {index}", outputPreview="ok"),
+                )
+                for index in range(3)
+            ],
+        )
+        source = json.dumps(trace.to_dict())
+
+        replay = replay_from_step(trace, "s0", "hybrid", {"prompt": "retry"})
+        self.assertEqual(json.dumps(trace.to_dict()), source)
+        first, second, third = replay.steps
+        self.assertEqual(first.preview.outputPreview, "ok (modified: prompt)")
+        self.assertIs(first.metrics, trace.steps[0].metrics)
+        self.assertIsNot(first.preview, trace.steps[0].preview)
+        self.assertEqual(second.endedAt, None)
+        self.assertEqual(
+            (second.status, second.preview.outputPreview), ("pending", "[invalidated for replay]")
+        )
+        self.assertRegex(second.startedAt, ISO_Z_PATTERN)
+        self.assertNotEqual(second.startedAt, trace.steps[1].startedAt)
+        self.assertEqual(third.startedAt, "not a time")
+        self.assertEqual((replay.status, replay.endedAt), ("running", None))
+
+        recorded = replay_from_step(trace, "s1", "recorded", {})
+        self.assertIs(recorded.steps[2], trace.steps[2])
+        self.assertIs(recorded.steps[0].preview, trace.steps[0].preview)
+        self.assertEqual(recorded.steps[1].endedAt, recorded.steps[1].startedAt)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -3,6 +3,7 @@ from pathlib import Path
 from tempfile import TemporaryDirectory
 
 from server.replay.jobs import MAX_SCENARIOS, ReplayJobStore
+from server.timing import DeadlineExceededError
 from server.trace.schema import StepSummary, TraceMetadata, TraceSummary
 from server.trace.store import TraceStore
 
@@ -131,6 +132,38 @@ class TestReplayJobs(unittest.TestCase):
             self.assertEqual(system_meta.get("jobId"), job.id)
             self.assertEqual(system_meta.get("scenarioId"), scenario.id)
 
+    def test_execute_job_cancels_remaining_scenarios_when_the_deadline_expires(self) -> None:
+        job = self.store.create_job("trace-1", "s1", self.scenarios)
+        calls = []
+
+        def expiring_replay(*args: object) -> None:
+            calls.append(args)
+            raise DeadlineExceededError("Request deadline exceeded")
+
+        with TemporaryDirectory() as tmp:
+            trace_store = TraceStore(Path(tmp))
+            trace_store.ingest_trace(
+                TraceSummary(
+                    id="trace-1",
+                    name="Test",
+                    startedAt="2026-01-27T10:00:00.000Z",
+                    endedAt="2026-01-27T10:00:01.000Z",
+                    status="completed",
+                    metadata=TraceMetadata(
+                        source="manual", agentName="TestAgent", modelId="demo", wallTimeMs=1000
+                    ),
+                    steps=[],
+                )
+            )
+            with self.assertRaises(DeadlineExceededError):
+                self.store.execute_job(job.id, trace_store, replay_fn=expiring_replay)
+            self.assertEqual([trace.id for trace in trace_store.list_traces()], ["trace-1"])
+
+        # Neither retried nor recorded as a scenario failure.
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(job.status, "canceled")
+        self.assertEqual([scenario.status for scenario in job.scenarios], ["canceled", "canceled"])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+from server.main import ROUTES
+from server.routing import RouteTable
+
+
+def _noop(*_args) -> None:
+    return None
+
+
+class TestRouteTable(unittest.TestCase):
+    def test_literal_segments_win_over_parameters(self) -> None:
+        table = RouteTable()
+        table.add("GET", "/api/gameplay/sessions/{session_id}", _noop)
+        current = table.add("GET", "/api/gameplay/sessions/current", _noop)
+        route, params = table.match("GET", "/api/gameplay/sessions/current") or (None, None)
+        self.assertIs(route, current)
+        self.assertEqual(params, {})
+        route, params = table.match("GET", "/api/gameplay/sessions/abc") or (None, None)
+        self.assertEqual(params, {"session_id": "abc"})
+
+    def test_backtracks_when_literal_branch_dead_ends(self) -> None:
+        table = RouteTable()
+        table.add("POST", "/api/guilds/events", _noop)
+        join = table.add("POST", "/api/guilds/{guild_id}/join", _noop)
+        route, params = table.match("POST", "/api/guilds/events/join") or (None, None)
+        self.assertIs(route, join)
+        self.assertEqual(params, {"guild_id": "events"})
+
+    def test_typed_params_are_converted_or_rejected(self) -> None:
+        table = RouteTable()
+        table.add("GET", "/api/items/{index:int}", _noop)
+        self.assertEqual(table.match("GET", "/api/items/7")[1], {"index": 7})  # type: ignore[index]
+        self.assertIsNone(table.match("GET", "/api/items/seven"))
+        with self.assertRaises(ValueError):
+            table.add("GET", "/api/items/{index:float}/x", _noop)
+
+    def test_method_and_trailing_segments_must_match(self) -> None:
+        table = RouteTable()
+        table.add("GET", "/api/traces/{trace_id}", _noop)
+        self.assertIsNone(table.match("POST", "/api/traces/t1"))
+        self.assertIsNone(table.match("GET", "/api/traces/t1/extra"))
+        self.assertIsNotNone(table.match("GET", "/api/traces/t1/"))
+
+    def test_duplicate_and_conflicting_routes_are_rejected(self) -> None:
+        table = RouteTable()
+        table.add("GET", "/api/traces/{trace_id}", _noop)
+        with self.assertRaises(ValueError):
+            table.add("GET", "/api/traces/{trace_id}", _noop)
+        with self.assertRaises(ValueError):
+            table.add("GET", "/api/traces/{other_id}/steps", _noop)
+
+    def test_api_routes_carry_metadata(self) -> None:
+        route, params = ROUTES.match("GET", "/api/traces/t1/steps/s1") or (None, None)
+        self.assertIsNotNone(route)
+        self.assertEqual(params, {"trace_id": "t1", "step_id": "s1"})
+        self.assertTrue(route.cacheable)  # type: ignore[union-attr]
+        stream, _ = ROUTES.match("GET", "/api/stream/traces/latest") or (None, None)
+        self.assertEqual(stream.rate_limit, "stream")  # type: ignore[union-attr]
+
+
+if __name__ == "__main__":
+    unittest.main()
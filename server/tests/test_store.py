@@ -1,5 +1,7 @@
+import sqlite3
 import tempfile
 import unittest
+from contextlib import contextmanager
 from pathlib import Path
 
 from server.trace.schema import StepDetails, StepSummary, TraceMetadata, TraceSummary
@@ -52,6 +54,9 @@ class TestTraceStore(unittest.TestCase):
 
         step_details = self.store.get_step_details("trace-1", "s1")
         self.assertEqual(step_details.data["response"], "ok")
+        # Files are written aside and renamed into place; nothing is left behind.
+        self.assertEqual(list(self.store.traces_dir.glob("*.tmp")), [])
+        self.assertEqual(list((self.store.steps_dir / "trace-1").glob("*.tmp")), [])
 
     def test_ingest_partial_trace(self) -> None:
         summary = TraceSummary(
@@ -98,6 +103,114 @@ class TestTraceStore(unittest.TestCase):
         self.assertEqual(len(fetched.steps), 1)
         self.assertEqual(fetched.steps[0].id, "s-good")
 
+    def test_append_update_and_finalize_running_trace(self) -> None:
+        summary = TraceSummary(
+            id="trace-live",
+            name="Live",
+            startedAt="2026-01-27T10:00:00.000Z",
+            endedAt=None,
+            status="running",
+            metadata=TraceMetadata(
+                source="manual", agentName="TestAgent", modelId="demo", wallTimeMs=0
+            ),
+            steps=[],
+        )
+        self.store.ingest_trace(summary)
+        summary_path = self.store.traces_dir / "trace-live.summary.json"
+        written = summary_path.read_bytes()
+
+        def step(index: int, status: str = "running") -> StepSummary:
+            return StepSummary(
+                id=f"s{index}",
+                index=index,
+                type="tool_call",
+                name=f"step {index}",
+                startedAt="2026-01-27T10:00:00.000Z",
+                endedAt=None,
+                status=status,
+            )
+
+        for index in range(3):
+            self.store.append_step("trace-live", step(index), {"n": index} if index == 1 else None)
+        self.store.update_step("trace-live", step(1, "completed"))
+        self.assertEqual(summary_path.read_bytes(), written)
+
+        running = self.store.get_summary("trace-live")
+        self.assertEqual([item.id for item in running.steps], ["s0", "s1", "s2"])
+        self.assertEqual(running.steps[1].status, "completed")
+        details = self.store.get_step_details("trace-live", "s1")
+        self.assertEqual((details.status, details.data), ("completed", {"n": 1}))
+        with self.assertRaises(ValueError):
+            self.store.append_step("trace-live", step(0))
+        with self.assertRaises(FileNotFoundError):
+            self.store.update_step("trace-live", step(9))
+
+        final = self.store.finalize_trace("trace-live", "completed", metadata={"wallTimeMs": 3000})
+        self.assertEqual(len(final.steps), 3)
+        self.assertFalse((self.store.traces_dir / "trace-live.append.ndjson").exists())
+        stored = self.store.get_summary("trace-live")
+        self.assertEqual(
+            (stored.status, stored.metadata.wallTimeMs, len(stored.steps)), ("completed", 3000, 3)
+        )
+        with self.assertRaises(ValueError):
+            self.store.append_step("trace-live", step(3))
+        with self.assertRaises(ValueError):
+            self.store.finalize_trace("trace-live", "completed")
+
+    def test_failed_step_commit_leaves_no_log_line(self) -> None:
+        class FailingCommit:
+            def __init__(self, conn: sqlite3.Connection) -> None:
+                self._conn = conn
+
+            def execute(self, *args: object) -> sqlite3.Cursor:
+                return self._conn.execute(*args)
+
+            def commit(self) -> None:
+                raise sqlite3.OperationalError("disk I/O error")
+
+        class FailingStore(TraceStore):
+            fail = False
+
+            @contextmanager
+            def _db(self, operation: str):
+                with super()._db(operation) as conn:
+                    yield FailingCommit(conn) if self.fail else conn
+
+        store = FailingStore(Path(self.temp_dir.name) / "failing")
+        store.ingest_trace(
+            TraceSummary(
+                id="trace-live",
+                name="Live",
+                startedAt="2026-01-27T10:00:00.000Z",
+                endedAt=None,
+                status="running",
+                metadata=TraceMetadata(
+                    source="manual", agentName="TestAgent", modelId="demo", wallTimeMs=0
+                ),
+                steps=[],
+            )
+        )
+
+        def step(step_id: str) -> StepSummary:
+            return StepSummary(
+                id=step_id,
+                index=0,
+                type="llm_call",
+                name=step_id,
+                startedAt="2026-01-27T10:00:00.000Z",
+                endedAt=None,
+            )
+
+        store.append_step("trace-live", step("s0"))
+        store.fail = True
+        with self.assertRaises(sqlite3.OperationalError):
+            store.append_step("trace-live", step("phantom"))
+        store.fail = False
+        store.append_step("trace-live", step("s1"))
+        self.assertEqual([item.id for item in store.get_summary("trace-live").steps], ["s0", "s1"])
+        final = store.finalize_trace("trace-live", "completed")
+        self.assertEqual([item.id for item in final.steps], ["s0", "s1"])
+
     def test_add_and_list_comments(self) -> None:
         summary = TraceSummary(
             id="trace-3",
@@ -134,6 +247,156 @@ class TestTraceStore(unittest.TestCase):
         self.assertEqual(comments[0]["body"], "Investigate retry loop")
         self.assertTrue(comments[0]["pinned"])
 
+    def test_generation_counts_trace_writes_across_store_instances(self) -> None:
+        other = TraceStore(Path(self.temp_dir.name))
+        start = self.store.generation()
+        summary = TraceSummary(
+            id="trace-gen",
+            name="Generation",
+            startedAt="2026-01-27T10:00:00.000Z",
+            endedAt=None,
+            status="running",
+            metadata=TraceMetadata(
+                source="manual", agentName="TestAgent", modelId="demo", wallTimeMs=0
+            ),
+            steps=[],
+        )
+        other.ingest_trace(summary)
+        self.assertEqual(self.store.generation(), start + 1)
+        step = StepSummary(
+            id="s1",
+            index=0,
+            type="llm_call",
+            name="plan",
+            startedAt="2026-01-27T10:00:00.000Z",
+            endedAt=None,
+        )
+        other.append_step("trace-gen", step)
+        self.assertEqual(self.store.generation(), start + 2)
+        other.add_comment("trace-gen", "s1", "jason", "Not a trace write")
+        self.assertEqual(self.store.generation(), start + 2)
+        other.finalize_trace("trace-gen", "completed")
+        other.delete_trace("trace-gen")
+        self.assertEqual(self.store.generation(), start + 4)
+
+    def _paged_trace(
+        self, trace_id: str, step_ids: list, status: str = "completed"
+    ) -> TraceSummary:
+        return TraceSummary(
+            id=trace_id,
+            name=f"Paged {trace_id}",
+            startedAt="2026-01-27T10:00:00.000Z",
+            endedAt=None,
+            status=status,
+            metadata=TraceMetadata(
+                source="manual", agentName="TestAgent", modelId="demo", wallTimeMs=0
+            ),
+            steps=[
+                StepSummary(
+                    id=step_id,
+                    index=index,
+                    type="tool_call",
+                    name=f"step {step_id}",
+                    startedAt="2026-01-27T10:00:00.000Z",
+                    endedAt=None,
+                )
+                for index, step_id in enumerate(step_ids)
+            ],
+        )
+
+    def test_trace_page_reads_header_and_step_window_from_index(self) -> None:
+        # Indices deliberately disagree with list order: pages follow the trace's own order.
+        summary = self._paged_trace("trace-paged", ["s3", "s1", "s4", "s0", "s2"])
+        self.store.ingest_trace(summary)
+        (self.store.traces_dir / "trace-paged.summary.json").unlink()
+
+        page, count = self.store.get_trace_page("trace-paged", step_offset=1, step_limit=2)
+        self.assertEqual((page.name, count), ("Paged trace-paged", 5))
+        self.assertEqual([step.id for step in page.steps], ["s1", "s4"])
+        self.assertEqual(page.steps[0].to_dict(), summary.steps[1].to_dict())
+        header, count = self.store.get_trace_page(include_steps=False)
+        self.assertEqual((header.id, header.steps, count), ("trace-paged", [], 5))
+        tail, _ = self.store.get_trace_page("trace-paged", step_offset=4)
+        self.assertEqual([step.id for step in tail.steps], ["s2"])
+        self.assertEqual(
+            [(trace.id, count) for trace, count in self.store.list_trace_headers()],
+            [("trace-paged", 5)],
+        )
+        with self.assertRaises(FileNotFoundError):
+            self.store.get_trace_page("missing")
+
+        # A re-ingest replaces the step rows instead of leaving stale ones behind.
+        self.store.ingest_trace(self._paged_trace("trace-paged", ["s9", "s0"]))
+        page, count = self.store.get_trace_page("trace-paged")
+        self.assertEqual(([step.id for step in page.steps], count), (["s9", "s0"], 2))
+
+    def test_trace_page_matches_full_summary_with_duplicate_step_ids(self) -> None:
+        trace = self._paged_trace("trace-dup", ["s0", "s1", "s1", "s2", "s0"], status="running")
+        self.store.ingest_trace(trace)
+        updated = self._paged_trace("x", ["s1"]).steps[0]
+        updated.status = "failed"
+        self.store.update_step("trace-dup", updated)
+
+        full = self.store.get_summary("trace-dup")
+        page, count = self.store.get_trace_page("trace-dup")
+        self.assertEqual(count, len(full.steps))
+        expected = [step.to_dict() for step in full.steps]
+        self.assertEqual([step.to_dict() for step in page.steps], expected)
+        window, _ = self.store.get_trace_page("trace-dup", step_offset=1, step_limit=3)
+        self.assertEqual([step.to_dict() for step in window.steps], expected[1:4])
+        self.assertEqual(
+            [step.status for step in window.steps], ["completed", "failed", "completed"]
+        )
+
+    def test_trace_page_follows_appends_and_updates_of_running_trace(self) -> None:
+        self.store.ingest_trace(self._paged_trace("trace-live", ["s0"], status="running"))
+        for step_id in ("s1", "s2"):
+            self.store.append_step("trace-live", self._paged_trace("x", [step_id]).steps[0])
+        updated = self._paged_trace("x", ["s0"]).steps[0]
+        updated.status = "failed"
+        self.store.update_step("trace-live", updated)
+
+        page, count = self.store.get_trace_page("trace-live", step_limit=2)
+        self.assertEqual(([step.id for step in page.steps], count), (["s0", "s1"], 3))
+        self.assertEqual(page.steps[0].status, "failed")
+        self.store.finalize_trace("trace-live", "completed")
+        header, _ = self.store.get_trace_page("trace-live", include_steps=False)
+        self.assertEqual(header.status, "completed")
+
+    def test_iter_traces_follows_list_traces_and_counts_steps_from_index(self) -> None:
+        self.store.ingest_trace(self._paged_trace("trace-b", ["s0", "s1"]))
+        self.store.ingest_trace(self._paged_trace("trace-a", ["s0"], status="running"))
+        self.store.append_step("trace-a", self._paged_trace("x", ["s1"]).steps[0])
+
+        listed = [trace.to_dict() for trace in self.store.list_traces()]
+        self.assertEqual([trace.to_dict() for trace in self.store.iter_traces()], listed)
+        self.assertEqual(self.store.step_total(), 4)
+        traces = self.store.iter_traces()
+        next(traces)
+        self.store.delete_trace("trace-b")
+        self.assertEqual(list(traces), [])
+
+    def test_migration_backfills_step_index_for_existing_traces(self) -> None:
+        self.store.ingest_trace(self._paged_trace("trace-old", ["a", "b", "a"]))
+        # Roll the database back to schema 5, whose steps were keyed by id; the migrations add
+        # the header and step JSON columns, key steps by position and refill them.
+        with sqlite3.connect(self.store.db_path) as conn:
+            conn.execute("PRAGMA user_version = 5")
+            conn.execute("ALTER TABLE traces DROP COLUMN header")
+            conn.execute("DROP TABLE steps")
+            conn.execute(
+                "CREATE TABLE steps (traceId TEXT, stepId TEXT, stepIndex INTEGER, type TEXT, "
+                "name TEXT, startedAt TEXT, endedAt TEXT, status TEXT, durationMs INTEGER, "
+                "toolCallId TEXT, metricsTokens INTEGER, metricsCost REAL, previewTitle TEXT, "
+                "previewSubtitle TEXT, previewInput TEXT, previewOutput TEXT, parentStepId TEXT, "
+                "PRIMARY KEY (traceId, stepId))"
+            )
+
+        migrated = TraceStore(Path(self.temp_dir.name))
+        page, count = migrated.get_trace_page("trace-old", step_offset=1)
+        self.assertEqual(([step.id for step in page.steps], count), (["b", "a"], 3))
+        self.assertEqual(page.name, "Paged trace-old")
+
 
 if __name__ == "__main__":
     unittest.main()
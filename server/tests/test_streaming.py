@@ -0,0 +1,180 @@
+import asyncio
+import json
+import unittest
+from http.client import HTTPConnection
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from server.gameplay import GameplayStore
+from server.streaming import AsyncStreamServer, start_stream_server_thread
+from server.trace.live import LiveTraceBroker
+from server.trace.schema import StepSummary, TraceMetadata, TraceSummary
+from server.trace.store import TraceStore
+
+
+def _trace(trace_id: str) -> TraceSummary:
+    return TraceSummary(
+        id=trace_id,
+        name="Stream test",
+        startedAt="2026-01-27T10:00:00.000Z",
+        endedAt="2026-01-27T10:00:01.000Z",
+        status="completed",
+        metadata=TraceMetadata(
+            source="manual", agentName="TestAgent", modelId="demo", wallTimeMs=1000
+        ),
+        steps=[
+            StepSummary(
+                id="s1",
+                index=0,
+                type="llm_call",
+                name="plan",
+                startedAt="2026-01-27T10:00:00.000Z",
+                endedAt="2026-01-27T10:00:01.000Z",
+                durationMs=1000,
+            )
+        ],
+    )
+
+
+class _Writer:
+    def __init__(self) -> None:
+        self.data = bytearray()
+        self.closed = False
+
+    def write(self, data: bytes) -> None:
+        self.data += data
+
+    async def drain(self) -> None:
+        return None
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class TestAsyncStreamServer(unittest.TestCase):
+    server: AsyncStreamServer
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.temp_dir = TemporaryDirectory()
+        cls.store = TraceStore(Path(cls.temp_dir.name))
+        cls.store.ingest_trace(_trace("trace-1"))
+        cls.broker = LiveTraceBroker()
+        cls.gameplay_store = GameplayStore(Path(cls.temp_dir.name))
+        cls.server = start_stream_server_thread(
+            cls.store, cls.broker, cls.gameplay_store, "127.0.0.1", 0, heartbeat_interval_s=0.2
+        )
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.temp_dir.cleanup()
+
+    def _read_event(self, resp) -> dict[str, str]:
+        fields: dict[str, str] = {}
+        while True:
+            line = resp.fp.readline().decode("utf-8").rstrip("\n")
+            if not line:
+                return fields
+            name, _, value = line.partition(": ")
+            fields[name] = value
+
+    def test_latest_stream_sends_snapshot_then_published_trace(self) -> None:
+        conn = HTTPConnection("127.0.0.1", self.server.port, timeout=2)
+        conn.request("GET", "/api/stream/traces/latest")
+        resp = conn.getresponse()
+        self.assertEqual(resp.status, 200)
+        self.assertEqual(resp.getheader("Content-Type"), "text/event-stream")
+
+        snapshot = self._read_event(resp)
+        self.assertEqual(snapshot["event"], "trace")
+        self.assertEqual(json.loads(snapshot["data"])["trace"]["id"], "trace-1")
+
+        self.broker.publish_trace(_trace("trace-2"))
+        published = self._read_event(resp)
+        while published["event"] == "heartbeat":
+            published = self._read_event(resp)
+        self.assertEqual(json.loads(published["data"])["trace"]["id"], "trace-2")
+        self.assertIn("id", published)
+        conn.close()
+
+    def test_idle_stream_receives_timer_heartbeats(self) -> None:
+        conn = HTTPConnection("127.0.0.1", self.server.port, timeout=2)
+        conn.request("GET", "/api/stream/replay-jobs/job-1")
+        resp = conn.getresponse()
+        self.assertEqual(self._read_event(resp)["event"], "heartbeat")
+        heartbeat = self._read_event(resp)
+        self.assertEqual(heartbeat["event"], "heartbeat")
+        self.assertIn("ts", json.loads(heartbeat["data"]))
+        conn.close()
+
+    def test_gameplay_stream_emits_session_snapshot(self) -> None:
+        session = self.gameplay_store.create_session("trace-1", "host", "Async")
+        conn = HTTPConnection("127.0.0.1", self.server.port, timeout=2)
+        conn.request("GET", f"/api/stream/gameplay/{session['id']}")
+        resp = conn.getresponse()
+        event = self._read_event(resp)
+        self.assertEqual(event["event"], "gameplay")
+        self.assertEqual(json.loads(event["data"])["session"]["id"], session["id"])
+        conn.close()
+
+    def test_unknown_path_and_bad_mode_are_rejected(self) -> None:
+        for path, status in (("/api/traces", 404), ("/api/stream/traces/latest?mode=binary", 400)):
+            conn = HTTPConnection("127.0.0.1", self.server.port, timeout=2)
+            conn.request("GET", path)
+            resp = conn.getresponse()
+            self.assertEqual(resp.status, status)
+            self.assertIn("error", json.loads(resp.read().decode("utf-8")))
+            conn.close()
+
+    def test_non_get_is_rejected(self) -> None:
+        conn = HTTPConnection("127.0.0.1", self.server.port, timeout=2)
+        conn.request("POST", "/api/stream/traces/latest", body=b"{}")
+        resp = conn.getresponse()
+        self.assertEqual(resp.status, 405)
+        conn.close()
+
+    def test_cancelled_stream_cleans_up_and_propagates(self) -> None:
+        broker = LiveTraceBroker()
+        server = AsyncStreamServer(self.store, broker, self.gameplay_store)
+        writer = _Writer()
+
+        async def run() -> None:
+            reader = asyncio.StreamReader()
+            reader.feed_data(b"GET /api/stream/traces/latest HTTP/1.1\r\n\r\n")
+            stream = server._handle(reader, writer)  # type: ignore[arg-type]
+            handler = asyncio.ensure_future(stream)
+            while server.connection_count == 0:
+                await asyncio.sleep(0.01)
+            handler.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await handler
+
+        asyncio.run(asyncio.wait_for(run(), 5))
+        self.assertIn(b"event: trace", bytes(writer.data))
+        self.assertEqual(server.connection_count, 0)
+        self.assertEqual(broker.subscriber_count(), 0)
+        self.assertTrue(writer.closed)
+
+    def test_failed_stream_open_answers_500_and_unsubscribes(self) -> None:
+        class BrokenStore:
+            def get_summary(self, trace_id: object = None) -> TraceSummary:
+                raise OSError("disk gone")
+
+        broker = LiveTraceBroker()
+        server = AsyncStreamServer(BrokenStore(), broker, self.gameplay_store)  # type: ignore[arg-type]
+        writer = _Writer()
+
+        async def run() -> None:
+            reader = asyncio.StreamReader()
+            reader.feed_data(b"GET /api/stream/traces/latest HTTP/1.1\r\n\r\n")
+            await server._handle(reader, writer)  # type: ignore[arg-type]
+
+        asyncio.run(asyncio.wait_for(run(), 5))
+        self.assertTrue(bytes(writer.data).startswith(b"HTTP/1.1 500 Internal Server Error"))
+        self.assertTrue(writer.closed)
+        self.assertEqual(server.connection_count, 0)
+        self.assertEqual(broker.subscriber_count(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
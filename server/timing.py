@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+
+class DeadlineExceededError(Exception):
+    """Raised at a deadline checkpoint once the current request has run out of time."""
+
+
+class PhaseTimer:
+    """Per-request phase durations; a phase entered more than once accumulates.
+
+    `deadline` is an optional `time.perf_counter()` value after which `check_deadline` aborts the
+    request's remaining work.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.deadline: Optional[float] = None
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def phases_ms(self) -> Dict[str, float]:
+        return {name: round(seconds * 1000, 3) for name, seconds in self.phases.items()}
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: each phase plus `total` up to the moment headers are sent."""
+        entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.phases.items()]
+        entries.append(f"total;dur={self.elapsed_ms():.2f}")
+        return ", ".join(entries)
+
+
+class _Phase:
+    __slots__ = ("_timer", "_name", "_started")
+
+    def __init__(self, timer: PhaseTimer, name: str) -> None:
+        self._timer = timer
+        self._name = name
+        self._started = 0.0
+
+    def __enter__(self) -> None:
+        self._started = time.perf_counter()
+
+    def __exit__(self, *_exc: object) -> None:
+        self._timer.add(self._name, time.perf_counter() - self._started)
+
+
+class _NoPhase:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *_exc: object) -> None:
+        return None
+
+
+_NO_PHASE = _NoPhase()
+# ContextVars are per thread under ThreadingHTTPServer and per task under asyncio.
+_CURRENT: ContextVar[Optional[PhaseTimer]] = ContextVar("agent_director_phase_timer", default=None)
+
+
+def start_request() -> PhaseTimer:
+    timer = PhaseTimer()
+    _CURRENT.set(timer)
+    return timer
+
+
+def end_request() -> None:
+    _CURRENT.set(None)
+
+
+def current_timer() -> Optional[PhaseTimer]:
+    return _CURRENT.get()
+
+
+def phase(name: str) -> _Phase | _NoPhase:
+    """Time a block into the current request's timer; a no-op outside a request (MCP, scripts)."""
+    timer = _CURRENT.get()
+    return _Phase(timer, name) if timer is not None else _NO_PHASE
+
+
+def check_deadline() -> None:
+    """Raise DeadlineExceededError if the current request is past its deadline.
+
+    Long computations call this between stages; outside a request, or without a deadline, it is a
+    no-op.
+    """
+    timer = _CURRENT.get()
+    if timer is not None and timer.deadline is not None and time.perf_counter() > timer.deadline:
+        raise DeadlineExceededError("Request deadline exceeded")
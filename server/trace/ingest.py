@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Dict, Iterable, Iterator, Set, Tuple
+
+from ..mcp.schema import validate_input
+from .schema import StepDetails, StepSummary, TraceSummary
+from .store import TraceStore
+
+
+def _parse_line(line: bytes, line_number: int) -> Dict[str, Any]:
+    try:
+        record = json.loads(line)
+    except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise ValueError(f"Line {line_number}: malformed JSON") from exc
+    if not isinstance(record, dict):
+        raise ValueError(f"Line {line_number}: record must be an object")
+    return record
+
+
+# JSON types of the fields StepSummary / TraceSummary copy through without converting; null
+# leaves a field unset. Bools are rejected where a number is expected.
+_NUMBER = (int, float)
+_STEP_FIELD_TYPES: Dict[str, Any] = {
+    "index": int,
+    "type": str,
+    "name": str,
+    "startedAt": str,
+    "endedAt": str,
+    "durationMs": _NUMBER,
+    "status": str,
+    "error": str,
+    "parentStepId": str,
+    "childStepIds": list,
+    "attempt": int,
+    "retryOfStepId": str,
+    "metrics": dict,
+    "preview": dict,
+    "io": dict,
+    "toolCallId": str,
+}
+_METRICS_FIELD_TYPES: Dict[str, Any] = {"tokensTotal": int, "costUsd": _NUMBER}
+_PREVIEW_FIELD_TYPES: Dict[str, Any] = {
+    "title": str,
+    "subtitle": str,
+    "inputPreview": str,
+    "outputPreview": str,
+}
+_IO_FIELD_TYPES: Dict[str, Any] = {"emittedToolCallIds": list, "consumedToolCallIds": list}
+_HEADER_FIELD_TYPES: Dict[str, Any] = {
+    "name": str,
+    "startedAt": str,
+    "endedAt": str,
+    "status": str,
+    "metadata": dict,
+    "parentTraceId": str,
+    "branchPointStepId": str,
+    "replay": dict,
+}
+_METADATA_FIELD_TYPES: Dict[str, Any] = {
+    "source": str,
+    "agentName": str,
+    "modelId": str,
+    "wallTimeMs": _NUMBER,
+    "workTimeMs": _NUMBER,
+    "totalTokens": int,
+    "totalCostUsd": _NUMBER,
+    "errorCount": int,
+    "retryCount": int,
+}
+
+
+def _check_types(
+    record: Dict[str, Any], types: Dict[str, Any], where: str, line_number: int
+) -> None:
+    for key, expected in types.items():
+        value = record.get(key)
+        if value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, expected):
+            raise ValueError(f"Line {line_number}: {where} {key} has invalid type")
+        if expected is list and not all(isinstance(item, str) for item in value):
+            raise ValueError(f"Line {line_number}: {where} {key} items must be strings")
+
+
+def _check_step(record: Dict[str, Any], line_number: int) -> None:
+    _check_types(record, _STEP_FIELD_TYPES, "step", line_number)
+    for key, types in (
+        ("metrics", _METRICS_FIELD_TYPES),
+        ("preview", _PREVIEW_FIELD_TYPES),
+        ("io", _IO_FIELD_TYPES),
+    ):
+        if record.get(key) is not None:
+            _check_types(record[key], types, f"step {key}", line_number)
+
+
+def _check_header(header: Dict[str, Any]) -> None:
+    _check_types(header, _HEADER_FIELD_TYPES, "trace", 1)
+    if header.get("metadata") is not None:
+        _check_types(header["metadata"], _METADATA_FIELD_TYPES, "trace metadata", 1)
+
+
+def ingest_ndjson(store: TraceStore, lines: Iterable[bytes]) -> Tuple[TraceSummary, int, int]:
+    """Ingest an NDJSON trace: a header line, then one step or details record per line.
+
+    The header is a trace object without `steps` (`"record": "trace"` is optional). Later lines are
+    `{"record": "step", ...StepSummary, "data"?: {...}}` or `{"record": "details", "id": <step id>,
+    "data": {...}}` for a step already sent. Fields of the wrong JSON type are rejected. Step
+    summaries and details are staged on disk as they arrive, so only the step ids are held in
+    memory, and are moved into place once the trace is stored. If the stream fails part-way
+    through, nothing is published, and the staged files are discarded without touching a copy of
+    the trace that another upload stored. Returns the trace header (without steps), the number
+    of steps and the number of steps with details.
+    """
+    iterator = iter(lines)
+    first = next(iterator, None)
+    if first is None:
+        raise ValueError("Empty trace body")
+    header = _parse_line(first, 1)
+    if header.pop("record", "trace") != "trace":
+        raise ValueError("Line 1: first record must be the trace header")
+    header.pop("steps", None)
+    trace_id = header.get("id")
+    validate_input("show_trace", {"trace_id": trace_id})
+    _check_header(header)
+    try:
+        summary = TraceSummary.from_dict({**header, "steps": []})
+    except (AttributeError, KeyError, TypeError, ValueError) as exc:
+        raise ValueError(f"Line 1: invalid trace header: {exc}") from exc
+
+    # Byte offset of each step's line in the staged steps file.
+    offsets: Dict[str, int] = {}
+    detailed: Set[str] = set()
+    with store.staging_dir() as staging:
+        steps_path = staging / "steps.ndjson"
+        with steps_path.open("w+b") as staged:
+            for line_number, line in enumerate(iterator, start=2):
+                record = _parse_line(line, line_number)
+                kind = record.pop("record", "step")
+                data = record.pop("data", None)
+                if data is not None and not isinstance(data, dict):
+                    raise ValueError(f"Line {line_number}: data must be an object")
+                step_id = record.get("id")
+                validate_input("get_step_details", {"trace_id": summary.id, "step_id": step_id})
+                if kind == "step":
+                    if step_id in offsets:
+                        raise ValueError(f"Line {line_number}: duplicate step id {step_id}")
+                    _check_step(record, line_number)
+                    try:
+                        step = StepSummary.from_dict(record)
+                    except (AttributeError, KeyError, TypeError, ValueError) as exc:
+                        raise ValueError(f"Line {line_number}: invalid step: {exc}") from exc
+                    staged.seek(0, os.SEEK_END)
+                    offsets[step.id] = staged.tell()
+                    staged.write(json.dumps(step.to_dict()).encode("utf-8") + b"\n")
+                elif kind == "details":
+                    if step_id not in offsets:
+                        raise ValueError(f"Line {line_number}: details for unknown step {step_id}")
+                    if data is None:
+                        raise ValueError(f"Line {line_number}: details record needs data")
+                    staged.seek(offsets[step_id])
+                    step = StepSummary.from_dict(json.loads(staged.readline()))
+                else:
+                    raise ValueError(f"Line {line_number}: unknown record type {kind!r}")
+                if data is not None:
+                    store.stage_step_details(staging, StepDetails.from_summary(step, data))
+                    detailed.add(step.id)
+
+        def load_steps() -> Iterator[StepSummary]:
+            with steps_path.open("rb") as handle:
+                for line in handle:
+                    yield StepSummary.from_dict(json.loads(line))
+
+        store.ingest_trace_steps(summary, load_steps)
+        store.commit_step_details(summary.id, staging)
+    return summary, len(offsets), len(detailed)
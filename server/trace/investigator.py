@@ -3,12 +3,14 @@ from __future__ import annotations
 from datetime import datetime, timezone
 from typing import Any, Dict, List
 
+from ..timing import check_deadline
 from .insights import compute_insights
 from .schema import TraceSummary
 
 
 def investigate_trace(trace: TraceSummary) -> Dict[str, Any]:
     insights = compute_insights(trace)
+    check_deadline()
     hypotheses: List[Dict[str, Any]] = []
 
     failed_steps = [step for step in trace.steps if step.status == "failed"]
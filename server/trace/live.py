@@ -1,40 +1,427 @@
 from __future__ import annotations
 
-from collections import defaultdict
+import json
+from collections import OrderedDict, defaultdict, deque
 from datetime import datetime, timezone
 from queue import Queue
 from threading import Lock
-from typing import Dict, Tuple
+from typing import Any, Callable, Deque, Dict, List, Optional, Protocol, Tuple
 from uuid import uuid4
 
-from .schema import TraceSummary
+from ..config import DEFAULT_SSE_REPLAY_BYTES, DEFAULT_SSE_REPLAY_DEPTH
+from .schema import StepSummary, TraceSummary
+
+STREAM_MODES = {"full", "delta"}
+TOPIC_KINDS = {"trace", "lineage", "job"}
+ALL_TOPIC = "all"
+DEFAULT_SNAPSHOT_INTERVAL = 50
+MAX_TRACKED_TRACES = 64
+MAX_REPLAY_TOPICS = 256
+
+
+class FrameSink(Protocol):
+    """Anything with a thread-safe put_nowait; queue.Queue or an event-loop adapter."""
+
+    def put_nowait(self, item: bytes) -> None: ...
+
+
+def queued_frames(sink: FrameSink) -> int:
+    """Frames waiting in a subscriber queue; sinks without qsize() count as empty."""
+    qsize = getattr(sink, "qsize", None)
+    return qsize() if callable(qsize) else 0
+
+
+def encode_sse_event(
+    event_name: str, payload: Dict[str, Any], event_id: Optional[int] = None
+) -> bytes:
+    """Encode one SSE frame; published frames are shared by reference across subscribers."""
+    id_line = f"id: {event_id}\n" if event_id is not None else ""
+    return f"event: {event_name}\ndata: {json.dumps(payload)}\n{id_line}\n".encode("utf-8")
+
+
+class EventRing:
+    """Recent encoded frames for one topic, bounded by event count and total bytes."""
+
+    def __init__(
+        self,
+        floor: int = 0,
+        max_events: int = DEFAULT_SSE_REPLAY_DEPTH,
+        max_bytes: int = DEFAULT_SSE_REPLAY_BYTES,
+    ) -> None:
+        self._frames: Deque[Tuple[int, bytes]] = deque()
+        self._max_events = max_events
+        self._max_bytes = max_bytes
+        self._bytes = 0
+        # Every event for this topic published after _floor is still buffered.
+        self._floor = floor
+
+    def append(self, event_id: int, frame: bytes) -> None:
+        self._frames.append((event_id, frame))
+        self._bytes += len(frame)
+        while self._frames and (
+            len(self._frames) > self._max_events or self._bytes > self._max_bytes
+        ):
+            evicted_id, evicted = self._frames.popleft()
+            self._bytes -= len(evicted)
+            self._floor = evicted_id
+
+    def since(self, last_event_id: int) -> Optional[List[bytes]]:
+        """Frames published after last_event_id, or None when the ring cannot cover the gap."""
+        if last_event_id < self._floor:
+            return None
+        return [frame for event_id, frame in self._frames if event_id > last_event_id]
+
+
+def topic_for(kind: str, key: str) -> str:
+    if kind not in TOPIC_KINDS:
+        raise ValueError(f"topic kind must be one of {sorted(TOPIC_KINDS)}")
+    return f"{kind}:{key}"
+
+
+def trace_topics(trace: TraceSummary) -> List[str]:
+    """Every topic a published trace is routed to."""
+    topics = [ALL_TOPIC, topic_for("trace", trace.id), topic_for("lineage", trace.id)]
+    if trace.parentTraceId:
+        topics.append(topic_for("lineage", trace.parentTraceId))
+    if trace.replay:
+        job_id = (trace.replay.modifications.get("__system__") or {}).get("jobId")
+        if job_id:
+            topics.append(topic_for("job", str(job_id)))
+    return topics
+
+
+def trace_delta(previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """Diff two serialized traces into step changes plus a top-level field patch.
+
+    Steps are compared by position, not id, since ids are not guaranteed unique within a trace.
+    A client applies the delta by truncating its steps to stepCount - len(addedSteps), replacing
+    each changedSteps entry at its position and appending addedSteps.
+    """
+    previous_steps = previous.get("steps", [])
+    current_steps = current.get("steps", [])
+    shared = min(len(previous_steps), len(current_steps))
+    return {
+        "addedSteps": current_steps[shared:],
+        "changedSteps": [
+            {"position": position, "step": current_steps[position]}
+            for position in range(shared)
+            if previous_steps[position] != current_steps[position]
+        ],
+        "stepCount": len(current_steps),
+        "patch": {
+            key: value
+            for key, value in current.items()
+            if key != "steps" and previous.get(key) != value
+        },
+        "unset": [key for key in previous if key != "steps" and key not in current],
+    }
+
+
+class _LiveTrace:
+    """The last payload published for a trace, kept as a step list that grows in place.
+
+    Published steps are applied to `steps` directly; payload() copies the list only when a
+    full payload is actually needed (full frames, snapshots), so a run of step publishes to
+    delta subscribers costs O(1) each instead of a copy of every earlier step.
+    """
+
+    __slots__ = ("seq", "_fields", "steps", "_positions", "_payload")
+
+    def __init__(self, payload: Dict[str, Any]) -> None:
+        self.seq = 0
+        self._fields = payload
+        self.steps: List[Dict[str, Any]] = list(payload.get("steps", []))
+        # Last position of each step id; with duplicate ids the last occurrence is replaced.
+        self._positions = {step.get("id"): index for index, step in enumerate(self.steps)}
+        self._payload: Optional[Dict[str, Any]] = payload
+
+    def apply_step(self, step: Dict[str, Any], updated: bool) -> Optional[int]:
+        """Append step, or replace the step with its id when updated.
+
+        Returns the position that was replaced, or None when the step was appended.
+        """
+        position = self._positions.get(step.get("id")) if updated else None
+        if position is None:
+            self._positions[step.get("id")] = len(self.steps)
+            self.steps.append(step)
+        else:
+            self.steps[position] = step
+        self._payload = None
+        return position
+
+    def payload(self) -> Dict[str, Any]:
+        # Earlier payloads may still be encoding elsewhere, so each one gets its own list.
+        if self._payload is None:
+            self._payload = {
+                key: list(self.steps) if key == "steps" else value
+                for key, value in self._fields.items()
+            }
+            if "steps" not in self._fields:
+                self._payload["steps"] = list(self.steps)
+        return self._payload
 
 
 class LiveTraceBroker:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        snapshot_interval: int = DEFAULT_SNAPSHOT_INTERVAL,
+        max_tracked_traces: int = MAX_TRACKED_TRACES,
+        replay_depth: int = DEFAULT_SSE_REPLAY_DEPTH,
+        replay_bytes: int = DEFAULT_SSE_REPLAY_BYTES,
+    ) -> None:
         self._lock = Lock()
-        self._subscribers: Dict[str, Queue[dict]] = {}
+        self._publish_lock = Lock()
+        # topic -> token -> (queue, mode); publishing only visits the trace's own topics.
+        self._subscribers: Dict[str, Dict[str, Tuple[FrameSink, str]]] = {}
+        self._topics: Dict[str, str] = {}
         self._events_emitted = defaultdict(int)
+        self._snapshot_interval = max(1, snapshot_interval)
+        self._max_tracked_traces = max(1, max_tracked_traces)
+        # Last published state per trace id, used as the delta base.
+        self._traces: OrderedDict[str, _LiveTrace] = OrderedDict()
+        self._trace_topics: Dict[str, List[str]] = {}
+        # One replay ring per (mode, topic); a ring starts recording once it has had a subscriber.
+        self._rings: OrderedDict[Tuple[str, str], EventRing] = OrderedDict()
+        self._replay_depth = replay_depth
+        self._replay_bytes = replay_bytes
+        self._last_event_id = 0
+
+    @property
+    def last_event_id(self) -> int:
+        return self._last_event_id
 
-    def subscribe(self) -> Tuple[str, Queue[dict]]:
+    def subscribe(
+        self, mode: str = "full", topic: str = ALL_TOPIC, queue: Optional[FrameSink] = None
+    ) -> Tuple[str, FrameSink]:
+        if mode not in STREAM_MODES:
+            raise ValueError(f"mode must be one of {sorted(STREAM_MODES)}")
         token = uuid4().hex
-        queue: Queue[dict] = Queue()
+        if queue is None:
+            queue = Queue()
         with self._lock:
-            self._subscribers[token] = queue
+            self._subscribers.setdefault(topic, {})[token] = (queue, mode)
+            self._topics[token] = topic
+            ring_key = (mode, topic)
+            if ring_key in self._rings:
+                self._rings.move_to_end(ring_key)
+            else:
+                self._rings[ring_key] = EventRing(
+                    self._last_event_id, self._replay_depth, self._replay_bytes
+                )
+                while len(self._rings) > MAX_REPLAY_TOPICS:
+                    self._rings.popitem(last=False)
+        return token, queue
+
+    def resume(
+        self,
+        mode: str,
+        last_event_id: int,
+        topic: str = ALL_TOPIC,
+        queue: Optional[FrameSink] = None,
+    ) -> Optional[Tuple[str, FrameSink]]:
+        """Subscribe with every frame after last_event_id pre-queued, or None if they are gone."""
+        if mode not in STREAM_MODES:
+            raise ValueError(f"mode must be one of {sorted(STREAM_MODES)}")
+        with self._publish_lock:
+            if last_event_id > self._last_event_id:
+                return None
+            ring = self._rings.get((mode, topic))
+            if ring is not None:
+                backlog = ring.since(last_event_id)
+            else:
+                backlog = [] if last_event_id == self._last_event_id else None
+            if backlog is None:
+                return None
+            token, queue = self.subscribe(mode, topic, queue)
+            for frame in backlog:
+                queue.put_nowait(frame)
         return token, queue
 
     def unsubscribe(self, token: str) -> None:
         with self._lock:
-            self._subscribers.pop(token, None)
+            topic = self._topics.pop(token, None)
+            if topic is None:
+                return
+            topic_subscribers = self._subscribers.get(topic, {})
+            topic_subscribers.pop(token, None)
+            if not topic_subscribers:
+                self._subscribers.pop(topic, None)
+
+    def subscriber_count(self, topic: Optional[str] = None) -> int:
+        with self._lock:
+            if topic is None:
+                return len(self._topics)
+            return len(self._subscribers.get(topic, {}))
+
+    def stream_stats(self) -> Tuple[int, int]:
+        """(subscriber count, frames queued across all subscribers) for metrics scrapes."""
+        with self._lock:
+            sinks = [sink for topic in self._subscribers.values() for sink, _ in topic.values()]
+        return len(sinks), sum(queued_frames(sink) for sink in sinks)
+
+    def snapshot(self, trace_id: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        with self._lock:
+            live = self._traces.get(trace_id)
+            return (live.seq, live.payload()) if live else None
 
     def publish_trace(self, trace: TraceSummary) -> None:
-        event = {
-            "type": "trace",
-            "publishedAt": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
-            "trace": trace.to_dict(),
-        }
+        payload = trace.to_dict()
+        base: List[Optional[_LiveTrace]] = [None]
+
+        def replace(previous: Optional[_LiveTrace]) -> _LiveTrace:
+            # previous is no longer published to, so its payload can be taken lazily.
+            base[0] = previous
+            return _LiveTrace(payload)
+
+        def delta() -> Dict[str, Any]:
+            return trace_delta(base[0].payload() if base[0] else {}, payload)
+
+        with self._publish_lock:
+            self._publish(trace.id, trace_topics(trace), replace, delta)
+
+    def publish_step(
+        self,
+        trace_id: str,
+        step: StepSummary,
+        load_trace: Callable[[], TraceSummary],
+        updated: bool = False,
+    ) -> None:
+        """Publish one appended or updated step as a delta on the last payload sent for the trace.
+
+        Delta frames then carry only that step. When the trace is not tracked (never published, or
+        evicted) load_trace() supplies the full trace, which is published as usual instead.
+        """
+        step_payload = step.to_dict()
+        applied: List[Optional[int]] = [None, 0]
+
+        def apply(previous: Optional[_LiveTrace]) -> _LiveTrace:
+            assert previous is not None
+            applied[0] = previous.apply_step(step_payload, updated)
+            applied[1] = len(previous.steps)
+            return previous
+
+        def delta() -> Dict[str, Any]:
+            position, step_count = applied
+            return {
+                "addedSteps": [step_payload] if position is None else [],
+                "changedSteps": (
+                    [] if position is None else [{"position": position, "step": step_payload}]
+                ),
+                "stepCount": step_count,
+                "patch": {},
+                "unset": [],
+            }
+
+        with self._publish_lock:
+            with self._lock:
+                topics = self._trace_topics.get(trace_id) if trace_id in self._traces else None
+            if topics is not None:
+                self._publish(trace_id, topics, apply, delta)
+                return
+        self.publish_trace(load_trace())
+
+    def _publish(
+        self,
+        trace_id: str,
+        topics: List[str],
+        update: Callable[[Optional[_LiveTrace]], _LiveTrace],
+        delta: Callable[[], Dict[str, Any]],
+    ) -> None:
+        # Callers hold _publish_lock. update() turns the previous state into the new one under
+        # _lock, so snapshot() never pairs a payload with the wrong seq; delta() describes the
+        # change and is only called if a delta frame needs it.
+        published_at = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
         with self._lock:
-            subscribers = list(self._subscribers.items())
-        for token, queue in subscribers:
-            queue.put_nowait(event)
+            previous = self._traces.pop(trace_id, None)
+            previous_seq = previous.seq if previous else None
+            live = update(previous)
+            live.seq = previous_seq + 1 if previous_seq else 1
+            seq = live.seq
+            self._traces[trace_id] = live
+            self._trace_topics[trace_id] = topics
+            while len(self._traces) > self._max_tracked_traces:
+                evicted_id, _ = self._traces.popitem(last=False)
+                self._trace_topics.pop(evicted_id, None)
+            subscribers = [
+                (token, queue, mode)
+                for topic in topics
+                for token, (queue, mode) in self._subscribers.get(topic, {}).items()
+            ]
+            rings = [
+                (mode, self._rings[(mode, topic)])
+                for topic in topics
+                for mode in STREAM_MODES
+                if (mode, topic) in self._rings
+            ]
+            self._last_event_id += 1
+            event_id = self._last_event_id
+        frames: Dict[str, bytes] = {}
+
+        def frame_for(mode: str) -> bytes:
+            if mode not in frames:
+                frames[mode] = self._encode_frame(
+                    mode, event_id, trace_id, seq, published_at, live, previous_seq, delta
+                )
+            return frames[mode]
+
+        for mode, ring in rings:
+            ring.append(event_id, frame_for(mode))
+        for token, queue, mode in subscribers:
+            queue.put_nowait(frame_for(mode))
             self._events_emitted[token] += 1
+
+    def _encode_frame(
+        self,
+        mode: str,
+        event_id: int,
+        trace_id: str,
+        seq: int,
+        published_at: str,
+        live: _LiveTrace,
+        previous_seq: Optional[int],
+        delta: Callable[[], Dict[str, Any]],
+    ) -> bytes:
+        if mode == "delta":
+            return self._encode_delta_frame(
+                event_id, trace_id, seq, published_at, live, previous_seq, delta
+            )
+        return encode_sse_event(
+            "trace",
+            {"type": "trace", "publishedAt": published_at, "trace": live.payload()},
+            event_id,
+        )
+
+    def _encode_delta_frame(
+        self,
+        event_id: int,
+        trace_id: str,
+        seq: int,
+        published_at: str,
+        live: _LiveTrace,
+        previous_seq: Optional[int],
+        delta: Callable[[], Dict[str, Any]],
+    ) -> bytes:
+        if previous_seq is None or seq % self._snapshot_interval == 0:
+            return encode_sse_event(
+                "trace.snapshot",
+                {
+                    "type": "trace.snapshot",
+                    "publishedAt": published_at,
+                    "traceId": trace_id,
+                    "seq": seq,
+                    "trace": live.payload(),
+                },
+                event_id,
+            )
+        return encode_sse_event(
+            "trace.delta",
+            {
+                "type": "trace.delta",
+                "publishedAt": published_at,
+                "traceId": trace_id,
+                "seq": seq,
+                "baseSeq": previous_seq,
+                **delta(),
+            },
+            event_id,
+        )
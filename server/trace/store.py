@@ -2,18 +2,27 @@ from __future__ import annotations
 
 import gzip
 import json
+import os
 import shutil
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+from dataclasses import replace
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional
+from tempfile import TemporaryDirectory
+from threading import Lock
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from uuid import uuid4
 
-from .schema import StepDetails, StepSummary, TraceSummary
+from ..json_stream import LazyArray, iter_json
+from ..metrics import SQLITE_QUERY_SECONDS, STORE_SUMMARY_LOAD_SECONDS
+from ..timing import phase
+from .schema import StepDetails, StepSummary, TraceMetadata, TraceSummary
 
-
-SCHEMA_VERSION = 4
+SCHEMA_VERSION = 7
+MAX_DETAIL_READ_WORKERS = 8
+FINAL_TRACE_STATUSES = {"completed", "failed"}
 
 
 class TraceStore:
@@ -23,6 +32,8 @@ class TraceStore:
         self.steps_dir = data_dir / "steps"
         self.db_path = data_dir / "traces.db"
         self.last_ingest_warnings: List[str] = []
+        self._generation_conn: Optional[sqlite3.Connection] = None
+        self._generation_lock = Lock()
         self._ensure_dirs()
         self._init_db()
         if demo_dir:
@@ -34,15 +45,17 @@ class TraceStore:
         self.steps_dir.mkdir(parents=True, exist_ok=True)
 
     @contextmanager
-    def _db(self):
+    def _db(self, operation: str):
         conn = sqlite3.connect(self.db_path)
         try:
-            yield conn
+            with SQLITE_QUERY_SECONDS.time((operation,)):
+                yield conn
         finally:
             conn.close()
 
     def _init_db(self) -> None:
-        with self._db() as conn:
+        backfill = False
+        with self._db("init") as conn:
             cur = conn.cursor()
             cur.execute("PRAGMA journal_mode=WAL")
             cur.execute(
@@ -143,6 +156,103 @@ class TraceStore:
                 version = 4
                 cur.execute(f"PRAGMA user_version = {version}")
                 conn.commit()
+            if version < 5:
+                cur.execute(
+                    "CREATE TABLE IF NOT EXISTS store_meta "
+                    "(key TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+                )
+                cur.execute(
+                    "INSERT OR IGNORE INTO store_meta (key, value) VALUES ('generation', 0)"
+                )
+                version = 5
+                cur.execute(f"PRAGMA user_version = {version}")
+                conn.commit()
+            if version < 6:
+                # Header JSON (the trace without steps) and each step's JSON in trace order, so
+                # projected and paged reads are served from the index without the summary file.
+                cur.execute("ALTER TABLE traces ADD COLUMN header TEXT")
+                cur.execute("ALTER TABLE steps ADD COLUMN position INTEGER")
+                cur.execute("ALTER TABLE steps ADD COLUMN summary TEXT")
+                cur.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_steps_position ON steps(traceId, position)"
+                )
+                version = 6
+                cur.execute(f"PRAGMA user_version = {version}")
+                conn.commit()
+                backfill = True
+            if version < 7:
+                # Steps are keyed by position: step ids are not unique within every trace, and
+                # keying by id merged duplicates. The rows are rebuilt from the summaries below.
+                cur.execute("DROP TABLE steps")
+                cur.execute(
+                    """
+                    CREATE TABLE steps (
+                        traceId TEXT NOT NULL,
+                        stepId TEXT,
+                        stepIndex INTEGER,
+                        type TEXT,
+                        name TEXT,
+                        startedAt TEXT,
+                        endedAt TEXT,
+                        status TEXT,
+                        durationMs INTEGER,
+                        toolCallId TEXT,
+                        metricsTokens INTEGER,
+                        metricsCost REAL,
+                        previewTitle TEXT,
+                        previewSubtitle TEXT,
+                        previewInput TEXT,
+                        previewOutput TEXT,
+                        parentStepId TEXT,
+                        position INTEGER NOT NULL,
+                        summary TEXT,
+                        PRIMARY KEY (traceId, position)
+                    )
+                    """
+                )
+                cur.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_steps_trace_step ON steps(traceId, stepId)"
+                )
+                cur.execute("CREATE INDEX IF NOT EXISTS idx_steps_toolcall ON steps(toolCallId)")
+                version = 7
+                cur.execute(f"PRAGMA user_version = {version}")
+                conn.commit()
+                backfill = True
+        if backfill:
+            for summary_file in self.traces_dir.glob("*.summary.json"):
+                summary = self._load_summary(summary_file)
+                self._upsert_steps(summary.id, summary.steps)
+                self._upsert_trace(summary)
+
+    def generation(self) -> int:
+        """Counter bumped by every committed trace write, from any process sharing the data dir.
+
+        Summary files are written before the commit that bumps it, so a reader that sees a new
+        generation also sees the new files. Comments and audit rows do not count as trace writes.
+        """
+        with self._generation_lock:
+            if self._generation_conn is None:
+                self._generation_conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            row = self._generation_conn.execute(GENERATION_SQL).fetchone()
+        return int(row[0]) if row else 0
+
+    def trace_version(self, trace_id: str) -> Tuple[int, ...]:
+        """A cheap validator for one trace: the generation plus its summary and append log stats.
+
+        Summaries are replaced by rename and the log only grows, so any write to the trace changes
+        it. Read it before the summary: a response tagged with it never holds older data.
+        """
+        generation = self.generation()
+        try:
+            stat = (self.traces_dir / f"{trace_id}.summary.json").stat()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Trace not found: {trace_id}") from None
+        try:
+            log = self._append_log_path(trace_id).stat()
+            log_version: Tuple[int, ...] = (log.st_ino, log.st_mtime_ns, log.st_size)
+        except FileNotFoundError:
+            log_version = ()
+        return (generation, stat.st_ino, stat.st_mtime_ns, stat.st_size, *log_version)
 
     def bootstrap_demo_if_empty(self, demo_dir: Path) -> None:
         if any(self.traces_dir.glob("*.summary.json")):
@@ -160,27 +270,100 @@ class TraceStore:
                         continue
                     shutil.copytree(trace_dir, dest)
         for summary in self.list_traces():
-            self._upsert_trace(summary)
             self._upsert_steps(summary.id, summary.steps)
+            self._upsert_trace(summary)
 
     def list_traces(self) -> List[TraceSummary]:
         traces: List[TraceSummary] = []
         for summary_file in self.traces_dir.glob("*.summary.json"):
             traces.append(self._load_summary(summary_file))
-        traces.sort(key=lambda t: t.startedAt)
+        traces.sort(key=lambda t: (t.startedAt, t.id))
         return traces
 
+    def iter_traces(self) -> Iterator[TraceSummary]:
+        """Every trace in start order, as list_traces, reading each summary only when reached."""
+        with self._db("iter_traces") as conn:
+            ids = [row[0] for row in conn.execute("SELECT id FROM traces ORDER BY startedAt, id")]
+        for trace_id in ids:
+            try:
+                yield self._load_summary(self.traces_dir / f"{trace_id}.summary.json")
+            except FileNotFoundError:
+                continue  # Deleted since the ids were read.
+
+    def step_total(self) -> int:
+        """Steps across all traces, counted in the index."""
+        with self._db("step_total") as conn:
+            return conn.execute("SELECT COUNT(*) FROM steps").fetchone()[0]
+
+    def list_trace_headers(self) -> List[Tuple[TraceSummary, int]]:
+        """Every trace without its steps, with its step count, read from the index only."""
+        with self._db("list_trace_headers") as conn:
+            rows = conn.execute(
+                "SELECT header, (SELECT COUNT(*) FROM steps WHERE steps.traceId = traces.id) "
+                "FROM traces ORDER BY startedAt, id"
+            ).fetchall()
+        with phase("parse"):
+            return [(TraceSummary.from_dict(json.loads(header)), count) for header, count in rows]
+
+    def get_trace_page(
+        self,
+        trace_id: Optional[str] = None,
+        step_offset: int = 0,
+        step_limit: Optional[int] = None,
+        include_steps: bool = True,
+    ) -> Tuple[TraceSummary, int]:
+        """Read a trace header and one window of its steps (in trace order), plus the step count.
+
+        Only the requested rows are loaded, so a large trace can be paged without reading its
+        summary file. Without `trace_id` the most recently started trace is used, as in get_summary.
+        """
+        with self._db("get_trace_page") as conn:
+            # One read transaction, so the window and the count come from the same snapshot.
+            conn.execute("BEGIN")
+            if trace_id is None:
+                row = conn.execute(
+                    "SELECT id, header FROM traces ORDER BY startedAt DESC, id DESC LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    raise FileNotFoundError("No traces available")
+            else:
+                row = conn.execute(
+                    "SELECT id, header FROM traces WHERE id = ?", (trace_id,)
+                ).fetchone()
+                if row is None:
+                    raise FileNotFoundError(f"Trace not found: {trace_id}")
+            trace_id, header = row
+            count = conn.execute(
+                "SELECT COUNT(*) FROM steps WHERE traceId = ?", (trace_id,)
+            ).fetchone()[0]
+            steps: List[str] = []
+            if include_steps:
+                steps = [
+                    summary
+                    for (summary,) in conn.execute(
+                        "SELECT summary FROM steps WHERE traceId = ? "
+                        "ORDER BY position LIMIT ? OFFSET ?",
+                        (trace_id, -1 if step_limit is None else step_limit, step_offset),
+                    )
+                ]
+        with phase("parse"):
+            trace = TraceSummary.from_dict(json.loads(header))
+            trace.steps = [StepSummary.from_dict(json.loads(step)) for step in steps]
+        return trace, count
+
     def delete_trace(self, trace_id: str) -> None:
         summary_path = self.traces_dir / f"{trace_id}.summary.json"
         if summary_path.exists():
             summary_path.unlink()
+        self._append_log_path(trace_id).unlink(missing_ok=True)
         trace_steps = self.steps_dir / trace_id
         if trace_steps.exists():
             shutil.rmtree(trace_steps, ignore_errors=True)
-        with self._db() as conn:
+        with self._db("delete_trace") as conn:
             conn.execute("DELETE FROM steps WHERE traceId = ?", (trace_id,))
             conn.execute("DELETE FROM traces WHERE id = ?", (trace_id,))
             conn.execute("DELETE FROM comments WHERE traceId = ?", (trace_id,))
+            conn.execute(BUMP_GENERATION_SQL)
             conn.commit()
 
     def add_comment(
@@ -201,9 +384,9 @@ class TraceStore:
             "author": author.strip(),
             "body": body.strip(),
             "pinned": bool(pinned),
-            "createdAt": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+            "createdAt": _utc_now(),
         }
-        with self._db() as conn:
+        with self._db("add_comment") as conn:
             conn.execute(
                 """
                 INSERT INTO comments (id, traceId, stepId, author, body, pinned, createdAt)
@@ -223,7 +406,7 @@ class TraceStore:
         return comment
 
     def list_comments(self, trace_id: str, step_id: Optional[str] = None) -> List[Dict[str, object]]:
-        with self._db() as conn:
+        with self._db("list_comments") as conn:
             if step_id:
                 rows = conn.execute(
                     """
@@ -280,31 +463,45 @@ class TraceStore:
             "revealedPaths": revealed_paths,
             "deniedPaths": denied_paths,
             "safeExport": safe_export,
-            "createdAt": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+            "createdAt": _utc_now(),
         }
-        with self._db() as conn:
-            conn.execute(
+        return self.log_redaction_events([event])[0]
+
+    def log_redaction_events(self, events: List[Dict[str, object]]) -> List[Dict[str, object]]:
+        """Insert audit events (log_redaction_event's shape) in one transaction.
+
+        Fills in each event's id and createdAt.
+        """
+        created_at = _utc_now()
+        for event in events:
+            event.setdefault("id", uuid4().hex)
+            event.setdefault("createdAt", created_at)
+        with self._db("log_redaction_event") as conn:
+            conn.executemany(
                 """
                 INSERT INTO redaction_events (
                     id, traceId, stepId, role, action, status, requestedPaths, revealedPaths, deniedPaths, safeExport, createdAt
                 ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
-                (
-                    event["id"],
-                    event["traceId"],
-                    event["stepId"],
-                    event["role"],
-                    event["action"],
-                    event["status"],
-                    json.dumps(event["requestedPaths"]),
-                    json.dumps(event["revealedPaths"]),
-                    json.dumps(event["deniedPaths"]),
-                    1 if event["safeExport"] else 0,
-                    event["createdAt"],
-                ),
+                [
+                    (
+                        event["id"],
+                        event["traceId"],
+                        event["stepId"],
+                        event["role"],
+                        event["action"],
+                        event["status"],
+                        json.dumps(event["requestedPaths"]),
+                        json.dumps(event["revealedPaths"]),
+                        json.dumps(event["deniedPaths"]),
+                        1 if event["safeExport"] else 0,
+                        event["createdAt"],
+                    )
+                    for event in events
+                ],
             )
             conn.commit()
-        return event
+        return events
 
     def export_snapshot(self, output_path: Path) -> Path:
         output_path.parent.mkdir(parents=True, exist_ok=True)
@@ -332,6 +529,23 @@ class TraceStore:
         detail_path = trace_dir / f"{details.id}.details.json"
         self._write_json(detail_path, details.to_dict())
 
+    @contextmanager
+    def staging_dir(self) -> Iterator[Path]:
+        """A private directory on the store's filesystem, removed with its contents on exit."""
+        with TemporaryDirectory(dir=self.data_dir, prefix=".staging-") as path:
+            yield Path(path)
+
+    def stage_step_details(self, staging_dir: Path, details: StepDetails) -> None:
+        """Write details into a staging_dir() directory; commit_step_details publishes them."""
+        self._write_json(staging_dir / f"{details.id}.details.json", details.to_dict())
+
+    def commit_step_details(self, trace_id: str, staging_dir: Path) -> None:
+        """Move staged details into the trace's step directory, each with an atomic rename."""
+        trace_dir = self.steps_dir / trace_id
+        trace_dir.mkdir(parents=True, exist_ok=True)
+        for path in staging_dir.glob("*.details.json"):
+            os.replace(path, trace_dir / path.name)
+
     def get_summary(self, trace_id: Optional[str] = None) -> TraceSummary:
         traces = self.list_traces()
         if not traces:
@@ -346,14 +560,37 @@ class TraceStore:
     def get_step_details(self, trace_id: str, step_id: str) -> StepDetails:
         step_path = self.steps_dir / trace_id / f"{step_id}.details.json"
         gzip_path = self.steps_dir / trace_id / f"{step_id}.details.json.gz"
-        if step_path.exists():
-            payload = self._read_json(step_path)
-            return StepDetails.from_dict(payload)
-        if gzip_path.exists():
-            payload = self._read_json(gzip_path)
-            return StepDetails.from_dict(payload)
+        for path in (step_path, gzip_path):
+            if path.exists():
+                payload = self._read_json(path)
+                with phase("parse"):
+                    return StepDetails.from_dict(payload)
         raise FileNotFoundError(f"Step details not found: {trace_id}/{step_id}")
 
+    def get_step_details_many(
+        self, trace_id: str, step_ids: List[str]
+    ) -> Tuple[Dict[str, StepDetails], Dict[str, str]]:
+        """Read several steps' details concurrently; returns (details by id, error by id)."""
+
+        def load(step_id: str) -> Tuple[str, Optional[StepDetails], Optional[str]]:
+            try:
+                return step_id, self.get_step_details(trace_id, step_id), None
+            except FileNotFoundError as exc:
+                return step_id, None, str(exc)
+            except (OSError, ValueError, KeyError) as exc:
+                return step_id, None, f"Step details unreadable: {trace_id}/{step_id}: {exc}"
+
+        unique_ids = list(dict.fromkeys(step_ids))
+        workers = min(MAX_DETAIL_READ_WORKERS, len(unique_ids))
+        if workers <= 1:
+            results = [load(step_id) for step_id in unique_ids]
+        else:
+            with ThreadPoolExecutor(workers, thread_name_prefix="agent-director-details") as pool:
+                results = list(pool.map(load, unique_ids))
+        found = {step_id: details for step_id, details, _ in results if details is not None}
+        errors = {step_id: error for step_id, _, error in results if error is not None}
+        return found, errors
+
     def ingest_trace(
         self, summary: TraceSummary, step_details: Optional[Dict[str, StepDetails]] = None
     ) -> None:
@@ -370,6 +607,8 @@ class TraceStore:
         summary_path = self.traces_dir / f"{summary.id}.summary.json"
         try:
             self._write_json(summary_path, summary.to_dict())
+            # A full ingest replaces the trace, including steps appended to an earlier running copy.
+            self._append_log_path(summary.id).unlink(missing_ok=True)
         except OSError as exc:
             self.last_ingest_warnings.append(f"Failed to write summary JSON: {exc}")
 
@@ -383,93 +622,288 @@ class TraceStore:
                 except OSError as exc:
                     self.last_ingest_warnings.append(f"Failed to write step details {step_id}: {exc}")
 
+        # Steps first: the trace upsert bumps the generation, which must not run ahead of them.
+        try:
+            self._upsert_steps(summary.id, summary.steps)
+        except sqlite3.DatabaseError as exc:
+            self.last_ingest_warnings.append(f"Failed to upsert steps for {summary.id}: {exc}")
+
         try:
             self._upsert_trace(summary)
         except sqlite3.DatabaseError as exc:
             self.last_ingest_warnings.append(f"Failed to upsert trace {summary.id}: {exc}")
 
+    def ingest_trace_steps(
+        self, header: TraceSummary, load_steps: Callable[[], Iterable[StepSummary]]
+    ) -> None:
+        """ingest_trace for a trace whose steps are read back one at a time, as NDJSON uploads are.
+
+        load_steps() is called once for the summary file and once for the step rows, so the
+        steps are never all in memory together.
+        """
+        self.last_ingest_warnings = []
+        summary_path = self.traces_dir / f"{header.id}.summary.json"
+        fields = replace(header, steps=[]).to_dict()
+        fields["steps"] = LazyArray(load_steps(), StepSummary.to_dict)
         try:
-            self._upsert_steps(summary.id, summary.steps)
+            self._write_json_chunks(summary_path, iter_json(fields))
+            self._append_log_path(header.id).unlink(missing_ok=True)
+        except OSError as exc:
+            self.last_ingest_warnings.append(f"Failed to write summary JSON: {exc}")
+
+        try:
+            self._upsert_steps(header.id, load_steps())
         except sqlite3.DatabaseError as exc:
-            self.last_ingest_warnings.append(f"Failed to upsert steps for {summary.id}: {exc}")
+            self.last_ingest_warnings.append(f"Failed to upsert steps for {header.id}: {exc}")
+
+        try:
+            self._upsert_trace(header)
+        except sqlite3.DatabaseError as exc:
+            self.last_ingest_warnings.append(f"Failed to upsert trace {header.id}: {exc}")
+
+    def append_step(self, trace_id: str, step: StepSummary, data: Optional[Dict] = None) -> None:
+        """Add one step to a running trace without rewriting its summary.
+
+        The step is inserted into the `steps` table and appended to the trace's append log; reads
+        fold the log into the summary until finalize_trace writes it out once.
+        """
+        self._write_step("append_step", trace_id, step, data, new=True)
+
+    def update_step(self, trace_id: str, step: StepSummary, data: Optional[Dict] = None) -> None:
+        """Replace an existing step of a running trace (status, end time, metrics, ...)."""
+        self._write_step("update_step", trace_id, step, data, new=False)
+
+    def finalize_trace(
+        self,
+        trace_id: str,
+        status: str,
+        ended_at: Optional[str] = None,
+        metadata: Optional[Dict] = None,
+    ) -> TraceSummary:
+        """Close a running trace: write its summary with the appended steps and drop the log."""
+        if status not in FINAL_TRACE_STATUSES:
+            raise ValueError(f"status must be one of {sorted(FINAL_TRACE_STATUSES)}")
+        summary_path = self.traces_dir / f"{trace_id}.summary.json"
+        with self._db("finalize_trace") as conn:
+            # The write lock is held until commit, so no append can land between the fold and the
+            # flip.
+            conn.execute("BEGIN IMMEDIATE")
+            self._require_running(conn, trace_id)
+            summary = TraceSummary.from_dict(self._read_json(summary_path))
+            # The steps table is authoritative; a log line left by a writer that died before
+            # its commit never reaches the final summary.
+            summary.steps = [
+                StepSummary.from_dict(json.loads(row))
+                for (row,) in conn.execute(
+                    "SELECT summary FROM steps WHERE traceId = ? ORDER BY position", (trace_id,)
+                )
+            ]
+            summary.status = status
+            summary.endedAt = ended_at or _utc_now()
+            if metadata:
+                summary.metadata = TraceMetadata.from_dict(
+                    {**summary.metadata.to_dict(), **metadata}
+                )
+            self._write_json(summary_path, summary.to_dict())
+            conn.execute(TRACE_UPSERT_SQL, _trace_row(summary))
+            conn.execute(BUMP_GENERATION_SQL)
+            conn.commit()
+        self._append_log_path(trace_id).unlink(missing_ok=True)
+        return summary
+
+    def _write_step(
+        self, operation: str, trace_id: str, step: StepSummary, data: Optional[Dict], new: bool
+    ) -> None:
+        with self._db(operation) as conn:
+            # BEGIN IMMEDIATE serializes writers across threads and processes, keeping the
+            # running check, the row and the log line consistent with a concurrent finalize.
+            conn.execute("BEGIN IMMEDIATE")
+            self._require_running(conn, trace_id)
+            # With duplicate ids the last occurrence is the one replaced, as when folding the log.
+            existing = conn.execute(
+                "SELECT position FROM steps WHERE traceId = ? AND stepId = ? "
+                "ORDER BY position DESC LIMIT 1",
+                (trace_id, step.id),
+            ).fetchone()
+            if new and existing:
+                raise ValueError(f"Step already exists: {trace_id}/{step.id}")
+            if not new and not existing:
+                raise FileNotFoundError(f"Step not found: {trace_id}/{step.id}")
+            if existing:
+                position = existing[0]
+            else:
+                position = conn.execute(
+                    "SELECT COALESCE(MAX(position) + 1, 0) FROM steps WHERE traceId = ?",
+                    (trace_id,),
+                ).fetchone()[0]
+            conn.execute(STEP_UPSERT_SQL, _step_row(trace_id, step, position))
+            if data is None and not new:
+                # Details repeat the summary fields, so refresh them even when only the summary
+                # changed.
+                try:
+                    data = self.get_step_details(trace_id, step.id).data
+                except FileNotFoundError:
+                    pass
+            if data is not None:
+                self.save_step_details(trace_id, StepDetails.from_summary(step, data))
+            # The line goes in before the commit, so a reader that sees the new generation also
+            # sees the step; if the commit fails the line is cut off again. Writers hold the lock
+            # until then, so nothing can have been appended after it.
+            log_path = self._append_log_path(trace_id)
+            with log_path.open("ab") as handle:
+                logged_at = handle.tell()
+                handle.write(json.dumps(step.to_dict()).encode("utf-8") + b"\n")
+            try:
+                conn.execute(BUMP_GENERATION_SQL)
+                conn.commit()
+            except BaseException:
+                with log_path.open("r+b") as handle:
+                    handle.truncate(logged_at)
+                raise
+
+    def _require_running(self, conn: sqlite3.Connection, trace_id: str) -> None:
+        row = conn.execute("SELECT status FROM traces WHERE id = ?", (trace_id,)).fetchone()
+        if row is None:
+            raise FileNotFoundError(f"Trace not found: {trace_id}")
+        if row[0] != "running":
+            raise ValueError(f"Trace is not running: {trace_id}")
+
+    def _append_log_path(self, trace_id: str) -> Path:
+        return self.traces_dir / f"{trace_id}.append.ndjson"
+
+    def _fold_append_log(self, summary: TraceSummary) -> TraceSummary:
+        """Apply a running trace's append log: a step per line; a repeated id replaces the step."""
+        try:
+            with self._append_log_path(summary.id).open("r", encoding="utf-8") as handle:
+                lines = handle.read().split("\n")
+        except FileNotFoundError:
+            return summary
+        positions = {step.id: position for position, step in enumerate(summary.steps)}
+        # The last element is empty, or a line still being written; either way it is skipped.
+        for line in lines[:-1]:
+            step = StepSummary.from_dict(json.loads(line))
+            position = positions.get(step.id)
+            if position is None:
+                positions[step.id] = len(summary.steps)
+                summary.steps.append(step)
+            else:
+                summary.steps[position] = step
+        return summary
 
     def _write_json(self, path: Path, payload: Dict) -> None:
+        self._write_json_chunks(path, [json.dumps(payload, indent=2)])
+
+    def _write_json_chunks(self, path: Path, chunks: Iterable[str]) -> None:
+        # Write aside and rename, so concurrent readers (list_traces scans every summary) never
+        # see a half-written file.
         path.parent.mkdir(parents=True, exist_ok=True)
-        with path.open("w", encoding="utf-8") as handle:
-            json.dump(payload, handle, indent=2)
+        temp_path = path.with_name(f".{path.name}.{uuid4().hex}.tmp")
+        try:
+            with temp_path.open("w", encoding="utf-8") as handle:
+                handle.writelines(chunks)
+            os.replace(temp_path, path)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
 
     def _read_json(self, path: Path) -> Dict:
-        if path.suffix == ".gz":
-            with gzip.open(path, "rt", encoding="utf-8") as handle:
+        with phase("read"):
+            if path.suffix == ".gz":
+                with gzip.open(path, "rt", encoding="utf-8") as handle:
+                    return json.load(handle)
+            with path.open("r", encoding="utf-8") as handle:
                 return json.load(handle)
-        with path.open("r", encoding="utf-8") as handle:
-            return json.load(handle)
 
     def _load_summary(self, path: Path) -> TraceSummary:
-        payload = self._read_json(path)
-        return TraceSummary.from_dict(payload)
+        with STORE_SUMMARY_LOAD_SECONDS.time():
+            payload = self._read_json(path)
+            with phase("parse"):
+                summary = TraceSummary.from_dict(payload)
+                if summary.status == "running":
+                    summary = self._fold_append_log(summary)
+                return summary
 
     def _upsert_trace(self, summary: TraceSummary) -> None:
-        meta = summary.metadata
-        created_at = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
-        with self._db() as conn:
-            conn.execute(
-                """
-                INSERT OR REPLACE INTO traces (
-                    id, name, startedAt, endedAt, status, wallTimeMs, workTimeMs,
-                    totalTokens, totalCostUsd, errorCount, retryCount,
-                    parentTraceId, branchPointStepId, createdAt
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    summary.id,
-                    summary.name,
-                    summary.startedAt,
-                    summary.endedAt,
-                    summary.status,
-                    meta.wallTimeMs,
-                    meta.workTimeMs,
-                    meta.totalTokens,
-                    meta.totalCostUsd,
-                    meta.errorCount,
-                    meta.retryCount,
-                    summary.parentTraceId,
-                    summary.branchPointStepId,
-                    created_at,
-                ),
-            )
+        with self._db("upsert_trace") as conn:
+            conn.execute(TRACE_UPSERT_SQL, _trace_row(summary))
+            conn.execute(BUMP_GENERATION_SQL)
             conn.commit()
 
     def _upsert_steps(self, trace_id: str, steps: Iterable[StepSummary]) -> None:
-        with self._db() as conn:
-            for step in steps:
-                conn.execute(
-                    """
-                    INSERT OR REPLACE INTO steps (
-                        traceId, stepId, stepIndex, type, name, startedAt, endedAt,
-                        status, durationMs, toolCallId, metricsTokens, metricsCost,
-                        previewTitle, previewSubtitle, previewInput, previewOutput,
-                        parentStepId
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        trace_id,
-                        step.id,
-                        step.index,
-                        step.type,
-                        step.name,
-                        step.startedAt,
-                        step.endedAt,
-                        step.status,
-                        step.durationMs,
-                        step.toolCallId,
-                        step.metrics.tokensTotal if step.metrics else None,
-                        step.metrics.costUsd if step.metrics else None,
-                        step.preview.title if step.preview else None,
-                        step.preview.subtitle if step.preview else None,
-                        step.preview.inputPreview if step.preview else None,
-                        step.preview.outputPreview if step.preview else None,
-                        step.parentStepId,
-                    ),
-                )
+        with self._db("upsert_steps") as conn:
+            # Replace the trace's rows wholesale: a re-ingest may drop or reorder steps.
+            conn.execute("DELETE FROM steps WHERE traceId = ?", (trace_id,))
+            conn.executemany(
+                STEP_UPSERT_SQL,
+                (_step_row(trace_id, step, position) for position, step in enumerate(steps)),
+            )
             conn.commit()
+
+
+GENERATION_SQL = "SELECT value FROM store_meta WHERE key = 'generation'"
+BUMP_GENERATION_SQL = "UPDATE store_meta SET value = value + 1 WHERE key = 'generation'"
+TRACE_UPSERT_SQL = """
+    INSERT OR REPLACE INTO traces (
+        id, name, startedAt, endedAt, status, wallTimeMs, workTimeMs,
+        totalTokens, totalCostUsd, errorCount, retryCount,
+        parentTraceId, branchPointStepId, createdAt, header
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+STEP_UPSERT_SQL = """
+    INSERT OR REPLACE INTO steps (
+        traceId, stepId, stepIndex, type, name, startedAt, endedAt,
+        status, durationMs, toolCallId, metricsTokens, metricsCost,
+        previewTitle, previewSubtitle, previewInput, previewOutput,
+        parentStepId, position, summary
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _trace_row(summary: TraceSummary) -> Tuple:
+    meta = summary.metadata
+    return (
+        summary.id,
+        summary.name,
+        summary.startedAt,
+        summary.endedAt,
+        summary.status,
+        meta.wallTimeMs,
+        meta.workTimeMs,
+        meta.totalTokens,
+        meta.totalCostUsd,
+        meta.errorCount,
+        meta.retryCount,
+        summary.parentTraceId,
+        summary.branchPointStepId,
+        _utc_now(),
+        json.dumps(replace(summary, steps=[]).to_dict()),
+    )
+
+
+def _step_row(trace_id: str, step: StepSummary, position: int) -> Tuple:
+    return (
+        trace_id,
+        step.id,
+        step.index,
+        step.type,
+        step.name,
+        step.startedAt,
+        step.endedAt,
+        step.status,
+        step.durationMs,
+        step.toolCallId,
+        step.metrics.tokensTotal if step.metrics else None,
+        step.metrics.costUsd if step.metrics else None,
+        step.preview.title if step.preview else None,
+        step.preview.subtitle if step.preview else None,
+        step.preview.inputPreview if step.preview else None,
+        step.preview.outputPreview if step.preview else None,
+        step.parentStepId,
+        position,
+        json.dumps(step.to_dict()),
+    )
+
+
+def _utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")